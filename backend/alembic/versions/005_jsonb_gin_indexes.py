@@ -0,0 +1,64 @@
+"""JSONB + GIN indexes for exercise body regions and case specializations
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-02-03 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+JSONB_COLUMNS = [
+    ('exercises', 'body_regions', 'ix_exercises_body_regions_gin'),
+    ('educational_cases', 'specialization_areas', 'ix_educational_cases_specialization_areas_gin'),
+]
+
+
+def upgrade() -> None:
+    """
+    Converte as colunas JSON usadas em filtros de containment para JSONB
+    e cria índices GIN (jsonb_path_ops). Apenas PostgreSQL; nos demais
+    dialetos o filtro usa json_each e não há o que migrar.
+    """
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    for table, column, index_name in JSONB_COLUMNS:
+        if table not in existing_tables:
+            continue
+
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"
+        )
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} "
+            f"USING GIN ({column} jsonb_path_ops)"
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    for table, column, index_name in JSONB_COLUMNS:
+        if table not in existing_tables:
+            continue
+
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSON USING {column}::json"
+        )
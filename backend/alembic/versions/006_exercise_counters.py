@@ -0,0 +1,75 @@
+"""Denormalized execution/rating counters on exercises and prescriptions
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-02-05 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    if 'exercises' in existing_tables:
+        op.add_column('exercises', sa.Column('execution_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column('exercises', sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column('exercises', sa.Column('rating_count', sa.Integer(), nullable=False, server_default='0'))
+        op.create_index('ix_exercises_execution_count', 'exercises', ['execution_count'])
+
+    if 'patient_exercises' in existing_tables:
+        op.add_column('patient_exercises', sa.Column('completed_count', sa.Integer(), nullable=False, server_default='0'))
+
+    if 'exercise_executions' not in existing_tables:
+        return
+
+    # Backfill a partir das execuções existentes
+    if 'exercises' in existing_tables:
+        op.execute("""
+            UPDATE exercises SET
+                execution_count = (
+                    SELECT COUNT(*) FROM exercise_executions ee
+                    WHERE ee.exercise_id = exercises.id
+                ),
+                rating_sum = (
+                    SELECT COALESCE(SUM(ee.patient_rating), 0) FROM exercise_executions ee
+                    WHERE ee.exercise_id = exercises.id
+                ),
+                rating_count = (
+                    SELECT COUNT(ee.patient_rating) FROM exercise_executions ee
+                    WHERE ee.exercise_id = exercises.id
+                )
+        """)
+
+    if 'patient_exercises' in existing_tables:
+        op.execute("""
+            UPDATE patient_exercises SET
+                completed_count = (
+                    SELECT COUNT(*) FROM exercise_executions ee
+                    WHERE ee.patient_exercise_id = patient_exercises.id
+                      AND ee.completed_at IS NOT NULL
+                )
+        """)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    if 'patient_exercises' in existing_tables:
+        op.drop_column('patient_exercises', 'completed_count')
+
+    if 'exercises' in existing_tables:
+        op.drop_index('ix_exercises_execution_count', table_name='exercises')
+        op.drop_column('exercises', 'rating_count')
+        op.drop_column('exercises', 'rating_sum')
+        op.drop_column('exercises', 'execution_count')
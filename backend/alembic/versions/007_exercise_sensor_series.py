@@ -0,0 +1,53 @@
+"""exercise sensor series (packed float32 time series)
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-02-10 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    # exercise_executions não é criada por migração (vem do db.create_all)
+    if 'exercise_executions' not in existing_tables or 'exercise_sensor_series' in existing_tables:
+        return
+
+    op.create_table('exercise_sensor_series',
+        sa.Column('id', sa.String(36), nullable=False),
+        sa.Column('execution_id', sa.String(36), nullable=False),
+        sa.Column('channel', sa.String(50), nullable=False),
+        sa.Column('sample_rate_hz', sa.Float(), nullable=False),
+        sa.Column('sample_count', sa.Integer(), nullable=False),
+        sa.Column('original_sample_count', sa.Integer(), nullable=False),
+        sa.Column('downsample_factor', sa.Integer(), nullable=True, default=1),
+        sa.Column('min_value', sa.Float(), nullable=True),
+        sa.Column('max_value', sa.Float(), nullable=True),
+        sa.Column('mean_value', sa.Float(), nullable=True),
+        sa.Column('encoding', sa.String(20), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['execution_id'], ['exercise_executions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_exercise_sensor_series_execution_id', 'exercise_sensor_series', ['execution_id'])
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    if 'exercise_sensor_series' in existing_tables:
+        op.drop_index('ix_exercise_sensor_series_execution_id', table_name='exercise_sensor_series')
+        op.drop_table('exercise_sensor_series')
@@ -0,0 +1,47 @@
+"""sync changelog and execution client_id (offline-first sync)
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-02-12 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('sync_changes',
+        sa.Column('seq', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('entity_type', sa.String(50), nullable=False),
+        sa.Column('entity_id', sa.String(36), nullable=False),
+        sa.Column('patient_id', sa.String(36), nullable=False),
+        sa.Column('operation', sa.String(10), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_sync_changes_patient_seq', 'sync_changes', ['patient_id', 'seq'])
+    op.create_index('ix_sync_changes_changed_at', 'sync_changes', ['changed_at'])
+
+    # exercise_executions não é criada por migração (vem do db.create_all)
+    conn = op.get_bind()
+    if 'exercise_executions' in sa.inspect(conn).get_table_names():
+        op.add_column('exercise_executions', sa.Column('client_id', sa.String(64), nullable=True))
+        op.create_index('ix_exercise_executions_client_id', 'exercise_executions', ['client_id'], unique=True)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if 'exercise_executions' in sa.inspect(conn).get_table_names():
+        op.drop_index('ix_exercise_executions_client_id', table_name='exercise_executions')
+        op.drop_column('exercise_executions', 'client_id')
+
+    op.drop_index('ix_sync_changes_changed_at', table_name='sync_changes')
+    op.drop_index('ix_sync_changes_patient_seq', table_name='sync_changes')
+    op.drop_table('sync_changes')
@@ -0,0 +1,53 @@
+"""patient points ledger (gamification running totals)
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-02-14 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('patient_points',
+        sa.Column('patient_id', sa.String(36), nullable=False),
+        sa.Column('total_points', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('execution_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('current_streak', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('longest_streak', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_activity_date', sa.Date(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('patient_id')
+    )
+    op.create_index('ix_patient_points_total_points', 'patient_points', ['total_points'])
+
+    # exercise_executions não é criada por migração (vem do db.create_all)
+    conn = op.get_bind()
+    if 'exercise_executions' not in sa.inspect(conn).get_table_names():
+        return
+
+    # Totais e contagens a partir das execuções existentes; os streaks
+    # são preenchidos por `flask backfill-points`.
+    op.execute("""
+        INSERT INTO patient_points (patient_id, total_points, execution_count,
+                                    current_streak, longest_streak, updated_at)
+        SELECT patient_id,
+               SUM(COALESCE(points_earned, 0) + COALESCE(bonus_points, 0)),
+               COUNT(id), 0, 0, CURRENT_TIMESTAMP
+        FROM exercise_executions
+        GROUP BY patient_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_patient_points_total_points', table_name='patient_points')
+    op.drop_table('patient_points')
@@ -0,0 +1,65 @@
+"""ai batch jobs (bulk document analysis and SOAP completion)
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-02-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('ai_batch_jobs',
+        sa.Column('id', sa.String(36), nullable=False),
+        sa.Column('job_type', sa.String(50), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('created_by', sa.String(36), nullable=False),
+        sa.Column('total_items', sa.Integer(), nullable=False),
+        sa.Column('succeeded_items', sa.Integer(), nullable=False),
+        sa.Column('failed_items', sa.Integer(), nullable=False),
+        sa.Column('tokens_used', sa.Integer(), nullable=False),
+        sa.Column('options', sa.JSON(), nullable=True),
+        sa.Column('provider_batch_id', sa.String(100), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ai_batch_jobs_status', 'ai_batch_jobs', ['status'])
+    op.create_index('ix_ai_batch_jobs_created_by', 'ai_batch_jobs', ['created_by'])
+
+    op.create_table('ai_batch_items',
+        sa.Column('id', sa.String(36), nullable=False),
+        sa.Column('job_id', sa.String(36), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('input', sa.JSON(), nullable=False),
+        sa.Column('output', sa.Text(), nullable=True),
+        sa.Column('provider', sa.String(20), nullable=True),
+        sa.Column('tokens_used', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['ai_batch_jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ai_batch_items_job_status', 'ai_batch_items', ['job_id', 'status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ai_batch_items_job_status', table_name='ai_batch_items')
+    op.drop_table('ai_batch_items')
+    op.drop_index('ix_ai_batch_jobs_created_by', table_name='ai_batch_jobs')
+    op.drop_index('ix_ai_batch_jobs_status', table_name='ai_batch_jobs')
+    op.drop_table('ai_batch_jobs')
@@ -0,0 +1,73 @@
+"""ai usage ledger (per-call records and hourly rollups)
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-02-24 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('ai_usage_records',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('tenant_id', sa.String(64), nullable=False),
+        sa.Column('user_id', sa.String(36), nullable=True),
+        sa.Column('provider', sa.String(20), nullable=False),
+        sa.Column('task_type', sa.String(50), nullable=False),
+        sa.Column('model', sa.String(100), nullable=True),
+        sa.Column('input_tokens', sa.Integer(), nullable=False),
+        sa.Column('output_tokens', sa.Integer(), nullable=False),
+        sa.Column('tokens_used', sa.Integer(), nullable=False),
+        sa.Column('cost_usd', sa.Float(), nullable=False),
+        sa.Column('latency_ms', sa.Integer(), nullable=False),
+        sa.Column('cache', sa.String(20), nullable=True),
+        sa.Column('tokens_saved', sa.Integer(), nullable=False),
+        sa.Column('prompt_tokens_saved', sa.Integer(), nullable=False),
+        sa.Column('success', sa.Boolean(), nullable=False),
+        sa.Column('background', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ai_usage_records_user_created', 'ai_usage_records', ['user_id', 'created_at'])
+    op.create_index('ix_ai_usage_records_tenant_created', 'ai_usage_records', ['tenant_id', 'created_at'])
+
+    op.create_table('ai_usage_hourly',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('hour', sa.DateTime(), nullable=False),
+        sa.Column('tenant_id', sa.String(64), nullable=False),
+        sa.Column('provider', sa.String(20), nullable=False),
+        sa.Column('task_type', sa.String(50), nullable=False),
+        sa.Column('latency_bucket_ms', sa.Integer(), nullable=False),
+        sa.Column('requests', sa.Integer(), nullable=False),
+        sa.Column('failures', sa.Integer(), nullable=False),
+        sa.Column('cache_hits', sa.Integer(), nullable=False),
+        sa.Column('input_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('output_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('tokens_used', sa.BigInteger(), nullable=False),
+        sa.Column('tokens_saved', sa.BigInteger(), nullable=False),
+        sa.Column('prompt_tokens_saved', sa.BigInteger(), nullable=False),
+        sa.Column('cost_usd', sa.Float(), nullable=False),
+        sa.Column('cost_saved_usd', sa.Float(), nullable=False),
+        sa.Column('latency_ms_total', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('hour', 'tenant_id', 'provider', 'task_type', 'latency_bucket_ms',
+                            name='uq_ai_usage_hourly_key')
+    )
+    op.create_index('ix_ai_usage_hourly_hour', 'ai_usage_hourly', ['hour'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ai_usage_hourly_hour', table_name='ai_usage_hourly')
+    op.drop_table('ai_usage_hourly')
+    op.drop_index('ix_ai_usage_records_tenant_created', table_name='ai_usage_records')
+    op.drop_index('ix_ai_usage_records_user_created', table_name='ai_usage_records')
+    op.drop_table('ai_usage_records')
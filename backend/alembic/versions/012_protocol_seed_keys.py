@@ -0,0 +1,42 @@
+"""Seed keys and content hashes for protocols and intervention templates
+
+Revision ID: 012
+Revises: 011
+Create Date: 2025-02-26 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+SEEDED_TABLES = ('clinical_protocols', 'intervention_templates')
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    for table in SEEDED_TABLES:
+        if table not in existing_tables:
+            continue
+        op.add_column(table, sa.Column('seed_key', sa.String(120), nullable=True))
+        op.add_column(table, sa.Column('content_hash', sa.String(64), nullable=True))
+        op.create_index(f'ix_{table}_seed_key', table, ['seed_key'], unique=True)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    for table in SEEDED_TABLES:
+        if table not in existing_tables:
+            continue
+        op.drop_index(f'ix_{table}_seed_key', table_name=table)
+        op.drop_column(table, 'content_hash')
+        op.drop_column(table, 'seed_key')
@@ -0,0 +1,71 @@
+"""Sparse Kanban board positions (BIGINT + ordering index)
+
+Revision ID: 013
+Revises: 012
+Create Date: 2025-03-03 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+POSITION_GAP = 1 << 20
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    if 'tasks' not in existing_tables:
+        return
+
+    # SQLite já guarda inteiros de 64 bits
+    if conn.dialect.name != 'sqlite':
+        op.alter_column('tasks', 'board_position', type_=sa.BigInteger(), existing_type=sa.Integer())
+
+    # Renumera cada coluna com espaçamento, mantendo a ordem atual
+    op.execute(f"""
+        UPDATE tasks SET board_position = {POSITION_GAP} * (
+            SELECT COUNT(*) FROM tasks t2
+            WHERE t2.project_id = tasks.project_id
+              AND t2.column_id = tasks.column_id
+              AND (
+                  COALESCE(t2.board_position, 0) < COALESCE(tasks.board_position, 0)
+                  OR (COALESCE(t2.board_position, 0) = COALESCE(tasks.board_position, 0)
+                      AND (t2.created_at < tasks.created_at
+                           OR (t2.created_at = tasks.created_at AND t2.id <= tasks.id)))
+              )
+        )
+    """)
+
+    op.create_index('ix_tasks_board_order', 'tasks', ['project_id', 'column_id', 'board_position'])
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    if 'tasks' not in existing_tables:
+        return
+
+    op.drop_index('ix_tasks_board_order', table_name='tasks')
+
+    # Volta para posições consecutivas (cabem em INTEGER)
+    op.execute("""
+        UPDATE tasks SET board_position = (
+            SELECT COUNT(*) FROM tasks t2
+            WHERE t2.project_id = tasks.project_id
+              AND t2.column_id = tasks.column_id
+              AND (t2.board_position < tasks.board_position
+                   OR (t2.board_position = tasks.board_position AND t2.id <= tasks.id))
+        )
+    """)
+
+    if conn.dialect.name != 'sqlite':
+        op.alter_column('tasks', 'board_position', type_=sa.Integer(), existing_type=sa.BigInteger())
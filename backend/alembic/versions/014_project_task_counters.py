@@ -0,0 +1,54 @@
+"""Per-project task key counters
+
+Revision ID: 014
+Revises: 013
+Create Date: 2025-03-05 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    if 'projects' not in existing_tables:
+        return
+
+    counters = op.create_table(
+        'project_task_counters',
+        sa.Column('project_id', sa.String(36), sa.ForeignKey('projects.id'), primary_key=True),
+        sa.Column('last_number', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+
+    if 'tasks' not in existing_tables:
+        return
+
+    # Backfill: maior número usado nas chaves "PROJ-123" de cada projeto
+    last_numbers = {}
+    for project_id, key in conn.execute(sa.text('SELECT project_id, "key" FROM tasks')):
+        suffix = (key or '').rsplit('-', 1)[-1]
+        if suffix.isdigit():
+            last_numbers[project_id] = max(last_numbers.get(project_id, 0), int(suffix))
+
+    if last_numbers:
+        op.bulk_insert(counters, [
+            {'project_id': project_id, 'last_number': number}
+            for project_id, number in last_numbers.items()
+        ])
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    if 'project_task_counters' in existing_tables:
+        op.drop_table('project_task_counters')
@@ -0,0 +1,45 @@
+"""Daily sprint burndown snapshots
+
+Revision ID: 015
+Revises: 014
+Create Date: 2025-03-07 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    if 'sprints' not in existing_tables or 'sprint_burndown_snapshots' in existing_tables:
+        return
+
+    # Linhas criadas na primeira mudança de cada sprint (services.sprint_burndown)
+    op.create_table(
+        'sprint_burndown_snapshots',
+        sa.Column('sprint_id', sa.String(36), sa.ForeignKey('sprints.id'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('total_tasks', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_tasks', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_points', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_points', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('hours_logged', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    existing_tables = sa.inspect(conn).get_table_names()
+
+    if 'sprint_burndown_snapshots' in existing_tables:
+        op.drop_table('sprint_burndown_snapshots')
@@ -13,11 +13,13 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from dotenv import load_dotenv
 
+from app.utils.db_routing import RoutingSession
+
 # Carrega variáveis de ambiente
 load_dotenv()
 
-# Inicialização das extensões
-db = SQLAlchemy()
+# Inicialização das extensões (a sessão manda leituras read-only para a réplica, se houver)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 limiter = Limiter(
@@ -40,6 +42,9 @@ def create_app(config_name=None):
     # Registro de blueprints
     register_blueprints(app)
     
+    # Comandos CLI
+    register_commands(app)
+    
     # Error handlers
     register_error_handlers(app)
     
@@ -58,6 +63,9 @@ def configure_app(app):
 def initialize_extensions(app):
     """Inicializa as extensões Flask"""
     
+    from app.utils.json_provider import init_json_provider
+    init_json_provider(app)
+    
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
@@ -68,34 +76,68 @@ def initialize_extensions(app):
          origins=app.config.get('CORS_ORIGINS', ['*']), 
          supports_credentials=True,
          allow_headers=['Content-Type', 'Authorization'])
+    
+    # Compressão e ETag/304 (registrado depois do CORS para rodar antes dele)
+    from app.utils.compression import init_compression
+    init_compression(app)
+
+# Blueprints da aplicação: nome -> (módulo, atributo, url_prefix).
+# Os módulos só são importados se o blueprint estiver habilitado, para que
+# workers dedicados (ex.: só sync) não paguem o import dos SDKs de IA etc.
+BLUEPRINTS = {
+    'auth': ('app.auth.routes', 'auth_bp', '/api/auth'),
+    'api': ('app.api.routes', 'api_bp', '/api/v1'),
+    'patients': ('app.api.patients', 'patients_bp', '/api/v1/patients'),
+    'medical_records': ('app.api.medical_records', 'medical_records_bp', '/api/v1/medical-records'),
+    'appointments': ('app.api.appointments', 'appointments_bp', '/api/v1/appointments'),
+    'exercises': ('app.api.exercises', 'exercises_bp', '/api/v1/exercises'),
+    'mentoring': ('app.api.mentoring', 'mentoring_bp', '/api/v1/mentoring'),
+    'ai': ('app.api.ai', 'ai_bp', '/api/v1/ai'),
+    'protocols': ('app.api.clinical_protocols', 'clinical_protocols_bp', '/api/v1/protocols'),
+    'projects': ('app.api.project_management', 'project_management_bp', '/api/v1/projects'),
+    'analytics': ('app.api.analytics', 'analytics_bp', '/api/v1/analytics'),
+    'sync': ('app.api.sync', 'sync_bp', '/api/v1/sync'),
+    'gamification': ('app.api.gamification', 'gamification_bp', '/api/v1/gamification'),
+}
+
+def enabled_blueprints(app):
+    """Nomes dos blueprints habilitados (ENABLED_BLUEPRINTS vazio = todos)"""
+    
+    enabled = app.config.get('ENABLED_BLUEPRINTS')
+    if not enabled:
+        return list(BLUEPRINTS)
+    
+    unknown = sorted(set(enabled) - set(BLUEPRINTS))
+    if unknown:
+        raise ValueError(f"Blueprints desconhecidos em ENABLED_BLUEPRINTS: {', '.join(unknown)}")
+    return [name for name in BLUEPRINTS if name in enabled]
 
 def register_blueprints(app):
-    """Registra todos os blueprints da aplicação"""
-    
-    # Import aqui para evitar circular imports
-    from app.auth.routes import auth_bp
-    from app.api.routes import api_bp
-    from app.api.patients import patients_bp
-    from app.api.medical_records import medical_records_bp
-    from app.api.appointments import appointments_bp
-    from app.api.exercises import exercises_bp
-    from app.api.mentoring import mentoring_bp
-    from app.api.ai import ai_bp
-    from app.api.clinical_protocols import clinical_protocols_bp
-    from app.api.project_management import project_management_bp
-    from app.api.analytics import analytics_bp
-    
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(api_bp, url_prefix='/api/v1')
-    app.register_blueprint(patients_bp, url_prefix='/api/v1/patients')
-    app.register_blueprint(medical_records_bp, url_prefix='/api/v1/medical-records')
-    app.register_blueprint(appointments_bp, url_prefix='/api/v1/appointments')
-    app.register_blueprint(exercises_bp, url_prefix='/api/v1/exercises')
-    app.register_blueprint(mentoring_bp, url_prefix='/api/v1/mentoring')
-    app.register_blueprint(ai_bp, url_prefix='/api/v1/ai')
-    app.register_blueprint(clinical_protocols_bp, url_prefix='/api/v1/protocols')
-    app.register_blueprint(project_management_bp, url_prefix='/api/v1/projects')
-    app.register_blueprint(analytics_bp, url_prefix='/api/v1/analytics')
+    """Registra os blueprints habilitados da aplicação"""
+    
+    # Import aqui para evitar circular imports (e só dos módulos habilitados)
+    from importlib import import_module
+    
+    for name in enabled_blueprints(app):
+        module_name, attribute, url_prefix = BLUEPRINTS[name]
+        blueprint = getattr(import_module(module_name), attribute)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+def register_commands(app):
+    """Registra os comandos CLI da aplicação"""
+    
+    from app.commands import (
+        init_protocols, reconcile_counters, backfill_points, ai_batch, startup_profile, rebalance_board,
+        research_export
+    )
+    
+    init_protocols.init_app(app)
+    reconcile_counters.init_app(app)
+    backfill_points.init_app(app)
+    ai_batch.init_app(app)
+    startup_profile.init_app(app)
+    rebalance_board.init_app(app)
+    research_export.init_app(app)
 
 def register_basic_routes(app):
     """Registra rotas básicas da aplicação"""
@@ -109,6 +151,22 @@ def register_basic_routes(app):
             'version': '1.0.0'
         })
     
+    @app.route('/health/compression')
+    def compression_metrics():
+        """Bytes economizados com compressão e respostas 304"""
+        from app.utils.compression import get_compression_metrics
+        return jsonify(get_compression_metrics())
+    
+    @app.route('/health/replica')
+    def replica_status():
+        """Estado da réplica de leitura (atraso e leituras desviadas ao primário)"""
+        from app.utils.db_routing import get_replica_monitor
+        monitor = get_replica_monitor()
+        if monitor is None:
+            return jsonify({'configured': False})
+        monitor.available()
+        return jsonify({'configured': True, **monitor.stats()})
+    
     @app.route('/api/v1')
     def api_info():
         """Endpoint com informações da API"""
@@ -126,7 +184,9 @@ def register_basic_routes(app):
                 'ai': '/api/v1/ai/*',
                 'protocols': '/api/v1/protocols/*',
                 'projects': '/api/v1/projects/*',
-                'analytics': '/api/v1/analytics/*'
+                'analytics': '/api/v1/analytics/*',
+                'sync': '/api/v1/sync/*',
+                'gamification': '/api/v1/gamification/*'
             }
         })
 
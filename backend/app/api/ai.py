@@ -2,22 +2,43 @@
 API endpoints para sistema de IA
 """
 
-import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import wraps
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
-from ..services.ai_orchestrator import ai_service, AIProvider, AITaskType
+from ..services.ai_orchestrator import get_ai_service, AIProvider, AITaskType
+from ..services.ai_cache import get_response_cache
+from ..services.ai_context import MAX_DOCUMENT_LENGTH, get_patient_context_cache
+from ..services.ai_executor import get_ai_executor, run_ai
+from ..services.ai_usage import get_usage_ledger, usage_report
+from ..services.ai_batch import (
+    JOB_TYPES, BatchValidationError, cancel_batch_job, create_batch_job,
+    dispatch_batch_job, retry_failed_items
+)
 from ..models.user import User
 from ..models.patient import Patient
 from ..models.medical_record import MedicalRecord
+from ..models.ai_batch import AIBatchJob, AIBatchItem, AIBatchStatus
 from .. import db
 from ..utils.decorators import role_required
 from ..utils.validation import validate_json
+from ..utils.sse import sse_response, wants_stream
 
 ai_bp = Blueprint('ai', __name__, url_prefix='/api/ai')
 
 
+def ai_quota_required(view):
+    """Responde 429 quando a cota de tokens do usuário ou da clínica acabou"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        error = get_usage_ledger().quota_error(get_jwt_identity())
+        if error:
+            return jsonify({'error': error}), 429
+        return view(*args, **kwargs)
+    return wrapper
+
+
 # =============================================================================
 # SOAP AUTO-COMPLETAR
 # =============================================================================
@@ -25,6 +46,7 @@ ai_bp = Blueprint('ai', __name__, url_prefix='/api/ai')
 @ai_bp.route('/soap/complete', methods=['POST'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA', 'ESTAGIARIO'])
+@ai_quota_required
 @validate_json({
     'patient_id': {'type': 'string', 'required': True},
     'subjective': {'type': 'string', 'required': False},
@@ -32,8 +54,8 @@ ai_bp = Blueprint('ai', __name__, url_prefix='/api/ai')
     'assessment': {'type': 'string', 'required': False},
     'plan': {'type': 'string', 'required': False}
 })
-async def complete_soap():
-    """Auto-completa evolução SOAP"""
+def complete_soap():
+    """Auto-completa evolução SOAP (SSE com ?stream=1)"""
     
     data = request.get_json()
     user_id = get_jwt_identity()
@@ -51,13 +73,19 @@ async def complete_soap():
         'plan': data.get('plan', '')
     }
     
+    if wants_stream():
+        service = get_ai_service()
+        return sse_response(service.orchestrator.stream_request(
+            service.build_soap_request(data['patient_id'], partial_data, user_id)
+        ))
+    
     try:
         # Processar com IA
-        response = await ai_service.complete_soap_evolution(
+        response = run_ai(get_ai_service().complete_soap_evolution(
             patient_id=data['patient_id'],
             partial_data=partial_data,
             user_id=user_id
-        )
+        ))
         
         return jsonify({
             'success': response.success,
@@ -82,14 +110,15 @@ async def complete_soap():
 @ai_bp.route('/exercises/suggest', methods=['POST'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA', 'ESTAGIARIO'])
+@ai_quota_required
 @validate_json({
     'patient_id': {'type': 'string', 'required': True},
     'condition': {'type': 'string', 'required': True},
     'goals': {'type': 'list', 'required': True, 'minlength': 1},
     'limitations': {'type': 'list', 'required': False}
 })
-async def suggest_exercises():
-    """Sugere exercícios personalizados"""
+def suggest_exercises():
+    """Sugere exercícios personalizados (SSE com ?stream=1)"""
     
     data = request.get_json()
     user_id = get_jwt_identity()
@@ -99,13 +128,19 @@ async def suggest_exercises():
     if not patient:
         return jsonify({'error': 'Paciente não encontrado'}), 404
     
+    if wants_stream():
+        service = get_ai_service()
+        return sse_response(service.orchestrator.stream_request(
+            service.build_exercise_request(data['patient_id'], data['condition'], data['goals'], user_id)
+        ))
+    
     try:
-        response = await ai_service.suggest_exercises(
+        response = run_ai(get_ai_service().suggest_exercises(
             patient_id=data['patient_id'],
             condition=data['condition'],
             goals=data['goals'],
             user_id=user_id
-        )
+        ))
         
         return jsonify({
             'success': response.success,
@@ -129,23 +164,24 @@ async def suggest_exercises():
 @ai_bp.route('/diagnosis/support', methods=['POST'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA'])
+@ai_quota_required
 @validate_json({
     'symptoms': {'type': 'list', 'required': True, 'minlength': 1},
     'examination_findings': {'type': 'dict', 'required': True},
     'patient_history': {'type': 'dict', 'required': False}
 })
-async def diagnosis_support():
+def diagnosis_support():
     """Apoio ao diagnóstico diferencial"""
     
     data = request.get_json()
     user_id = get_jwt_identity()
     
     try:
-        response = await ai_service.support_diagnosis(
+        response = run_ai(get_ai_service().support_diagnosis(
             symptoms=data['symptoms'],
             examination_findings=data['examination_findings'],
             user_id=user_id
-        )
+        ))
         
         return jsonify({
             'success': response.success,
@@ -169,13 +205,14 @@ async def diagnosis_support():
 @ai_bp.route('/treatment/plan', methods=['POST'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA'])
+@ai_quota_required
 @validate_json({
     'patient_id': {'type': 'string', 'required': True},
     'diagnosis': {'type': 'string', 'required': True},
     'patient_profile': {'type': 'dict', 'required': True}
 })
-async def generate_treatment_plan():
-    """Gera plano de tratamento"""
+def generate_treatment_plan():
+    """Gera plano de tratamento (SSE com ?stream=1)"""
     
     data = request.get_json()
     user_id = get_jwt_identity()
@@ -185,12 +222,18 @@ async def generate_treatment_plan():
     if not patient:
         return jsonify({'error': 'Paciente não encontrado'}), 404
     
+    if wants_stream():
+        service = get_ai_service()
+        return sse_response(service.orchestrator.stream_request(
+            service.build_treatment_plan_request(data['diagnosis'], data['patient_profile'], user_id)
+        ))
+    
     try:
-        response = await ai_service.generate_treatment_plan(
+        response = run_ai(get_ai_service().generate_treatment_plan(
             diagnosis=data['diagnosis'],
             patient_profile=data['patient_profile'],
             user_id=user_id
-        )
+        ))
         
         return jsonify({
             'success': response.success,
@@ -213,25 +256,32 @@ async def generate_treatment_plan():
 
 @ai_bp.route('/chat', methods=['POST'])
 @jwt_required()
+@ai_quota_required
 @validate_json({
     'message': {'type': 'string', 'required': True, 'minlength': 1},
     'conversation_history': {'type': 'list', 'required': False},
     'context': {'type': 'dict', 'required': False}
 })
-async def chat():
-    """Chat inteligente com IA"""
+def chat():
+    """Chat inteligente com IA (SSE com ?stream=1)"""
     
     data = request.get_json()
     user_id = get_jwt_identity()
     
     conversation_history = data.get('conversation_history', [])
     
+    if wants_stream():
+        service = get_ai_service()
+        return sse_response(service.orchestrator.stream_request(
+            service.build_chat_request(data['message'], conversation_history, user_id)
+        ))
+    
     try:
-        response = await ai_service.chat_response(
+        response = run_ai(get_ai_service().chat_response(
             message=data['message'],
             conversation_history=conversation_history,
             user_id=user_id
-        )
+        ))
         
         return jsonify({
             'success': response.success,
@@ -255,29 +305,30 @@ async def chat():
 @ai_bp.route('/documents/analyze', methods=['POST'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA', 'ESTAGIARIO'])
+@ai_quota_required
 @validate_json({
     'content': {'type': 'string', 'required': True, 'minlength': 10},
     'document_type': {'type': 'string', 'required': True},
     'patient_id': {'type': 'string', 'required': False}
 })
-async def analyze_document():
+def analyze_document():
     """Analisa documentos médicos"""
     
     data = request.get_json()
     user_id = get_jwt_identity()
     
-    # Verificar tamanho do documento
-    if len(data['content']) > 50000:  # Limite de 50KB
+    # Verificar tamanho do documento (acima do orçamento da tarefa é analisado por partes)
+    if len(data['content']) > MAX_DOCUMENT_LENGTH:
         return jsonify({
-            'error': 'Documento muito grande. Limite: 50KB'
+            'error': f'Documento muito grande. Limite: {MAX_DOCUMENT_LENGTH} caracteres'
         }), 400
     
     try:
-        response = await ai_service.analyze_document(
+        response = run_ai(get_ai_service().analyze_document(
             document_content=data['content'],
             document_type=data['document_type'],
             user_id=user_id
-        )
+        ))
         
         return jsonify({
             'success': response.success,
@@ -285,6 +336,7 @@ async def analyze_document():
             'provider': response.provider.value,
             'confidence': response.confidence,
             'processing_time': response.processing_time,
+            'chunks': response.metadata.get('chunks', 1),
             'error': response.error
         })
         
@@ -301,13 +353,14 @@ async def analyze_document():
 @ai_bp.route('/cases/generate', methods=['POST'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA'])
+@ai_quota_required
 @validate_json({
     'specialty_area': {'type': 'string', 'required': True},
     'complexity_level': {'type': 'string', 'required': True, 'enum': ['basico', 'intermediario', 'avancado', 'complexo']},
     'learning_objectives': {'type': 'list', 'required': True, 'minlength': 1},
     'include_images': {'type': 'boolean', 'required': False}
 })
-async def generate_case_study():
+def generate_case_study():
     """Gera casos clínicos educacionais"""
     
     data = request.get_json()
@@ -343,7 +396,7 @@ Mantenha realismo clínico e base as informações em evidência científica.
     )
     
     try:
-        response = await ai_service.orchestrator.process_request(request_obj)
+        response = run_ai(get_ai_service().orchestrator.process_request(request_obj))
         
         return jsonify({
             'success': response.success,
@@ -367,12 +420,13 @@ Mantenha realismo clínico e base as informações em evidência científica.
 @ai_bp.route('/competency/evaluate', methods=['POST'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA'])
+@ai_quota_required
 @validate_json({
     'intern_performance': {'type': 'dict', 'required': True},
     'evaluation_criteria': {'type': 'list', 'required': True},
     'performance_examples': {'type': 'list', 'required': False}
 })
-async def evaluate_competency():
+def evaluate_competency():
     """Avalia competências de estagiários"""
     
     data = request.get_json()
@@ -410,7 +464,7 @@ Forneça:
     )
     
     try:
-        response = await ai_service.orchestrator.process_request(request_obj)
+        response = run_ai(get_ai_service().orchestrator.process_request(request_obj))
         
         return jsonify({
             'success': response.success,
@@ -427,6 +481,134 @@ Forneça:
         }), 500
 
 
+# =============================================================================
+# JOBS EM LOTE
+# =============================================================================
+
+def _get_batch_job(job_id, user):
+    """Job visível ao usuário (criador ou ADMIN)"""
+    job = AIBatchJob.query.get(job_id)
+    if job is None or (user.role != 'ADMIN' and job.created_by != user.id):
+        return None
+    return job
+
+
+@ai_bp.route('/batch/jobs', methods=['POST'])
+@jwt_required()
+@role_required(['ADMIN', 'FISIOTERAPEUTA'])
+@ai_quota_required
+@validate_json({
+    'job_type': {'type': 'string', 'required': True, 'allowed': list(JOB_TYPES)},
+    'items': {'type': 'list', 'required': True, 'minlength': 1},
+    'options': {'type': 'dict', 'required': False}
+})
+def create_batch_job_endpoint():
+    """Cria job em lote (análise de documentos ou SOAP) e agenda o processamento"""
+    
+    data = request.get_json()
+    user = User.query.get(get_jwt_identity())
+    
+    try:
+        job = create_batch_job(user, data['job_type'], data['items'], data.get('options'))
+    except BatchValidationError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    
+    dispatch_batch_job(job.id)
+    return jsonify({'message': 'Job criado', 'job': job.to_dict()}), 202
+
+
+@ai_bp.route('/batch/jobs', methods=['GET'])
+@jwt_required()
+@role_required(['ADMIN', 'FISIOTERAPEUTA'])
+def list_batch_jobs():
+    """Jobs do usuário (ADMIN vê todos)"""
+    
+    user = User.query.get(get_jwt_identity())
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    
+    query = AIBatchJob.query
+    if user.role != 'ADMIN':
+        query = query.filter_by(created_by=user.id)
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+    
+    pagination = query.order_by(AIBatchJob.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
+    return jsonify({
+        'jobs': [job.to_dict() for job in pagination.items],
+        'total': pagination.total,
+        'page': page,
+        'pages': pagination.pages
+    })
+
+
+@ai_bp.route('/batch/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_batch_job(job_id):
+    """Status e progresso do job"""
+    
+    job = _get_batch_job(job_id, User.query.get(get_jwt_identity()))
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    return jsonify({'job': job.to_dict()})
+
+
+@ai_bp.route('/batch/jobs/<job_id>/results', methods=['GET'])
+@jwt_required()
+def get_batch_job_results(job_id):
+    """Resultados por item (parciais enquanto o job roda)"""
+    
+    job = _get_batch_job(job_id, User.query.get(get_jwt_identity()))
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 50, type=int), 200)
+    include_input = request.args.get('include_input', 'false').lower() == 'true'
+    
+    query = job.items
+    if request.args.get('status'):
+        query = query.filter(AIBatchItem.status == request.args['status'])
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    
+    return jsonify({
+        'job': job.to_dict(),
+        'items': [item.to_dict(include_input=include_input) for item in pagination.items],
+        'total': pagination.total,
+        'page': page,
+        'pages': pagination.pages
+    })
+
+
+@ai_bp.route('/batch/jobs/<job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_batch_job_endpoint(job_id):
+    """Cancela o job mantendo os itens já concluídos"""
+    
+    job = _get_batch_job(job_id, User.query.get(get_jwt_identity()))
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    return jsonify({'job': cancel_batch_job(job).to_dict()})
+
+
+@ai_bp.route('/batch/jobs/<job_id>/retry', methods=['POST'])
+@jwt_required()
+def retry_batch_job(job_id):
+    """Recoloca os itens falhos na fila"""
+    
+    job = _get_batch_job(job_id, User.query.get(get_jwt_identity()))
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    if job.status in (AIBatchStatus.PENDING, AIBatchStatus.RUNNING):
+        return jsonify({'error': 'Job ainda em processamento'}), 409
+    
+    count = retry_failed_items(job)
+    if count:
+        dispatch_batch_job(job.id)
+    return jsonify({'message': f'{count} itens recolocados na fila', 'job': job.to_dict()})
+
+
 # =============================================================================
 # UTILITÁRIOS E STATUS
 # =============================================================================
@@ -439,7 +621,7 @@ def ai_status():
     available_providers = []
     
     # Verificar cada provedor
-    orchestrator = ai_service.orchestrator
+    orchestrator = get_ai_service().orchestrator
     
     for provider in AIProvider:
         is_available = provider in orchestrator.providers
@@ -449,8 +631,19 @@ def ai_status():
             'description': _get_provider_description(provider)
         })
     
+    routing = orchestrator.router.snapshot() if orchestrator.router else {}
+    streaming = orchestrator.stream_metrics_snapshot()
+    for provider in available_providers:
+        provider['routing'] = routing.get(provider['name'])
+        provider['streaming'] = streaming.get(provider['name'])
+    
     return jsonify({
         'providers': available_providers,
+        'executor': {
+            **get_ai_executor().stats(),
+            'concurrency': orchestrator.limiter.snapshot() if orchestrator.limiter else None
+        },
+        'prompt_tokens': orchestrator.prompt_stats_snapshot(),
         'total_available': len(orchestrator.providers),
         'default_provider': 'claude' if AIProvider.CLAUDE in orchestrator.providers else 'gpt4',
         'supported_tasks': [task.value for task in AITaskType]
@@ -461,32 +654,57 @@ def ai_status():
 @jwt_required()
 @role_required(['ADMIN'])
 def ai_usage_stats():
-    """Estatísticas de uso da IA (placeholder)"""
+    """Tokens, custo, latência (p50/p95/p99) e economia do cache por provedor e tarefa"""
+    
+    hours = min(max(request.args.get('hours', 24, type=int), 1), 24 * 90)
+    ledger = get_usage_ledger()
+    
+    # Inclui no relatório o que ainda está no buffer deste processo
+    ledger.flush()
     
-    # Implementar coleta de métricas em produção
+    report = usage_report(datetime.utcnow() - timedelta(hours=hours), tenant_id=ledger.tenant_id)
     return jsonify({
-        'total_requests': 0,
-        'requests_by_provider': {
-            'claude': 0,
-            'gpt4': 0,
-            'gemini': 0
-        },
-        'requests_by_task': {
-            task.value: 0 for task in AITaskType
-        },
-        'average_response_time': 0.0,
-        'success_rate': 0.0,
-        'tokens_used': {
-            'total': 0,
-            'by_provider': {
-                'claude': 0,
-                'gpt4': 0,
-                'gemini': 0
-            }
-        }
+        'hours': hours,
+        **report,
+        'quotas': ledger.quota_snapshot(),
+        'ledger': ledger.stats()
     })
 
 
+@ai_bp.route('/cache/stats', methods=['GET'])
+@jwt_required()
+@role_required(['ADMIN'])
+def ai_cache_stats():
+    """Taxa de acerto e tokens economizados pelo cache de respostas"""
+    
+    cache = get_response_cache()
+    if cache is None:
+        return jsonify({'enabled': False, 'patient_context': get_patient_context_cache().stats()})
+    
+    return jsonify({
+        'enabled': True,
+        'backend': type(cache.backend).__name__,
+        'semantic_enabled': cache.semantic is not None,
+        'ttl_seconds': cache.ttl,
+        'max_temperature': cache.max_temperature,
+        'stats': cache.stats.to_dict(),
+        'patient_context': get_patient_context_cache().stats()
+    })
+
+
+@ai_bp.route('/cache', methods=['DELETE'])
+@jwt_required()
+@role_required(['ADMIN'])
+def ai_cache_clear():
+    """Esvazia o cache de respostas"""
+    
+    cache = get_response_cache()
+    if cache is not None:
+        cache.clear()
+    get_patient_context_cache().clear()
+    return jsonify({'message': 'Cache de IA esvaziado'})
+
+
 def _get_provider_description(provider: AIProvider) -> str:
     """Retorna descrição do provedor"""
     
@@ -3,7 +3,7 @@ API endpoints para analytics e dashboard executivo
 """
 
 from datetime import datetime, date, timedelta
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import and_, or_, desc, func, extract
 from sqlalchemy.orm import joinedload
@@ -15,7 +15,9 @@ from ..models.patient import Patient
 from ..models.medical_record import MedicalRecord
 from ..models.exercise import ExerciseExecution
 from ..models.project_management import Project, Task
+from ..services.outcome_trends import SOURCES, not_improving_worklist, patient_outcome_trends
 from .. import db
+from ..utils.db_routing import read_only
 from ..utils.decorators import role_required
 from ..utils.pagination import paginate
 from ..utils.validation import validate_json
@@ -30,6 +32,7 @@ analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
 @analytics_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA'])
+@read_only
 def get_executive_dashboard():
     """Dashboard executivo com KPIs principais"""
     
@@ -96,6 +99,7 @@ def get_executive_dashboard():
 @analytics_bp.route('/metrics', methods=['GET'])
 @jwt_required()
 @role_required(['ADMIN'])
+@read_only
 def get_metrics():
     """Lista métricas calculadas"""
     
@@ -132,6 +136,7 @@ def get_metrics():
 @analytics_bp.route('/operational-metrics', methods=['GET'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA'])
+@read_only
 def get_operational_metrics():
     """Métricas operacionais detalhadas"""
     
@@ -157,7 +162,7 @@ def get_operational_metrics():
         ).count()
         
         time_series.append({
-            'date': current_date.isoformat(),
+            'date': current_date,
             'appointments': daily_appointments,
             'completed': daily_completed,
             'completion_rate': (daily_completed / daily_appointments * 100) if daily_appointments > 0 else 0
@@ -205,6 +210,7 @@ def get_operational_metrics():
 @analytics_bp.route('/clinical-metrics', methods=['GET'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA'])
+@read_only
 def get_clinical_metrics():
     """Métricas clínicas detalhadas"""
     
@@ -269,6 +275,7 @@ def get_clinical_metrics():
 @analytics_bp.route('/patient-analytics', methods=['GET'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA'])
+@read_only
 def get_patient_analytics():
     """Analytics específicas de pacientes"""
     
@@ -363,6 +370,7 @@ def get_patient_analytics():
 @analytics_bp.route('/performance-trends', methods=['GET'])
 @jwt_required()
 @role_required(['ADMIN'])
+@read_only
 def get_performance_trends():
     """Tendências de performance ao longo do tempo"""
     
@@ -403,7 +411,7 @@ def get_performance_trends():
         ).count()
         
         monthly_trends.append({
-            'month': current_month.isoformat(),
+            'month': current_month,
             'appointments': appointments,
             'completed_appointments': completed,
             'completion_rate': (completed / appointments * 100) if appointments > 0 else 0,
@@ -492,7 +500,7 @@ def get_real_time_stats():
             'id': apt.id,
             'patient_name': apt.patient.full_name if apt.patient else 'N/A',
             'therapist_name': apt.therapist.full_name if apt.therapist else 'N/A',
-            'date': apt.appointment_date.isoformat(),
+            'date': apt.appointment_date,
             'time': apt.start_time.strftime('%H:%M') if apt.start_time else 'N/A',
             'type': apt.appointment_type
         }
@@ -567,6 +575,49 @@ def create_analytics_snapshot():
     }), 201
 
 
+# =============================================================================
+# DESFECHOS CLÍNICOS
+# =============================================================================
+
+def _outcome_params():
+    """Janela (dias) e MCID da requisição, com os padrões da configuração"""
+    lookback_days = request.args.get('days', current_app.config.get('OUTCOME_LOOKBACK_DAYS', 90), type=int)
+    mcid = request.args.get('mcid', current_app.config.get('OUTCOME_PAIN_MCID', 2.0), type=float)
+    return max(1, min(lookback_days, 730)), mcid
+
+
+@analytics_bp.route('/outcomes/not-improving', methods=['GET'])
+@jwt_required()
+@role_required(['ADMIN', 'FISIOTERAPEUTA'])
+@read_only
+def get_not_improving_patients():
+    """Pacientes ativos sem melhora clinicamente importante da dor"""
+    
+    lookback_days, mcid = _outcome_params()
+    sources = [source.strip() for source in request.args.get('sources', ','.join(SOURCES)).split(',') if source.strip()]
+    unknown = set(sources) - set(SOURCES)
+    if unknown or not sources:
+        return jsonify({'error': f'Fontes válidas: {", ".join(SOURCES)}'}), 400
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    
+    return jsonify(not_improving_worklist(lookback_days=lookback_days, mcid=mcid, sources=sources, limit=limit))
+
+
+@analytics_bp.route('/outcomes/patients/<patient_id>', methods=['GET'])
+@jwt_required()
+@role_required(['ADMIN', 'FISIOTERAPEUTA'])
+@read_only
+def get_patient_outcome_trends(patient_id):
+    """Tendências de dor do paciente por fonte, com série suavizada"""
+    
+    patient = Patient.query.get(patient_id)
+    if not patient:
+        return jsonify({'error': 'Paciente não encontrado'}), 404
+    
+    lookback_days, mcid = _outcome_params()
+    return jsonify(patient_outcome_trends(patient_id, lookback_days=lookback_days, mcid=mcid))
+
+
 # Registrar blueprint
 def init_app(app):
     """Registra o blueprint no app Flask"""
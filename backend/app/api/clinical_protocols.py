@@ -3,9 +3,9 @@ API endpoints para protocolos clínicos baseados em evidência
 """
 
 from datetime import datetime, date
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy import and_, or_, desc, func, update
 from sqlalchemy.orm import joinedload
 
 from ..models.clinical_protocols import (
@@ -17,20 +17,73 @@ from ..models.patient import Patient
 from .. import db
 from ..utils.decorators import role_required
 from ..utils.pagination import paginate
+from ..utils.compression import conditional
 from ..utils.validation import validate_json
+from ..services.protocol_catalog import get_protocol_catalog, preload_protocol_catalog
 
 clinical_protocols_bp = Blueprint('clinical_protocols', __name__, url_prefix='/api/clinical_protocols')
 
 
+@clinical_protocols_bp.record_once
+def _preload_catalog(state):
+    preload_protocol_catalog(state.app)
+
+
+def _catalog():
+    """Catálogo em memória, ou None quando desativado"""
+    if not current_app.config.get('PROTOCOL_CATALOG_ENABLED', True):
+        return None
+    return get_protocol_catalog().get()
+
+
+def _catalog_version():
+    """Versão do catálogo para o ETag das listagens (None quando desativado)"""
+    catalog = _catalog()
+    return catalog.version if catalog is not None else None
+
+
+def _json_bytes(body):
+    """Resposta com JSON já serializado pelo catálogo"""
+    return current_app.response_class(body, mimetype='application/json')
+
+
+def _count_protocol_use(protocol_id):
+    """Incrementa o uso sem mexer em updated_at (não muda a versão do catálogo)"""
+    db.session.execute(
+        update(ClinicalProtocol).where(ClinicalProtocol.id == protocol_id).values(
+            usage_count=ClinicalProtocol.usage_count + 1,
+            last_used_at=datetime.utcnow(),
+            updated_at=ClinicalProtocol.updated_at
+        )
+    )
+    db.session.commit()
+
+
 # =============================================================================
 # PROTOCOLOS CLÍNICOS
 # =============================================================================
 
 @clinical_protocols_bp.route('/protocols', methods=['GET'])
 @jwt_required()
+@conditional(_catalog_version)
 def get_protocols():
     """Lista protocolos clínicos"""
     
+    catalog = _catalog()
+    if catalog is not None:
+        return _json_bytes(catalog.list_protocols(
+            status=request.args.get('status') or 'ativo',
+            body_region=request.args.get('body_region'),
+            specialization=request.args.get('specialization'),
+            evidence_level=request.args.get('evidence_level'),
+            pathology=request.args.get('pathology'),
+            search=request.args.get('search'),
+            sort_by=request.args.get('sort_by', 'updated_at'),
+            include_details=request.args.get('include_details', 'false').lower() == 'true',
+            page=request.args.get('page', 1, type=int),
+            per_page=min(request.args.get('per_page', 20, type=int), 100)
+        ))
+    
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
     
@@ -97,20 +150,35 @@ def get_protocols():
 def get_protocol(protocol_id):
     """Obtém protocolo específico"""
     
+    catalog = _catalog()
+    body = catalog.protocol_json(protocol_id) if catalog is not None else None
+    if body is not None:
+        _count_protocol_use(protocol_id)
+        return _json_bytes(body)
+    
+    # Fora do catálogo (criado em outro processo desde a última verificação)
     protocol = ClinicalProtocol.query.get(protocol_id)
     if not protocol:
         return jsonify({'error': 'Protocolo não encontrado'}), 404
     
     # Incrementar contador de uso
-    protocol.usage_count += 1
-    protocol.last_used_at = datetime.utcnow()
-    db.session.commit()
+    _count_protocol_use(protocol_id)
+    db.session.refresh(protocol)
     
     return jsonify({
         'protocol': protocol.to_dict(include_details=True)
     })
 
 
+@clinical_protocols_bp.route('/protocols/icd10/<code>', methods=['GET'])
+@jwt_required()
+@conditional(_catalog_version)
+def get_protocols_by_icd10(code):
+    """Protocolos ativos para um código CID-10 (exato ou da categoria)"""
+    
+    return _json_bytes(get_protocol_catalog().get().icd10_lookup(code))
+
+
 @clinical_protocols_bp.route('/protocols', methods=['POST'])
 @jwt_required()
 @role_required(['ADMIN', 'FISIOTERAPEUTA'])
@@ -511,9 +579,22 @@ def complete_application(application_id):
 
 @clinical_protocols_bp.route('/interventions', methods=['GET'])
 @jwt_required()
+@conditional(_catalog_version)
 def get_intervention_templates():
     """Lista templates de intervenção"""
     
+    catalog = _catalog()
+    if catalog is not None:
+        return _json_bytes(catalog.list_interventions(
+            intervention_type=request.args.get('type'),
+            category=request.args.get('category'),
+            evidence_level=request.args.get('evidence_level'),
+            search=request.args.get('search'),
+            include_details=request.args.get('include_details', 'false').lower() == 'true',
+            page=request.args.get('page', 1, type=int),
+            per_page=min(request.args.get('per_page', 20, type=int), 100)
+        ))
+    
     query = InterventionTemplate.query.filter(InterventionTemplate.is_active == True)
     
     # Filtros
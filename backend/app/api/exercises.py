@@ -9,11 +9,16 @@ from sqlalchemy import and_, or_, desc
 from sqlalchemy.orm import joinedload
 
 from ..models.exercise import (
-    Exercise, PatientExercise, ExerciseExecution, ExerciseProgram,
+    Exercise, PatientExercise, ExerciseExecution, ExerciseProgram, ExerciseSensorSeries,
     ExerciseCategory, ExerciseDifficulty, BodyRegion
 )
 from ..models.user import User
 from ..models.patient import Patient
+from ..services.exercise_stats import apply_execution_counters
+from ..services.points_ledger import apply_points, publish_points
+from ..services.execution_ingestion import (
+    ingest_executions, calculate_execution_points, check_execution_permission, MAX_BATCH_SIZE
+)
 from .. import db
 from ..utils.decorators import role_required
 from ..utils.pagination import paginate
@@ -44,7 +49,7 @@ def get_exercises():
     
     body_region = request.args.get('body_region')
     if body_region:
-        query = query.filter(Exercise.body_regions.contains([body_region]))
+        query = query.filter(Exercise.body_region_filter(body_region))
     
     # Busca por texto
     search = request.args.get('search', '').strip()
@@ -74,6 +79,10 @@ def get_exercises():
     
     if sort_by == 'title':
         order_field = Exercise.title
+    elif sort_by == 'rating':
+        order_field = Exercise.average_rating
+    elif sort_by == 'popularity':
+        order_field = Exercise.total_executions
     elif sort_by == 'difficulty':
         order_field = Exercise.difficulty
     elif sort_by == 'category':
@@ -510,33 +519,14 @@ def create_execution():
     if not patient_exercise:
         return jsonify({'error': 'Prescrição não encontrada'}), 404
     
-    # Verificar permissões (paciente ou terapeuta do paciente)
-    if user.role == 'PACIENTE' and patient_exercise.patient_id != user_id:
-        return jsonify({'error': 'Acesso não autorizado'}), 403
-    elif user.role == 'FISIOTERAPEUTA' and patient_exercise.prescribed_by != user_id:
-        return jsonify({'error': 'Acesso não autorizado'}), 403
-    
-    # Verificar se prescrição está ativa
-    if not patient_exercise.is_active:
-        return jsonify({'error': 'Prescrição não está ativa'}), 400
+    # Verificar permissões (paciente ou terapeuta do paciente) e prescrição ativa
+    error = check_execution_permission(user, patient_exercise)
+    if error:
+        status = 403 if error == 'Acesso não autorizado' else 400
+        return jsonify({'error': error}), status
     
     # Calcular pontos
-    points_earned = patient_exercise.exercise.points_value
-    bonus_points = 0
-    
-    # Bonus por completar todos os parâmetros
-    params = patient_exercise.effective_parameters
-    completion_bonus = True
-    
-    if params.get('repetitions') and data.get('repetitions_completed', 0) < params['repetitions']:
-        completion_bonus = False
-    if params.get('sets') and data.get('sets_completed', 0) < params['sets']:
-        completion_bonus = False
-    if params.get('duration_seconds') and data.get('duration_seconds', 0) < params['duration_seconds']:
-        completion_bonus = False
-    
-    if completion_bonus:
-        bonus_points = int(points_earned * 0.5)  # 50% bonus
+    points_earned, bonus_points = calculate_execution_points(patient_exercise, data)
     
     execution = ExerciseExecution(
         patient_exercise_id=data['patient_exercise_id'],
@@ -557,7 +547,16 @@ def create_execution():
     )
     
     db.session.add(execution)
+    db.session.flush()
+    apply_execution_counters([execution])
+    points_deltas = apply_points([{
+        'patient_id': execution.patient_id,
+        'therapist_id': patient_exercise.prescribed_by,
+        'points': points_earned + bonus_points,
+        'activity_at': execution.started_at
+    }])
     db.session.commit()
+    publish_points(points_deltas)
     
     return jsonify({
         'message': 'Execução registrada com sucesso',
@@ -566,6 +565,67 @@ def create_execution():
     }), 201
 
 
+@exercises_bp.route('/executions/batch', methods=['POST'])
+@jwt_required()
+@validate_json({
+    'executions': {'type': 'list', 'required': True, 'minlength': 1, 'maxlength': MAX_BATCH_SIZE}
+})
+def create_executions_batch():
+    """Registra lote de execuções (e dados de sensores) enviados pelo app mobile"""
+    
+    data = request.get_json()
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    if len(data['executions']) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Máximo de {MAX_BATCH_SIZE} execuções por lote'}), 400
+    
+    result = ingest_executions(user, data['executions'])
+    
+    if result.created:
+        status = 201
+    elif result.duplicates:
+        status = 200  # reenvio de lote já gravado
+    else:
+        status = 400
+    return jsonify({
+        'message': f'{len(result.created)} execuções registradas',
+        'created': result.created,
+        'duplicates': result.duplicates,
+        'errors': result.errors,
+        'sensor_series': result.sensor_series_count,
+        'points_earned': result.total_points
+    }), status
+
+
+@exercises_bp.route('/execution/<execution_id>/sensor-data', methods=['GET'])
+@jwt_required()
+def get_execution_sensor_data(execution_id):
+    """Retorna séries de sensores de uma execução"""
+    
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    
+    execution = ExerciseExecution.query.get(execution_id)
+    if not execution:
+        return jsonify({'error': 'Execução não encontrada'}), 404
+    
+    if user.role == 'PACIENTE' and execution.patient_id != user_id:
+        return jsonify({'error': 'Acesso não autorizado'}), 403
+    
+    channels = request.args.get('channels')
+    query = ExerciseSensorSeries.query.filter(ExerciseSensorSeries.execution_id == execution_id)
+    if channels:
+        query = query.filter(ExerciseSensorSeries.channel.in_(channels.split(',')))
+    
+    include_samples = request.args.get('include_samples', 'true').lower() == 'true'
+    
+    return jsonify({
+        'execution_id': execution_id,
+        'series': [series.to_dict(include_samples=include_samples) for series in query.all()]
+    })
+
+
 @exercises_bp.route('/executions/<patient_id>', methods=['GET'])
 @jwt_required()
 def get_patient_executions(patient_id):
@@ -644,16 +704,17 @@ def get_library_stats():
         ).count()
         difficulty_stats[difficulty.value] = count
     
-    # Exercícios mais executados
+    # Exercícios mais executados (contador desnormalizado, sem JOIN nas execuções)
     most_executed = db.session.query(
         Exercise.id,
         Exercise.title,
-        db.func.count(ExerciseExecution.id).label('execution_count')
-    ).join(ExerciseExecution).filter(
+        Exercise.execution_count
+    ).filter(
         Exercise.is_active == True,
-        Exercise.is_approved == True
-    ).group_by(Exercise.id, Exercise.title).order_by(
-        desc('execution_count')
+        Exercise.is_approved == True,
+        Exercise.execution_count > 0
+    ).order_by(
+        desc(Exercise.execution_count)
     ).limit(10).all()
     
     return jsonify({
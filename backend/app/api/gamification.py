@@ -0,0 +1,125 @@
+"""
+API endpoints para pontos, sequências e leaderboards da gamificação
+"""
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from ..models.gamification import PatientPoints
+from ..models.patient import Patient
+from ..models.user import User
+from ..services.leaderboard import GLOBAL_SCOPE, get_leaderboard, therapist_scope
+from ..services.points_ledger import rebuild_leaderboards
+from ..utils.decorators import role_required
+
+gamification_bp = Blueprint('gamification', __name__, url_prefix='/api/gamification')
+
+MAX_LEADERBOARD_SIZE = 100
+
+
+def _can_view_patient(user, patient_id):
+    return user.role != 'PACIENTE' or user.id == patient_id
+
+
+@gamification_bp.route('/patients/<patient_id>/points', methods=['GET'])
+@jwt_required()
+def get_patient_points(patient_id):
+    """Total de pontos, sequência e posição do paciente"""
+
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+
+    if not _can_view_patient(user, patient_id):
+        return jsonify({'error': 'Acesso não autorizado'}), 403
+
+    points = PatientPoints.query.get(patient_id)
+    data = points.to_dict() if points else PatientPoints(
+        patient_id=patient_id, total_points=0, execution_count=0,
+        current_streak=0, longest_streak=0
+    ).to_dict()
+
+    data['rank'] = get_leaderboard().rank(GLOBAL_SCOPE, patient_id) if points else None
+    return jsonify({'points': data})
+
+
+@gamification_bp.route('/patients/<patient_id>/streak', methods=['GET'])
+@jwt_required()
+def get_patient_streak(patient_id):
+    """Sequência atual e recorde de dias com exercícios"""
+
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+
+    if not _can_view_patient(user, patient_id):
+        return jsonify({'error': 'Acesso não autorizado'}), 403
+
+    points = PatientPoints.query.get(patient_id)
+    return jsonify({
+        'patient_id': patient_id,
+        'current_streak': points.effective_streak() if points else 0,
+        'longest_streak': points.longest_streak if points else 0,
+        'last_activity_date': points.last_activity_date.isoformat() if points and points.last_activity_date else None
+    })
+
+
+@gamification_bp.route('/leaderboard', methods=['GET'])
+@jwt_required()
+def get_leaderboard_top():
+    """
+    Top-N de pacientes por pontos
+
+    Sem ``therapist_id`` retorna o ranking geral; com ele, o ranking dos
+    pontos obtidos nas prescrições daquele fisioterapeuta.
+    """
+
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+
+    limit = min(request.args.get('limit', 10, type=int), MAX_LEADERBOARD_SIZE)
+    therapist_id = request.args.get('therapist_id')
+    scope = therapist_scope(therapist_id) if therapist_id else GLOBAL_SCOPE
+
+    leaderboard = get_leaderboard()
+    entries = leaderboard.top(scope, max(limit, 1))
+
+    # Nomes apenas para a equipe; pacientes veem só a própria posição
+    if user.role != 'PACIENTE' and entries:
+        names = dict(
+            Patient.query.with_entities(Patient.id, Patient.nome_completo).filter(
+                Patient.id.in_([entry['patient_id'] for entry in entries])
+            ).all()
+        )
+        for entry in entries:
+            entry['patient_name'] = names.get(entry['patient_id'])
+    elif user.role == 'PACIENTE':
+        for entry in entries:
+            entry['is_me'] = entry['patient_id'] == user.id
+            if not entry['is_me']:
+                entry['patient_id'] = None
+
+    response = {
+        'scope': scope,
+        'leaderboard': entries,
+        'backend': leaderboard.backend_name
+    }
+    if user.role == 'PACIENTE':
+        response['my_rank'] = leaderboard.rank(scope, user.id)
+
+    return jsonify(response)
+
+
+@gamification_bp.route('/leaderboard/rebuild', methods=['POST'])
+@jwt_required()
+@role_required(['ADMIN'])
+def rebuild_leaderboard():
+    """Rematerializa leaderboards a partir do banco"""
+
+    data = request.get_json(silent=True) or {}
+    result = rebuild_leaderboards(data.get('therapist_ids') or [])
+    return jsonify({'message': 'Leaderboards reconstruídos', 'members': result})
+
+
+# Registrar blueprint
+def init_app(app):
+    """Registra o blueprint no app Flask"""
+    app.register_blueprint(gamification_bp)
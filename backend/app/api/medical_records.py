@@ -12,6 +12,7 @@ from app import db
 from app.models.user import User, UserRole
 from app.models.patient import Patient, MedicalRecord, Evolution
 from app.auth.utils import roles_required
+from app.services.clinical_summary import get_clinical_summary
 
 medical_records_bp = Blueprint('medical_records', __name__)
 
@@ -291,57 +292,12 @@ def get_patient_stats(patient_id: str):
         # Verificar se paciente existe
         patient = Patient.query.get_or_404(patient_id)
         
-        # Buscar dados para estatísticas
-        medical_records = MedicalRecord.query.filter_by(patient_id=patient_id).all()
-        
-        if not medical_records:
-            return jsonify({
-                'total_records': 0,
-                'total_evolutions': 0,
-                'latest_evaluation': None,
-                'pain_evolution': [],
-                'treatment_duration_days': 0
-            }), 200
-        
-        # Estatísticas básicas
-        total_records = len(medical_records)
-        
-        # Buscar todas as evoluções
-        all_evolutions = []
-        for record in medical_records:
-            evolutions = Evolution.query.filter_by(medical_record_id=record.id).all()
-            all_evolutions.extend(evolutions)
-        
-        total_evolutions = len(all_evolutions)
-        
-        # Última avaliação
-        latest_record = max(medical_records, key=lambda x: x.data_avaliacao) if medical_records else None
-        latest_evaluation = latest_record.data_avaliacao.isoformat() if latest_record else None
-        
-        # Evolução da dor
-        pain_evolution = []
-        for evolution in sorted(all_evolutions, key=lambda x: x.data_atendimento):
-            if evolution.escala_dor is not None:
-                pain_evolution.append({
-                    'date': evolution.data_atendimento.isoformat(),
-                    'pain_level': evolution.escala_dor
-                })
-        
-        # Duração do tratamento
-        treatment_duration_days = 0
-        if all_evolutions:
-            first_session = min(all_evolutions, key=lambda x: x.data_atendimento)
-            last_session = max(all_evolutions, key=lambda x: x.data_atendimento)
-            treatment_duration_days = (last_session.data_atendimento - first_session.data_atendimento).days
+        # Resumo agregado no banco (em cache até a próxima gravação)
+        summary = get_clinical_summary(patient_id)
         
         return jsonify({
             'patient_name': patient.nome_completo,
-            'total_records': total_records,
-            'total_evolutions': total_evolutions,
-            'latest_evaluation': latest_evaluation,
-            'pain_evolution': pain_evolution,
-            'treatment_duration_days': treatment_duration_days,
-            'average_session_duration': sum(e.duracao_minutos for e in all_evolutions if e.duracao_minutos) / len([e for e in all_evolutions if e.duracao_minutos]) if any(e.duracao_minutos for e in all_evolutions) else 0
+            **summary
         }), 200
         
     except Exception as e:
@@ -207,7 +207,7 @@ def get_educational_cases():
     
     specialization = request.args.get('specialization')
     if specialization:
-        query = query.filter(EducationalCase.specialization_areas.contains([specialization]))
+        query = query.filter(EducationalCase.specialization_filter(specialization))
     
     assigned_to_me = request.args.get('assigned_to_me', 'false').lower() == 'true'
     if assigned_to_me and user.role == 'ESTAGIARIO':
@@ -3,9 +3,9 @@ API endpoints para sistema de gestão de projetos com Kanban
 """
 
 from datetime import datetime, date
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy import and_, or_, desc
 from sqlalchemy.orm import joinedload
 
 from ..models.project_management import (
@@ -13,6 +13,13 @@ from ..models.project_management import (
     ProjectStatus, ProjectPriority, TaskStatus, TaskPriority, TaskType
 )
 from ..models.user import User
+from ..services.project_stats import project_task_stats, with_task_counts
+from ..services.board_ordering import COLUMN_STATUSES, append_position, place_task
+from ..services.sprint_burndown import sprint_burndown
+from ..services.task_bulk import (
+    MAX_BATCH_UPDATE, TaskBulkError, batch_update_tasks, import_tasks, iter_tasks_csv, read_task_records
+)
+from ..services.task_keys import next_task_key
 from .. import db
 from ..utils.decorators import role_required
 from ..utils.pagination import paginate
@@ -83,8 +90,8 @@ def get_projects():
     else:
         query = query.order_by(desc(Project.updated_at))
     
-    # Eager loading
-    query = query.options(joinedload(Project.owner))
+    # Eager loading (progresso calculado na mesma consulta)
+    query = with_task_counts(query.options(joinedload(Project.owner)))
     
     include_details = request.args.get('include_details', 'false').lower() == 'true'
     
@@ -104,7 +111,7 @@ def get_project(project_id):
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
     
-    project = Project.query.get(project_id)
+    project = with_task_counts(Project.query).filter(Project.id == project_id).first()
     if not project:
         return jsonify({'error': 'Projeto não encontrado'}), 404
     
@@ -411,17 +418,6 @@ def create_task():
     if user.role not in ['ADMIN'] and project.owner_id != user_id and user_id not in project.team_members:
         return jsonify({'error': 'Sem permissão para criar tarefas neste projeto'}), 403
     
-    # Gerar chave da tarefa
-    last_task = Task.query.filter_by(project_id=data['project_id']).order_by(desc(Task.created_at)).first()
-    if last_task and last_task.key:
-        # Extrair número da última tarefa
-        last_number = int(last_task.key.split('-')[1]) if '-' in last_task.key else 0
-        task_number = last_number + 1
-    else:
-        task_number = 1
-    
-    task_key = f"{project.key}-{task_number}"
-    
     # Validar assignee se fornecido
     if data.get('assignee_id'):
         assignee = User.query.get(data['assignee_id'])
@@ -436,15 +432,9 @@ def create_task():
         except ValueError:
             return jsonify({'error': 'Formato de data inválido'}), 400
     
-    # Determinar posição no board
-    last_position = db.session.query(func.max(Task.board_position)).filter_by(
-        project_id=data['project_id'],
-        column_id='backlog'
-    ).scalar() or 0
-    
     task = Task(
         project_id=data['project_id'],
-        key=task_key,
+        key=next_task_key(project),  # Contador atômico do projeto
         title=data['title'],
         description=data.get('description'),
         task_type=TaskType(data['task_type']),
@@ -457,7 +447,7 @@ def create_task():
         parent_task_id=data.get('parent_task_id'),
         labels=data.get('labels', []),
         acceptance_criteria=data.get('acceptance_criteria', []),
-        board_position=last_position + 1
+        board_position=append_position(data['project_id'], 'backlog')  # Fim do backlog
     )
     
     db.session.add(task)
@@ -495,16 +485,7 @@ def move_task(task_id):
     new_column = data['column_id']
     
     # Mapear column_id para TaskStatus
-    column_to_status = {
-        'backlog': TaskStatus.BACKLOG,
-        'todo': TaskStatus.TODO,
-        'in_progress': TaskStatus.IN_PROGRESS,
-        'review': TaskStatus.REVIEW,
-        'done': TaskStatus.DONE,
-        'blocked': TaskStatus.BLOCKED
-    }
-    
-    new_status = column_to_status.get(new_column, TaskStatus.TODO)
+    new_status = COLUMN_STATUSES.get(new_column, TaskStatus.TODO)
     
     # Verificar se pode mover para o novo status
     can_move, reason = task.can_move_to_status(new_status)
@@ -513,7 +494,6 @@ def move_task(task_id):
     
     # Atualizar status baseado na coluna
     task.status = new_status
-    task.column_id = new_column
     
     # Definir timestamps importantes
     if new_status == TaskStatus.IN_PROGRESS and old_column != 'in_progress':
@@ -521,29 +501,9 @@ def move_task(task_id):
     elif new_status == TaskStatus.DONE and task.status != TaskStatus.DONE:
         task.completed_date = datetime.utcnow()
     
-    # Reordenar posições na nova coluna
-    if 'position' in data:
-        new_position = data['position']
-        
-        # Mover outras tarefas para acomodar a nova posição
-        tasks_to_update = Task.query.filter(
-            Task.project_id == task.project_id,
-            Task.column_id == new_column,
-            Task.id != task_id,
-            Task.board_position >= new_position
-        ).all()
-        
-        for t in tasks_to_update:
-            t.board_position += 1
-        
-        task.board_position = new_position
-    else:
-        # Colocar no final da coluna
-        max_position = db.session.query(func.max(Task.board_position)).filter_by(
-            project_id=task.project_id,
-            column_id=new_column
-        ).scalar() or 0
-        task.board_position = max_position + 1
+    # Posição = índice na coluna de destino (sem o índice, vai para o final).
+    # Só a linha da tarefa é gravada; a coluna é renumerada se faltar espaço.
+    place_task(task, new_column, data.get('position'))
     
     task.updated_at = datetime.utcnow()
     db.session.commit()
@@ -554,6 +514,105 @@ def move_task(task_id):
     })
 
 
+# =============================================================================
+# OPERAÇÕES EM LOTE
+# =============================================================================
+
+def _bulk_error(error):
+    return jsonify({'error': str(error), 'errors': error.errors[:100]}), 400
+
+
+@project_management_bp.route('/projects/<project_id>/tasks/import', methods=['POST'])
+@jwt_required()
+def import_project_tasks(project_id):
+    """Importa tarefas de CSV ou JSON numa única transação (tudo ou nada)"""
+    
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'error': 'Projeto não encontrado'}), 404
+    
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    if user.role not in ['ADMIN'] and project.owner_id != user_id and user_id not in project.team_members:
+        return jsonify({'error': 'Sem permissão para criar tarefas neste projeto'}), 403
+    
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+    upload = request.files.get('file')
+    
+    try:
+        # Arquivo (multipart), corpo CSV ou corpo JSON
+        if upload:
+            fmt = 'csv' if (upload.filename or '').lower().endswith('.csv') else 'json'
+            records = read_task_records(upload.read().decode('utf-8-sig'), fmt)
+        elif request.mimetype == 'text/csv':
+            records = read_task_records(request.get_data(as_text=True), 'csv')
+        elif request.is_json:
+            records = read_task_records(request.get_data(as_text=True), 'json')
+        else:
+            return jsonify({'error': 'Envie um arquivo CSV/JSON ou um corpo JSON com "tasks"'}), 400
+        
+        result = import_tasks(project, records, user_id, dry_run=dry_run)
+    except TaskBulkError as e:
+        return _bulk_error(e)
+    
+    return jsonify({
+        'message': f'{result["valid"]} tarefas válidas' if dry_run else f'{result["imported"]} tarefas importadas',
+        **result
+    }), 200 if dry_run else 201
+
+
+@project_management_bp.route('/projects/<project_id>/tasks/batch-update', methods=['POST'])
+@jwt_required()
+@validate_json({
+    'task_ids': {'type': 'list', 'required': True, 'minlength': 1, 'maxlength': MAX_BATCH_UPDATE},
+    'status': {'type': 'string', 'required': False, 'enum': [s.value for s in TaskStatus]},
+    'assignee_id': {'type': 'string', 'required': False, 'nullable': True},
+    'sprint_id': {'type': 'string', 'required': False, 'nullable': True}
+})
+def batch_update_project_tasks(project_id):
+    """Altera status, responsável e/ou sprint de várias tarefas numa transação"""
+    
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'error': 'Projeto não encontrado'}), 404
+    
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    if user.role not in ['ADMIN'] and project.owner_id != user_id and user_id not in project.team_members:
+        return jsonify({'error': 'Sem permissão para editar tarefas neste projeto'}), 403
+    
+    data = request.get_json()
+    changes = {field: data[field] for field in ('status', 'assignee_id', 'sprint_id') if field in data}
+    
+    try:
+        result = batch_update_tasks(project, data['task_ids'], changes)
+    except TaskBulkError as e:
+        return _bulk_error(e)
+    
+    return jsonify({'message': f'{result["updated"]} tarefas atualizadas', **result})
+
+
+@project_management_bp.route('/projects/<project_id>/tasks/export', methods=['GET'])
+@jwt_required()
+def export_project_tasks(project_id):
+    """Exporta as tarefas do projeto em CSV, em streaming"""
+    
+    project = Project.query.get(project_id)
+    if not project:
+        return jsonify({'error': 'Projeto não encontrado'}), 404
+    
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    if user.role not in ['ADMIN'] and project.owner_id != user_id and user_id not in project.team_members:
+        return jsonify({'error': 'Acesso não autorizado'}), 403
+    
+    return Response(
+        stream_with_context(iter_tasks_csv(project.id)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{project.key}-tarefas.csv"'}
+    )
+
+
 # =============================================================================
 # COMENTÁRIOS
 # =============================================================================
@@ -689,7 +748,7 @@ def log_time_on_task(task_id):
 def get_project_stats(project_id):
     """Estatísticas do projeto"""
     
-    project = Project.query.get(project_id)
+    project = with_task_counts(Project.query).filter(Project.id == project_id).first()
     if not project:
         return jsonify({'error': 'Projeto não encontrado'}), 404
     
@@ -700,53 +759,38 @@ def get_project_stats(project_id):
     if user.role not in ['ADMIN'] and project.owner_id != user_id and user_id not in project.team_members:
         return jsonify({'error': 'Acesso não autorizado'}), 403
     
-    # Estatísticas das tarefas
-    tasks = Task.query.filter_by(project_id=project_id, is_archived=False).all()
-    
-    task_stats = {
-        'total': len(tasks),
-        'by_status': {},
-        'by_type': {},
-        'by_priority': {},
-        'overdue': len([t for t in tasks if t.is_overdue]),
-        'completed': len([t for t in tasks if t.status == TaskStatus.DONE])
-    }
-    
-    # Contar por status
-    for status in TaskStatus:
-        task_stats['by_status'][status.value] = len([t for t in tasks if t.status == status])
-    
-    # Contar por tipo
-    for task_type in TaskType:
-        task_stats['by_type'][task_type.value] = len([t for t in tasks if t.task_type == task_type])
-    
-    # Contar por prioridade
-    for priority in TaskPriority:
-        task_stats['by_priority'][priority.value] = len([t for t in tasks if t.priority == priority])
-    
-    # Estatísticas de tempo
-    total_estimated = sum(t.estimated_hours or 0 for t in tasks)
-    total_actual = sum(t.actual_hours for t in tasks)
-    
-    time_stats = {
-        'estimated_hours': total_estimated,
-        'actual_hours': total_actual,
-        'variance': total_actual - total_estimated if total_estimated > 0 else 0,
-        'efficiency': (total_estimated / total_actual * 100) if total_actual > 0 else 0
-    }
-    
-    # Velocidade (story points concluídos)
-    completed_story_points = sum(t.story_points or 0 for t in tasks if t.status == TaskStatus.DONE and t.story_points)
+    # Estatísticas agregadas no banco
+    stats = project_task_stats(project_id)
     
     return jsonify({
         'project': project.to_dict(),
-        'task_stats': task_stats,
-        'time_stats': time_stats,
-        'velocity': completed_story_points,
+        'task_stats': stats['task_stats'],
+        'time_stats': stats['time_stats'],
+        'velocity': stats['velocity'],
         'team_size': len(project.team_members) + 1  # +1 para o owner
     })
 
 
+@project_management_bp.route('/sprints/<sprint_id>/burndown', methods=['GET'])
+@jwt_required()
+def get_sprint_burndown(sprint_id):
+    """Burndown diário do sprint (linhas mantidas a cada mudança de tarefa)"""
+    
+    sprint = Sprint.query.get(sprint_id)
+    if not sprint:
+        return jsonify({'error': 'Sprint não encontrado'}), 404
+    
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    project = sprint.project
+    
+    # Verificar permissões
+    if user.role not in ['ADMIN'] and project.owner_id != user_id and user_id not in project.team_members:
+        return jsonify({'error': 'Acesso não autorizado'}), 403
+    
+    return jsonify(sprint_burndown(sprint))
+
+
 # Registrar blueprint
 def init_app(app):
     """Registra o blueprint no app Flask"""
@@ -0,0 +1,100 @@
+"""
+API endpoints para sincronização offline-first do app mobile
+"""
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from ..models.user import User
+from ..services.execution_ingestion import ingest_executions, MAX_BATCH_SIZE
+from ..services.sync import (
+    pull_changes, push_prescription_notes, parse_token, InvalidSyncToken,
+    DEFAULT_PULL_LIMIT, DEFAULT_HISTORY_DAYS
+)
+from ..utils.validation import validate_json
+
+sync_bp = Blueprint('sync', __name__, url_prefix='/api/sync')
+
+
+def _resolve_patient_id(user, requested_id):
+    """Paciente só sincroniza os próprios dados; equipe escolhe o paciente"""
+    if user.role == 'PACIENTE':
+        if requested_id and requested_id != user.id:
+            return None
+        return user.id
+    return requested_id
+
+
+@sync_bp.route('/pull', methods=['GET'])
+@jwt_required()
+def pull():
+    """
+    Retorna alterações desde o token ``since``
+
+    Sem ``since`` retorna o snapshot completo. Enquanto ``has_more`` for
+    verdadeiro o cliente deve repetir o pull com o token recebido.
+    """
+
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+
+    patient_id = _resolve_patient_id(user, request.args.get('patient_id'))
+    if not patient_id:
+        if user.role == 'PACIENTE':
+            return jsonify({'error': 'Acesso não autorizado'}), 403
+        return jsonify({'error': 'patient_id é obrigatório'}), 400
+
+    try:
+        since = parse_token(request.args.get('since'))
+    except InvalidSyncToken as e:
+        return jsonify({'error': str(e)}), 400
+
+    limit = request.args.get('limit', DEFAULT_PULL_LIMIT, type=int)
+    history_days = request.args.get('history_days', DEFAULT_HISTORY_DAYS, type=int)
+
+    return jsonify(pull_changes(patient_id, since, limit=limit, history_days=history_days))
+
+
+@sync_bp.route('/push', methods=['POST'])
+@jwt_required()
+@validate_json({
+    'executions': {'type': 'list', 'maxlength': MAX_BATCH_SIZE},
+    'prescription_notes': {'type': 'list', 'maxlength': MAX_BATCH_SIZE}
+})
+def push():
+    """
+    Recebe alterações feitas offline
+
+    ``executions`` usa ``client_id`` como chave de idempotência: reenvios
+    retornam o id já gravado em ``duplicates``. ``prescription_notes``
+    usa ``base_updated_at`` e conflitos são resolvidos a favor do servidor.
+    """
+
+    data = request.get_json()
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+
+    executions = data.get('executions') or []
+    notes = data.get('prescription_notes') or []
+
+    if len(executions) > MAX_BATCH_SIZE or len(notes) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Máximo de {MAX_BATCH_SIZE} itens por lote'}), 400
+
+    ingestion = ingest_executions(user, executions)
+    notes_result = push_prescription_notes(user, notes)
+
+    return jsonify({
+        'executions': {
+            'created': ingestion.created,
+            'duplicates': ingestion.duplicates,
+            'errors': ingestion.errors,
+            'points_earned': ingestion.total_points
+        },
+        'prescription_notes': notes_result
+    })
+
+
+# Registrar blueprint
+def init_app(app):
+    """Registra o blueprint no app Flask"""
+    app.register_blueprint(sync_bp)
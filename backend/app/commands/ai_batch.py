@@ -0,0 +1,58 @@
+"""
+Comandos para os jobs de IA em lote
+"""
+
+import time
+
+import click
+from flask.cli import with_appcontext
+
+from ..models.ai_batch import AIBatchJob
+from ..services.ai_batch import claim_pending_jobs, run_batch_job
+from ..services.ai_executor import get_ai_executor
+from .. import db
+
+
+@click.command('ai-batch-worker')
+@click.option('--once', is_flag=True, default=False,
+              help='Processa os jobs pendentes e sai')
+@click.option('--poll-seconds', default=10, show_default=True,
+              help='Intervalo entre buscas por jobs pendentes')
+@with_appcontext
+def ai_batch_worker_command(once, poll_seconds):
+    """Processa jobs de IA pendentes ou interrompidos"""
+    
+    executor = get_ai_executor()
+    click.echo('🤖 Worker de jobs de IA iniciado')
+    
+    while True:
+        jobs = claim_pending_jobs()
+        for job in jobs:
+            job_id = job.id
+            click.echo(f'▶️  Job {job_id} ({job.job_type}): {job.processed_items}/{job.total_items} itens')
+            try:
+                # Sem timeout: jobs longos (ou em lote no provedor) levam horas
+                executor.submit(run_batch_job(job_id)).result()
+            except Exception as e:
+                click.echo(f'❌ Erro no job {job_id}: {str(e)}')
+                db.session.rollback()
+                continue
+            
+            # O job rodou com a sessão do loop de IA: relê nesta sessão
+            db.session.expire_all()
+            job = db.session.get(AIBatchJob, job_id)
+            click.echo(
+                f'✅ Job {job.id}: {job.status} '
+                f'({job.succeeded_items} ok, {job.failed_items} falhas, {job.tokens_used} tokens)'
+            )
+        
+        if once:
+            break
+        if not jobs:
+            time.sleep(poll_seconds)
+        db.session.remove()
+
+
+def init_app(app):
+    """Registra os comandos no app Flask"""
+    app.cli.add_command(ai_batch_worker_command)
@@ -0,0 +1,52 @@
+"""
+Comandos para o ledger de pontos e leaderboards da gamificação
+"""
+
+import click
+from flask.cli import with_appcontext
+
+from ..services.points_ledger import backfill_points, rebuild_leaderboards
+from .. import db
+
+
+@click.command('backfill-points')
+@click.option('--dry-run', is_flag=True, default=False,
+              help='Apenas reporta divergências, sem gravar')
+@with_appcontext
+def backfill_points_command(dry_run):
+    """Recalcula totais e sequências de pontos a partir das execuções"""
+    
+    click.echo('🔎 Recalculando pontos dos pacientes...')
+    
+    try:
+        result = backfill_points(dry_run=dry_run)
+    except Exception as e:
+        click.echo(f'❌ Erro ao recalcular pontos: {str(e)}')
+        db.session.rollback()
+        raise
+    
+    click.echo(f'✅ Pacientes com execuções: {result["patients"]}')
+    click.echo(f'✅ Linhas {"a inserir" if dry_run else "inseridas"}: {result["inserted"]}')
+    click.echo(f'✅ Linhas {"a corrigir" if dry_run else "corrigidas"}: {result["updated"]}')
+    
+    if not dry_run:
+        members = rebuild_leaderboards()
+        click.echo(f'🏆 Leaderboard geral reconstruído: {sum(members.values())} pacientes')
+
+
+@click.command('rebuild-leaderboard')
+@click.option('--therapist-id', 'therapist_ids', multiple=True,
+              help='Também reconstrói o leaderboard deste fisioterapeuta')
+@with_appcontext
+def rebuild_leaderboard_command(therapist_ids):
+    """Rematerializa os leaderboards a partir de patient_points"""
+    
+    members = rebuild_leaderboards(therapist_ids)
+    for scope, count in members.items():
+        click.echo(f'🏆 {scope}: {count} pacientes')
+
+
+def init_app(app):
+    """Registra os comandos no app Flask"""
+    app.cli.add_command(backfill_points_command)
+    app.cli.add_command(rebuild_leaderboard_command)
@@ -1,63 +1,130 @@
 """
-Comando para inicializar protocolos base no sistema
+Comandos para inicializar e importar protocolos no sistema
 """
 
 import click
 from flask.cli import with_appcontext
-from flask import current_app
-from flask_jwt_extended import get_jwt_identity
 
-from ..models.user import User
+from ..models.user import User, UserRole
 from ..data.base_protocols import insert_base_protocols
 from ..data.base_interventions import insert_base_interventions
+from ..services.protocol_seeding import (
+    SPECS, SeedError, invalidate_protocol_catalog, prepare_records, read_seed_file, seed_records
+)
 from .. import db
 
 
-@click.command()
-@click.option('--admin-email', default='admin@fisioflow.com', 
-              help='Email do usuário admin que criará os protocolos')
-@with_appcontext
-def init_protocols(admin_email):
-    """Inicializa protocolos clínicos base no sistema"""
+def _admin_user(admin_email):
+    """Usuário admin autor dos registros, ou None (com a mensagem já exibida)"""
     
-    # Buscar usuário admin
     admin_user = User.query.filter_by(email=admin_email).first()
     if not admin_user:
         click.echo(f'❌ Usuário admin não encontrado: {admin_email}')
         click.echo('💡 Certifique-se de que o usuário admin foi criado primeiro')
-        return
+        return None
     
-    if admin_user.role != 'ADMIN':
+    if not admin_user.has_role(UserRole.ADMIN):
         click.echo(f'❌ Usuário não é admin: {admin_email}')
+        return None
+    
+    return admin_user
+
+
+def _echo_result(label, result, dry_run=False):
+    verb = 'a inserir' if dry_run else 'inseridos'
+    click.echo(
+        f'✅ {label}: {result["inserted"]} {verb}, {result["updated"]} '
+        f'{"a atualizar" if dry_run else "atualizados"}, {result["unchanged"]} sem alteração'
+    )
+    if result['adopted']:
+        click.echo(f'   {result["adopted"]} registros antigos associados à chave de carga')
+
+
+@click.command()
+@click.option('--admin-email', default='admin@fisioflow.com',
+              help='Email do usuário admin que criará os protocolos')
+@with_appcontext
+def init_protocols(admin_email):
+    """Inicializa protocolos clínicos base no sistema (pode ser repetido)"""
+    
+    admin_user = _admin_user(admin_email)
+    if admin_user is None:
         return
     
     click.echo(f'📋 Inicializando protocolos clínicos base...')
     
     try:
-        # Inserir protocolos base
-        protocols = insert_base_protocols(db, admin_user.id)
-        
-        click.echo(f'✅ {len(protocols)} protocolos inseridos com sucesso!')
-        
-        for protocol in protocols:
-            click.echo(f'  - {protocol.title} ({protocol.pathology})')
+        _echo_result('Protocolos', insert_base_protocols(db, admin_user.id))
         
         click.echo(f'📋 Inserindo templates de intervenção...')
         
-        # Inserir templates de intervenção
-        interventions = insert_base_interventions(db, admin_user.id)
-        
-        click.echo(f'✅ {len(interventions)} templates de intervenção inseridos com sucesso!')
-        
-        for intervention in interventions:
-            click.echo(f'  - {intervention.name} ({intervention.category})')
-            
+        _echo_result('Templates de intervenção', insert_base_interventions(db, admin_user.id))
+    
     except Exception as e:
         click.echo(f'❌ Erro ao inserir dados: {str(e)}')
         db.session.rollback()
         raise
 
 
+@click.command('import-protocols')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--kind', type=click.Choice(sorted(SPECS)), default=None,
+              help='Tipo dos registros em listas JSON e CSV (padrão: protocols)')
+@click.option('--admin-email', default='admin@fisioflow.com',
+              help='Email do usuário admin autor dos registros novos')
+@click.option('--batch-size', default=500, show_default=True, help='Registros por comando em lote')
+@click.option('--skip-invalid', is_flag=True, default=False,
+              help='Ignora registros inválidos em vez de abortar a importação')
+@click.option('--dry-run', is_flag=True, default=False,
+              help='Apenas compara com o banco, sem gravar')
+@with_appcontext
+def import_protocols(path, kind, admin_email, batch_size, skip_invalid, dry_run):
+    """Importa protocolos/intervenções de JSON ou CSV (upsert por seed_key)"""
+    
+    admin_user = _admin_user(admin_email)
+    if admin_user is None:
+        return
+    
+    try:
+        sources = read_seed_file(path, kind)
+    except (SeedError, ValueError) as e:
+        raise click.ClickException(f'Arquivo inválido: {e}')
+    
+    # Valida tudo antes de gravar qualquer tipo
+    prepared = {}
+    for source_kind, records in sources.items():
+        rows, errors = prepare_records(SPECS[source_kind], records)
+        for error in errors[:20]:
+            click.echo(f'⚠️  {source_kind}: {error}')
+        if len(errors) > 20:
+            click.echo(f'⚠️  ... e mais {len(errors) - 20} erros')
+        if errors and not skip_invalid:
+            raise click.ClickException(f'{len(errors)} registros inválidos em {source_kind}; nada foi gravado')
+        prepared[source_kind] = rows
+    
+    # Todos os tipos numa única transação: qualquer falha desfaz o arquivo inteiro
+    results = {}
+    try:
+        for source_kind, rows in prepared.items():
+            click.echo(f'📋 {source_kind}: {len(rows)} registros válidos')
+            with click.progressbar(length=len(rows), label=f'Importando {source_kind}') as bar:
+                results[source_kind] = seed_records(SPECS[source_kind], rows, admin_user.id,
+                                                    batch_size=batch_size, dry_run=dry_run, commit=False,
+                                                    progress=bar.update)
+        if not dry_run:
+            db.session.commit()
+    except Exception as e:
+        click.echo(f'❌ Erro ao importar {source_kind}: {str(e)}; nada foi gravado')
+        db.session.rollback()
+        raise
+    
+    if not dry_run and any(result['inserted'] or result['updated'] for result in results.values()):
+        invalidate_protocol_catalog()
+    for source_kind, result in results.items():
+        _echo_result(source_kind, result, dry_run)
+
+
 def init_app(app):
-    """Registra o comando no app Flask"""
-    app.cli.add_command(init_protocols)
\ No newline at end of file
+    """Registra os comandos no app Flask"""
+    app.cli.add_command(init_protocols)
+    app.cli.add_command(import_protocols)
@@ -0,0 +1,38 @@
+"""
+Comando para renumerar as posições dos boards Kanban
+"""
+
+import click
+from flask.cli import with_appcontext
+
+from ..services.board_ordering import MIN_GAP, rebalance_boards
+from .. import db
+
+
+@click.command('rebalance-board')
+@click.option('--project-id', default=None, help='Só o board deste projeto')
+@click.option('--min-gap', default=MIN_GAP, show_default=True,
+              help='Renumera colunas com intervalos menores que este')
+@click.option('--dry-run', is_flag=True, default=False,
+              help='Apenas reporta as colunas que seriam renumeradas')
+@with_appcontext
+def rebalance_board(project_id, min_gap, dry_run):
+    """Renumera colunas do Kanban com posições repetidas ou sem espaço"""
+    
+    click.echo('🔎 Verificando posições dos boards...')
+    
+    try:
+        result = rebalance_boards(project_id=project_id, min_gap=min_gap, dry_run=dry_run)
+    except Exception as e:
+        click.echo(f'❌ Erro ao renumerar boards: {str(e)}')
+        db.session.rollback()
+        raise
+    
+    action = 'a renumerar' if dry_run else 'renumeradas'
+    click.echo(f'✅ Colunas verificadas: {result["columns_checked"]}')
+    click.echo(f'✅ Colunas {action}: {result["columns_rebalanced"]} ({result["tasks_moved"]} tarefas)')
+
+
+def init_app(app):
+    """Registra o comando no app Flask"""
+    app.cli.add_command(rebalance_board)
@@ -0,0 +1,35 @@
+"""
+Comando para reconciliar contadores desnormalizados de exercícios
+"""
+
+import click
+from flask.cli import with_appcontext
+
+from ..services.exercise_stats import reconcile_exercise_counters
+from .. import db
+
+
+@click.command('reconcile-exercise-counters')
+@click.option('--dry-run', is_flag=True, default=False,
+              help='Apenas reporta divergências, sem corrigir')
+@with_appcontext
+def reconcile_counters(dry_run):
+    """Recalcula contadores de execuções/avaliações a partir das execuções"""
+    
+    click.echo('🔎 Verificando contadores de exercícios...')
+    
+    try:
+        result = reconcile_exercise_counters(dry_run=dry_run)
+    except Exception as e:
+        click.echo(f'❌ Erro ao reconciliar contadores: {str(e)}')
+        db.session.rollback()
+        raise
+    
+    action = 'com divergência' if dry_run else 'corrigidos'
+    click.echo(f'✅ Exercícios {action}: {result["exercises_fixed"]}')
+    click.echo(f'✅ Prescrições {action}: {result["prescriptions_fixed"]}')
+
+
+def init_app(app):
+    """Registra o comando no app Flask"""
+    app.cli.add_command(reconcile_counters)
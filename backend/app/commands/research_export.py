@@ -0,0 +1,51 @@
+"""
+Comando para exportar dados clínicos pseudonimizados para pesquisa/BI
+"""
+
+import click
+from flask.cli import with_appcontext
+
+from ..services.research_export import EXPORT_TABLES, FORMATS, run_research_export
+from ..utils.db_routing import replica_reads
+from .. import db
+
+
+@click.command('research-export')
+@click.option('--output', default=None, help='Diretório de saída (padrão: RESEARCH_EXPORT_DIR)')
+@click.option('--table', 'tables', multiple=True, type=click.Choice(sorted(EXPORT_TABLES)),
+              help='Tabela a exportar (pode repetir; padrão: todas)')
+@click.option('--format', 'fmt', default=None, type=click.Choice(FORMATS),
+              help='Formato dos arquivos (padrão: RESEARCH_EXPORT_FORMAT)')
+@click.option('--full', is_flag=True, default=False,
+              help="Ignora as marcas d'água e exporta tudo")
+@click.option('--chunk-size', default=None, type=int, help='Linhas por bloco lido/gravado')
+@click.option('--include-unconsented', is_flag=True, default=False,
+              help='Inclui pacientes sem consentimento_dados')
+@with_appcontext
+def research_export(output, tables, fmt, full, chunk_size, include_unconsented):
+    """Exporta prontuários, evoluções, agendamentos e execuções (incremental)"""
+
+    click.echo('🔎 Exportando dados para pesquisa...')
+
+    try:
+        # Leituras longas: na réplica, quando configurada e em dia
+        with replica_reads():
+            results = run_research_export(
+                output_dir=output, tables=tables or None, fmt=fmt, full=full,
+                chunk_size=chunk_size, consented_only=not include_unconsented
+            )
+    except Exception as e:
+        click.echo(f'❌ Erro na exportação: {str(e)}')
+        db.session.rollback()
+        raise
+    finally:
+        db.session.remove()
+
+    for result in results:
+        target = result['file'] or 'sem linhas novas'
+        click.echo(f'✅ {result["table"]}: {result["rows"]} linhas em {result["chunks"]} blocos ({target})')
+
+
+def init_app(app):
+    """Registra o comando no app Flask"""
+    app.cli.add_command(research_export)
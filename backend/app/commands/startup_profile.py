@@ -0,0 +1,122 @@
+"""
+Comando para medir o custo de importação na inicialização da aplicação
+"""
+
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import click
+
+
+# Executado em um interpretador novo: imprime o tempo total de create_app (ms)
+STARTUP_SCRIPT = (
+    'import time; started = time.perf_counter(); '
+    'from app import create_app; create_app(); '
+    'print(f"{(time.perf_counter() - started) * 1000:.1f}")'
+)
+
+
+@dataclass
+class ImportCost:
+    """Uma linha do -X importtime (tempos em microssegundos)"""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(lines: Iterable[str]) -> List[ImportCost]:
+    """Interpreta a saída de `python -X importtime` (stderr)"""
+
+    costs = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # cabeçalho
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        costs.append(ImportCost(
+            module=stripped,
+            self_us=int(parts[0]),
+            cumulative_us=int(parts[1]),
+            depth=(len(name) - len(stripped) - 1) // 2
+        ))
+    return costs
+
+
+def total_import_us(costs: List[ImportCost]) -> int:
+    """Tempo total de import (soma dos imports de primeiro nível)"""
+    return sum(cost.cumulative_us for cost in costs if cost.depth == 0)
+
+
+def group_by_package(costs: List[ImportCost]) -> Dict[str, int]:
+    """Tempo próprio somado por pacote raiz (ex.: todo `openai.*` em `openai`)"""
+
+    totals: Dict[str, int] = {}
+    for cost in costs:
+        package = cost.module.split('.', 1)[0]
+        totals[package] = totals.get(package, 0) + cost.self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def profile_startup(cwd: Optional[str] = None, env: Optional[dict] = None) -> Tuple[float, List[ImportCost]]:
+    """Roda create_app() em um processo novo; retorna (ms totais, custos de import)"""
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'falha ao iniciar')
+
+    elapsed_ms = float(result.stdout.strip().splitlines()[-1])
+    return elapsed_ms, parse_importtime(result.stderr.splitlines())
+
+
+@click.command('startup-profile')
+@click.option('--top', default=25, show_default=True, help='Quantidade de módulos/pacotes listados')
+@click.option('--prefix', default=None, help='Lista só módulos com este prefixo (ex.: app.)')
+@click.option('--by-package', is_flag=True, default=False,
+              help='Agrupa o tempo próprio por pacote raiz')
+@click.option('--blueprints', default=None,
+              help='Sobrescreve ENABLED_BLUEPRINTS no processo medido (ex.: auth,sync)')
+def startup_profile(top, prefix, by_package, blueprints):
+    """Mede o custo de importação de create_app() em um interpretador novo"""
+
+    from flask import current_app
+
+    env = dict(os.environ)
+    if blueprints is not None:
+        env['ENABLED_BLUEPRINTS'] = blueprints
+
+    click.echo('⏱️  Medindo inicialização (python -X importtime)...')
+
+    try:
+        elapsed_ms, costs = profile_startup(cwd=os.path.dirname(current_app.root_path), env=env)
+    except RuntimeError as e:
+        raise click.ClickException(f'Erro ao medir inicialização: {e}')
+
+    click.echo(f'✅ create_app(): {elapsed_ms:.1f} ms '
+               f'(imports: {total_import_us(costs) / 1000:.1f} ms, {len(costs)} módulos)')
+
+    if by_package:
+        click.echo(f'{"próprio (ms)":>12}  pacote')
+        for package, self_us in list(group_by_package(costs).items())[:top]:
+            click.echo(f'{self_us / 1000:>12.1f}  {package}')
+        return
+
+    selected = [cost for cost in costs if not prefix or cost.module.startswith(prefix)]
+    selected.sort(key=lambda cost: cost.cumulative_us, reverse=True)
+    click.echo(f'{"acumulado (ms)":>14}  {"próprio (ms)":>12}  módulo')
+    for cost in selected[:top]:
+        click.echo(f'{cost.cumulative_us / 1000:>14.1f}  {cost.self_us / 1000:>12.1f}  {cost.module}')
+
+
+def init_app(app):
+    """Registra o comando no app Flask"""
+    app.cli.add_command(startup_profile)
@@ -25,6 +25,11 @@ class Config:
         'pool_recycle': 300,
     }
     
+    # Réplica de leitura (rotas @read_only): atraso máximo aceito e intervalo entre verificações
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    DATABASE_REPLICA_MAX_LAG_SECONDS = float(os.environ.get('DATABASE_REPLICA_MAX_LAG_SECONDS') or 30)
+    DATABASE_REPLICA_CHECK_SECONDS = float(os.environ.get('DATABASE_REPLICA_CHECK_SECONDS') or 10)
+    
     # JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or SECRET_KEY
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
@@ -38,6 +43,81 @@ class Config:
     # CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*').split(',')
     
+    # Redis (opcional: leaderboards e caches compartilhados entre processos)
+    REDIS_URL = os.environ.get('REDIS_URL')
+    LEADERBOARD_REFRESH_SECONDS = int(os.environ.get('LEADERBOARD_REFRESH_SECONDS') or 300)
+    
+    # Cache de respostas de IA (backend: memory, redis ou disk)
+    AI_CACHE_ENABLED = os.environ.get('AI_CACHE_ENABLED', 'true').lower() in ['true', 'on', '1']
+    AI_CACHE_BACKEND = os.environ.get('AI_CACHE_BACKEND') or 'memory'
+    AI_CACHE_TTL_SECONDS = int(os.environ.get('AI_CACHE_TTL_SECONDS') or 24 * 3600)
+    AI_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES') or 1000)
+    AI_CACHE_DIR = os.environ.get('AI_CACHE_DIR') or 'instance/ai_cache'
+    AI_CACHE_MAX_TEMPERATURE = float(os.environ.get('AI_CACHE_MAX_TEMPERATURE') or 0.75)
+    AI_CACHE_SEMANTIC_THRESHOLD = float(os.environ.get('AI_CACHE_SEMANTIC_THRESHOLD') or 0) or None
+    
+    # Roteamento de provedores de IA (circuit breaker e hedge)
+    AI_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('AI_CIRCUIT_FAILURE_THRESHOLD') or 5)
+    AI_CIRCUIT_COOLDOWN_SECONDS = float(os.environ.get('AI_CIRCUIT_COOLDOWN_SECONDS') or 30)
+    AI_HEDGE_ENABLED = os.environ.get('AI_HEDGE_ENABLED', 'false').lower() in ['true', 'on', '1']
+    AI_HEDGE_DELAY_SECONDS = float(os.environ['AI_HEDGE_DELAY_SECONDS']) if os.environ.get('AI_HEDGE_DELAY_SECONDS') else None
+    
+    # Execução de IA (loop dedicado; AI_HTTP_MAX_CONNECTIONS é lido na criação dos clientes)
+    AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY') or 64)
+    AI_PROVIDER_CONCURRENCY = int(os.environ.get('AI_PROVIDER_CONCURRENCY') or 32)
+    AI_REQUEST_TIMEOUT_SECONDS = float(os.environ.get('AI_REQUEST_TIMEOUT_SECONDS') or 120)
+    
+    # Jobs de IA em lote (AI_BATCH_INLINE falso = processados só pelo flask ai-batch-worker)
+    AI_BATCH_INLINE = os.environ.get('AI_BATCH_INLINE', 'true').lower() in ['true', 'on', '1']
+    AI_BATCH_PROVIDER_SHARE = float(os.environ.get('AI_BATCH_PROVIDER_SHARE') or 0.5)
+    AI_BATCH_POLL_SECONDS = int(os.environ.get('AI_BATCH_POLL_SECONDS') or 60)
+    
+    # Contexto dos prompts de IA (resumo por paciente, invalidado ao gravar o prontuário)
+    AI_CONTEXT_CACHE_TTL_SECONDS = int(os.environ.get('AI_CONTEXT_CACHE_TTL_SECONDS') or 600)
+    AI_CONTEXT_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CONTEXT_CACHE_MAX_ENTRIES') or 2000)
+    
+    # Ledger de uso de IA (gravação em lote) e cotas de tokens (0 = sem limite)
+    AI_USAGE_LEDGER_ENABLED = os.environ.get('AI_USAGE_LEDGER_ENABLED', 'true').lower() in ['true', 'on', '1']
+    AI_USAGE_FLUSH_SECONDS = float(os.environ.get('AI_USAGE_FLUSH_SECONDS') or 5)
+    AI_USAGE_BATCH_SIZE = int(os.environ.get('AI_USAGE_BATCH_SIZE') or 200)
+    AI_TENANT_ID = os.environ.get('AI_TENANT_ID') or 'default'
+    AI_USER_DAILY_TOKEN_QUOTA = int(os.environ.get('AI_USER_DAILY_TOKEN_QUOTA') or 0)
+    AI_TENANT_MONTHLY_TOKEN_QUOTA = int(os.environ.get('AI_TENANT_MONTHLY_TOKEN_QUOTA') or 0)
+    
+    # Resumo clínico das estatísticas do prontuário (Redis via REDIS_URL, senão memória)
+    CLINICAL_SUMMARY_CACHE_ENABLED = os.environ.get('CLINICAL_SUMMARY_CACHE_ENABLED', 'true').lower() in ['true', 'on', '1']
+    CLINICAL_SUMMARY_CACHE_TTL_SECONDS = int(os.environ.get('CLINICAL_SUMMARY_CACHE_TTL_SECONDS') or 3600)
+    CLINICAL_SUMMARY_CACHE_MAX_ENTRIES = int(os.environ.get('CLINICAL_SUMMARY_CACHE_MAX_ENTRIES') or 5000)
+    
+    # Tendências de desfecho (dor 0-10): janela padrão e diferença mínima clinicamente importante
+    OUTCOME_LOOKBACK_DAYS = int(os.environ.get('OUTCOME_LOOKBACK_DAYS') or 90)
+    OUTCOME_PAIN_MCID = float(os.environ.get('OUTCOME_PAIN_MCID') or 2.0)
+    
+    # Serialização JSON das respostas: 'orjson' (cai para a biblioteca padrão se não instalado) ou 'stdlib'
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER') or 'orjson'
+    
+    # Compressão das respostas (gzip/brotli acima do limite em bytes) e ETag/304 nos GETs
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() in ['true', 'on', '1']
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE') or 1024)
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL') or 6)
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY') or 4)
+    COMPRESSION_CACHE_ENTRIES = int(os.environ.get('COMPRESSION_CACHE_ENTRIES') or 128)
+    HTTP_ETAG_ENABLED = os.environ.get('HTTP_ETAG_ENABLED', 'true').lower() in ['true', 'on', '1']
+    
+    # Exportação para pesquisa/BI (Parquet com pyarrow, senão CSV gzip); chave HMAC dos pseudônimos
+    RESEARCH_EXPORT_DIR = os.environ.get('RESEARCH_EXPORT_DIR') or 'instance/research_exports'
+    RESEARCH_EXPORT_FORMAT = os.environ.get('RESEARCH_EXPORT_FORMAT') or 'auto'
+    RESEARCH_EXPORT_CHUNK_SIZE = int(os.environ.get('RESEARCH_EXPORT_CHUNK_SIZE') or 10000)
+    RESEARCH_EXPORT_PSEUDONYM_KEY = os.environ.get('RESEARCH_EXPORT_PSEUDONYM_KEY')
+    
+    # Catálogo de protocolos em memória
+    PROTOCOL_CATALOG_ENABLED = os.environ.get('PROTOCOL_CATALOG_ENABLED', 'true').lower() in ['true', 'on', '1']
+    PROTOCOL_CATALOG_PRELOAD = os.environ.get('PROTOCOL_CATALOG_PRELOAD', 'true').lower() in ['true', 'on', '1']
+    PROTOCOL_CATALOG_CHECK_SECONDS = float(os.environ.get('PROTOCOL_CATALOG_CHECK_SECONDS') or 30)
+    
+    # Inicialização: blueprints carregados (vazio = todos; ex.: "auth,sync")
+    ENABLED_BLUEPRINTS = [name.strip() for name in os.environ.get('ENABLED_BLUEPRINTS', '').split(',') if name.strip()]
+    
     # Rate Limiting
     RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL') or 'memory://'
     RATELIMIT_DEFAULT = "1000 per hour"
@@ -74,6 +154,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    PROTOCOL_CATALOG_PRELOAD = False
 
 
 class ProductionConfig(Config):
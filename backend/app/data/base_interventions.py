@@ -271,43 +271,7 @@ BASE_INTERVENTIONS = [
 ]
 
 def insert_base_interventions(db, user_id):
-    """Insere templates de intervenção base no banco de dados"""
-    from ..models.clinical_protocols import InterventionTemplate
+    """Insere ou atualiza os templates base (idempotente, por seed_key e hash)"""
+    from ..services.protocol_seeding import seed
     
-    inserted_interventions = []
-    
-    for intervention_data in BASE_INTERVENTIONS:
-        # Verificar se intervenção já existe
-        existing = InterventionTemplate.query.filter_by(
-            name=intervention_data['name']
-        ).first()
-        
-        if existing:
-            continue
-        
-        # Criar nova intervenção
-        intervention = InterventionTemplate(
-            name=intervention_data['name'],
-            intervention_type=intervention_data['intervention_type'],
-            category=intervention_data['category'],
-            description=intervention_data['description'],
-            detailed_instructions=intervention_data['detailed_instructions'],
-            equipment_needed=intervention_data.get('equipment_needed', []),
-            default_dosage=intervention_data['default_dosage'],
-            progression_criteria=intervention_data['progression_criteria'],
-            progression_modifications=intervention_data.get('progression_modifications', []),
-            contraindications=intervention_data.get('contraindications', []),
-            precautions=intervention_data.get('precautions', []),
-            red_flags=intervention_data.get('red_flags', []),
-            evidence_references=intervention_data.get('evidence_references', []),
-            evidence_level=intervention_data['evidence_level'],
-            images=intervention_data.get('images', []),
-            videos=intervention_data.get('videos', []),
-            created_by=user_id
-        )
-        
-        db.session.add(intervention)
-        inserted_interventions.append(intervention)
-    
-    db.session.commit()
-    return inserted_interventions
\ No newline at end of file
+    return seed('interventions', BASE_INTERVENTIONS, user_id)
@@ -320,48 +320,7 @@ BASE_PROTOCOLS = [
 
 # Função para inserir protocolos base
 def insert_base_protocols(db, user_id):
-    """Insere protocolos base no banco de dados"""
-    from ..models.clinical_protocols import ClinicalProtocol, ProtocolStatus
+    """Insere ou atualiza os protocolos base (idempotente, por seed_key e hash)"""
+    from ..services.protocol_seeding import seed
     
-    inserted_protocols = []
-    
-    for protocol_data in BASE_PROTOCOLS:
-        # Verificar se protocolo já existe
-        existing = ClinicalProtocol.query.filter_by(
-            title=protocol_data['title']
-        ).first()
-        
-        if existing:
-            continue
-        
-        # Criar novo protocolo
-        protocol = ClinicalProtocol(
-            title=protocol_data['title'],
-            description=protocol_data['description'],
-            pathology=protocol_data['pathology'],
-            icd10_codes=protocol_data['icd10_codes'],
-            body_region=protocol_data['body_region'],
-            specialization_area=protocol_data['specialization_area'],
-            evidence_level=protocol_data['evidence_level'],
-            grade_recommendation=protocol_data['grade_recommendation'],
-            references=protocol_data['references'],
-            indications=protocol_data['indications'],
-            contraindications=protocol_data['contraindications'],
-            precautions=protocol_data['precautions'],
-            phases=protocol_data['phases'],
-            assessment_tools=protocol_data['assessment_tools'],
-            outcome_measures=protocol_data['outcome_measures'],
-            frequency_recommendations=protocol_data['frequency_recommendations'],
-            inclusion_criteria=protocol_data['inclusion_criteria'],
-            exclusion_criteria=protocol_data['exclusion_criteria'],
-            population_modifications=protocol_data.get('population_modifications', {}),
-            status=ProtocolStatus.ACTIVE,
-            version="1.0",
-            created_by=user_id
-        )
-        
-        db.session.add(protocol)
-        inserted_protocols.append(protocol)
-    
-    db.session.commit()
-    return inserted_protocols
\ No newline at end of file
+    return seed('protocols', BASE_PROTOCOLS, user_id)
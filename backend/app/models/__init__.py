@@ -10,7 +10,11 @@ from .medical_record import MedicalRecord
 from .analytics import Analytics, AnalyticsEvent
 from .clinical_protocols import ClinicalProtocol, ProtocolStep
 from .mentoring import Mentorship
-from .project_management import Project, Task
+from .project_management import Project, Task, ProjectTaskCounter, SprintBurndown
+from .sync import SyncChange
+from .gamification import PatientPoints
+from .ai_batch import AIBatchJob, AIBatchItem
+from .ai_usage import AIUsageRecord, AIUsageHourly
 
 __all__ = [
     'User', 
@@ -27,5 +31,13 @@ __all__ = [
     'ProtocolStep',
     'Mentorship',
     'Project',
-    'Task'
+    'Task',
+    'ProjectTaskCounter',
+    'SprintBurndown',
+    'SyncChange',
+    'PatientPoints',
+    'AIBatchJob',
+    'AIBatchItem',
+    'AIUsageRecord',
+    'AIUsageHourly'
 ]
\ No newline at end of file
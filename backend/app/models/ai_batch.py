@@ -0,0 +1,133 @@
+"""
+Modelos para jobs de IA em lote (análise de documentos, SOAP da agenda)
+"""
+
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Integer, Text, DateTime, ForeignKey, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app import db
+
+
+class AIBatchStatus:
+    """Estados de um job"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    PARTIAL = 'partial'      # terminou com itens falhos
+    FAILED = 'failed'        # nenhum item concluído
+    CANCELLED = 'cancelled'
+
+    FINISHED = (COMPLETED, PARTIAL, FAILED, CANCELLED)
+
+
+class AIBatchItemStatus:
+    """Estados de um item"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+
+class AIBatchJob(db.Model):
+    """
+    Job de IA em lote
+
+    Os contadores são atualizados a cada item concluído, então o
+    progresso e os resultados parciais podem ser lidos durante a execução.
+    """
+    __tablename__ = 'ai_batch_jobs'
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default=AIBatchStatus.PENDING, index=True)
+    created_by: Mapped[str] = mapped_column(String(36), ForeignKey('users.id'), nullable=False, index=True)
+
+    total_items: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    succeeded_items: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed_items: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tokens_used: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Opções do job (max_attempts, concurrency, use_provider_batch)
+    options: Mapped[Optional[dict]] = mapped_column(JSON)
+    # Id do lote no provedor (Message Batches API), quando usado
+    provider_batch_id: Mapped[Optional[str]] = mapped_column(String(100))
+    error: Mapped[Optional[str]] = mapped_column(Text)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    items = db.relationship('AIBatchItem', backref='job', lazy='dynamic', cascade='all, delete-orphan',
+                            order_by='AIBatchItem.position')
+
+    @property
+    def processed_items(self) -> int:
+        return self.succeeded_items + self.failed_items
+
+    @property
+    def progress(self) -> float:
+        return round(self.processed_items / self.total_items, 4) if self.total_items else 1.0
+
+    def to_dict(self):
+        """Converte para dicionário"""
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'created_by': self.created_by,
+            'total_items': self.total_items,
+            'succeeded_items': self.succeeded_items,
+            'failed_items': self.failed_items,
+            'progress': self.progress,
+            'tokens_used': self.tokens_used,
+            'options': self.options or {},
+            'provider_batch_id': self.provider_batch_id,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class AIBatchItem(db.Model):
+    """Item de um job: entrada, resultado e tentativas"""
+    __tablename__ = 'ai_batch_items'
+    __table_args__ = (
+        db.Index('ix_ai_batch_items_job_status', 'job_id', 'status'),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_id: Mapped[str] = mapped_column(String(36), ForeignKey('ai_batch_jobs.id', ondelete='CASCADE'), nullable=False)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default=AIBatchItemStatus.PENDING)
+
+    input: Mapped[dict] = mapped_column(JSON, nullable=False)
+    output: Mapped[Optional[str]] = mapped_column(Text)
+    provider: Mapped[Optional[str]] = mapped_column(String(20))
+    tokens_used: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self, include_input: bool = False):
+        """Converte para dicionário"""
+        data = {
+            'id': self.id,
+            'position': self.position,
+            'status': self.status,
+            'output': self.output,
+            'provider': self.provider,
+            'tokens_used': self.tokens_used,
+            'attempts': self.attempts,
+            'error': self.error,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        if include_input:
+            data['input'] = self.input
+        return data
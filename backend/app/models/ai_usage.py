@@ -0,0 +1,101 @@
+"""
+Modelos do ledger de uso de IA (tokens, custo e latência por chamada)
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app import db
+
+
+class AIUsageRecord(db.Model):
+    """
+    Uma chamada de IA (inclusive acertos de cache e falhas)
+
+    Gravado em lotes pelo UsageLedger, fora do caminho da requisição.
+    """
+    __tablename__ = 'ai_usage_records'
+    __table_args__ = (
+        db.Index('ix_ai_usage_records_user_created', 'user_id', 'created_at'),
+        db.Index('ix_ai_usage_records_tenant_created', 'tenant_id', 'created_at'),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    user_id: Mapped[Optional[str]] = mapped_column(String(36))
+    provider: Mapped[str] = mapped_column(String(20), nullable=False)
+    task_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    model: Mapped[Optional[str]] = mapped_column(String(100))
+
+    input_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    output_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tokens_used: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cost_usd: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    latency_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Economia: resposta vinda do cache e tokens de prompt evitados
+    cache: Mapped[Optional[str]] = mapped_column(String(20))
+    tokens_saved: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    prompt_tokens_saved: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    success: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    background: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+
+    def to_dict(self):
+        """Converte para dicionário"""
+        return {
+            'id': self.id,
+            'created_at': self.created_at.isoformat(),
+            'tenant_id': self.tenant_id,
+            'user_id': self.user_id,
+            'provider': self.provider,
+            'task_type': self.task_type,
+            'model': self.model,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'tokens_used': self.tokens_used,
+            'cost_usd': round(self.cost_usd, 6),
+            'latency_ms': self.latency_ms,
+            'cache': self.cache,
+            'tokens_saved': self.tokens_saved,
+            'prompt_tokens_saved': self.prompt_tokens_saved,
+            'success': self.success,
+            'background': self.background
+        }
+
+
+class AIUsageHourly(db.Model):
+    """
+    Agregado por hora, tenant, provedor, tarefa e faixa de latência
+
+    A faixa de latência faz parte da chave para que os percentis saiam
+    das contagens somadas, sem ler as chamadas individuais.
+    """
+    __tablename__ = 'ai_usage_hourly'
+    __table_args__ = (
+        db.UniqueConstraint('hour', 'tenant_id', 'provider', 'task_type', 'latency_bucket_ms',
+                            name='uq_ai_usage_hourly_key'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    hour: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    provider: Mapped[str] = mapped_column(String(20), nullable=False)
+    task_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    latency_bucket_ms: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    requests: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failures: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cache_hits: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    input_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    output_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    tokens_used: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    tokens_saved: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    prompt_tokens_saved: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    cost_usd: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    cost_saved_usd: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    latency_ms_total: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
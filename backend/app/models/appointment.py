@@ -234,17 +234,22 @@ class Appointment(db.Model):
         return max(s1, s2) < min(e1, e2)
     
     def to_dict(self, include_relationships: bool = True) -> Dict[str, Any]:
-        """Converte para dicionário"""
+        """
+        Converte para dicionário
+
+        Datas e enums ficam como objetos Python; o provedor JSON da
+        aplicação (app.utils.json_provider) os serializa em ISO 8601/valor.
+        """
         data = {
             'id': self.id,
             'patient_id': self.patient_id,
             'therapist_id': self.therapist_id,
-            'appointment_date': self.appointment_date.isoformat(),
+            'appointment_date': self.appointment_date,
             'start_time': self.start_time,
             'end_time': self.end_time,
             'duration_minutes': self.duration_minutes,
-            'appointment_type': self.appointment_type.value,
-            'status': self.status.value,
+            'appointment_type': self.appointment_type,
+            'status': self.status,
             'title': self.title,
             'description': self.description,
             'location': self.location,
@@ -252,7 +257,7 @@ class Appointment(db.Model):
             'is_recurring': self.is_recurring,
             'recurrence_pattern': self.recurrence_pattern,
             'confirmation_required': self.confirmation_required,
-            'confirmed_at': self.confirmed_at.isoformat() if self.confirmed_at else None,
+            'confirmed_at': self.confirmed_at,
             'reminder_sent': self.reminder_sent,
             'notes': self.notes,
             'cancellation_reason': self.cancellation_reason,
@@ -261,8 +266,8 @@ class Appointment(db.Model):
             'is_confirmed': self.is_confirmed,
             'can_be_cancelled': self.can_be_cancelled,
             'can_be_rescheduled': self.can_be_rescheduled,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
         }
         
         if include_relationships:
@@ -320,18 +325,18 @@ class AppointmentReminder(db.Model):
         return {
             'id': self.id,
             'appointment_id': self.appointment_id,
-            'reminder_type': self.reminder_type.value,
+            'reminder_type': self.reminder_type,
             'minutes_before': self.minutes_before,
-            'scheduled_for': self.scheduled_for.isoformat(),
-            'sent_at': self.sent_at.isoformat() if self.sent_at else None,
-            'failed_at': self.failed_at.isoformat() if self.failed_at else None,
+            'scheduled_for': self.scheduled_for,
+            'sent_at': self.sent_at,
+            'failed_at': self.failed_at,
             'error_message': self.error_message,
             'subject': self.subject,
             'message': self.message,
             'is_sent': self.is_sent,
             'is_failed': self.is_failed,
             'is_pending': self.is_pending,
-            'created_at': self.created_at.isoformat(),
+            'created_at': self.created_at,
         }
 
 
@@ -406,8 +411,8 @@ class ScheduleTemplate(db.Model):
             'max_patients_per_slot': self.max_patients_per_slot,
             'is_active': self.is_active,
             'time_slots': self.generate_time_slots(),
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
         }
 
 
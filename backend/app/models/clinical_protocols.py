@@ -121,6 +121,10 @@ class ClinicalProtocol(db.Model):
     status: Mapped[ProtocolStatus] = mapped_column(db.Enum(ProtocolStatus), default=ProtocolStatus.DRAFT, index=True)
     version: Mapped[str] = mapped_column(String(20), default="1.0")
     created_by: Mapped[str] = mapped_column(String(36), ForeignKey('users.id'), nullable=False)
+    
+    # Carga em lote: chave estável da origem e hash do conteúdo importado
+    seed_key: Mapped[Optional[str]] = mapped_column(String(120), unique=True, index=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64))
     reviewed_by: Mapped[Optional[str]] = mapped_column(String(36), ForeignKey('users.id'))
     approved_by: Mapped[Optional[str]] = mapped_column(String(36), ForeignKey('users.id'))
     
@@ -360,6 +364,10 @@ class InterventionTemplate(db.Model):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Carga em lote: chave estável da origem e hash do conteúdo importado
+    seed_key: Mapped[Optional[str]] = mapped_column(String(120), unique=True, index=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64))
+    
     # Relacionamentos
     creator = relationship("User", backref="created_interventions")
     
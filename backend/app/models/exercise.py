@@ -7,11 +7,14 @@ from typing import Dict, List, Any, Optional
 from uuid import uuid4
 from enum import Enum
 
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Date, Text, JSON, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Date, Text, JSON, ForeignKey, LargeBinary
+from sqlalchemy import case, cast, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 
 from . import db
+from .types import JSONBList, json_array_contains, days_between
+from ..utils.sensor_codec import unpack_samples
 
 
 class ExerciseCategory(Enum):
@@ -54,6 +57,12 @@ class BodyRegion(Enum):
 class Exercise(db.Model):
     """Modelo para exercícios da biblioteca"""
     __tablename__ = 'exercises'
+    __table_args__ = (
+        db.Index(
+            'ix_exercises_body_regions_gin', 'body_regions',
+            postgresql_using='gin', postgresql_ops={'body_regions': 'jsonb_path_ops'}
+        ),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
     title: Mapped[str] = mapped_column(String(200), nullable=False, index=True)
@@ -63,7 +72,7 @@ class Exercise(db.Model):
     # Categorização
     category: Mapped[ExerciseCategory] = mapped_column(db.Enum(ExerciseCategory), nullable=False, index=True)
     difficulty: Mapped[ExerciseDifficulty] = mapped_column(db.Enum(ExerciseDifficulty), nullable=False, index=True)
-    body_regions: Mapped[List[str]] = mapped_column(JSON, nullable=False)  # Lista de BodyRegion
+    body_regions: Mapped[List[str]] = mapped_column(JSONBList, nullable=False)  # Lista de BodyRegion
     
     # Mídia
     video_url: Mapped[Optional[str]] = mapped_column(String(500))
@@ -85,6 +94,11 @@ class Exercise(db.Model):
     # Gamificação
     points_value: Mapped[int] = mapped_column(Integer, default=10)  # Pontos por execução
     
+    # Contadores desnormalizados (mantidos em create_execution, ver services.exercise_stats)
+    execution_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0', nullable=False, index=True)
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, server_default='0', nullable=False)
+    rating_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0', nullable=False)
+    
     # Controle
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, index=True)
     is_approved: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
@@ -97,19 +111,33 @@ class Exercise(db.Model):
     patient_exercises = relationship("PatientExercise", back_populates="exercise", cascade="all, delete-orphan")
     executions = relationship("ExerciseExecution", back_populates="exercise", cascade="all, delete-orphan")
 
+    @classmethod
+    def body_region_filter(cls, body_region: str):
+        """Filtro SQL (indexado no PostgreSQL) por região corporal"""
+        return json_array_contains(cls.body_regions, body_region)
+
     @hybrid_property
     def average_rating(self):
-        """Calcula avaliação média baseada nas execuções"""
-        if not self.executions:
+        """Avaliação média baseada nos contadores de execução"""
+        if not self.rating_count:
             return 0.0
-        
-        ratings = [e.patient_rating for e in self.executions if e.patient_rating is not None]
-        return sum(ratings) / len(ratings) if ratings else 0.0
+        return self.rating_sum / self.rating_count
+
+    @average_rating.expression
+    def average_rating(cls):
+        return case(
+            (cls.rating_count > 0, cast(cls.rating_sum, Float) / cls.rating_count),
+            else_=0.0
+        )
 
     @hybrid_property
     def total_executions(self):
-        """Conta total de execuções"""
-        return len(self.executions)
+        """Total de execuções registradas"""
+        return self.execution_count or 0
+
+    @total_executions.expression
+    def total_executions(cls):
+        return cls.execution_count
 
     def to_dict(self, include_stats=False):
         """Converte para dicionário"""
@@ -178,6 +206,9 @@ class PatientExercise(db.Model):
     is_completed: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     
+    # Contador desnormalizado de execuções concluídas
+    completed_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0', nullable=False)
+    
     # Controle
     prescribed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -205,9 +236,21 @@ class PatientExercise(db.Model):
         if expected_executions == 0:
             return 0.0
             
-        actual_executions = len([e for e in self.executions if e.completed_at is not None])
+        actual_executions = self.completed_count or 0
         return min((actual_executions / expected_executions) * 100, 100.0)
 
+    @completion_rate.expression
+    def completion_rate(cls):
+        end_date = func.coalesce(cls.end_date, func.current_date())
+        days_in_period = days_between(cls.start_date, end_date) + 1
+        expected_executions = cast(days_in_period / 7.0 * cls.frequency_per_week, Integer)
+        
+        return case(
+            (expected_executions <= 0, 0.0),
+            (cls.completed_count >= expected_executions, 100.0),
+            else_=cls.completed_count * 100.0 / expected_executions
+        )
+
     @property
     def effective_parameters(self):
         """Retorna parâmetros efetivos (customizados ou padrão)"""
@@ -260,6 +303,9 @@ class ExerciseExecution(db.Model):
     patient_exercise_id: Mapped[str] = mapped_column(String(36), ForeignKey('patient_exercises.id'), nullable=False, index=True)
     exercise_id: Mapped[str] = mapped_column(String(36), ForeignKey('exercises.id'), nullable=False, index=True)
     patient_id: Mapped[str] = mapped_column(String(36), ForeignKey('patients.id'), nullable=False, index=True)
+
+    # Chave de idempotência gerada pelo app mobile (sincronização offline)
+    client_id: Mapped[Optional[str]] = mapped_column(String(64), unique=True, index=True)
     
     # Dados da execução
     started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -291,6 +337,7 @@ class ExerciseExecution(db.Model):
     patient_exercise = relationship("PatientExercise", back_populates="executions")
     exercise = relationship("Exercise", back_populates="executions")
     patient = relationship("Patient", backref="exercise_executions")
+    sensor_series = relationship("ExerciseSensorSeries", back_populates="execution", cascade="all, delete-orphan")
 
     @hybrid_property
     def is_completed(self):
@@ -341,6 +388,7 @@ class ExerciseExecution(db.Model):
             'patient_exercise_id': self.patient_exercise_id,
             'exercise_id': self.exercise_id,
             'patient_id': self.patient_id,
+            'client_id': self.client_id,
             'started_at': self.started_at.isoformat(),
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'duration_seconds': self.duration_seconds,
@@ -368,6 +416,58 @@ class ExerciseExecution(db.Model):
         return data
 
 
+class ExerciseSensorSeries(db.Model):
+    """Série temporal de um canal de sensor, em formato binário compacto"""
+    __tablename__ = 'exercise_sensor_series'
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    execution_id: Mapped[str] = mapped_column(String(36), ForeignKey('exercise_executions.id'), nullable=False, index=True)
+    
+    # Identificação do canal ("accel_x", "gyro_z", "heart_rate"...)
+    channel: Mapped[str] = mapped_column(String(50), nullable=False)
+    
+    # Amostragem (após redução)
+    sample_rate_hz: Mapped[float] = mapped_column(Float, nullable=False)
+    sample_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    original_sample_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    downsample_factor: Mapped[int] = mapped_column(Integer, default=1)
+    
+    # Estatísticas pré-calculadas (evitam decodificar para listagens)
+    min_value: Mapped[Optional[float]] = mapped_column(Float)
+    max_value: Mapped[Optional[float]] = mapped_column(Float)
+    mean_value: Mapped[Optional[float]] = mapped_column(Float)
+    
+    # Amostras empacotadas (ver utils.sensor_codec)
+    encoding: Mapped[str] = mapped_column(String(20), nullable=False, default='f32le+zlib')
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    # Relacionamentos
+    execution = relationship("ExerciseExecution", back_populates="sensor_series")
+
+    def to_dict(self, include_samples=False):
+        """Converte para dicionário"""
+        data = {
+            'id': self.id,
+            'execution_id': self.execution_id,
+            'channel': self.channel,
+            'sample_rate_hz': self.sample_rate_hz,
+            'sample_count': self.sample_count,
+            'original_sample_count': self.original_sample_count,
+            'downsample_factor': self.downsample_factor,
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+            'mean_value': self.mean_value,
+            'encoding': self.encoding
+        }
+        
+        if include_samples:
+            data['samples'] = unpack_samples(self.data)
+        
+        return data
+
+
 class ExerciseProgram(db.Model):
     """Programas de exercícios (coleções organizadas)"""
     __tablename__ = 'exercise_programs'
@@ -0,0 +1,52 @@
+"""
+Modelos para o ledger de pontos da gamificação
+"""
+
+from datetime import datetime, date, timedelta
+from typing import Optional
+
+from sqlalchemy import String, Integer, DateTime, Date, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .. import db
+
+
+class PatientPoints(db.Model):
+    """
+    Totais correntes de pontos por paciente
+
+    Atualizado na mesma transação que grava as execuções, para que total
+    e sequência (streak) sejam lidos sem somar exercise_executions. As
+    execuções continuam sendo a fonte da verdade (ver backfill-points).
+    """
+    __tablename__ = 'patient_points'
+
+    patient_id: Mapped[str] = mapped_column(String(36), ForeignKey('patients.id', ondelete='CASCADE'), primary_key=True)
+    total_points: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0', index=True)
+    execution_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+
+    # Sequência de dias consecutivos com pelo menos uma execução
+    current_streak: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    longest_streak: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    last_activity_date: Mapped[Optional[date]] = mapped_column(Date)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def effective_streak(self, today: Optional[date] = None) -> int:
+        """Streak atual considerando que um dia sem atividade a zera"""
+        today = today or date.today()
+        if not self.last_activity_date or self.last_activity_date < today - timedelta(days=1):
+            return 0
+        return self.current_streak
+
+    def to_dict(self):
+        """Converte para dicionário"""
+        return {
+            'patient_id': self.patient_id,
+            'total_points': self.total_points,
+            'execution_count': self.execution_count,
+            'current_streak': self.effective_streak(),
+            'longest_streak': self.longest_streak,
+            'last_activity_date': self.last_activity_date.isoformat() if self.last_activity_date else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -12,6 +12,7 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 
 from . import db
+from .types import JSONBList, json_array_contains
 
 
 class CompetencyLevel(Enum):
@@ -128,6 +129,12 @@ class Intern(db.Model):
 class EducationalCase(db.Model):
     """Casos clínicos educacionais"""
     __tablename__ = 'educational_cases'
+    __table_args__ = (
+        db.Index(
+            'ix_educational_cases_specialization_areas_gin', 'specialization_areas',
+            postgresql_using='gin', postgresql_ops={'specialization_areas': 'jsonb_path_ops'}
+        ),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
     title: Mapped[str] = mapped_column(String(300), nullable=False, index=True)
@@ -135,7 +142,7 @@ class EducationalCase(db.Model):
     
     # Classificação do caso
     complexity: Mapped[CaseComplexity] = mapped_column(db.Enum(CaseComplexity), nullable=False, index=True)
-    specialization_areas: Mapped[List[str]] = mapped_column(JSON, nullable=False)
+    specialization_areas: Mapped[List[str]] = mapped_column(JSONBList, nullable=False)
     pathologies: Mapped[List[str]] = mapped_column(JSON, nullable=False)
     
     # Conteúdo do caso
@@ -173,6 +180,11 @@ class EducationalCase(db.Model):
     assigned_intern = relationship("Intern", back_populates="case_assignments")
     submissions = relationship("CaseSubmission", back_populates="case", cascade="all, delete-orphan")
 
+    @classmethod
+    def specialization_filter(cls, specialization: str):
+        """Filtro SQL (indexado no PostgreSQL) por área de especialização"""
+        return json_array_contains(cls.specialization_areas, specialization)
+
     @hybrid_property
     def is_overdue(self):
         """Verifica se o caso está em atraso"""
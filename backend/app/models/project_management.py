@@ -7,8 +7,9 @@ from typing import Dict, List, Any, Optional
 from uuid import uuid4
 from enum import Enum
 
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Date, Text, JSON, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Boolean, DateTime, Date, Text, JSON, ForeignKey
+from sqlalchemy import case, func
+from sqlalchemy.orm import Mapped, mapped_column, query_expression, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 
 from . import db
@@ -117,14 +118,27 @@ class Project(db.Model):
     tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
     sprints = relationship("Sprint", back_populates="project", cascade="all, delete-orphan")
     
-    @hybrid_property
+    # Contagens de tarefas (sem arquivadas) carregadas junto com a consulta
+    # do projeto via with_expression (ver services.project_stats)
+    task_total: Mapped[Optional[int]] = query_expression()
+    task_completed: Mapped[Optional[int]] = query_expression()
+    
+    def task_counts(self):
+        """(total, concluídas) das tarefas não arquivadas, sem carregar as tarefas"""
+        if self.task_total is not None:
+            return self.task_total, self.task_completed or 0
+        
+        if getattr(self, '_task_counts', None) is None:
+            self._task_counts = tuple(db.session.query(
+                func.count(Task.id),
+                func.coalesce(func.sum(case((Task.status == TaskStatus.DONE, 1), else_=0)), 0)
+            ).filter(Task.project_id == self.id, Task.is_archived == False).one())
+        return self._task_counts
+    
+    @property
     def progress_percentage(self):
         """Calcula porcentagem de progresso baseado nas tarefas"""
-        if not self.tasks:
-            return 0
-        
-        completed_tasks = sum(1 for task in self.tasks if task.status == TaskStatus.DONE)
-        total_tasks = len([task for task in self.tasks if not task.is_archived])
+        total_tasks, completed_tasks = self.task_counts()
         
         if total_tasks == 0:
             return 0
@@ -187,8 +201,8 @@ class Project(db.Model):
                 'metrics': self.metrics,
                 'attachments': self.attachments,
                 'owner': self.owner.to_dict() if self.owner else None,
-                'task_count': len([t for t in self.tasks if not t.is_archived]),
-                'completed_task_count': len([t for t in self.tasks if t.status == TaskStatus.DONE and not t.is_archived])
+                'task_count': self.task_counts()[0],
+                'completed_task_count': self.task_counts()[1]
             })
         
         return data
@@ -197,6 +211,9 @@ class Project(db.Model):
 class Task(db.Model):
     """Tarefas do sistema Kanban"""
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_board_order', 'project_id', 'column_id', 'board_position'),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey('projects.id'), nullable=False)
@@ -208,7 +225,8 @@ class Task(db.Model):
     
     # Classificação
     task_type: Mapped[TaskType] = mapped_column(db.Enum(TaskType), nullable=False, index=True)
-    status: Mapped[TaskStatus] = mapped_column(db.Enum(TaskStatus), default=TaskStatus.BACKLOG, index=True)
+    status: Mapped[TaskStatus] = mapped_column(db.Enum(TaskStatus), default=TaskStatus.BACKLOG, index=True,
+                                             active_history=True)  # Valor anterior para o burndown
     priority: Mapped[TaskPriority] = mapped_column(db.Enum(TaskPriority), default=TaskPriority.MEDIUM, index=True)
     
     # Atribuição
@@ -216,7 +234,7 @@ class Task(db.Model):
     reporter_id: Mapped[str] = mapped_column(String(36), ForeignKey('users.id'), nullable=False)
     
     # Estimativas e tracking
-    story_points: Mapped[Optional[int]] = mapped_column(Integer)  # Para Scrum
+    story_points: Mapped[Optional[int]] = mapped_column(Integer, active_history=True)  # Para Scrum
     estimated_hours: Mapped[Optional[float]] = mapped_column(Float)
     actual_hours: Mapped[float] = mapped_column(Float, default=0.0)
     
@@ -231,10 +249,10 @@ class Task(db.Model):
     
     # Posicionamento no Kanban
     column_id: Mapped[str] = mapped_column(String(50), nullable=False, default="backlog")
-    board_position: Mapped[int] = mapped_column(Integer, default=0)  # Posição na coluna
+    board_position: Mapped[int] = mapped_column(BigInteger, default=0)  # Posição esparsa na coluna (ver board_ordering)
     
     # Sprint (se usar metodologia ágil)
-    sprint_id: Mapped[Optional[str]] = mapped_column(String(36), ForeignKey('sprints.id'))
+    sprint_id: Mapped[Optional[str]] = mapped_column(String(36), ForeignKey('sprints.id'), active_history=True)
     
     # Metadados
     labels: Mapped[List[str]] = mapped_column(JSON, default=list)
@@ -248,7 +266,7 @@ class Task(db.Model):
     acceptance_criteria: Mapped[List[str]] = mapped_column(JSON, default=list)
     
     # Controle
-    is_archived: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+    is_archived: Mapped[bool] = mapped_column(Boolean, default=False, index=True, active_history=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -455,7 +473,7 @@ class TimeLog(db.Model):
     task_id: Mapped[str] = mapped_column(String(36), ForeignKey('tasks.id'), nullable=False)
     user_id: Mapped[str] = mapped_column(String(36), ForeignKey('users.id'), nullable=False)
     
-    hours: Mapped[float] = mapped_column(Float, nullable=False)
+    hours: Mapped[float] = mapped_column(Float, nullable=False, active_history=True)
     description: Mapped[Optional[str]] = mapped_column(Text)
     date_worked: Mapped[date] = mapped_column(Date, nullable=False)
     
@@ -475,4 +493,42 @@ class TimeLog(db.Model):
             'date_worked': self.date_worked.isoformat(),
             'user': self.user.to_dict() if self.user else None,
             'created_at': self.created_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+
+class ProjectTaskCounter(db.Model):
+    """Último número de tarefa emitido por projeto (chaves FISIO-1, FISIO-2, ...)"""
+    __tablename__ = 'project_task_counters'
+
+    project_id: Mapped[str] = mapped_column(String(36), ForeignKey('projects.id'), primary_key=True)
+    last_number: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class SprintBurndown(db.Model):
+    """Situação diária do sprint, mantida incrementalmente (services.sprint_burndown)"""
+    __tablename__ = 'sprint_burndown_snapshots'
+
+    sprint_id: Mapped[str] = mapped_column(String(36), ForeignKey('sprints.id'), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    
+    # Totais no fim do dia (tarefas não arquivadas do sprint)
+    total_tasks: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completed_tasks: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_points: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completed_points: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    hours_logged: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)  # Acumulado
+    
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Converte para dicionário"""
+        return {
+            'day': self.day.isoformat(),
+            'total_tasks': self.total_tasks,
+            'completed_tasks': self.completed_tasks,
+            'remaining_tasks': self.total_tasks - self.completed_tasks,
+            'total_points': self.total_points,
+            'completed_points': self.completed_points,
+            'remaining_points': self.total_points - self.completed_points,
+            'hours_logged': round(self.hours_logged, 2)
+        }
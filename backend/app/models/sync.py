@@ -0,0 +1,86 @@
+"""
+Modelos para sincronização offline-first do app mobile
+"""
+
+from datetime import datetime
+
+from sqlalchemy import String, Integer, DateTime, event, insert
+from sqlalchemy.orm import Mapped, mapped_column, Session
+
+from app import db
+
+
+# Tabelas sincronizáveis (todas possuem patient_id, que define o escopo)
+SYNC_TABLES = ('patient_exercises', 'exercise_executions')
+
+
+class SyncOperation:
+    """Operações registradas no changelog"""
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+
+
+class SyncChange(db.Model):
+    """
+    Changelog de sincronização
+
+    Cada alteração em uma tabela sincronizável recebe um ``seq``
+    monotonicamente crescente; o cliente guarda o último ``seq`` visto
+    como token e pede apenas o que mudou depois dele. Exclusões ficam
+    registradas como tombstones (operation = 'delete').
+    """
+    __tablename__ = 'sync_changes'
+    __table_args__ = (
+        db.Index('ix_sync_changes_patient_seq', 'patient_id', 'seq'),
+    )
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    entity_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    entity_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    patient_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    operation: Mapped[str] = mapped_column(String(10), nullable=False, default=SyncOperation.UPSERT)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        """Converte para dicionário"""
+        return {
+            'seq': self.seq,
+            'entity_type': self.entity_type,
+            'entity_id': self.entity_id,
+            'patient_id': self.patient_id,
+            'operation': self.operation,
+            'changed_at': self.changed_at.isoformat()
+        }
+
+
+def _change_row(obj, operation, now):
+    return {
+        'entity_type': obj.__tablename__,
+        'entity_id': obj.id,
+        'patient_id': obj.patient_id,
+        'operation': operation,
+        'changed_at': now
+    }
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_sync_changes(session, flush_context):
+    """Registra no changelog as alterações ORM em tabelas sincronizáveis"""
+
+    now = datetime.utcnow()
+    rows = []
+
+    for obj in session.new:
+        if getattr(obj, '__tablename__', None) in SYNC_TABLES:
+            rows.append(_change_row(obj, SyncOperation.UPSERT, now))
+
+    for obj in session.dirty:
+        if getattr(obj, '__tablename__', None) in SYNC_TABLES and session.is_modified(obj, include_collections=False):
+            rows.append(_change_row(obj, SyncOperation.UPSERT, now))
+
+    for obj in session.deleted:
+        if getattr(obj, '__tablename__', None) in SYNC_TABLES:
+            rows.append(_change_row(obj, SyncOperation.DELETE, now))
+
+    if rows:
+        session.connection().execute(insert(SyncChange.__table__), rows)
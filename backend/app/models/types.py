@@ -0,0 +1,87 @@
+"""
+Tipos de coluna e expressões SQL compartilhados entre os modelos
+"""
+
+from sqlalchemy import JSON, bindparam
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+from sqlalchemy.types import Boolean, Integer, String
+
+
+# JSON genérico que vira JSONB no PostgreSQL (indexável com GIN)
+JSONBList = JSON().with_variant(postgresql.JSONB(), 'postgresql')
+
+
+class JSONArrayContains(ColumnElement):
+    """
+    Filtro "array JSON contém valor" executado no banco.
+
+    No PostgreSQL usa o operador ``@>`` (atendido pelo índice GIN
+    ``jsonb_path_ops``); nos demais dialetos usa ``json_each`` do SQLite.
+    """
+    inherit_cache = True
+    type = Boolean()
+
+    _traverse_internals = [
+        ('column', InternalTraversal.dp_clauseelement),
+        ('value', InternalTraversal.dp_clauseelement),
+    ]
+
+    def __init__(self, column, value):
+        self.column = column
+        self.value = bindparam(None, value, type_=String(), unique=True)
+
+
+@compiles(JSONArrayContains)
+def _compile_json_contains_default(element, compiler, **kw):
+    column = compiler.process(element.column, **kw)
+    value = compiler.process(element.value, **kw)
+    return f"EXISTS (SELECT 1 FROM json_each({column}) WHERE json_each.value = {value})"
+
+
+@compiles(JSONArrayContains, 'postgresql')
+def _compile_json_contains_postgresql(element, compiler, **kw):
+    column = compiler.process(element.column, **kw)
+    value = compiler.process(element.value, **kw)
+    return f"({column} @> jsonb_build_array(CAST({value} AS TEXT)))"
+
+
+def json_array_contains(column, value):
+    """Retorna expressão SQL verificando se o array JSON ``column`` contém ``value``"""
+    return JSONArrayContains(column, value)
+
+
+class DaysBetween(ColumnElement):
+    """Diferença em dias inteiros entre duas datas (``end - start``)"""
+    inherit_cache = True
+    type = Integer()
+
+    _traverse_internals = [
+        ('start', InternalTraversal.dp_clauseelement),
+        ('end', InternalTraversal.dp_clauseelement),
+    ]
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+
+@compiles(DaysBetween)
+def _compile_days_between_default(element, compiler, **kw):
+    start = compiler.process(element.start, **kw)
+    end = compiler.process(element.end, **kw)
+    return f"CAST(julianday({end}) - julianday({start}) AS INTEGER)"
+
+
+@compiles(DaysBetween, 'postgresql')
+def _compile_days_between_postgresql(element, compiler, **kw):
+    start = compiler.process(element.start, **kw)
+    end = compiler.process(element.end, **kw)
+    return f"(CAST({end} AS DATE) - CAST({start} AS DATE))"
+
+
+def days_between(start, end):
+    """Retorna expressão SQL com o número de dias entre ``start`` e ``end``"""
+    return DaysBetween(start, end)
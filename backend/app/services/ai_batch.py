@@ -0,0 +1,451 @@
+"""
+Jobs de IA em lote
+
+Um job recebe N itens (documentos para análise ou evoluções SOAP para
+pré-preencher), é gravado com todos os itens pendentes e processado no
+loop de IA com concorrência limitada. Cada item é persistido ao
+terminar, então progresso e resultados parciais ficam disponíveis
+durante a execução e sobrevivem a reinícios: o worker
+(``flask ai-batch-worker``) retoma itens pendentes de jobs interrompidos.
+
+Itens com falha são repetidos com backoff exponencial; respostas 429 do
+provedor bloqueiam o provedor pelo Retry-After (ConcurrencyLimiter) e
+as chamadas de lote esperam em vez de cair para outro provedor.
+
+Com ``use_provider_batch`` e o Claude configurado, o job é enviado à
+Message Batches API da Anthropic (metade do custo, até 24h) e os
+resultados são coletados por polling; itens que falharem lá são
+refeitos pelo caminho normal.
+"""
+
+import asyncio
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import insert
+
+from .. import db
+from ..models.ai_batch import AIBatchJob, AIBatchItem, AIBatchStatus, AIBatchItemStatus
+from ..models.patient import Patient
+from .ai_context import MAX_DOCUMENT_LENGTH, split_document, token_budget
+from .ai_executor import get_ai_executor
+from .ai_usage import get_usage_ledger
+from .ai_orchestrator import AIProvider, AIRequest, AIResponse, AITaskType, CLAUDE_MODEL, get_ai_service
+
+MAX_ITEMS_PER_JOB = 1000
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_JOB_CONCURRENCY = 8
+MAX_JOB_CONCURRENCY = 32
+RETRY_BASE_SECONDS = 2.0
+PROVIDER_BATCH_POLL_SECONDS = 60
+# Job "running" sem progresso há mais que isso é considerado órfão
+STALE_JOB_MINUTES = 15
+
+JOB_TYPES = ('document_analysis', 'soap_completion')
+SOAP_FIELDS = ('subjective', 'objective', 'assessment', 'plan')
+
+
+class BatchValidationError(ValueError):
+    """Job ou item inválido"""
+
+
+def _validate_items(job_type: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Normaliza os itens e retorna a lista a gravar"""
+
+    if job_type not in JOB_TYPES:
+        raise BatchValidationError(f"Tipo de job inválido: {job_type}")
+    if not isinstance(items, list) or not items:
+        raise BatchValidationError("Informe ao menos um item")
+    if len(items) > MAX_ITEMS_PER_JOB:
+        raise BatchValidationError(f"Máximo de {MAX_ITEMS_PER_JOB} itens por job")
+
+    normalized = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise BatchValidationError(f"Item {index}: formato inválido")
+
+        if job_type == 'document_analysis':
+            content = item.get('content')
+            if not isinstance(content, str) or len(content.strip()) < 10:
+                raise BatchValidationError(f"Item {index}: conteúdo do documento obrigatório")
+            if len(content) > MAX_DOCUMENT_LENGTH:
+                raise BatchValidationError(f"Item {index}: documento excede {MAX_DOCUMENT_LENGTH} caracteres")
+            normalized.append({
+                'content': content,
+                'document_type': str(item.get('document_type') or 'geral'),
+                'reference': item.get('reference')
+            })
+        else:
+            if not item.get('patient_id'):
+                raise BatchValidationError(f"Item {index}: patient_id obrigatório")
+            normalized.append({
+                'patient_id': str(item['patient_id']),
+                **{field: str(item.get(field) or '') for field in SOAP_FIELDS},
+                'reference': item.get('reference')
+            })
+
+    if job_type == 'soap_completion':
+        patient_ids = {item['patient_id'] for item in normalized}
+        found = {
+            row[0] for row in db.session.query(Patient.id).filter(Patient.id.in_(patient_ids)).all()
+        }
+        missing = patient_ids - found
+        if missing:
+            raise BatchValidationError(f"Pacientes não encontrados: {', '.join(sorted(missing)[:5])}")
+
+    return normalized
+
+
+def build_item_request(job: AIBatchJob, item_input: Dict[str, Any]) -> AIRequest:
+    """AIRequest de um item, marcada como chamada de segundo plano"""
+
+    service = get_ai_service()
+    if job.job_type == 'document_analysis':
+        request = service.build_document_request(item_input['content'], item_input['document_type'], job.created_by)
+    else:
+        partial_data = {field: item_input.get(field, '') for field in SOAP_FIELDS}
+        request = service.build_soap_request(item_input['patient_id'], partial_data, job.created_by)
+    request.background = True
+    return request
+
+
+async def _run_item(job: AIBatchJob, item_input: Dict[str, Any], orchestrator) -> AIResponse:
+    """Executa um item (documentos longos passam pelo map-reduce da análise)"""
+    
+    if job.job_type == 'document_analysis':
+        return await get_ai_service().analyze_document(
+            item_input['content'], item_input['document_type'], job.created_by,
+            orchestrator=orchestrator, background=True
+        )
+    return await orchestrator.process_request(build_item_request(job, item_input))
+
+
+def _fits_single_request(job: AIBatchJob, item_input: Dict[str, Any]) -> bool:
+    """Itens que não precisam de map-reduce (requisito da Message Batches API)"""
+    
+    if job.job_type != 'document_analysis':
+        return True
+    budget = token_budget(AITaskType.DOCUMENT_ANALYSIS.value) - get_ai_service().DOCUMENT_PROMPT_OVERHEAD
+    return len(split_document(item_input['content'], budget)) == 1
+
+
+def create_batch_job(user, job_type: str, items: List[Dict[str, Any]],
+                     options: Optional[Dict[str, Any]] = None) -> AIBatchJob:
+    """Grava o job e seus itens pendentes (uma transação)"""
+
+    normalized = _validate_items(job_type, items)
+    options = dict(options or {})
+    options['max_attempts'] = max(1, min(int(options.get('max_attempts') or DEFAULT_MAX_ATTEMPTS), 10))
+    options['concurrency'] = max(1, min(int(options.get('concurrency') or DEFAULT_JOB_CONCURRENCY), MAX_JOB_CONCURRENCY))
+    options['use_provider_batch'] = bool(options.get('use_provider_batch'))
+
+    job = AIBatchJob(
+        job_type=job_type,
+        created_by=user.id,
+        total_items=len(normalized),
+        options=options
+    )
+    db.session.add(job)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    db.session.execute(insert(AIBatchItem), [
+        {
+            'id': str(uuid.uuid4()),
+            'job_id': job.id,
+            'position': position,
+            'status': AIBatchItemStatus.PENDING,
+            'input': item_input,
+            'tokens_used': 0,
+            'attempts': 0,
+            'updated_at': now
+        }
+        for position, item_input in enumerate(normalized)
+    ])
+    db.session.commit()
+    return job
+
+
+def dispatch_batch_job(job_id: str) -> None:
+    """
+    Agenda o job no loop de IA deste processo
+
+    Com AI_BATCH_INLINE falso nada é agendado: o job espera o
+    ``flask ai-batch-worker``.
+    """
+
+    if not current_app.config.get('AI_BATCH_INLINE', True):
+        return
+
+    future = get_ai_executor().submit(run_batch_job(job_id))
+    logger = current_app.logger
+
+    def log_failure(done):
+        if not done.cancelled() and done.exception() is not None:
+            logger.error(f"Job de IA {job_id} interrompido: {done.exception()}")
+
+    future.add_done_callback(log_failure)
+
+
+def _job_status(job_id: str) -> Optional[str]:
+    return db.session.query(AIBatchJob.status).filter(AIBatchJob.id == job_id).scalar()
+
+
+def _record_item(job_id: str, item: AIBatchItem) -> None:
+    """Persiste o item e incrementa os contadores do job no banco"""
+
+    counters = {AIBatchJob.updated_at: datetime.utcnow()}
+    if item.status == AIBatchItemStatus.SUCCEEDED:
+        counters[AIBatchJob.succeeded_items] = AIBatchJob.succeeded_items + 1
+        counters[AIBatchJob.tokens_used] = AIBatchJob.tokens_used + (item.tokens_used or 0)
+    elif item.status == AIBatchItemStatus.FAILED:
+        counters[AIBatchJob.failed_items] = AIBatchJob.failed_items + 1
+
+    db.session.query(AIBatchJob).filter(AIBatchJob.id == job_id).update(counters, synchronize_session=False)
+    db.session.commit()
+
+
+def _finish_job(job_id: str) -> AIBatchJob:
+    """Define o status final a partir dos contadores"""
+
+    job = db.session.get(AIBatchJob, job_id)
+    db.session.refresh(job)
+    if job.status == AIBatchStatus.CANCELLED:
+        return job
+    if job.processed_items < job.total_items:
+        # Itens recolocados na fila durante a execução ficam para a próxima rodada
+        return job
+    elif job.failed_items == 0:
+        job.status = AIBatchStatus.COMPLETED
+    elif job.succeeded_items == 0:
+        job.status = AIBatchStatus.FAILED
+    else:
+        job.status = AIBatchStatus.PARTIAL
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff exponencial com jitter (2s, 4s, 8s... até 60s)"""
+    return min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), 60.0) * random.uniform(0.8, 1.2)
+
+
+async def _process_item(job: AIBatchJob, item: AIBatchItem, orchestrator, max_attempts: int) -> None:
+    while item.attempts < max_attempts:
+        if _job_status(job.id) == AIBatchStatus.CANCELLED:
+            return
+
+        quota_error = get_usage_ledger().quota_error(job.created_by)
+        if quota_error:
+            # Sem novas tentativas: o item pode ser refeito com retry após a renovação da cota
+            item.error = quota_error
+            break
+
+        item.status = AIBatchItemStatus.RUNNING
+        item.attempts += 1
+        db.session.commit()
+
+        response = await _run_item(job, item.input, orchestrator)
+        if response.success:
+            item.status = AIBatchItemStatus.SUCCEEDED
+            item.output = response.content
+            item.provider = response.provider.value
+            item.tokens_used = response.tokens_used
+            item.error = None
+            _record_item(job.id, item)
+            return
+
+        item.error = response.error
+        if item.attempts < max_attempts:
+            item.status = AIBatchItemStatus.PENDING
+            db.session.commit()
+            await asyncio.sleep(retry_delay(item.attempts))
+
+    item.status = AIBatchItemStatus.FAILED
+    _record_item(job.id, item)
+
+
+async def run_batch_job(job_id: str, orchestrator=None) -> AIBatchJob:
+    """
+    Processa os itens pendentes do job (também retoma jobs interrompidos)
+
+    Roda no loop de IA; as gravações no banco são curtas e síncronas,
+    feitas entre as chamadas ao provedor.
+    """
+
+    orchestrator = orchestrator or get_ai_service().orchestrator
+    job = db.session.get(AIBatchJob, job_id)
+    if job is None or job.status in AIBatchStatus.FINISHED:
+        return job
+
+    options = job.options or {}
+    if options.get('use_provider_batch') and AIProvider.CLAUDE in orchestrator.providers:
+        if await run_provider_batch(job, orchestrator):
+            return _finish_job(job_id)
+
+    job.status = AIBatchStatus.RUNNING
+    job.started_at = job.started_at or datetime.utcnow()
+    db.session.commit()
+
+    # Itens "running" são de uma execução interrompida: voltam para a fila
+    items = job.items.filter(
+        AIBatchItem.status.in_([AIBatchItemStatus.PENDING, AIBatchItemStatus.RUNNING])
+    ).all()
+    max_attempts = options.get('max_attempts', DEFAULT_MAX_ATTEMPTS)
+    semaphore = asyncio.Semaphore(options.get('concurrency', DEFAULT_JOB_CONCURRENCY))
+
+    async def bounded(item):
+        async with semaphore:
+            await _process_item(job, item, orchestrator, max_attempts)
+
+    await asyncio.gather(*(bounded(item) for item in items))
+    return _finish_job(job_id)
+
+
+async def run_provider_batch(job: AIBatchJob, orchestrator) -> bool:
+    """
+    Executa o job pela Message Batches API da Anthropic
+
+    Retorna True se todos os itens foram resolvidos lá; caso contrário
+    os itens restantes (inclusive documentos longos, que precisam de
+    map-reduce) voltam para o processamento normal.
+    """
+
+    client = orchestrator.providers[AIProvider.CLAUDE]
+    pending = job.items.filter(AIBatchItem.status != AIBatchItemStatus.SUCCEEDED).all()
+    items = {item.id: item for item in pending if _fits_single_request(job, item.input)}
+    if not items:
+        return False
+
+    if not job.provider_batch_id:
+        requests = []
+        for item in items.values():
+            request = build_item_request(job, item.input)
+            requests.append({
+                'custom_id': item.id,
+                'params': {
+                    'model': CLAUDE_MODEL,
+                    'max_tokens': request.max_tokens,
+                    'temperature': request.temperature,
+                    'system': orchestrator._build_system_prompt(request),
+                    'messages': [{'role': 'user', 'content': orchestrator._build_user_prompt(request)}]
+                }
+            })
+        batch = await client.messages.batches.create(requests=requests)
+        job.provider_batch_id = batch.id
+        job.status = AIBatchStatus.RUNNING
+        job.started_at = job.started_at or datetime.utcnow()
+        db.session.commit()
+
+    poll_seconds = current_app.config.get('AI_BATCH_POLL_SECONDS') or PROVIDER_BATCH_POLL_SECONDS
+    while True:
+        batch = await client.messages.batches.retrieve(job.provider_batch_id)
+        if batch.processing_status == 'ended':
+            break
+        if _job_status(job.id) == AIBatchStatus.CANCELLED:
+            await client.messages.batches.cancel(job.provider_batch_id)
+            return True
+        db.session.query(AIBatchJob).filter(AIBatchJob.id == job.id).update(
+            {AIBatchJob.updated_at: datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+        await asyncio.sleep(poll_seconds)
+
+    unresolved = 0
+    async for entry in await client.messages.batches.results(job.provider_batch_id):
+        item = items.get(entry.custom_id)
+        if item is None or item.status == AIBatchItemStatus.SUCCEEDED:
+            continue
+        item.attempts += 1
+        if entry.result.type == 'succeeded':
+            message = entry.result.message
+            item.status = AIBatchItemStatus.SUCCEEDED
+            item.output = message.content[0].text
+            item.provider = AIProvider.CLAUDE.value
+            item.tokens_used = message.usage.input_tokens + message.usage.output_tokens
+            item.error = None
+            _record_item(job.id, item)
+        else:
+            # errored/expired/canceled: refeito pelo caminho normal
+            item.status = AIBatchItemStatus.PENDING
+            item.error = f"provider batch: {entry.result.type}"
+            db.session.commit()
+            unresolved += 1
+
+    return unresolved == 0 and len(items) == len(pending)
+
+
+def cancel_batch_job(job: AIBatchJob) -> AIBatchJob:
+    """Cancela o job; itens já concluídos são mantidos"""
+
+    if job.status not in AIBatchStatus.FINISHED:
+        job.status = AIBatchStatus.CANCELLED
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    return job
+
+
+def retry_failed_items(job: AIBatchJob) -> int:
+    """Recoloca itens falhos na fila e reabre o job"""
+
+    count = AIBatchItem.query.filter(
+        AIBatchItem.job_id == job.id,
+        AIBatchItem.status == AIBatchItemStatus.FAILED
+    ).update(
+        {
+            AIBatchItem.status: AIBatchItemStatus.PENDING,
+            AIBatchItem.attempts: 0,
+            AIBatchItem.updated_at: datetime.utcnow()
+        },
+        synchronize_session=False
+    )
+    if count:
+        job.failed_items = max(0, job.failed_items - count)
+        job.status = AIBatchStatus.PENDING
+        job.finished_at = None
+        db.session.commit()
+    return count
+
+
+def _claimable(stale_before: datetime):
+    return db.or_(
+        AIBatchJob.status == AIBatchStatus.PENDING,
+        db.and_(AIBatchJob.status == AIBatchStatus.RUNNING, AIBatchJob.updated_at < stale_before)
+    )
+
+
+def claim_job(job_id: str, stale_before: datetime) -> bool:
+    """
+    Marca o job como running se ainda estiver livre
+
+    O UPDATE condicional é atômico: entre workers concorrentes apenas um
+    altera a linha (rowcount == 1) e fica com o job.
+    """
+
+    claimed = db.session.query(AIBatchJob).filter(
+        AIBatchJob.id == job_id, _claimable(stale_before)
+    ).update(
+        {AIBatchJob.status: AIBatchStatus.RUNNING, AIBatchJob.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return claimed == 1
+
+
+def claim_pending_jobs(limit: int = 10) -> List[AIBatchJob]:
+    """Reivindica jobs pendentes ou órfãos (running sem progresso recente) para o worker"""
+
+    stale_before = datetime.utcnow() - timedelta(minutes=STALE_JOB_MINUTES)
+    candidates = [
+        row.id for row in db.session.query(AIBatchJob.id).filter(
+            _claimable(stale_before)
+        ).order_by(AIBatchJob.created_at).limit(limit)
+    ]
+    claimed = [job_id for job_id in candidates if claim_job(job_id, stale_before)]
+    if not claimed:
+        return []
+    return AIBatchJob.query.filter(AIBatchJob.id.in_(claimed)).order_by(AIBatchJob.created_at).all()
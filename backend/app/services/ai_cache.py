@@ -0,0 +1,439 @@
+"""
+Cache de respostas do orquestrador de IA
+
+A chave é o hash SHA-256 de (tarefa, prompt do sistema, prompt do
+usuário, temperatura, provedor, max_tokens) com espaços normalizados.
+Backends: LRU em memória (padrão), Redis (TTL por SETEX; a política de
+despejo LRU fica a cargo do servidor) ou diretório em disco.
+
+Requisições com temperatura alta (chat, geração de casos) não usam o
+cache. Opcionalmente, uma camada por similaridade reaproveita respostas
+de prompts quase idênticos da mesma tarefa, provedor e paciente.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_TEMPERATURE = 0.75
+KEY_PREFIX = 'fisioflow:ai-cache'
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(text: str) -> str:
+    """Remove diferenças irrelevantes de espaçamento entre prompts"""
+    return _WHITESPACE.sub(' ', text or '').strip()
+
+
+def cache_key(task_type: str, system_prompt: str, user_prompt: str,
+              temperature: float, provider: str, max_tokens: int) -> str:
+    """Hash estável da requisição normalizada"""
+    payload = json.dumps([
+        task_type,
+        normalize_prompt(system_prompt),
+        normalize_prompt(user_prompt),
+        round(float(temperature), 2),
+        provider,
+        max_tokens
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class MemoryCacheBackend:
+    """LRU em memória com TTL"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Redis compartilhado entre workers (SETEX por entrada)"""
+
+    def __init__(self, client, prefix: str = KEY_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f'{self.prefix}:{key}'
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self._key(key))
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        self.client.setex(self._key(key), ttl, json.dumps(value, ensure_ascii=False, default=str))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self._key(key))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(f'{self.prefix}:*'):
+            self.client.delete(key)
+
+
+class DiskCacheBackend:
+    """
+    Um arquivo JSON por chave
+
+    O mtime marca o último acesso: leituras fazem touch e o despejo
+    remove os arquivos mais antigos quando o limite é excedido.
+    """
+
+    def __init__(self, directory: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry['expires_at'] < time.time():
+            self.delete(key)
+            return None
+        os.utime(path)
+        return entry['value']
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        path = self._path(key)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'expires_at': time.time() + ttl, 'value': value}, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        files = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory) if name.endswith('.json')
+        ]
+        excess = len(files) - self.max_entries
+        if excess > 0:
+            files.sort(key=lambda path: os.stat(path).st_mtime)
+            for path in files[:excess]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                self.delete(name[:-5])
+
+
+# =============================================================================
+# CAMADA POR SIMILARIDADE
+# =============================================================================
+
+class HashingEmbedder:
+    """
+    Embedding local por hashing de trigramas de caracteres
+
+    Não chama nenhuma API: captura quase-duplicatas (ordem de objetivos,
+    pontuação, acentuação de digitação) sem custo extra por requisição.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def __call__(self, text: str) -> List[float]:
+        text = normalize_prompt(text).lower()
+        vector = [0.0] * self.dimensions
+        for i in range(len(text) - 2):
+            digest = hashlib.blake2b(text[i:i + 3].encode('utf-8'), digest_size=4).digest()
+            vector[int.from_bytes(digest, 'little') % self.dimensions] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+
+class SemanticIndex:
+    """
+    Índice de vizinhança por escopo (tarefa, provedor, sistema, paciente)
+
+    O escopo inclui o paciente para que uma resposta nunca seja reutilizada
+    com o contexto clínico de outra pessoa.
+    """
+
+    def __init__(self, embedder: Callable[[str], Sequence[float]], threshold: float,
+                 max_entries_per_scope: int = 200):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries_per_scope = max_entries_per_scope
+        self._scopes: Dict[str, 'OrderedDict[str, Sequence[float]]'] = defaultdict(OrderedDict)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _similarity(a: Sequence[float], b: Sequence[float]) -> float:
+        return sum(x * y for x, y in zip(a, b))
+
+    def add(self, scope: str, key: str, text: str) -> None:
+        vector = self.embedder(text)
+        with self._lock:
+            entries = self._scopes[scope]
+            entries[key] = vector
+            while len(entries) > self.max_entries_per_scope:
+                entries.popitem(last=False)
+
+    def search(self, scope: str, text: str) -> Optional[Tuple[str, float]]:
+        entries = self._scopes.get(scope)
+        if not entries:
+            return None
+        vector = self.embedder(text)
+        with self._lock:
+            best_key, best_score = None, 0.0
+            for key, candidate in entries.items():
+                score = self._similarity(vector, candidate)
+                if score > best_score:
+                    best_key, best_score = key, score
+        if best_key is not None and best_score >= self.threshold:
+            return best_key, best_score
+        return None
+
+    def discard(self, scope: str, key: str) -> None:
+        with self._lock:
+            self._scopes.get(scope, {}).pop(key, None)
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+@dataclass
+class CacheStats:
+    """Métricas do cache (por processo)"""
+    hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    stores: int = 0
+    tokens_saved: int = 0
+    by_task: Dict[str, Dict[str, int]] = field(
+        default_factory=lambda: defaultdict(lambda: {'hits': 0, 'misses': 0, 'tokens_saved': 0})
+    )
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return (self.hits + self.semantic_hits) / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'hits': self.hits,
+            'semantic_hits': self.semantic_hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'stores': self.stores,
+            'hit_rate': round(self.hit_rate, 4),
+            'tokens_saved': self.tokens_saved,
+            'by_task': {task: dict(values) for task, values in self.by_task.items()}
+        }
+
+
+@dataclass
+class CacheLookup:
+    """Resultado de uma consulta ao cache"""
+    key: Optional[str]
+    scope: Optional[str] = None
+    value: Optional[Dict[str, Any]] = None
+    kind: Optional[str] = None  # 'exact' ou 'semantic'
+    similarity: Optional[float] = None
+
+    @property
+    def hit(self) -> bool:
+        return self.value is not None
+
+
+class AIResponseCache:
+    """Cache de respostas com métricas de acerto e tokens economizados"""
+
+    def __init__(self, backend, ttl: int = DEFAULT_TTL_SECONDS,
+                 max_temperature: float = DEFAULT_MAX_TEMPERATURE,
+                 semantic: Optional[SemanticIndex] = None):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self.semantic = semantic
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def should_bypass(self, temperature: float, use_cache: bool = True) -> bool:
+        return not use_cache or temperature >= self.max_temperature
+
+    @staticmethod
+    def _scope(task_type: str, provider: str, system_prompt: str, patient_id: Optional[str]) -> str:
+        system_hash = hashlib.sha256(normalize_prompt(system_prompt).encode('utf-8')).hexdigest()[:16]
+        return f'{task_type}:{provider}:{system_hash}:{patient_id or "-"}'
+
+    def lookup(self, task_type: str, system_prompt: str, user_prompt: str, temperature: float,
+               provider: str, max_tokens: int, patient_id: Optional[str] = None,
+               use_cache: bool = True) -> CacheLookup:
+        """Consulta o cache; ``key`` None indica que a requisição não é cacheável"""
+
+        if self.should_bypass(temperature, use_cache):
+            with self._lock:
+                self.stats.bypassed += 1
+            return CacheLookup(key=None)
+
+        key = cache_key(task_type, system_prompt, user_prompt, temperature, provider, max_tokens)
+        scope = self._scope(task_type, provider, system_prompt, patient_id)
+        result = CacheLookup(key=key, scope=scope)
+
+        try:
+            value = self.backend.get(key)
+            if value is not None:
+                result.value, result.kind = value, 'exact'
+            elif self.semantic is not None:
+                match = self.semantic.search(scope, user_prompt)
+                if match:
+                    value = self.backend.get(match[0])
+                    if value is not None:
+                        result.value, result.kind, result.similarity = value, 'semantic', match[1]
+                    else:
+                        self.semantic.discard(scope, match[0])
+        except Exception as e:
+            logger.warning(f'Falha ao consultar cache de IA: {e}')
+
+        with self._lock:
+            task_stats = self.stats.by_task[task_type]
+            if result.hit:
+                if result.kind == 'exact':
+                    self.stats.hits += 1
+                else:
+                    self.stats.semantic_hits += 1
+                saved = int(result.value.get('tokens_used') or 0)
+                self.stats.tokens_saved += saved
+                task_stats['hits'] += 1
+                task_stats['tokens_saved'] += saved
+            else:
+                self.stats.misses += 1
+                task_stats['misses'] += 1
+
+        return result
+
+    def store(self, lookup: CacheLookup, user_prompt: str, value: Dict[str, Any]) -> None:
+        """Grava a resposta de uma consulta que não acertou"""
+        if lookup.key is None:
+            return
+        try:
+            self.backend.set(lookup.key, value, self.ttl)
+            if self.semantic is not None:
+                self.semantic.add(lookup.scope, lookup.key, user_prompt)
+        except Exception as e:
+            logger.warning(f'Falha ao gravar cache de IA: {e}')
+            return
+        with self._lock:
+            self.stats.stores += 1
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+def create_response_cache(config: Dict[str, Any]) -> AIResponseCache:
+    """Cria o cache a partir da configuração da aplicação"""
+
+    backend_name = config.get('AI_CACHE_BACKEND', 'memory')
+    max_entries = config.get('AI_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    backend = None
+
+    if backend_name == 'redis' and config.get('REDIS_URL'):
+        try:
+            import redis
+
+            client = redis.Redis.from_url(config['REDIS_URL'], socket_timeout=1)
+            client.ping()
+            backend = RedisCacheBackend(client)
+        except Exception as e:
+            logger.warning(f'Redis indisponível para cache de IA, usando memória: {e}')
+    elif backend_name == 'disk':
+        backend = DiskCacheBackend(config.get('AI_CACHE_DIR', 'instance/ai_cache'), max_entries)
+
+    if backend is None:
+        backend = MemoryCacheBackend(max_entries)
+
+    semantic = None
+    threshold = config.get('AI_CACHE_SEMANTIC_THRESHOLD')
+    if threshold:
+        semantic = SemanticIndex(HashingEmbedder(), float(threshold))
+
+    return AIResponseCache(
+        backend,
+        ttl=config.get('AI_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS),
+        max_temperature=config.get('AI_CACHE_MAX_TEMPERATURE', DEFAULT_MAX_TEMPERATURE),
+        semantic=semantic
+    )
+
+
+def get_response_cache() -> Optional[AIResponseCache]:
+    """Cache da aplicação (None se AI_CACHE_ENABLED for falso)"""
+    app = current_app._get_current_object()
+    if not app.config.get('AI_CACHE_ENABLED', True):
+        return None
+    cache = app.extensions.get('ai_response_cache')
+    if cache is None:
+        cache = create_response_cache(app.config)
+        app.extensions['ai_response_cache'] = cache
+    return cache
@@ -0,0 +1,239 @@
+"""
+Montagem do contexto dos prompts de IA
+
+O resumo clínico de cada paciente (dados básicos e última evolução) é
+guardado em cache e invalidado quando o paciente ou seus prontuários
+são gravados, em vez de consultado a cada chamada. O contexto adicional
+da requisição entra no prompt sem repetir o que a solicitação já traz
+(o histórico do chat, os campos do SOAP), e o conjunto respeita um
+orçamento de tokens por tarefa, estimado localmente.
+
+Documentos maiores que o orçamento são divididos em partes para
+análise map-reduce (resumo de cada parte, depois análise dos resumos).
+"""
+
+import json
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app, has_app_context
+
+from .patient_cache import (
+    PatientCache, create_patient_cache, get_app_patient_cache, register_patient_cache
+)
+
+KEY_PREFIX = 'fisioflow:ai-patient-context'
+DEFAULT_CONTEXT_TTL_SECONDS = 600
+DEFAULT_CONTEXT_MAX_ENTRIES = 2000
+
+# Média para português nos tokenizadores BPE dos provedores
+CHARS_PER_TOKEN = 3.5
+
+# Orçamento de tokens do prompt do usuário por tarefa
+TASK_TOKEN_BUDGETS = {
+    'soap_completion': 1500,
+    'exercise_suggestion': 1500,
+    'diagnosis_support': 2000,
+    'treatment_plan': 2000,
+    'chat_response': 2500,
+    'document_analysis': 6000,
+    'case_study_generation': 1500,
+    'competency_evaluation': 2000
+}
+DEFAULT_TOKEN_BUDGET = 2000
+
+# Documentos aceitos pela análise (divididos em partes acima do orçamento)
+MAX_DOCUMENT_LENGTH = 200_000
+
+TRUNCATION_MARKER = '\n[...]'
+MIN_DEDUP_LENGTH = 4
+
+_PARAGRAPHS = re.compile(r'\n\s*\n')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa local de tokens (sem chamar o tokenizador do provedor)"""
+    return math.ceil(len(text or '') / CHARS_PER_TOKEN)
+
+
+def token_budget(task_type: str) -> int:
+    """Orçamento da tarefa (AI_PROMPT_TOKEN_BUDGETS sobrescreve o padrão)"""
+    overrides = (current_app.config.get('AI_PROMPT_TOKEN_BUDGETS') or {}) if has_app_context() else {}
+    return overrides.get(task_type) or TASK_TOKEN_BUDGETS.get(task_type, DEFAULT_TOKEN_BUDGET)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Corta o texto no limite estimado, preferindo terminar numa quebra de linha"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(0, int(max_tokens * CHARS_PER_TOKEN) - len(TRUNCATION_MARKER))
+    if limit == 0:
+        return ''
+    cut = text[:limit]
+    newline = cut.rfind('\n')
+    if newline > limit // 2:
+        cut = cut[:newline]
+    return cut.rstrip() + TRUNCATION_MARKER
+
+
+def split_document(text: str, max_tokens: int) -> List[str]:
+    """
+    Divide o documento em partes de até ``max_tokens``
+
+    Agrupa parágrafos inteiros; parágrafos maiores que o limite são
+    quebrados por linhas e, em último caso, por caracteres.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    pieces = []
+    for paragraph in _PARAGRAPHS.split(text):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for line in paragraph.splitlines():
+            pieces.extend(line[start:start + max_chars] for start in range(0, len(line), max_chars))
+
+    chunks, current = [], ''
+    for piece in pieces:
+        if not piece.strip():
+            continue
+        candidate = f'{current}\n\n{piece}' if current else piece
+        if len(candidate) > max_chars and current:
+            chunks.append(current)
+            candidate = piece
+        current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# =============================================================================
+# DEDUPLICAÇÃO DO CONTEXTO
+# =============================================================================
+
+def _prune(value: Any, prompt: str) -> Any:
+    """Remove do valor os textos que já aparecem no prompt (None se nada sobrar)"""
+    if isinstance(value, str):
+        text = value.strip()
+        # Valores muito curtos ('D', 'não') aparecem no prompt por acaso
+        return None if not text or (len(text) >= MIN_DEDUP_LENGTH and text in prompt) else value
+    if isinstance(value, dict):
+        pruned = {key: _prune(item, prompt) for key, item in value.items()}
+        pruned = {key: item for key, item in pruned.items() if item is not None}
+        return pruned or None
+    if isinstance(value, (list, tuple)):
+        pruned = [item for item in (_prune(item, prompt) for item in value) if item is not None]
+        return pruned or None
+    return value
+
+
+def deduplicate_context(context: Dict[str, Any], prompt: str) -> Dict[str, Any]:
+    """Contexto adicional sem os trechos já presentes na solicitação"""
+    return _prune(context or {}, prompt) or {}
+
+
+def format_context(context: Dict[str, Any]) -> str:
+    """Uma linha ``chave: valor`` por item, JSON compacto"""
+    lines = []
+    for key, value in context.items():
+        if not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str)
+        lines.append(f'{key}: {value}')
+    return '\n'.join(lines)
+
+
+# =============================================================================
+# PROMPT
+# =============================================================================
+
+@dataclass
+class PromptStats:
+    """Tokens estimados de um prompt e economia em relação ao formato antigo"""
+    prompt_tokens: int
+    budget: int
+    tokens_saved: int = 0
+    truncated: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'prompt_tokens': self.prompt_tokens,
+            'budget': self.budget,
+            'tokens_saved': self.tokens_saved,
+            'truncated': self.truncated
+        }
+
+
+def legacy_prompt(prompt: str, context: Dict[str, Any], patient_context: Optional[str]) -> str:
+    """Prompt no formato anterior (contexto completo em JSON indentado), para medir a economia"""
+    context_info = ''
+    if patient_context:
+        context_info += f"\nContexto do Paciente:\n{patient_context}\n"
+    if context:
+        context_info += f"\nContexto Adicional:\n{json.dumps(context, indent=2, ensure_ascii=False, default=str)}\n"
+    return f"{context_info}\nSolicitação:\n{prompt}"
+
+
+def build_user_prompt(task_type: str, prompt: str, context: Dict[str, Any],
+                      patient_context: Optional[str] = None) -> Tuple[str, PromptStats]:
+    """
+    Monta o prompt do usuário dentro do orçamento da tarefa
+
+    A solicitação nunca é cortada; o que sobra do orçamento vai primeiro
+    para o contexto do paciente e depois para o contexto adicional.
+    """
+    budget = token_budget(task_type)
+    request_part = f"\nSolicitação:\n{prompt}"
+    remaining = budget - estimate_tokens(request_part)
+    truncated = False
+
+    sections = []
+    if patient_context:
+        trimmed = truncate_to_tokens(patient_context.strip(), max(remaining - 10, 0))
+        truncated = truncated or trimmed != patient_context.strip()
+        if trimmed:
+            sections.append(f"\nContexto do Paciente:\n{trimmed}\n")
+            remaining -= estimate_tokens(sections[-1])
+
+    extra = format_context(deduplicate_context(context, prompt))
+    if extra:
+        trimmed = truncate_to_tokens(extra, max(remaining - 10, 0))
+        truncated = truncated or trimmed != extra
+        if trimmed:
+            sections.append(f"\nContexto Adicional:\n{trimmed}\n")
+
+    user_prompt = ''.join(sections) + request_part
+    prompt_tokens = estimate_tokens(user_prompt)
+    baseline = estimate_tokens(legacy_prompt(prompt, context, patient_context))
+    return user_prompt, PromptStats(
+        prompt_tokens=prompt_tokens,
+        budget=budget,
+        tokens_saved=max(0, baseline - prompt_tokens),
+        truncated=truncated
+    )
+
+
+# =============================================================================
+# CACHE DO CONTEXTO DO PACIENTE
+# =============================================================================
+
+def create_patient_context_cache(config: Dict[str, Any]) -> PatientCache:
+    """Redis quando o cache de IA usa Redis (invalidação vale para todos os processos)"""
+    return create_patient_cache(
+        config, KEY_PREFIX,
+        ttl=config.get('AI_CONTEXT_CACHE_TTL_SECONDS', DEFAULT_CONTEXT_TTL_SECONDS),
+        max_entries=config.get('AI_CONTEXT_CACHE_MAX_ENTRIES', DEFAULT_CONTEXT_MAX_ENTRIES),
+        use_redis=config.get('AI_CACHE_BACKEND') == 'redis'
+    )
+
+
+def get_patient_context_cache() -> PatientCache:
+    """Cache da aplicação (criado na primeira chamada)"""
+    return get_app_patient_cache('ai_patient_context', create_patient_context_cache)
+
+
+# O resumo inclui os dados do paciente: gravações em patients também invalidam
+register_patient_cache('ai_patient_context', get_patient_context_cache, include_patients=True)
@@ -0,0 +1,283 @@
+"""
+Camada de execução das chamadas de IA
+
+As rotas Flask são síncronas (WSGI); em vez de criar um event loop por
+requisição, todas as corrotinas de IA rodam em um único loop de longa
+duração numa thread dedicada do processo. As threads de requisição só
+esperam o resultado, então um worker mantém dezenas de chamadas em
+andamento compartilhando os pools de conexão dos clientes assíncronos.
+
+O ConcurrencyLimiter limita as chamadas simultâneas no total e por
+provedor, para não estourar o rate limit nem o pool de conexões.
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+import weakref
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, Optional
+
+from flask import current_app, has_app_context
+
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_PROVIDER_CONCURRENCY = 32
+DEFAULT_TIMEOUT_SECONDS = 120.0
+DEFAULT_RETRY_AFTER_SECONDS = 10.0
+
+
+class ProviderRateLimited(RuntimeError):
+    """Provedor em espera após resposta 429"""
+    
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider}: limite de requisições, nova tentativa em {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def rate_limit_retry_after(exc: BaseException) -> Optional[float]:
+    """
+    Segundos de espera se ``exc`` for um 429 do provedor, senão None
+    
+    Reconhece RateLimitError dos SDKs (status_code 429) e usa o
+    cabeçalho Retry-After quando presente.
+    """
+    status = getattr(exc, 'status_code', None)
+    if status != 429 and 'RateLimit' not in type(exc).__name__:
+        return None
+    
+    retry_after = getattr(exc, 'retry_after', None)
+    response = getattr(exc, 'response', None)
+    if retry_after is None and response is not None:
+        retry_after = getattr(response, 'headers', {}).get('retry-after')
+    try:
+        return max(float(retry_after), 0.0)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_SECONDS
+
+
+class ConcurrencyLimiter:
+    """
+    Semáforos global e por provedor
+
+    Chamadas em segundo plano (jobs em lote) ocupam também uma cota
+    ``background_share`` do limite do provedor, para não esgotar as vagas
+    das requisições interativas. Após um 429 o provedor fica bloqueado
+    pelo Retry-After informado.
+    
+    Os semáforos são criados por event loop (o de produção é único, mas
+    testes usam ``asyncio.run`` repetidas vezes).
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 provider_limits: Optional[Dict[str, int]] = None,
+                 default_provider_limit: int = DEFAULT_PROVIDER_CONCURRENCY,
+                 background_share: float = 0.5):
+        self.max_concurrency = max_concurrency
+        self.provider_limits = dict(provider_limits or {})
+        self.default_provider_limit = default_provider_limit
+        self.background_share = background_share
+        self.in_flight: Dict[str, int] = {}
+        self.peak_in_flight = 0
+        self.waited = 0
+        self.rate_limited = 0
+        self._blocked_until: Dict[str, float] = {}
+        self._semaphores: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]' = \
+            weakref.WeakKeyDictionary()
+
+    def limit_for(self, provider: str) -> int:
+        return self.provider_limits.get(provider, self.default_provider_limit)
+
+    def background_limit_for(self, provider: str) -> int:
+        return max(1, int(self.limit_for(provider) * self.background_share))
+    
+    def block(self, provider: str, seconds: float) -> None:
+        """Suspende o provedor por ``seconds`` (resposta 429)"""
+        self.rate_limited += 1
+        until = time.monotonic() + seconds
+        self._blocked_until[provider] = max(until, self._blocked_until.get(provider, 0.0))
+    
+    def blocked_for(self, provider: str) -> float:
+        """Segundos restantes de bloqueio do provedor (0 se liberado)"""
+        return max(0.0, self._blocked_until.get(provider, 0.0) - time.monotonic())
+    
+    def _semaphore(self, key: str, limit: int) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphores = self._semaphores.setdefault(loop, {})
+        if key not in semaphores:
+            semaphores[key] = asyncio.Semaphore(limit)
+        return semaphores[key]
+
+    @asynccontextmanager
+    async def slot(self, provider: str, background: bool = False):
+        """Reserva uma vaga global e uma do provedor durante a chamada"""
+        semaphores = [self._semaphore('*', self.max_concurrency),
+                      self._semaphore(provider, self.limit_for(provider))]
+        if background:
+            semaphores.insert(0, self._semaphore(f'bg:{provider}', self.background_limit_for(provider)))
+        if any(semaphore.locked() for semaphore in semaphores):
+            self.waited += 1
+
+        async with AsyncExitStack() as stack:
+            for semaphore in semaphores:
+                await stack.enter_async_context(semaphore)
+            self.in_flight[provider] = self.in_flight.get(provider, 0) + 1
+            self.peak_in_flight = max(self.peak_in_flight, sum(self.in_flight.values()))
+            try:
+                yield
+            finally:
+                self.in_flight[provider] -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': dict(self.in_flight),
+            'peak_in_flight': self.peak_in_flight,
+            'waited': self.waited,
+            'rate_limited': self.rate_limited,
+            'blocked': {
+                provider: round(self.blocked_for(provider), 1)
+                for provider in self._blocked_until if self.blocked_for(provider)
+            },
+            'provider_limits': {
+                provider: self.limit_for(provider) for provider in set(self.in_flight) | set(self.provider_limits)
+            }
+        }
+
+
+async def _with_app_context(app, awaitable: Awaitable) -> Any:
+    """Executa no loop de IA com o app context de quem submeteu"""
+    if app is None:
+        return await awaitable
+    with app.app_context():
+        return await awaitable
+
+
+class AIExecutor:
+    """Event loop de longa duração para as chamadas de IA do processo"""
+
+    def __init__(self, default_timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        self.default_timeout = default_timeout
+        self.submitted = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._stats_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Loop da thread de IA, (re)criado após fork do gunicorn --preload"""
+        if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return self._loop
+
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=self._run_loop, args=(loop,), name='ai-event-loop', daemon=True)
+                thread.start()
+                self._loop, self._thread, self._pid = loop, thread, os.getpid()
+        return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def submit(self, awaitable: Awaitable) -> concurrent.futures.Future:
+        """Agenda a corrotina no loop de IA e retorna um Future thread-safe"""
+        app = current_app._get_current_object() if has_app_context() else None
+        future = asyncio.run_coroutine_threadsafe(_with_app_context(app, awaitable), self.loop)
+        with self._stats_lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: concurrent.futures.Future) -> None:
+        with self._stats_lock:
+            self.in_flight -= 1
+
+    def run(self, awaitable: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Executa a corrotina no loop de IA e bloqueia a thread atual até o resultado"""
+        future = self.submit(awaitable)
+        try:
+            return future.result(timeout or self.default_timeout)
+        except concurrent.futures.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            future.cancel()
+            raise TimeoutError("Tempo limite da chamada de IA excedido")
+
+    def iterate(self, agen: AsyncIterator[Any], timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Consome um gerador assíncrono a partir de código síncrono
+
+        Cada passo roda no loop de IA. Fechar o iterador (cliente
+        desconectado) fecha o gerador assíncrono, e com ele o stream do
+        provedor.
+        """
+        try:
+            while True:
+                try:
+                    item = self.run(agen.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                yield item
+        finally:
+            try:
+                self.run(agen.aclose(), timeout)
+            except RuntimeError:
+                # Passo anterior cancelado por timeout ainda em execução
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        running = self._loop is not None and self._pid == os.getpid() and self._thread.is_alive()
+        return {
+            'running': running,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'submitted': self.submitted,
+            'timeouts': self.timeouts
+        }
+
+    def shutdown(self) -> None:
+        """Para o loop (usado em testes e no encerramento do processo)"""
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop.close()
+            self._loop = self._thread = self._pid = None
+
+
+def create_limiter(config: Dict[str, Any]) -> ConcurrencyLimiter:
+    """Limiter a partir de AI_MAX_CONCURRENCY e AI_PROVIDER_CONCURRENCY"""
+    return ConcurrencyLimiter(
+        max_concurrency=config.get('AI_MAX_CONCURRENCY') or DEFAULT_MAX_CONCURRENCY,
+        provider_limits=config.get('AI_PROVIDER_CONCURRENCY_LIMITS') or {},
+        default_provider_limit=config.get('AI_PROVIDER_CONCURRENCY') or DEFAULT_PROVIDER_CONCURRENCY,
+        background_share=config.get('AI_BATCH_PROVIDER_SHARE') or 0.5
+    )
+
+
+# Um loop por processo, compartilhado por todos os apps (como o ai_service)
+_executor = AIExecutor()
+
+
+def get_ai_executor() -> AIExecutor:
+    """Executor do processo, com o timeout configurado no app atual"""
+    if has_app_context():
+        _executor.default_timeout = current_app.config.get('AI_REQUEST_TIMEOUT_SECONDS') or DEFAULT_TIMEOUT_SECONDS
+    return _executor
+
+
+def run_ai(awaitable: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Atalho para rotas síncronas: executa a corrotina no loop de IA"""
+    return get_ai_executor().run(awaitable, timeout)
@@ -1,23 +1,36 @@
 """
 Orquestrador de IA - Integração Claude, GPT-4, Gemini
+
+Os SDKs dos provedores (e o httpx) só são importados ao criar os
+clientes, e o AIService só é construído no primeiro uso
+(``get_ai_service``): workers que não atendem IA não pagam a
+importação nem a memória deles.
 """
 
 import asyncio
 import json
 import os
+import threading
+import time
 from datetime import datetime
 from enum import Enum
-from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass
-import openai
-import anthropic
-import google.generativeai as genai
-from flask import current_app
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple, Union
+from dataclasses import dataclass, field
+from flask import current_app, has_app_context
 
 from ..models.patient import Patient
 from ..models.medical_record import MedicalRecord
 from ..models.exercise import Exercise
 from ..models.user import User
+from .ai_cache import AIResponseCache, get_response_cache
+from .ai_context import (
+    PromptStats, build_user_prompt, get_patient_context_cache, split_document, token_budget
+)
+from .ai_executor import ConcurrencyLimiter, ProviderRateLimited, create_limiter, rate_limit_retry_after
+from .ai_routing import ProviderRouter, ProviderStats, RoutingSettings
+from .ai_usage import get_usage_ledger, usage_event
+
+CLAUDE_MODEL = "claude-3-sonnet-20240229"
 
 
 class AIProvider(Enum):
@@ -50,6 +63,8 @@ class AIRequest:
     preferred_provider: Optional[AIProvider] = None
     max_tokens: int = 1000
     temperature: float = 0.7
+    use_cache: bool = True
+    background: bool = False  # jobs em lote: cota própria e espera em vez de fallback no 429
 
 
 @dataclass 
@@ -65,32 +80,83 @@ class AIResponse:
     error: Optional[str] = None
 
 
+@dataclass
+class AIStreamEvent:
+    """Evento de uma resposta em streaming (start, token, done ou error)"""
+    event: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
 class AIOrchestrator:
     """Orquestrador principal de IA"""
     
-    def __init__(self):
+    # Esperas por 429 no mesmo provedor antes de desistir (só em lotes)
+    MAX_RATE_LIMIT_RETRIES = 3
+    
+    # Confiança atribuída às respostas de cada provedor
+    PROVIDER_CONFIDENCE = {
+        AIProvider.CLAUDE: 0.9,
+        AIProvider.GPT4: 0.85,
+        AIProvider.GEMINI: 0.8
+    }
+    
+    def __init__(self, cache: Optional[AIResponseCache] = None, router: Optional[ProviderRouter] = None,
+                 limiter: Optional[ConcurrencyLimiter] = None):
         self.providers = {}
+        self.cache = cache
+        self.router = router
+        self.limiter = limiter
+        self.stream_metrics: Dict[str, ProviderStats] = {}
+        self.prompt_totals = {'calls': 0, 'prompt_tokens': 0, 'tokens_saved': 0, 'truncated': 0}
         self._initialize_providers()
     
     def _initialize_providers(self):
-        """Inicializa provedores de IA"""
+        """
+        Inicializa provedores de IA
+        
+        Claude e GPT-4 usam os clientes assíncronos dos SDKs, cada um com
+        seu pool de conexões httpx reaproveitado entre chamadas; todos
+        rodam no loop de longa duração do AIExecutor.
+        """
         
         # Claude
         if os.getenv('ANTHROPIC_API_KEY'):
-            self.providers[AIProvider.CLAUDE] = anthropic.Anthropic(
-                api_key=os.getenv('ANTHROPIC_API_KEY')
+            import anthropic
+            
+            self.providers[AIProvider.CLAUDE] = anthropic.AsyncAnthropic(
+                api_key=os.getenv('ANTHROPIC_API_KEY'),
+                http_client=self._http_client(),
+                max_retries=1
             )
         
         # OpenAI GPT-4
         if os.getenv('OPENAI_API_KEY'):
-            openai.api_key = os.getenv('OPENAI_API_KEY')
-            self.providers[AIProvider.GPT4] = openai
+            import openai
+            
+            self.providers[AIProvider.GPT4] = openai.AsyncOpenAI(
+                api_key=os.getenv('OPENAI_API_KEY'),
+                http_client=self._http_client(),
+                max_retries=1
+            )
         
         # Google Gemini
         if os.getenv('GOOGLE_API_KEY'):
+            import google.generativeai as genai
+            
             genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
             self.providers[AIProvider.GEMINI] = genai.GenerativeModel('gemini-pro')
     
+    @staticmethod
+    def _http_client():
+        """Pool de conexões keep-alive dimensionado para AI_HTTP_MAX_CONNECTIONS"""
+        import httpx
+        
+        max_connections = int(os.getenv('AI_HTTP_MAX_CONNECTIONS') or 100)
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(float(os.getenv('AI_HTTP_TIMEOUT_SECONDS') or 60), connect=10.0)
+        )
+    
     async def process_request(self, request: AIRequest) -> AIResponse:
         """Processa requisição de IA"""
         
@@ -101,24 +167,39 @@ class AIOrchestrator:
         start_time = datetime.now()
         
         try:
-            if provider == AIProvider.CLAUDE:
-                response = await self._process_with_claude(request)
-            elif provider == AIProvider.GPT4:
-                response = await self._process_with_gpt4(request)
-            elif provider == AIProvider.GEMINI:
-                response = await self._process_with_gemini(request)
-            else:
-                raise ValueError(f"Provedor não disponível: {provider}")
+            system_prompt = self._build_system_prompt(request)
+            user_prompt, prompt_stats = self._build_prompt(request)
+            
+            # Cache de respostas (exato e, se configurado, por similaridade)
+            cache = self.cache if self.cache is not None else get_response_cache()
+            lookup = None
+            if cache is not None:
+                lookup = cache.lookup(
+                    request.task_type.value, system_prompt, user_prompt, request.temperature,
+                    provider.value, request.max_tokens, patient_id=request.patient_id,
+                    use_cache=request.use_cache
+                )
+                if lookup.hit:
+                    response = self._response_from_cache(lookup, start_time)
+                    self._record_usage(request, response)
+                    return response
+            
+            response = await self._dispatch(provider, request, system_prompt, user_prompt)
                 
             processing_time = (datetime.now() - start_time).total_seconds()
             response.processing_time = processing_time
             response.success = True
+            response.metadata['prompt'] = prompt_stats.to_dict()
             
+            if lookup is not None:
+                cache.store(lookup, user_prompt, self._response_to_cache(response))
+            
+            self._record_usage(request, response)
             return response
             
         except Exception as e:
             current_app.logger.error(f"Erro no processamento de IA: {str(e)}")
-            return AIResponse(
+            response = AIResponse(
                 provider=provider,
                 content="",
                 confidence=0.0,
@@ -128,6 +209,355 @@ class AIOrchestrator:
                 success=False,
                 error=str(e)
             )
+            self._record_usage(request, response)
+            return response
+    
+    async def stream_request(self, request: AIRequest) -> AsyncIterator[AIStreamEvent]:
+        """
+        Processa requisição de IA repassando os tokens à medida que chegam
+        
+        Emite ``start`` (com o tempo até o primeiro token), um ``token`` por
+        trecho de texto, e ``done`` ou ``error`` ao final. O fallback para
+        outro provedor só acontece antes do primeiro token; depois disso uma
+        falha encerra o stream com ``error``. Fechar o gerador (cliente
+        desconectado) fecha também o stream do provedor.
+        """
+        
+        provider = self._select_best_provider(request)
+        started = time.monotonic()
+        
+        system_prompt = self._build_system_prompt(request)
+        user_prompt, prompt_stats = self._build_prompt(request)
+        
+        cache = self.cache if self.cache is not None else get_response_cache()
+        lookup = None
+        if cache is not None:
+            lookup = cache.lookup(
+                request.task_type.value, system_prompt, user_prompt, request.temperature,
+                provider.value, request.max_tokens, patient_id=request.patient_id,
+                use_cache=request.use_cache
+            )
+            if lookup.hit:
+                response = self._response_from_cache(lookup, datetime.now())
+                yield AIStreamEvent('start', {
+                    'provider': response.provider.value,
+                    'time_to_first_token': round(time.monotonic() - started, 4),
+                    'cache': lookup.kind
+                })
+                yield AIStreamEvent('token', {'text': response.content})
+                self._record_usage(request, response)
+                yield AIStreamEvent('done', self._stream_summary(response))
+                return
+        
+        router = self._get_router()
+        errors = []
+        
+        for candidate in self._routing_order(provider, request):
+            if self._get_limiter().blocked_for(candidate.value):
+                errors.append(f"{candidate.value}: limite de requisições")
+                continue
+            if not router.acquire(candidate.value):
+                errors.append(f"{candidate.value}: circuito aberto")
+                continue
+            
+            usage: Dict[str, Any] = {}
+            chunks: List[str] = []
+            first_token_at = None
+            async with self._get_limiter().slot(candidate.value):
+                attempt_started = time.monotonic()
+                stream = self._stream_provider(candidate, request, system_prompt, user_prompt, usage)
+                try:
+                    async for text in stream:
+                        if not text:
+                            continue
+                        if first_token_at is None:
+                            first_token_at = time.monotonic()
+                            self._record_time_to_first_token(candidate, first_token_at - attempt_started)
+                            yield AIStreamEvent('start', {
+                                'provider': candidate.value,
+                                'time_to_first_token': round(first_token_at - started, 4),
+                                'fallback': candidate != provider
+                            })
+                        chunks.append(text)
+                        yield AIStreamEvent('token', {'text': text})
+                except (asyncio.CancelledError, GeneratorExit):
+                    # Cliente desconectou: não conta como falha do provedor
+                    router.release(candidate.value)
+                    raise
+                except Exception as e:
+                    retry_after = rate_limit_retry_after(e)
+                    if retry_after is not None:
+                        self._get_limiter().block(candidate.value, retry_after)
+                        router.release(candidate.value)
+                    else:
+                        router.record(candidate.value, time.monotonic() - attempt_started, success=False)
+                    current_app.logger.error(f"Erro no streaming de IA ({candidate.value}): {str(e)}")
+                    if first_token_at is None:
+                        errors.append(f"{candidate.value}: {e}")
+                        continue
+                    yield AIStreamEvent('error', {'error': str(e), 'partial': True})
+                    return
+                finally:
+                    await stream.aclose()
+            
+            tokens_used = usage.get('total_tokens') or (
+                usage.get('input_tokens', 0) + usage.get('output_tokens', 0)
+            )
+            router.record(candidate.value, time.monotonic() - attempt_started, success=True, tokens=tokens_used)
+            
+            response = AIResponse(
+                provider=candidate,
+                content=''.join(chunks),
+                confidence=self.PROVIDER_CONFIDENCE.get(candidate, 0.8),
+                tokens_used=tokens_used,
+                processing_time=time.monotonic() - started,
+                metadata={
+                    **usage,
+                    'streamed': True,
+                    'prompt': prompt_stats.to_dict(),
+                    'time_to_first_token': round(first_token_at - started, 4) if first_token_at else None,
+                    'routing': {'attempts': [candidate.value], 'fallback': candidate != provider, 'errors': errors}
+                },
+                success=True
+            )
+            if first_token_at is None:
+                yield AIStreamEvent('start', {'provider': candidate.value, 'time_to_first_token': None})
+            if lookup is not None and response.content:
+                cache.store(lookup, user_prompt, self._response_to_cache(response))
+            self._record_usage(request, response)
+            yield AIStreamEvent('done', self._stream_summary(response))
+            return
+        
+        error = "Nenhum provedor disponível: " + "; ".join(errors)
+        self._record_usage(request, AIResponse(
+            provider=provider, content="", confidence=0.0, tokens_used=0,
+            processing_time=time.monotonic() - started, metadata={}, success=False, error=error
+        ))
+        yield AIStreamEvent('error', {'error': error})
+    
+    @staticmethod
+    def _stream_summary(response: AIResponse) -> Dict[str, Any]:
+        """Dados do evento ``done``: tudo menos o texto, já enviado em tokens"""
+        return {
+            'success': response.success,
+            'provider': response.provider.value,
+            'confidence': response.confidence,
+            'processing_time': round(response.processing_time, 4),
+            'tokens_used': response.tokens_used,
+            'time_to_first_token': response.metadata.get('time_to_first_token'),
+            'cache': response.metadata.get('cache'),
+            'prompt': response.metadata.get('prompt')
+        }
+    
+    def _record_usage(self, request: AIRequest, response: AIResponse) -> None:
+        """Enfileira a chamada no ledger de uso (gravação em lote, fora da requisição)"""
+        if not has_app_context():
+            return
+        try:
+            ledger = get_usage_ledger()
+            ledger.record(usage_event(request, response, ledger.tenant_id))
+        except Exception as e:
+            current_app.logger.warning(f"Falha ao registrar uso de IA: {str(e)}")
+    
+    def _record_time_to_first_token(self, provider: AIProvider, seconds: float) -> None:
+        if provider.value not in self.stream_metrics:
+            self.stream_metrics[provider.value] = ProviderStats(self._get_router().settings.window_size)
+        self.stream_metrics[provider.value].record(seconds, success=True)
+    
+    def stream_metrics_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """p50/p95 do tempo até o primeiro token por provedor"""
+        snapshot = {}
+        for provider, stats in list(self.stream_metrics.items()):
+            p50, p95 = stats.p50(), stats.p95()
+            snapshot[provider] = {
+                'streams': stats.total_calls,
+                'p50_time_to_first_token': round(p50, 3) if p50 is not None else None,
+                'p95_time_to_first_token': round(p95, 3) if p95 is not None else None
+            }
+        return snapshot
+    
+    def _get_router(self) -> ProviderRouter:
+        """Router criado na primeira requisição, com a configuração do app"""
+        if self.router is None:
+            self.router = ProviderRouter(RoutingSettings.from_config(current_app.config))
+        return self.router
+    
+    def _get_limiter(self) -> ConcurrencyLimiter:
+        """Limites de chamadas simultâneas, com a configuração do app"""
+        if self.limiter is None:
+            self.limiter = create_limiter(current_app.config)
+        return self.limiter
+    
+    def _routing_order(self, preferred: AIProvider, request: AIRequest) -> List[AIProvider]:
+        """Ordem de tentativa: provedor pedido explicitamente, depois o router"""
+        
+        ranked = [
+            AIProvider(value)
+            for value in self._get_router().rank([p.value for p in self.providers], preferred.value)
+        ]
+        if request.preferred_provider in self.providers:
+            ranked.remove(request.preferred_provider)
+            ranked.insert(0, request.preferred_provider)
+        return ranked
+    
+    async def _attempt(self, provider: AIProvider, request: AIRequest,
+                       system_prompt: str, user_prompt: str) -> AIResponse:
+        """Chama um provedor registrando latência e resultado no router"""
+        
+        router = self._get_router()
+        limiter = self._get_limiter()
+        
+        # Provedor em 429: interativas vão para o próximo provedor, lotes
+        # esperam o Retry-After e repetem no mesmo provedor
+        rate_limit_retries = 0
+        while True:
+            blocked = limiter.blocked_for(provider.value)
+            if blocked and not request.background:
+                router.release(provider.value)
+                raise ProviderRateLimited(provider.value, blocked)
+            
+            started = time.monotonic()
+            try:
+                if blocked:
+                    await asyncio.sleep(blocked)
+                async with limiter.slot(provider.value, background=request.background):
+                    # Latência medida a partir da vaga, sem a espera na fila
+                    started = time.monotonic()
+                    response = await self._call_provider(provider, request, system_prompt, user_prompt)
+                break
+            except asyncio.CancelledError:
+                router.release(provider.value)
+                raise
+            except Exception as e:
+                retry_after = rate_limit_retry_after(e)
+                if retry_after is None:
+                    router.record(provider.value, time.monotonic() - started, success=False)
+                    raise
+                # Limite de requisições não indica provedor com falha
+                limiter.block(provider.value, retry_after)
+                if not request.background or rate_limit_retries >= self.MAX_RATE_LIMIT_RETRIES:
+                    router.release(provider.value)
+                    raise
+                rate_limit_retries += 1
+        
+        router.record(provider.value, time.monotonic() - started, success=True, tokens=response.tokens_used)
+        return response
+    
+    async def _dispatch(self, preferred: AIProvider, request: AIRequest,
+                        system_prompt: str, user_prompt: str) -> AIResponse:
+        """
+        Executa a requisição com fallback, circuit breaker e hedge
+        
+        Provedores são tentados na ordem do router; com hedge ativo, se o
+        primário não responder em ``hedge_delay`` o próximo é disparado em
+        paralelo e vale a primeira resposta bem-sucedida.
+        """
+        
+        router = self._get_router()
+        pending = self._routing_order(preferred, request)
+        errors = []
+        
+        def next_available() -> Optional[AIProvider]:
+            while pending:
+                candidate = pending.pop(0)
+                if router.acquire(candidate.value):
+                    return candidate
+                errors.append(f"{candidate.value}: circuito aberto")
+            return None
+        
+        while True:
+            primary = next_available()
+            if primary is None:
+                break
+            
+            attempts = [primary.value]
+            tasks = {asyncio.ensure_future(self._attempt(primary, request, system_prompt, user_prompt))}
+            
+            if router.settings.hedge_enabled and pending:
+                done, _ = await asyncio.wait(tasks, timeout=router.hedge_delay(primary.value))
+                if not done:
+                    secondary = next_available()
+                    if secondary is not None:
+                        attempts.append(secondary.value)
+                        tasks.add(asyncio.ensure_future(
+                            self._attempt(secondary, request, system_prompt, user_prompt)
+                        ))
+            
+            try:
+                while tasks:
+                    done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            response = task.result()
+                            response.metadata['routing'] = {
+                                'attempts': attempts,
+                                'hedged': len(attempts) > 1,
+                                'fallback': response.provider != preferred,
+                                'errors': errors
+                            }
+                            return response
+                        errors.append(f"{task.exception()}")
+            finally:
+                for task in tasks:
+                    task.cancel()
+        
+        raise RuntimeError("Nenhum provedor disponível: " + "; ".join(errors))
+    
+    async def _call_provider(self, provider: AIProvider, request: AIRequest,
+                             system_prompt: str, user_prompt: str) -> AIResponse:
+        """Envia a requisição ao provedor escolhido"""
+        
+        if provider == AIProvider.CLAUDE:
+            return await self._process_with_claude(request, system_prompt, user_prompt)
+        elif provider == AIProvider.GPT4:
+            return await self._process_with_gpt4(request, system_prompt, user_prompt)
+        elif provider == AIProvider.GEMINI:
+            return await self._process_with_gemini(request, system_prompt, user_prompt)
+        raise ValueError(f"Provedor não disponível: {provider}")
+    
+    def _stream_provider(self, provider: AIProvider, request: AIRequest, system_prompt: str,
+                         user_prompt: str, usage: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream de texto do provedor; ``usage`` é preenchido ao final"""
+        
+        if provider == AIProvider.CLAUDE:
+            return self._stream_with_claude(request, system_prompt, user_prompt, usage)
+        elif provider == AIProvider.GPT4:
+            return self._stream_with_gpt4(request, system_prompt, user_prompt, usage)
+        elif provider == AIProvider.GEMINI:
+            return self._stream_with_gemini(request, system_prompt, user_prompt, usage)
+        raise ValueError(f"Provedor não disponível: {provider}")
+    
+    @staticmethod
+    def _response_to_cache(response: AIResponse) -> Dict[str, Any]:
+        """Serializa resposta para o cache (metadata apenas com tipos JSON)"""
+        return {
+            'provider': response.provider.value,
+            'content': response.content,
+            'confidence': response.confidence,
+            'tokens_used': response.tokens_used,
+            'metadata': json.loads(json.dumps(response.metadata, default=str))
+        }
+    
+    @staticmethod
+    def _response_from_cache(lookup, start_time: datetime) -> AIResponse:
+        """Reconstrói resposta cacheada; nenhum token é consumido"""
+        value = lookup.value
+        metadata = dict(value.get('metadata') or {})
+        metadata.update({
+            'cache': lookup.kind,
+            'tokens_saved': value.get('tokens_used', 0)
+        })
+        if lookup.similarity is not None:
+            metadata['cache_similarity'] = round(lookup.similarity, 4)
+        return AIResponse(
+            provider=AIProvider(value['provider']),
+            content=value['content'],
+            confidence=value['confidence'],
+            tokens_used=0,
+            processing_time=(datetime.now() - start_time).total_seconds(),
+            metadata=metadata,
+            success=True
+        )
     
     def _select_best_provider(self, request: AIRequest) -> AIProvider:
         """Seleciona melhor provedor baseado no tipo de tarefa"""
@@ -157,17 +587,13 @@ class AIOrchestrator:
         
         return preferred
     
-    async def _process_with_claude(self, request: AIRequest) -> AIResponse:
+    async def _process_with_claude(self, request: AIRequest, system_prompt: str, user_prompt: str) -> AIResponse:
         """Processa requisição com Claude"""
         
         client = self.providers[AIProvider.CLAUDE]
         
-        # Preparar prompt
-        system_prompt = self._build_system_prompt(request)
-        user_prompt = self._build_user_prompt(request)
-        
         response = await client.messages.create(
-            model="claude-3-sonnet-20240229",
+            model=CLAUDE_MODEL,
             max_tokens=request.max_tokens,
             temperature=request.temperature,
             system=system_prompt,
@@ -183,20 +609,19 @@ class AIOrchestrator:
             tokens_used=response.usage.input_tokens + response.usage.output_tokens,
             processing_time=0,  # Será preenchido depois
             metadata={
-                "model": "claude-3-sonnet-20240229",
+                "model": CLAUDE_MODEL,
                 "input_tokens": response.usage.input_tokens,
                 "output_tokens": response.usage.output_tokens
-            }
+            },
+            success=True
         )
     
-    async def _process_with_gpt4(self, request: AIRequest) -> AIResponse:
+    async def _process_with_gpt4(self, request: AIRequest, system_prompt: str, user_prompt: str) -> AIResponse:
         """Processa requisição com GPT-4"""
         
-        # Preparar mensagens
-        system_prompt = self._build_system_prompt(request)
-        user_prompt = self._build_user_prompt(request)
+        client = self.providers[AIProvider.GPT4]
         
-        response = await openai.ChatCompletion.acreate(
+        response = await client.chat.completions.create(
             model="gpt-4-turbo-preview",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -216,19 +641,22 @@ class AIOrchestrator:
                 "model": "gpt-4-turbo-preview",
                 "prompt_tokens": response.usage.prompt_tokens,
                 "completion_tokens": response.usage.completion_tokens
-            }
+            },
+            success=True
         )
     
-    async def _process_with_gemini(self, request: AIRequest) -> AIResponse:
+    async def _process_with_gemini(self, request: AIRequest, system_prompt: str, user_prompt: str) -> AIResponse:
         """Processa requisição com Gemini"""
         
+        import google.generativeai as genai
+        
         model = self.providers[AIProvider.GEMINI]
         
         # Preparar prompt
         full_prompt = f"""
-{self._build_system_prompt(request)}
+{system_prompt}
 
-{self._build_user_prompt(request)}
+{user_prompt}
 """
         
         response = await model.generate_content_async(
@@ -248,8 +676,87 @@ class AIOrchestrator:
             metadata={
                 "model": "gemini-pro",
                 "safety_ratings": response.candidates[0].safety_ratings if response.candidates else []
-            }
+            },
+            success=True
+        )
+    
+    async def _stream_with_claude(self, request: AIRequest, system_prompt: str, user_prompt: str,
+                                  usage: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream de texto do Claude"""
+        
+        client = self.providers[AIProvider.CLAUDE]
+        
+        stream = await client.messages.create(
+            model=CLAUDE_MODEL,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            system=system_prompt,
+            messages=[
+                {"role": "user", "content": user_prompt}
+            ],
+            stream=True
         )
+        usage['model'] = CLAUDE_MODEL
+        try:
+            async for event in stream:
+                if event.type == 'message_start':
+                    usage['input_tokens'] = event.message.usage.input_tokens
+                elif event.type == 'content_block_delta' and getattr(event.delta, 'text', None):
+                    yield event.delta.text
+                elif event.type == 'message_delta':
+                    usage['output_tokens'] = event.usage.output_tokens
+        finally:
+            await stream.close()
+    
+    async def _stream_with_gpt4(self, request: AIRequest, system_prompt: str, user_prompt: str,
+                                usage: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream de texto do GPT-4"""
+        
+        client = self.providers[AIProvider.GPT4]
+        
+        stream = await client.chat.completions.create(
+            model="gpt-4-turbo-preview",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        usage['model'] = "gpt-4-turbo-preview"
+        try:
+            async for chunk in stream:
+                if chunk.usage:
+                    usage['total_tokens'] = chunk.usage.total_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+    
+    async def _stream_with_gemini(self, request: AIRequest, system_prompt: str, user_prompt: str,
+                                  usage: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream de texto do Gemini"""
+        
+        import google.generativeai as genai
+        
+        model = self.providers[AIProvider.GEMINI]
+        
+        response = await model.generate_content_async(
+            f"\n{system_prompt}\n\n{user_prompt}\n",
+            generation_config=genai.types.GenerationConfig(
+                max_output_tokens=request.max_tokens,
+                temperature=request.temperature
+            ),
+            stream=True
+        )
+        usage['model'] = "gemini-pro"
+        async for chunk in response:
+            if chunk.parts:
+                yield chunk.text
+        if getattr(response, 'usage_metadata', None):
+            usage['total_tokens'] = response.usage_metadata.total_token_count
     
     def _build_system_prompt(self, request: AIRequest) -> str:
         """Constrói prompt do sistema baseado no tipo de tarefa"""
@@ -296,67 +803,102 @@ Forneça feedback construtivo e sugestões de desenvolvimento.
         
         return base_context + task_contexts.get(request.task_type, "")
     
-    def _build_user_prompt(self, request: AIRequest) -> str:
-        """Constrói prompt do usuário com contexto"""
+    def _build_prompt(self, request: AIRequest) -> Tuple[str, PromptStats]:
+        """Prompt do usuário dentro do orçamento da tarefa, com a economia estimada"""
         
-        # Adicionar contexto do paciente se disponível
-        context_info = ""
-        if request.patient_id:
-            patient_context = self._get_patient_context(request.patient_id)
-            context_info += f"\nContexto do Paciente:\n{patient_context}\n"
+        patient_context = self._get_patient_context(request.patient_id) if request.patient_id else None
+        user_prompt, stats = build_user_prompt(request.task_type.value, request.prompt, request.context, patient_context)
         
-        # Adicionar contexto adicional
-        if request.context:
-            context_info += f"\nContexto Adicional:\n{json.dumps(request.context, indent=2, ensure_ascii=False)}\n"
-        
-        return f"{context_info}\nSolicitação:\n{request.prompt}"
+        self.prompt_totals['calls'] += 1
+        self.prompt_totals['prompt_tokens'] += stats.prompt_tokens
+        self.prompt_totals['tokens_saved'] += stats.tokens_saved
+        self.prompt_totals['truncated'] += int(stats.truncated)
+        return user_prompt, stats
+    
+    def _build_user_prompt(self, request: AIRequest) -> str:
+        """Constrói prompt do usuário com contexto"""
+        return self._build_prompt(request)[0]
+    
+    def prompt_stats_snapshot(self) -> Dict[str, Any]:
+        """Tokens de prompt enviados e economizados (estimativa local, por processo)"""
+        calls = self.prompt_totals['calls']
+        return {
+            **self.prompt_totals,
+            'avg_prompt_tokens': round(self.prompt_totals['prompt_tokens'] / calls, 1) if calls else 0.0,
+            'avg_tokens_saved': round(self.prompt_totals['tokens_saved'] / calls, 1) if calls else 0.0
+        }
     
     def _get_patient_context(self, patient_id: str) -> str:
-        """Obtém contexto do paciente"""
+        """Obtém contexto do paciente (em cache até a próxima gravação do prontuário)"""
         
         try:
-            patient = Patient.query.get(patient_id)
-            if not patient:
-                return "Paciente não encontrado."
-            
-            # Dados básicos (sem informações sensíveis)
-            context = f"""
+            return get_patient_context_cache().get(patient_id, self._load_patient_context)
+        except Exception as e:
+            current_app.logger.error(f"Erro ao obter contexto do paciente: {str(e)}")
+            return "Erro ao obter contexto do paciente."
+    
+    @staticmethod
+    def _load_patient_context(patient_id: str) -> str:
+        """Resumo do paciente e da última evolução, lido do banco"""
+        
+        patient = Patient.query.get(patient_id)
+        if not patient:
+            return "Paciente não encontrado."
+        
+        # Dados básicos (sem informações sensíveis)
+        context = f"""
 Nome: {patient.full_name}
 Idade: {patient.age} anos
 Condições: {', '.join(patient.conditions) if patient.conditions else 'Não especificadas'}
 Observações: {patient.notes if patient.notes else 'Nenhuma'}
 """
-            
-            # Última evolução
-            latest_record = MedicalRecord.query.filter_by(
-                patient_id=patient_id
-            ).order_by(MedicalRecord.created_at.desc()).first()
-            
-            if latest_record:
-                context += f"""
+        
+        # Última evolução
+        latest_record = MedicalRecord.query.filter_by(
+            patient_id=patient_id
+        ).order_by(MedicalRecord.created_at.desc()).first()
+        
+        if latest_record:
+            context += f"""
 Última Evolução ({latest_record.created_at.strftime('%d/%m/%Y')}):
 - Subjetivo: {latest_record.subjective}
 - Objetivo: {latest_record.objective}
 - Avaliação: {latest_record.assessment}
 - Plano: {latest_record.plan}
 """
-            
-            return context
-            
-        except Exception as e:
-            current_app.logger.error(f"Erro ao obter contexto do paciente: {str(e)}")
-            return "Erro ao obter contexto do paciente."
+        
+        return context
 
 
 class AIService:
     """Serviço de IA de alto nível"""
     
-    def __init__(self):
-        self.orchestrator = AIOrchestrator()
+    # Tokens do modelo do prompt de documento, descontados de cada parte
+    DOCUMENT_PROMPT_OVERHEAD = 300
+    
+    def __init__(self, orchestrator: Optional[AIOrchestrator] = None):
+        self._orchestrator = orchestrator
+        self._lock = threading.Lock()
+    
+    @property
+    def orchestrator(self) -> AIOrchestrator:
+        """Orquestrador (e clientes dos provedores) criado no primeiro uso"""
+        if self._orchestrator is None:
+            with self._lock:
+                if self._orchestrator is None:
+                    self._orchestrator = AIOrchestrator()
+        return self._orchestrator
     
     async def complete_soap_evolution(self, patient_id: str, partial_data: Dict[str, str], user_id: str) -> AIResponse:
         """Completa evolução SOAP"""
         
+        return await self.orchestrator.process_request(
+            self.build_soap_request(patient_id, partial_data, user_id)
+        )
+    
+    def build_soap_request(self, patient_id: str, partial_data: Dict[str, str], user_id: str) -> AIRequest:
+        """Requisição de evolução SOAP (também usada no streaming)"""
+        
         prompt = f"""
 Com base nos dados clínicos disponíveis, complete a evolução SOAP:
 
@@ -366,7 +908,7 @@ Dados informados:
 Por favor, forneça sugestões para completar os campos em branco, mantendo consistência clínica.
 """
         
-        request = AIRequest(
+        return AIRequest(
             task_type=AITaskType.SOAP_COMPLETION,
             prompt=prompt,
             context=partial_data,
@@ -374,12 +916,17 @@ Por favor, forneça sugestões para completar os campos em branco, mantendo cons
             patient_id=patient_id,
             temperature=0.3  # Baixa criatividade para precisão clínica
         )
-        
-        return await self.orchestrator.process_request(request)
     
     async def suggest_exercises(self, patient_id: str, condition: str, goals: List[str], user_id: str) -> AIResponse:
         """Sugere exercícios personalizados"""
         
+        return await self.orchestrator.process_request(
+            self.build_exercise_request(patient_id, condition, goals, user_id)
+        )
+    
+    def build_exercise_request(self, patient_id: str, condition: str, goals: List[str], user_id: str) -> AIRequest:
+        """Requisição de sugestão de exercícios"""
+        
         prompt = f"""
 Sugira exercícios terapêuticos específicos para:
 
@@ -394,7 +941,7 @@ Para cada exercício sugerido, inclua:
 5. Precauções importantes
 """
         
-        request = AIRequest(
+        return AIRequest(
             task_type=AITaskType.EXERCISE_SUGGESTION,
             prompt=prompt,
             context={
@@ -405,8 +952,6 @@ Para cada exercício sugerido, inclua:
             patient_id=patient_id,
             temperature=0.7
         )
-        
-        return await self.orchestrator.process_request(request)
     
     async def support_diagnosis(self, symptoms: List[str], examination_findings: Dict[str, Any], user_id: str) -> AIResponse:
         """Apoio ao diagnóstico diferencial"""
@@ -443,6 +988,13 @@ Forneça:
     async def generate_treatment_plan(self, diagnosis: str, patient_profile: Dict[str, Any], user_id: str) -> AIResponse:
         """Gera plano de tratamento"""
         
+        return await self.orchestrator.process_request(
+            self.build_treatment_plan_request(diagnosis, patient_profile, user_id)
+        )
+    
+    def build_treatment_plan_request(self, diagnosis: str, patient_profile: Dict[str, Any], user_id: str) -> AIRequest:
+        """Requisição de plano de tratamento"""
+        
         prompt = f"""
 Elabore um plano de tratamento fisioterapêutico detalhado:
 
@@ -460,7 +1012,7 @@ Inclua:
 6. Prognóstico esperado
 """
         
-        request = AIRequest(
+        return AIRequest(
             task_type=AITaskType.TREATMENT_PLAN,
             prompt=prompt,
             context={
@@ -470,12 +1022,17 @@ Inclua:
             user_id=user_id,
             temperature=0.5
         )
-        
-        return await self.orchestrator.process_request(request)
     
     async def chat_response(self, message: str, conversation_history: List[Dict[str, str]], user_id: str) -> AIResponse:
         """Resposta de chat conversacional"""
         
+        return await self.orchestrator.process_request(
+            self.build_chat_request(message, conversation_history, user_id)
+        )
+    
+    def build_chat_request(self, message: str, conversation_history: List[Dict[str, str]], user_id: str) -> AIRequest:
+        """Requisição de chat"""
+        
         history_text = "\n".join([
             f"{msg['role']}: {msg['content']}" 
             for msg in conversation_history[-10:]  # Últimas 10 mensagens
@@ -490,7 +1047,7 @@ Nova mensagem: {message}
 Responda de forma útil e profissional, mantendo o contexto da conversa.
 """
         
-        request = AIRequest(
+        return AIRequest(
             task_type=AITaskType.CHAT_RESPONSE,
             prompt=prompt,
             context={
@@ -500,11 +1057,54 @@ Responda de forma útil e profissional, mantendo o contexto da conversa.
             user_id=user_id,
             temperature=0.8  # Maior criatividade para conversação
         )
+    
+    async def analyze_document(self, document_content: str, document_type: str, user_id: str,
+                               orchestrator: Optional[AIOrchestrator] = None,
+                               background: bool = False) -> AIResponse:
+        """
+        Analisa documento médico
         
-        return await self.orchestrator.process_request(request)
+        Documentos acima do orçamento da tarefa são resumidos por partes
+        (map) e a análise final é feita sobre os resumos (reduce).
+        """
+        
+        orchestrator = orchestrator or self.orchestrator
+        budget = token_budget(AITaskType.DOCUMENT_ANALYSIS.value)
+        chunks = split_document(document_content, budget - self.DOCUMENT_PROMPT_OVERHEAD)
+        
+        if len(chunks) == 1:
+            request = self.build_document_request(document_content, document_type, user_id)
+            request.background = background
+            return await orchestrator.process_request(request)
+        
+        # Resumos cabem juntos no orçamento da etapa final
+        summary_tokens = max(100, min(800, (budget - self.DOCUMENT_PROMPT_OVERHEAD) // len(chunks)))
+        map_requests = []
+        for index, chunk in enumerate(chunks, start=1):
+            request = self.build_document_chunk_request(chunk, index, len(chunks), document_type, user_id, summary_tokens)
+            request.background = background
+            map_requests.append(request)
+        partials = await asyncio.gather(*(orchestrator.process_request(request) for request in map_requests))
+        
+        map_tokens = sum(partial.tokens_used for partial in partials)
+        for index, partial in enumerate(partials, start=1):
+            if not partial.success:
+                partial.error = f"Falha ao resumir a parte {index}/{len(chunks)}: {partial.error}"
+                partial.tokens_used = map_tokens
+                return partial
+        
+        request = self.build_document_reduce_request(
+            [partial.content for partial in partials], document_type, user_id
+        )
+        request.background = background
+        response = await orchestrator.process_request(request)
+        response.tokens_used += map_tokens
+        response.metadata['chunks'] = len(chunks)
+        response.metadata['map_tokens'] = map_tokens
+        return response
     
-    async def analyze_document(self, document_content: str, document_type: str, user_id: str) -> AIResponse:
-        """Analisa documento médico"""
+    def build_document_request(self, document_content: str, document_type: str, user_id: str) -> AIRequest:
+        """Requisição de análise de documento"""
         
         prompt = f"""
 Analise o seguinte documento médico do tipo "{document_type}":
@@ -519,7 +1119,7 @@ Forneça:
 5. Pontos que necessitam esclarecimento
 """
         
-        request = AIRequest(
+        return AIRequest(
             task_type=AITaskType.DOCUMENT_ANALYSIS,
             prompt=prompt,
             context={
@@ -529,9 +1129,73 @@ Forneça:
             user_id=user_id,
             temperature=0.3
         )
+    
+    def build_document_chunk_request(self, chunk: str, index: int, total: int, document_type: str,
+                                     user_id: str, max_tokens: int) -> AIRequest:
+        """Requisição de resumo de uma parte do documento (etapa map)"""
         
-        return await self.orchestrator.process_request(request)
+        prompt = f"""
+Resuma a parte {index} de {total} de um documento médico do tipo "{document_type}":
+
+{chunk}
+
+Mantenha apenas informações clínicas: diagnósticos, achados, medidas, datas e condutas.
+"""
+        
+        return AIRequest(
+            task_type=AITaskType.DOCUMENT_ANALYSIS,
+            prompt=prompt,
+            context={},
+            user_id=user_id,
+            max_tokens=max_tokens,
+            temperature=0.2
+        )
+    
+    def build_document_reduce_request(self, summaries: List[str], document_type: str, user_id: str) -> AIRequest:
+        """Requisição de análise a partir dos resumos das partes (etapa reduce)"""
+        
+        parts = "\n\n".join(
+            f"[Parte {index}/{len(summaries)}]\n{summary}" for index, summary in enumerate(summaries, start=1)
+        )
+        prompt = f"""
+Analise o documento médico do tipo "{document_type}" a partir dos resumos de suas partes:
+
+{parts}
+
+Forneça:
+1. Resumo executivo
+2. Informações clínicas principais
+3. Achados relevantes para fisioterapia
+4. Recomendações de conduta
+5. Pontos que necessitam esclarecimento
+"""
+        
+        return AIRequest(
+            task_type=AITaskType.DOCUMENT_ANALYSIS,
+            prompt=prompt,
+            context={'document_type': document_type, 'parts': len(summaries)},
+            user_id=user_id,
+            temperature=0.3
+        )
+
+
+# Instância do processo, criada no primeiro uso
+_ai_service: Optional[AIService] = None
+_ai_service_lock = threading.Lock()
+
+
+def get_ai_service() -> AIService:
+    """Serviço de IA do processo (compartilhado por todos os apps)"""
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                _ai_service = AIService()
+    return _ai_service
 
 
-# Instância global do serviço
-ai_service = AIService()
\ No newline at end of file
+def __getattr__(name):
+    # Compatibilidade: ``from ...ai_orchestrator import ai_service``
+    if name == 'ai_service':
+        return get_ai_service()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
\ No newline at end of file
@@ -0,0 +1,291 @@
+"""
+Roteamento de provedores de IA por latência, custo e saúde observados
+
+Cada provedor mantém uma janela móvel de chamadas (latência, sucesso,
+tokens) para p50/p95 e taxa de erro, e um circuit breaker que o retira
+da rota após falhas consecutivas. A ordem de tentativa combina o
+mapeamento estático por tarefa (usado enquanto não há amostras) com o
+custo e a latência observados.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+# Custo aproximado em US$ por 1k tokens (entrada + saída), sobrescrevível
+# por AI_PROVIDER_COSTS
+DEFAULT_PROVIDER_COSTS = {
+    'claude': 0.009,
+    'gpt4': 0.02,
+    'gemini': 0.001,
+}
+
+
+@dataclass
+class RoutingSettings:
+    """Parâmetros do roteamento"""
+    window_size: int = 100
+    min_samples: int = 10
+    failure_threshold: int = 5
+    cooldown_seconds: float = 30.0
+    hedge_enabled: bool = False
+    hedge_delay_seconds: Optional[float] = None  # None = p95 do provedor primário
+    min_hedge_delay_seconds: float = 1.0
+    latency_weight: float = 1.0
+    cost_weight: float = 0.5
+    preference_bonus: float = 0.15
+    costs: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_PROVIDER_COSTS))
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'RoutingSettings':
+        settings = cls()
+        mapping = {
+            'AI_ROUTING_WINDOW': 'window_size',
+            'AI_ROUTING_MIN_SAMPLES': 'min_samples',
+            'AI_CIRCUIT_FAILURE_THRESHOLD': 'failure_threshold',
+            'AI_CIRCUIT_COOLDOWN_SECONDS': 'cooldown_seconds',
+            'AI_HEDGE_ENABLED': 'hedge_enabled',
+            'AI_HEDGE_DELAY_SECONDS': 'hedge_delay_seconds',
+            'AI_ROUTING_LATENCY_WEIGHT': 'latency_weight',
+            'AI_ROUTING_COST_WEIGHT': 'cost_weight',
+        }
+        for key, attr in mapping.items():
+            if config.get(key) is not None:
+                setattr(settings, attr, config[key])
+        if config.get('AI_PROVIDER_COSTS'):
+            settings.costs.update(config['AI_PROVIDER_COSTS'])
+        return settings
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(percentile / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class ProviderStats:
+    """Janela móvel das últimas chamadas de um provedor"""
+
+    def __init__(self, window_size: int):
+        self.samples: Deque[Tuple[float, bool, int]] = deque(maxlen=window_size)
+        self.total_calls = 0
+        self.total_failures = 0
+
+    def record(self, latency: float, success: bool, tokens: int = 0) -> None:
+        self.samples.append((latency, success, tokens))
+        self.total_calls += 1
+        if not success:
+            self.total_failures += 1
+
+    @property
+    def count(self) -> int:
+        return len(self.samples)
+
+    def latencies(self) -> List[float]:
+        return sorted(latency for latency, success, _ in self.samples if success)
+
+    def p50(self) -> Optional[float]:
+        return _percentile(self.latencies(), 50)
+
+    def p95(self) -> Optional[float]:
+        return _percentile(self.latencies(), 95)
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, success, _ in self.samples if not success) / len(self.samples)
+
+    def average_tokens(self) -> Optional[float]:
+        tokens = [t for _, success, t in self.samples if success and t]
+        return sum(tokens) / len(tokens) if tokens else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50, p95 = self.p50(), self.p95()
+        return {
+            'samples': self.count,
+            'total_calls': self.total_calls,
+            'total_failures': self.total_failures,
+            'p50_latency': round(p50, 3) if p50 is not None else None,
+            'p95_latency': round(p95, 3) if p95 is not None else None,
+            'error_rate': round(self.error_rate(), 4)
+        }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por provedor
+
+    closed -> open após ``failure_threshold`` falhas consecutivas; depois
+    de ``cooldown_seconds`` passa a half_open e libera uma chamada de
+    teste: sucesso fecha o circuito, falha o reabre.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Indica se o provedor pode receber uma chamada agora"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def available(self) -> bool:
+        """Como allow(), mas sem reservar a chamada de teste"""
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self._trial_in_flight)
+
+    def cancel_trial(self) -> None:
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self._trial_in_flight or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+
+class ProviderRouter:
+    """Ordena provedores e registra o resultado de cada chamada"""
+
+    def __init__(self, settings: Optional[RoutingSettings] = None):
+        self.settings = settings or RoutingSettings()
+        self.stats: Dict[str, ProviderStats] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, provider: str) -> ProviderStats:
+        if provider not in self.stats:
+            self.stats[provider] = ProviderStats(self.settings.window_size)
+        return self.stats[provider]
+
+    def _breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self.breakers:
+            self.breakers[provider] = CircuitBreaker(
+                self.settings.failure_threshold, self.settings.cooldown_seconds
+            )
+        return self.breakers[provider]
+
+    def call_cost(self, provider: str) -> Optional[float]:
+        """Custo observado por chamada (tokens médios x preço por 1k tokens)"""
+        price = self.settings.costs.get(provider)
+        if price is None:
+            return None
+        tokens = self._stats(provider).average_tokens() or 1000
+        return price * tokens / 1000
+
+    def _score(self, provider: str, preferred: str, fastest_p95: float, cheapest_cost: float) -> float:
+        """Menor é melhor: latência e custo relativos ao melhor candidato"""
+        settings = self.settings
+        stats = self._stats(provider)
+        warm = stats.count >= settings.min_samples
+        p95 = stats.p95() if warm else None
+        error_rate = stats.error_rate() if warm else 0.0
+
+        # Sem amostras suficientes a latência é neutra, o que deixa o
+        # provedor ser explorado em vez de ficar eternamente em segundo
+        latency_ratio = (p95 / fastest_p95) if p95 and fastest_p95 else 1.0
+        cost = self.call_cost(provider)
+        cost_ratio = (cost / cheapest_cost) if cost and cheapest_cost else 1.0
+
+        # Erros entram como latência extra (cada 10% de erro ~ +1x); o
+        # custo em escala log para que diferenças de preço de 20x não
+        # anulem a latência
+        score = (
+            settings.latency_weight * latency_ratio * (1 + 10 * error_rate)
+            + settings.cost_weight * (1 + math.log2(cost_ratio))
+        )
+        if provider == preferred:
+            score -= settings.preference_bonus * score
+        return score
+
+    def rank(self, available: Iterable[str], preferred: str) -> List[str]:
+        """
+        Ordem de tentativa entre os provedores disponíveis
+
+        Enquanto nenhum provedor tiver ``min_samples`` amostras, mantém o
+        preferido da tarefa na frente e os demais na ordem dada.
+        Provedores com circuito aberto vão para o fim.
+        """
+        available = list(available)
+        with self._lock:
+            healthy = [p for p in available if self._breaker(p).available()]
+            tripped = [p for p in available if p not in healthy]
+
+            warm = [p for p in healthy if self._stats(p).count >= self.settings.min_samples]
+            if not warm or len(healthy) < 2:
+                ordered = sorted(healthy, key=lambda p: p != preferred)
+            else:
+                p95s = [self._stats(p).p95() for p in warm]
+                fastest = min((v for v in p95s if v), default=0.0)
+                costs = [self.call_cost(p) for p in healthy]
+                cheapest = min((c for c in costs if c), default=0.0)
+                ordered = sorted(healthy, key=lambda p: self._score(p, preferred, fastest, cheapest))
+
+        return ordered + tripped
+
+    def acquire(self, provider: str) -> bool:
+        """Reserva a chamada (falso se o circuito estiver aberto)"""
+        with self._lock:
+            return self._breaker(provider).allow()
+
+    def release(self, provider: str) -> None:
+        """Libera reserva de chamada cancelada (ex.: perdedora de um hedge)"""
+        with self._lock:
+            self._breaker(provider).cancel_trial()
+
+    def record(self, provider: str, latency: float, success: bool, tokens: int = 0) -> None:
+        with self._lock:
+            self._stats(provider).record(latency, success, tokens)
+            breaker = self._breaker(provider)
+            if success:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+    def hedge_delay(self, provider: str) -> float:
+        """Tempo de espera pelo primário antes de disparar o segundo provedor"""
+        if self.settings.hedge_delay_seconds is not None:
+            return self.settings.hedge_delay_seconds
+        p95 = self._stats(provider).p95()
+        return max(p95 or 0.0, self.settings.min_hedge_delay_seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Métricas e estado do circuito por provedor"""
+        with self._lock:
+            return {
+                provider: {
+                    **self._stats(provider).to_dict(),
+                    'circuit': self._breaker(provider).state,
+                    'cost_per_1k_tokens': self.settings.costs.get(provider)
+                }
+                for provider in set(self.stats) | set(self.breakers)
+            }
@@ -0,0 +1,552 @@
+"""
+Ledger de uso de IA: tokens, custo e latência de cada chamada
+
+O orquestrador registra cada chamada (inclusive acertos de cache e
+falhas) num buffer em memória; uma thread do processo grava o buffer em
+lotes (bulk insert em ai_usage_records) e soma os mesmos eventos nos
+agregados por hora (ai_usage_hourly), lidos pelo relatório do admin.
+Nada disso acontece no caminho da requisição.
+
+As cotas (tokens por usuário por dia e por tenant por mês) são
+contadores O(1): Redis (INCRBY) quando configurado, senão memória do
+processo. Um contador ausente é carregado uma vez do ledger.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, insert, update
+
+from .. import db
+from ..models.ai_usage import AIUsageRecord, AIUsageHourly
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'fisioflow:ai-quota'
+DEFAULT_TENANT = 'default'
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_SECONDS = 5.0
+MAX_BUFFERED_EVENTS = 20_000
+
+# USD por milhão de tokens (entrada, saída)
+PRICING_PER_MILLION = {
+    'claude': (3.0, 15.0),
+    'gpt4': (10.0, 30.0),
+    'gemini': (0.5, 1.5)
+}
+
+# Limites superiores das faixas de latência (ms); a última recebe o excedente
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 120000)
+
+
+def estimate_cost(provider: str, input_tokens: int, output_tokens: int, total_tokens: int = 0,
+                  pricing: Optional[Dict[str, Tuple[float, float]]] = None) -> float:
+    """Custo em USD; sem a divisão entrada/saída usa a média dos dois preços"""
+    input_price, output_price = (pricing or PRICING_PER_MILLION).get(provider, (0.0, 0.0))
+    if not input_tokens and not output_tokens:
+        return total_tokens * (input_price + output_price) / 2 / 1_000_000
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def latency_bucket(latency_ms: int) -> int:
+    for bound in LATENCY_BUCKETS_MS:
+        if latency_ms <= bound:
+            return bound
+    return LATENCY_BUCKETS_MS[-1]
+
+
+def bucket_percentile(counts: Dict[int, int], percentile: float) -> Optional[int]:
+    """Percentil (limite superior da faixa) a partir das contagens por faixa"""
+    total = sum(counts.values())
+    if not total:
+        return None
+    threshold = percentile * total
+    cumulative = 0
+    for bound in sorted(counts):
+        cumulative += counts[bound]
+        if cumulative >= threshold:
+            return bound
+    return max(counts)
+
+
+@dataclass
+class UsageEvent:
+    """Uma chamada de IA, como gravada no ledger"""
+    tenant_id: str
+    user_id: Optional[str]
+    provider: str
+    task_type: str
+    model: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    tokens_used: int = 0
+    cost_usd: float = 0.0
+    latency_ms: int = 0
+    cache: Optional[str] = None
+    tokens_saved: int = 0
+    prompt_tokens_saved: int = 0
+    cost_saved_usd: float = 0.0
+    success: bool = True
+    background: bool = False
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    def to_row(self) -> Dict[str, Any]:
+        row = asdict(self)
+        row.pop('cost_saved_usd')
+        return row
+
+
+def usage_event(request, response, tenant_id: str = DEFAULT_TENANT) -> UsageEvent:
+    """Evento a partir de AIRequest/AIResponse do orquestrador"""
+
+    metadata = response.metadata or {}
+    provider = response.provider.value
+    cache = metadata.get('cache')
+
+    if cache:
+        # Acerto de cache: nada consumido; a economia é a chamada original
+        input_tokens = output_tokens = 0
+        tokens_saved = metadata.get('tokens_saved', 0)
+        cost_saved = estimate_cost(
+            provider, metadata.get('input_tokens') or metadata.get('prompt_tokens') or 0,
+            metadata.get('output_tokens') or metadata.get('completion_tokens') or 0, tokens_saved
+        )
+        prompt_tokens_saved = 0
+    else:
+        input_tokens = metadata.get('input_tokens') or metadata.get('prompt_tokens') or 0
+        output_tokens = metadata.get('output_tokens') or metadata.get('completion_tokens') or 0
+        tokens_saved = 0
+        cost_saved = 0.0
+        prompt_tokens_saved = (metadata.get('prompt') or {}).get('tokens_saved', 0)
+
+    return UsageEvent(
+        tenant_id=tenant_id,
+        user_id=request.user_id,
+        provider=provider,
+        task_type=request.task_type.value,
+        model=metadata.get('model'),
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        tokens_used=response.tokens_used,
+        cost_usd=estimate_cost(provider, input_tokens, output_tokens, response.tokens_used),
+        latency_ms=int((response.processing_time or 0) * 1000),
+        cache=cache,
+        tokens_saved=tokens_saved,
+        prompt_tokens_saved=prompt_tokens_saved,
+        cost_saved_usd=cost_saved,
+        success=response.success,
+        background=getattr(request, 'background', False)
+    )
+
+
+# =============================================================================
+# COTAS
+# =============================================================================
+
+def user_quota_key(user_id: str, now: datetime) -> str:
+    return f'user:{user_id}:{now:%Y-%m-%d}'
+
+
+def tenant_quota_key(tenant_id: str, now: datetime) -> str:
+    return f'tenant:{tenant_id}:{now:%Y-%m}'
+
+
+def quota_period_start(key: str) -> datetime:
+    """Início do período (dia ou mês) codificado na chave"""
+    period = key.rsplit(':', 1)[1]
+    return datetime.strptime(period, '%Y-%m-%d' if len(period) == 10 else '%Y-%m')
+
+
+class MemoryQuotaCounters:
+    """Contadores do processo; chaves de períodos passados são descartadas"""
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[int]:
+        return self._counts.get(key)
+
+    def initialize(self, key: str, value: int, ttl: int) -> int:
+        with self._lock:
+            if key not in self._counts:
+                # Novo período: contadores do período anterior não servem mais
+                prefix = key.rsplit(':', 1)[0]
+                for old in [k for k in self._counts if k.rsplit(':', 1)[0] == prefix]:
+                    del self._counts[old]
+                self._counts[key] = value
+            return self._counts[key]
+
+    def add_if_present(self, key: str, amount: int) -> None:
+        with self._lock:
+            if key in self._counts:
+                self._counts[key] += amount
+
+
+class RedisQuotaCounters:
+    """Contadores compartilhados entre processos (INCRBY, expiração pelo período)"""
+
+    def __init__(self, client, prefix: str = KEY_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f'{self.prefix}:{key}'
+
+    def get(self, key: str) -> Optional[int]:
+        value = self.client.get(self._key(key))
+        return int(value) if value is not None else None
+
+    def initialize(self, key: str, value: int, ttl: int) -> int:
+        self.client.set(self._key(key), value, ex=ttl, nx=True)
+        return self.get(key) or 0
+
+    def add_if_present(self, key: str, amount: int) -> None:
+        if self.client.exists(self._key(key)):
+            self.client.incrby(self._key(key), amount)
+
+
+def load_quota_usage(key: str) -> int:
+    """Tokens já gravados no ledger para o período da chave"""
+    scope, owner = key.split(':')[:2]
+    column = AIUsageRecord.user_id if scope == 'user' else AIUsageRecord.tenant_id
+    return db.session.query(func.coalesce(func.sum(AIUsageRecord.tokens_used), 0)).filter(
+        column == owner,
+        AIUsageRecord.created_at >= quota_period_start(key)
+    ).scalar()
+
+
+# =============================================================================
+# LEDGER
+# =============================================================================
+
+class UsageLedger:
+    """Buffer de eventos com gravação em lotes por uma thread do processo"""
+
+    def __init__(self, app=None, counters=None, tenant_id: str = DEFAULT_TENANT,
+                 batch_size: int = DEFAULT_BATCH_SIZE, flush_seconds: Optional[float] = DEFAULT_FLUSH_SECONDS,
+                 user_daily_quota: int = 0, tenant_monthly_quota: int = 0,
+                 loader: Callable[[str], int] = load_quota_usage, enabled: bool = True):
+        self.app = app
+        self.counters = counters or MemoryQuotaCounters()
+        self.tenant_id = tenant_id
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.user_daily_quota = user_daily_quota
+        self.tenant_monthly_quota = tenant_monthly_quota
+        self.loader = loader
+        self.enabled = enabled
+        self.written = 0
+        self.dropped = 0
+        self.flush_failures = 0
+        self.last_flush_at: Optional[datetime] = None
+        self._buffer: Deque[UsageEvent] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    # --- gravação -----------------------------------------------------------
+
+    def record(self, event: UsageEvent) -> None:
+        """Enfileira o evento e atualiza as cotas (não acessa o banco)"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if len(self._buffer) >= MAX_BUFFERED_EVENTS:
+                # Banco fora por muito tempo: descarta os mais antigos
+                self._buffer.popleft()
+                self.dropped += 1
+            self._buffer.append(event)
+            buffered = len(self._buffer)
+
+        if event.tokens_used:
+            self.counters.add_if_present(user_quota_key(event.user_id, event.created_at), event.tokens_used)
+            self.counters.add_if_present(tenant_quota_key(event.tenant_id, event.created_at), event.tokens_used)
+
+        self._ensure_thread()
+        if buffered >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_thread(self) -> None:
+        if not self.flush_seconds or self.app is None or 'sqlalchemy' not in self.app.extensions:
+            return
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ai-usage-ledger', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            with self.app.app_context():
+                try:
+                    self.flush()
+                finally:
+                    db.session.remove()
+
+    def flush(self) -> int:
+        """Grava o buffer (registros e agregados) numa transação; retorna quantos"""
+        with self._flush_lock:
+            with self._lock:
+                events = list(self._buffer)
+                self._buffer.clear()
+            if not events:
+                return 0
+
+            try:
+                for start in range(0, len(events), self.batch_size):
+                    chunk = events[start:start + self.batch_size]
+                    db.session.execute(insert(AIUsageRecord), [event.to_row() for event in chunk])
+                apply_hourly_rollups(events)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.flush_failures += 1
+                with self._lock:
+                    # Volta para a frente da fila, na ordem original
+                    self._buffer.extendleft(reversed(events))
+                    while len(self._buffer) > MAX_BUFFERED_EVENTS:
+                        self._buffer.popleft()
+                        self.dropped += 1
+                logger.warning(f'Falha ao gravar uso de IA ({len(events)} eventos): {e}')
+                return 0
+
+            self.written += len(events)
+            self.last_flush_at = datetime.utcnow()
+            return len(events)
+
+    def flush_at_exit(self) -> None:
+        if self.app is None or not self._buffer or 'sqlalchemy' not in self.app.extensions:
+            return
+        with self.app.app_context():
+            self.flush()
+
+    # --- cotas --------------------------------------------------------------
+
+    def _usage(self, key: str, ttl: int) -> int:
+        value = self.counters.get(key)
+        if value is None:
+            value = self.counters.initialize(key, int(self.loader(key) or 0), ttl)
+        return value
+
+    def quota_error(self, user_id: Optional[str], now: Optional[datetime] = None) -> Optional[str]:
+        """Mensagem de erro se a cota do usuário ou do tenant acabou, senão None"""
+        now = now or datetime.utcnow()
+        if self.user_daily_quota and user_id:
+            used = self._usage(user_quota_key(user_id, now), ttl=2 * 24 * 3600)
+            if used >= self.user_daily_quota:
+                return f'Cota diária de IA atingida ({used}/{self.user_daily_quota} tokens)'
+        if self.tenant_monthly_quota:
+            used = self._usage(tenant_quota_key(self.tenant_id, now), ttl=32 * 24 * 3600)
+            if used >= self.tenant_monthly_quota:
+                return f'Cota mensal de IA da clínica atingida ({used}/{self.tenant_monthly_quota} tokens)'
+        return None
+
+    def quota_snapshot(self, user_id: Optional[str] = None) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        snapshot = {
+            'tenant_id': self.tenant_id,
+            'tenant_monthly_quota': self.tenant_monthly_quota or None,
+            'tenant_monthly_used': self.counters.get(tenant_quota_key(self.tenant_id, now)),
+            'user_daily_quota': self.user_daily_quota or None
+        }
+        if user_id:
+            snapshot['user_daily_used'] = self.counters.get(user_quota_key(user_id, now))
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'buffered': len(self._buffer),
+            'written': self.written,
+            'dropped': self.dropped,
+            'flush_failures': self.flush_failures,
+            'last_flush_at': self.last_flush_at.isoformat() if self.last_flush_at else None
+        }
+
+
+def apply_hourly_rollups(events: Iterable[UsageEvent]) -> None:
+    """
+    Soma os eventos nos agregados por hora (sem commit)
+
+    UPDATE com incremento para as chaves existentes e bulk insert das
+    novas; se outro processo inserir a mesma chave antes, a transação
+    falha e o lote é refeito no próximo flush.
+    """
+    groups: Dict[Tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+    for event in events:
+        key = (
+            event.created_at.replace(minute=0, second=0, microsecond=0), event.tenant_id,
+            event.provider, event.task_type, latency_bucket(event.latency_ms)
+        )
+        totals = groups[key]
+        totals['requests'] += 1
+        totals['failures'] += 0 if event.success else 1
+        totals['cache_hits'] += 1 if event.cache else 0
+        totals['input_tokens'] += event.input_tokens
+        totals['output_tokens'] += event.output_tokens
+        totals['tokens_used'] += event.tokens_used
+        totals['tokens_saved'] += event.tokens_saved
+        totals['prompt_tokens_saved'] += event.prompt_tokens_saved
+        totals['cost_usd'] += event.cost_usd
+        totals['cost_saved_usd'] += event.cost_saved_usd
+        totals['latency_ms_total'] += event.latency_ms
+
+    new_rows = []
+    for (hour, tenant_id, provider, task_type, bucket), totals in groups.items():
+        result = db.session.execute(
+            update(AIUsageHourly)
+            .where(
+                AIUsageHourly.hour == hour,
+                AIUsageHourly.tenant_id == tenant_id,
+                AIUsageHourly.provider == provider,
+                AIUsageHourly.task_type == task_type,
+                AIUsageHourly.latency_bucket_ms == bucket
+            )
+            .values({
+                getattr(AIUsageHourly, column): getattr(AIUsageHourly, column) + value
+                for column, value in totals.items()
+            })
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            new_rows.append({
+                'hour': hour, 'tenant_id': tenant_id, 'provider': provider,
+                'task_type': task_type, 'latency_bucket_ms': bucket, **totals
+            })
+
+    if new_rows:
+        db.session.execute(insert(AIUsageHourly), new_rows)
+
+
+# =============================================================================
+# RELATÓRIO
+# =============================================================================
+
+SUM_COLUMNS = (
+    'requests', 'failures', 'cache_hits', 'input_tokens', 'output_tokens', 'tokens_used',
+    'tokens_saved', 'prompt_tokens_saved', 'cost_usd', 'cost_saved_usd', 'latency_ms_total'
+)
+
+
+def _summarize(totals: Dict[str, float], latency_counts: Dict[int, int]) -> Dict[str, Any]:
+    requests = int(totals.get('requests', 0))
+    summary = {column: totals.get(column, 0) for column in SUM_COLUMNS if column != 'latency_ms_total'}
+    summary['cost_usd'] = round(summary['cost_usd'], 4)
+    summary['cost_saved_usd'] = round(summary['cost_saved_usd'], 4)
+    summary['avg_latency_ms'] = round(totals.get('latency_ms_total', 0) / requests, 1) if requests else None
+    summary['cache_hit_rate'] = round(summary['cache_hits'] / requests, 4) if requests else 0.0
+    for name, percentile in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+        summary[f'{name}_latency_ms'] = bucket_percentile(latency_counts, percentile)
+    return summary
+
+
+def usage_report(since: datetime, tenant_id: Optional[str] = None, top_users: int = 10) -> Dict[str, Any]:
+    """Totais por provedor e tarefa a partir dos agregados por hora"""
+
+    query = db.session.query(
+        AIUsageHourly.provider, AIUsageHourly.task_type, AIUsageHourly.latency_bucket_ms,
+        *(func.sum(getattr(AIUsageHourly, column)).label(column) for column in SUM_COLUMNS)
+    ).filter(AIUsageHourly.hour >= since.replace(minute=0, second=0, microsecond=0))
+    if tenant_id:
+        query = query.filter(AIUsageHourly.tenant_id == tenant_id)
+    rows = query.group_by(AIUsageHourly.provider, AIUsageHourly.task_type, AIUsageHourly.latency_bucket_ms).all()
+
+    groups = {'total': {}, 'provider': defaultdict(dict), 'task': defaultdict(dict)}
+    latency = {'total': {}, 'provider': defaultdict(dict), 'task': defaultdict(dict)}
+
+    def add(totals, counts, row):
+        for column in SUM_COLUMNS:
+            totals[column] = totals.get(column, 0) + (getattr(row, column) or 0)
+        counts[row.latency_bucket_ms] = counts.get(row.latency_bucket_ms, 0) + (row.requests or 0)
+
+    for row in rows:
+        add(groups['total'], latency['total'], row)
+        add(groups['provider'][row.provider], latency['provider'][row.provider], row)
+        add(groups['task'][row.task_type], latency['task'][row.task_type], row)
+
+    users_query = db.session.query(
+        AIUsageRecord.user_id,
+        func.sum(AIUsageRecord.tokens_used).label('tokens_used'),
+        func.sum(AIUsageRecord.cost_usd).label('cost_usd'),
+        func.count(AIUsageRecord.id).label('requests')
+    ).filter(AIUsageRecord.created_at >= since)
+    if tenant_id:
+        users_query = users_query.filter(AIUsageRecord.tenant_id == tenant_id)
+    users = users_query.group_by(AIUsageRecord.user_id).order_by(
+        func.sum(AIUsageRecord.tokens_used).desc()
+    ).limit(top_users).all()
+
+    return {
+        'since': since.isoformat(),
+        'total': _summarize(groups['total'], latency['total']),
+        'by_provider': {
+            provider: _summarize(totals, latency['provider'][provider])
+            for provider, totals in groups['provider'].items()
+        },
+        'by_task': {
+            task: _summarize(totals, latency['task'][task])
+            for task, totals in groups['task'].items()
+        },
+        'top_users': [
+            {
+                'user_id': user.user_id,
+                'requests': user.requests,
+                'tokens_used': int(user.tokens_used or 0),
+                'cost_usd': round(user.cost_usd or 0, 4)
+            }
+            for user in users
+        ]
+    }
+
+
+# =============================================================================
+# INSTÂNCIA DA APLICAÇÃO
+# =============================================================================
+
+def _create_counters(app):
+    url = app.config.get('REDIS_URL')
+    if url:
+        try:
+            import redis
+
+            client = redis.Redis.from_url(url, socket_timeout=1)
+            client.ping()
+            return RedisQuotaCounters(client)
+        except Exception as e:
+            logger.warning(f'Redis indisponível para cotas de IA, usando memória: {e}')
+    return MemoryQuotaCounters()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Ledger da aplicação (criado na primeira chamada)"""
+    app = current_app._get_current_object()
+    ledger = app.extensions.get('ai_usage_ledger')
+    if ledger is None:
+        ledger = UsageLedger(
+            app=app,
+            counters=_create_counters(app),
+            tenant_id=app.config.get('AI_TENANT_ID') or DEFAULT_TENANT,
+            batch_size=app.config.get('AI_USAGE_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+            flush_seconds=app.config.get('AI_USAGE_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS),
+            user_daily_quota=app.config.get('AI_USER_DAILY_TOKEN_QUOTA') or 0,
+            tenant_monthly_quota=app.config.get('AI_TENANT_MONTHLY_TOKEN_QUOTA') or 0,
+            enabled=app.config.get('AI_USAGE_LEDGER_ENABLED', True)
+        )
+        app.extensions['ai_usage_ledger'] = ledger
+        atexit.register(ledger.flush_at_exit)
+    return ledger
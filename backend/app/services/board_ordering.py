@@ -0,0 +1,194 @@
+"""
+Ordenação das colunas do Kanban com posições esparsas
+
+Task.board_position guarda inteiros espaçados de POSITION_GAP. Mover uma
+tarefa grava só a linha dela, com a posição no meio do intervalo entre os
+vizinhos; quando o intervalo se esgota (ou dois movimentos concorrentes
+escolhem a mesma posição), a coluna é renumerada. O job
+rebalance_boards() faz essa renumeração de forma preventiva.
+
+Movimentos e renumerações de um projeto são serializados por um
+SELECT ... FOR UPDATE na linha do projeto (no-op no SQLite, que já
+serializa escritas).
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+
+from ..models.project_management import Project, Task, TaskStatus
+from .. import db
+
+
+POSITION_GAP = 1 << 20
+
+# Intervalos menores que isso disparam a renumeração no job preventivo
+MIN_GAP = 1 << 10
+
+# Colunas padrão do board e o status de cada uma
+COLUMN_STATUSES = {
+    'backlog': TaskStatus.BACKLOG,
+    'todo': TaskStatus.TODO,
+    'in_progress': TaskStatus.IN_PROGRESS,
+    'review': TaskStatus.REVIEW,
+    'done': TaskStatus.DONE,
+    'blocked': TaskStatus.BLOCKED
+}
+STATUS_COLUMNS = {status: column_id for column_id, status in COLUMN_STATUSES.items()}
+
+
+def position_between(before: Optional[int], after: Optional[int]) -> Optional[int]:
+    """Posição entre dois vizinhos (None = ponta da coluna); None se não houver espaço"""
+
+    if before is None and after is None:
+        return POSITION_GAP
+    if before is None:
+        return after - POSITION_GAP
+    if after is None:
+        return before + POSITION_GAP
+    if after - before < 2:
+        return None
+    return (before + after) // 2
+
+
+def lock_board(project_id: str) -> None:
+    """Trava o board do projeto até o fim da transação"""
+    db.session.query(Project.id).filter(Project.id == project_id).with_for_update().first()
+
+
+def _column_query(project_id: str, column_id: str, exclude_id: Optional[str] = None):
+    query = db.session.query(Task.id, Task.board_position, Task.updated_at).filter(
+        Task.project_id == project_id,
+        Task.column_id == column_id,
+        Task.is_archived == False  # noqa: E712
+    )
+    if exclude_id:
+        query = query.filter(Task.id != exclude_id)
+    return query
+
+
+def _ordered(query, descending: bool = False):
+    columns = (Task.board_position, Task.created_at, Task.id)
+    return query.order_by(*(column.desc() for column in columns) if descending else columns)
+
+
+def _last_position(project_id: str, column_id: str, exclude_id: Optional[str] = None) -> Optional[int]:
+    last = _ordered(_column_query(project_id, column_id, exclude_id), descending=True).first()
+    return last.board_position if last else None
+
+
+def append_position(project_id: str, column_id: str, exclude_id: Optional[str] = None) -> int:
+    """Posição no fim da coluna (leitura pelo índice ix_tasks_board_order)"""
+    return position_between(_last_position(project_id, column_id, exclude_id), None)
+
+
+def neighbor_positions(project_id: str, column_id: str, index: Optional[int],
+                       exclude_id: Optional[str] = None) -> Tuple[Optional[int], Optional[int]]:
+    """Posições das tarefas antes e depois do índice ``index`` (0 = topo, None = fim)"""
+
+    query = _ordered(_column_query(project_id, column_id, exclude_id))
+    if index is not None and index <= 0:
+        first = query.first()
+        return None, first.board_position if first else None
+
+    rows = query.offset(index - 1).limit(2).all() if index is not None else []
+    if not rows:
+        # Fim da coluna (ou índice além dele)
+        return _last_position(project_id, column_id, exclude_id), None
+    return rows[0].board_position, rows[1].board_position if len(rows) > 1 else None
+
+
+def rebalance_column(project_id: str, column_id: str, exclude_id: Optional[str] = None) -> int:
+    """
+    Renumera a coluna com espaçamento POSITION_GAP, mantendo a ordem.
+
+    Grava só as linhas que mudam, sem alterar updated_at. Não faz commit:
+    deve rodar com o board travado (lock_board).
+
+    Returns:
+        int: tarefas renumeradas
+    """
+
+    rows = _ordered(_column_query(project_id, column_id, exclude_id)).all()
+    changes = [
+        {'id': row.id, 'board_position': (index + 1) * POSITION_GAP, 'updated_at': row.updated_at}
+        for index, row in enumerate(rows)
+        if row.board_position != (index + 1) * POSITION_GAP
+    ]
+    if changes:
+        db.session.execute(update(Task), changes)
+    return len(changes)
+
+
+def place_task(task: Task, column_id: str, index: Optional[int] = None) -> bool:
+    """
+    Posiciona ``task`` na coluna, no índice dado ou no fim.
+
+    Atualiza só a tarefa, exceto quando não há espaço entre os vizinhos:
+    aí a coluna é renumerada antes. Não faz commit.
+
+    Returns:
+        bool: True se a coluna precisou ser renumerada
+    """
+
+    lock_board(task.project_id)
+
+    before, after = neighbor_positions(task.project_id, column_id, index, exclude_id=task.id)
+    position = position_between(before, after)
+    rebalanced = position is None
+    if rebalanced:
+        rebalance_column(task.project_id, column_id, exclude_id=task.id)
+        before, after = neighbor_positions(task.project_id, column_id, index, exclude_id=task.id)
+        position = position_between(before, after)
+
+    task.column_id = column_id
+    task.board_position = position
+    return rebalanced
+
+
+def column_needs_rebalance(positions: List[int], min_gap: int = MIN_GAP) -> bool:
+    """Há posições repetidas ou intervalos menores que ``min_gap``"""
+    return any(after - before < min_gap for before, after in zip(positions, positions[1:]))
+
+
+def rebalance_boards(project_id: Optional[str] = None, min_gap: int = MIN_GAP,
+                     dry_run: bool = False) -> Dict[str, int]:
+    """
+    Job preventivo: renumera as colunas com intervalos apertados.
+
+    Cada projeto é travado e commitado separadamente, para não segurar o
+    lock de todos os boards ao mesmo tempo.
+
+    Returns:
+        dict: colunas verificadas, colunas renumeradas e tarefas gravadas
+    """
+
+    columns_query = db.session.query(Task.project_id, Task.column_id).filter(
+        Task.is_archived == False  # noqa: E712
+    ).distinct()
+    if project_id:
+        columns_query = columns_query.filter(Task.project_id == project_id)
+
+    by_project: Dict[str, List[str]] = {}
+    for row in columns_query.order_by(Task.project_id, Task.column_id):
+        by_project.setdefault(row.project_id, []).append(row.column_id)
+
+    result = {'columns_checked': 0, 'columns_rebalanced': 0, 'tasks_moved': 0}
+    for board_project_id, column_ids in by_project.items():
+        lock_board(board_project_id)
+        for column_id in column_ids:
+            result['columns_checked'] += 1
+            positions = [row.board_position for row in _ordered(_column_query(board_project_id, column_id))]
+            if not column_needs_rebalance(positions, min_gap):
+                continue
+            result['columns_rebalanced'] += 1
+            if dry_run:
+                result['tasks_moved'] += len(positions)
+            else:
+                result['tasks_moved'] += rebalance_column(board_project_id, column_id)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+
+    return result
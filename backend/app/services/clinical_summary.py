@@ -0,0 +1,167 @@
+"""
+Resumo clínico do paciente para as estatísticas do prontuário
+
+Contagens, datas, duração das sessões e a série da escala de dor saem
+de duas consultas: uma agregação de prontuários e evoluções do paciente
+e uma consulta com funções de janela (média móvel e variação da dor
+entre sessões), sem carregar os prontuários nem as evoluções.
+
+O resumo fica em cache por paciente (services.patient_cache) e é
+descartado após o commit de qualquer transação que grave evoluções ou
+prontuários do paciente.
+Com REDIS_URL o cache (e a invalidação) vale para todos os processos.
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from ..models.patient import Evolution, MedicalRecord
+from .patient_cache import PatientCache, create_patient_cache, get_app_patient_cache, register_patient_cache
+from .. import db
+
+KEY_PREFIX = 'fisioflow:clinical-summary'
+DEFAULT_SUMMARY_TTL_SECONDS = 3600
+DEFAULT_SUMMARY_MAX_ENTRIES = 5000
+
+# Sessões na média móvel da dor (a atual e as duas anteriores)
+PAIN_WINDOW_SESSIONS = 3
+
+
+def _float(value) -> Optional[float]:
+    return round(float(value), 2) if value is not None else None
+
+
+def _isoformat(value) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def pain_trend(series: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Tendência da dor: primeira/última medida e inclinação (pontos por semana)
+
+    Inclinação por mínimos quadrados sobre os dias desde a primeira
+    sessão; negativa significa melhora.
+    """
+    if not series:
+        return None
+
+    days = [(date.fromisoformat(point['date']) - date.fromisoformat(series[0]['date'])).days for point in series]
+    levels = [point['pain_level'] for point in series]
+    mean_day = sum(days) / len(days)
+    mean_level = sum(levels) / len(levels)
+    spread = sum((day - mean_day) ** 2 for day in days)
+    slope = sum((day - mean_day) * (level - mean_level) for day, level in zip(days, levels)) / spread if spread else 0.0
+
+    change = levels[-1] - levels[0]
+    return {
+        'first': levels[0],
+        'last': levels[-1],
+        'change': change,
+        'average': round(mean_level, 2),
+        'slope_per_week': round(slope * 7, 3),
+        'direction': 'melhora' if change < 0 else 'piora' if change > 0 else 'estavel'
+    }
+
+
+def compute_clinical_summary(patient_id: str) -> Dict[str, Any]:
+    """Resumo calculado no banco (uma consulta, mais uma se houver escala de dor)"""
+
+    duration = func.nullif(Evolution.duracao_minutos, 0)
+    totals = db.session.execute(
+        select(
+            func.count(func.distinct(MedicalRecord.id)).label('total_records'),
+            func.max(MedicalRecord.data_avaliacao).label('latest_evaluation'),
+            func.count(Evolution.id).label('total_evolutions'),
+            func.min(Evolution.data_atendimento).label('first_session'),
+            func.max(Evolution.data_atendimento).label('last_session'),
+            func.count(duration).label('timed_sessions'),
+            func.avg(duration).label('average_duration'),
+            func.min(duration).label('min_duration'),
+            func.max(duration).label('max_duration'),
+            func.sum(duration).label('total_minutes'),
+            func.count(Evolution.escala_dor).label('pain_measurements')
+        )
+        .select_from(MedicalRecord)
+        .outerjoin(Evolution, Evolution.medical_record_id == MedicalRecord.id)
+        .where(MedicalRecord.patient_id == patient_id)
+    ).one()
+
+    pain_evolution = []
+    if totals.pain_measurements:
+        order = (Evolution.data_atendimento, Evolution.created_at)
+        rows = db.session.execute(
+            select(
+                Evolution.data_atendimento,
+                Evolution.escala_dor,
+                func.avg(Evolution.escala_dor).over(
+                    order_by=order, rows=(-(PAIN_WINDOW_SESSIONS - 1), 0)
+                ).label('moving_average'),
+                (Evolution.escala_dor - func.lag(Evolution.escala_dor).over(order_by=order)).label('change')
+            )
+            .join(MedicalRecord, MedicalRecord.id == Evolution.medical_record_id)
+            .where(MedicalRecord.patient_id == patient_id, Evolution.escala_dor.isnot(None))
+            .order_by(*order)
+        ).all()
+        pain_evolution = [
+            {
+                'date': row.data_atendimento.isoformat(),
+                'pain_level': row.escala_dor,
+                'moving_average': _float(row.moving_average),
+                'change': row.change
+            }
+            for row in rows
+        ]
+
+    treatment_duration_days = 0
+    if totals.first_session is not None:
+        treatment_duration_days = (totals.last_session - totals.first_session).days
+
+    return {
+        'total_records': totals.total_records,
+        'total_evolutions': totals.total_evolutions,
+        'latest_evaluation': _isoformat(totals.latest_evaluation),
+        'first_session': _isoformat(totals.first_session),
+        'last_session': _isoformat(totals.last_session),
+        'treatment_duration_days': treatment_duration_days,
+        'average_session_duration': _float(totals.average_duration) or 0,
+        'session_duration': {
+            'sessions': totals.timed_sessions,
+            'average_minutes': _float(totals.average_duration),
+            'min_minutes': totals.min_duration,
+            'max_minutes': totals.max_duration,
+            'total_minutes': totals.total_minutes or 0
+        },
+        'pain_evolution': pain_evolution,
+        'pain_trend': pain_trend(pain_evolution)
+    }
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+def create_clinical_summary_cache(config: Dict[str, Any]) -> PatientCache:
+    """Redis quando configurado (a invalidação precisa valer para todos os processos)"""
+    return create_patient_cache(
+        config, KEY_PREFIX,
+        ttl=config.get('CLINICAL_SUMMARY_CACHE_TTL_SECONDS', DEFAULT_SUMMARY_TTL_SECONDS),
+        max_entries=config.get('CLINICAL_SUMMARY_CACHE_MAX_ENTRIES', DEFAULT_SUMMARY_MAX_ENTRIES)
+    )
+
+
+def get_clinical_summary_cache() -> PatientCache:
+    """Cache da aplicação (criado na primeira chamada)"""
+    return get_app_patient_cache('clinical_summary', create_clinical_summary_cache)
+
+
+def get_clinical_summary(patient_id: str) -> Dict[str, Any]:
+    """Resumo do paciente (cache ou banco)"""
+    if not current_app.config.get('CLINICAL_SUMMARY_CACHE_ENABLED', True):
+        return compute_clinical_summary(patient_id)
+    return get_clinical_summary_cache().get(patient_id, compute_clinical_summary)
+
+
+register_patient_cache('clinical_summary', get_clinical_summary_cache)
@@ -0,0 +1,302 @@
+"""
+Ingestão em lote de execuções de exercícios e dados de sensores
+
+Usado pelo app mobile para enviar centenas de execuções por chamada:
+uma única consulta carrega todas as prescrições referenciadas, as
+execuções são inseridas com bulk insert e as séries de sensores são
+gravadas como float32 empacotados (ver utils.sensor_codec).
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+
+from ..models.exercise import PatientExercise, ExerciseExecution, ExerciseSensorSeries
+from ..utils.sensor_codec import ENCODING, pack_samples, downsample, downsample_factor
+from .exercise_stats import apply_execution_counters
+from .points_ledger import apply_points, publish_points
+from .sync import parse_client_datetime, record_sync_changes
+from .. import db
+
+MAX_BATCH_SIZE = 500
+MAX_CHANNELS_PER_EXECUTION = 12
+MAX_CLIENT_ID_LENGTH = 64
+
+# Mesmos limites do schema de create_execution
+EXECUTION_FIELD_RANGES = {
+    'duration_seconds': (1, None),
+    'repetitions_completed': (0, None),
+    'sets_completed': (0, None),
+    'patient_rating': (1, 5),
+    'difficulty_felt': (1, 10),
+    'pain_level': (0, 10),
+    'effort_level': (1, 10),
+}
+
+
+@dataclass
+class IngestionResult:
+    """Resultado de uma ingestão em lote"""
+    created: List[Dict[str, Any]] = field(default_factory=list)
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    duplicates: List[Dict[str, Any]] = field(default_factory=list)
+    sensor_series_count: int = 0
+
+    @property
+    def total_points(self) -> int:
+        return sum(item['points_earned'] for item in self.created)
+
+
+def calculate_execution_points(patient_exercise: PatientExercise, data: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Calcula pontos e bônus de uma execução
+
+    Returns:
+        tuple: (points_earned, bonus_points)
+    """
+    points_earned = patient_exercise.exercise.points_value
+    bonus_points = 0
+
+    # Bonus por completar todos os parâmetros
+    params = patient_exercise.effective_parameters
+    completion_bonus = True
+
+    if params.get('repetitions') and (data.get('repetitions_completed') or 0) < params['repetitions']:
+        completion_bonus = False
+    if params.get('sets') and (data.get('sets_completed') or 0) < params['sets']:
+        completion_bonus = False
+    if params.get('duration_seconds') and (data.get('duration_seconds') or 0) < params['duration_seconds']:
+        completion_bonus = False
+
+    if completion_bonus:
+        bonus_points = int(points_earned * 0.5)  # 50% bonus
+
+    return points_earned, bonus_points
+
+
+def check_execution_permission(user, patient_exercise: PatientExercise) -> Optional[str]:
+    """Retorna mensagem de erro se o usuário não pode registrar a execução"""
+
+    if user.role == 'PACIENTE' and patient_exercise.patient_id != user.id:
+        return 'Acesso não autorizado'
+    if user.role == 'FISIOTERAPEUTA' and patient_exercise.prescribed_by != user.id:
+        return 'Acesso não autorizado'
+    if not patient_exercise.is_active:
+        return 'Prescrição não está ativa'
+    return None
+
+
+def _validate_item(item: Any) -> Optional[str]:
+    if not isinstance(item, dict):
+        return 'Item deve ser um objeto'
+    if not isinstance(item.get('patient_exercise_id'), str):
+        return 'patient_exercise_id é obrigatório'
+    client_id = item.get('client_id')
+    if client_id is not None and (not isinstance(client_id, str) or not 0 < len(client_id) <= MAX_CLIENT_ID_LENGTH):
+        return f'client_id deve ter entre 1 e {MAX_CLIENT_ID_LENGTH} caracteres'
+    for field_name in ('started_at', 'completed_at'):
+        value = item.get(field_name)
+        if value is not None and not isinstance(value, str):
+            return f'{field_name} deve ser uma data ISO 8601'
+
+    for field_name, (minimum, maximum) in EXECUTION_FIELD_RANGES.items():
+        value = item.get(field_name)
+        if value is None:
+            continue
+        if not isinstance(value, int) or isinstance(value, bool):
+            return f'{field_name} deve ser inteiro'
+        if minimum is not None and value < minimum:
+            return f'{field_name} deve ser >= {minimum}'
+        if maximum is not None and value > maximum:
+            return f'{field_name} deve ser <= {maximum}'
+
+    sensor_data = item.get('sensor_data')
+    if sensor_data is not None:
+        if not isinstance(sensor_data, dict) or not isinstance(sensor_data.get('channels'), dict):
+            return 'sensor_data deve conter channels'
+        if len(sensor_data['channels']) > MAX_CHANNELS_PER_EXECUTION:
+            return f'Máximo de {MAX_CHANNELS_PER_EXECUTION} canais por execução'
+        rate = sensor_data.get('sample_rate_hz')
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            return 'sensor_data.sample_rate_hz deve ser positivo'
+        for channel, samples in sensor_data['channels'].items():
+            if not isinstance(samples, list) or not all(
+                isinstance(v, (int, float)) and not isinstance(v, bool) for v in samples
+            ):
+                return f'Canal {channel} deve ser uma lista numérica'
+
+    return None
+
+
+def _build_sensor_rows(execution_id: str, sensor_data: Dict[str, Any], now: datetime) -> List[Dict[str, Any]]:
+    rows = []
+    rate = float(sensor_data['sample_rate_hz'])
+
+    for channel, samples in sensor_data['channels'].items():
+        if not samples:
+            continue
+
+        factor = downsample_factor(rate, len(samples))
+        reduced = downsample(samples, factor)
+
+        rows.append({
+            'id': str(uuid4()),
+            'execution_id': execution_id,
+            'channel': channel[:50],
+            'sample_rate_hz': rate / factor,
+            'sample_count': len(reduced),
+            'original_sample_count': len(samples),
+            'downsample_factor': factor,
+            'min_value': min(reduced),
+            'max_value': max(reduced),
+            'mean_value': sum(reduced) / len(reduced),
+            'encoding': ENCODING,
+            'data': pack_samples(reduced),
+            'created_at': now
+        })
+
+    return rows
+
+
+def ingest_executions(user, items: List[Dict[str, Any]]) -> IngestionResult:
+    """
+    Valida e insere um lote de execuções em uma única transação
+
+    Itens inválidos são reportados em ``errors`` (com o índice no lote) e
+    não impedem a gravação dos demais. Itens com ``client_id`` já gravado
+    (reenvio do app offline) vão para ``duplicates`` com o id existente.
+    """
+    result = IngestionResult()
+
+    valid_items = []
+    for index, item in enumerate(items):
+        error = _validate_item(item)
+        if error:
+            result.errors.append({'index': index, 'error': error})
+        else:
+            valid_items.append((index, item))
+
+    if not valid_items:
+        return result
+
+    # Idempotência: client_ids já gravados ou repetidos dentro do lote
+    client_ids = {item['client_id'] for _, item in valid_items if item.get('client_id')}
+    existing = {}
+    if client_ids:
+        existing = dict(db.session.query(
+            ExerciseExecution.client_id, ExerciseExecution.id
+        ).filter(ExerciseExecution.client_id.in_(client_ids)).all())
+
+    # Prefetch único das prescrições (com exercício) referenciadas no lote
+    prescription_ids = {item['patient_exercise_id'] for _, item in valid_items}
+    prescriptions = {
+        pe.id: pe
+        for pe in PatientExercise.query.options(
+            joinedload(PatientExercise.exercise)
+        ).filter(PatientExercise.id.in_(prescription_ids))
+    }
+
+    now = datetime.utcnow()
+    execution_rows = []
+    sensor_rows = []
+
+    for index, item in valid_items:
+        client_id = item.get('client_id')
+        if client_id and client_id in existing:
+            result.duplicates.append({'index': index, 'id': existing[client_id], 'client_id': client_id})
+            continue
+
+        patient_exercise = prescriptions.get(item['patient_exercise_id'])
+        if not patient_exercise:
+            result.errors.append({'index': index, 'error': 'Prescrição não encontrada'})
+            continue
+
+        error = check_execution_permission(user, patient_exercise)
+        if error:
+            result.errors.append({'index': index, 'error': error})
+            continue
+
+        try:
+            started_at = parse_client_datetime(item.get('started_at')) or now
+            completed_at = parse_client_datetime(item.get('completed_at')) or now
+        except (TypeError, ValueError):
+            result.errors.append({'index': index, 'error': 'Formato de data inválido'})
+            continue
+
+        points_earned, bonus_points = calculate_execution_points(patient_exercise, item)
+        execution_id = str(uuid4())
+
+        execution_rows.append({
+            'id': execution_id,
+            'patient_exercise_id': patient_exercise.id,
+            'exercise_id': patient_exercise.exercise_id,
+            'patient_id': patient_exercise.patient_id,
+            'client_id': client_id,
+            'started_at': started_at,
+            'completed_at': completed_at,
+            'duration_seconds': item.get('duration_seconds'),
+            'repetitions_completed': item.get('repetitions_completed'),
+            'sets_completed': item.get('sets_completed'),
+            'patient_rating': item.get('patient_rating'),
+            'difficulty_felt': item.get('difficulty_felt'),
+            'pain_level': item.get('pain_level'),
+            'effort_level': item.get('effort_level'),
+            'patient_comments': item.get('patient_comments'),
+            'location': item.get('location'),
+            'execution_data': item.get('execution_data'),
+            'points_earned': points_earned,
+            'bonus_points': bonus_points
+        })
+
+        if client_id:
+            existing[client_id] = execution_id
+
+        if item.get('sensor_data'):
+            sensor_rows.extend(_build_sensor_rows(execution_id, item['sensor_data'], now))
+
+        result.created.append({
+            'index': index,
+            'id': execution_id,
+            'patient_exercise_id': patient_exercise.id,
+            'points_earned': points_earned + bonus_points
+        })
+
+    if not execution_rows:
+        return result
+
+    try:
+        db.session.execute(insert(ExerciseExecution), execution_rows)
+        if sensor_rows:
+            db.session.execute(insert(ExerciseSensorSeries), sensor_rows)
+        apply_execution_counters(execution_rows)
+        points_deltas = apply_points([
+            {
+                'patient_id': row['patient_id'],
+                'therapist_id': prescriptions[row['patient_exercise_id']].prescribed_by,
+                'points': row['points_earned'] + row['bonus_points'],
+                'activity_at': row['started_at']
+            }
+            for row in execution_rows
+        ])
+        # Bulk insert e UPDATE de contadores não passam pelo flush do ORM
+        record_sync_changes(
+            'exercise_executions',
+            [(row['id'], row['patient_id']) for row in execution_rows]
+        )
+        record_sync_changes(
+            'patient_exercises',
+            {(row['patient_exercise_id'], row['patient_id']) for row in execution_rows}
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    publish_points(points_deltas)
+
+    result.sensor_series_count = len(sensor_rows)
+    return result
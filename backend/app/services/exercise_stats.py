@@ -0,0 +1,137 @@
+"""
+Contadores desnormalizados de execuções de exercícios
+
+Exercise.execution_count / rating_sum / rating_count e
+PatientExercise.completed_count são atualizados na mesma transação que
+insere as execuções (UPDATE ... SET col = col + n, atômico no banco).
+reconcile_exercise_counters() recalcula tudo a partir de
+exercise_executions e corrige divergências.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Union
+
+from sqlalchemy import func, update
+
+from ..models.exercise import Exercise, PatientExercise, ExerciseExecution
+from .. import db
+
+
+def _field(execution, name):
+    """Lê campo de uma execução ORM ou de um dict de bulk insert"""
+    if isinstance(execution, dict):
+        return execution.get(name)
+    return getattr(execution, name)
+
+
+def apply_execution_counters(executions: Iterable[Union[ExerciseExecution, Dict[str, Any]]]) -> None:
+    """
+    Incrementa os contadores para um lote de execuções recém-criadas.
+
+    Aceita instâncias ORM ou os dicts usados em bulk insert. Emite um
+    UPDATE por exercício/prescrição afetado, não por execução.
+    Não faz commit: deve rodar na transação que insere as execuções.
+    """
+
+    exercise_deltas: Dict[str, Dict[str, int]] = defaultdict(
+        lambda: {'execution_count': 0, 'rating_sum': 0, 'rating_count': 0}
+    )
+    completed_deltas: Dict[str, int] = defaultdict(int)
+
+    for execution in executions:
+        delta = exercise_deltas[_field(execution, 'exercise_id')]
+        delta['execution_count'] += 1
+        rating = _field(execution, 'patient_rating')
+        if rating is not None:
+            delta['rating_sum'] += rating
+            delta['rating_count'] += 1
+
+        if _field(execution, 'completed_at') is not None:
+            completed_deltas[_field(execution, 'patient_exercise_id')] += 1
+
+    for exercise_id, delta in exercise_deltas.items():
+        db.session.execute(
+            update(Exercise)
+            .where(Exercise.id == exercise_id)
+            .values(
+                execution_count=Exercise.execution_count + delta['execution_count'],
+                rating_sum=Exercise.rating_sum + delta['rating_sum'],
+                rating_count=Exercise.rating_count + delta['rating_count']
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    # updated_at fica como está: é a versão das notas usada pelo push
+    # offline (services.sync), e um contador não é edição da prescrição
+    for patient_exercise_id, completed in completed_deltas.items():
+        db.session.execute(
+            update(PatientExercise)
+            .where(PatientExercise.id == patient_exercise_id)
+            .values(
+                completed_count=PatientExercise.completed_count + completed,
+                updated_at=PatientExercise.updated_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+def reconcile_exercise_counters(dry_run: bool = False) -> Dict[str, int]:
+    """
+    Recalcula os contadores a partir das execuções e corrige divergências.
+
+    Returns:
+        dict: número de exercícios e prescrições corrigidos
+    """
+
+    # Valores reais agregados no banco
+    actual_exercises = {
+        row.exercise_id: (row.execution_count, row.rating_sum, row.rating_count)
+        for row in db.session.query(
+            ExerciseExecution.exercise_id,
+            func.count(ExerciseExecution.id).label('execution_count'),
+            func.coalesce(func.sum(ExerciseExecution.patient_rating), 0).label('rating_sum'),
+            func.count(ExerciseExecution.patient_rating).label('rating_count')
+        ).group_by(ExerciseExecution.exercise_id)
+    }
+
+    actual_completed = {
+        row.patient_exercise_id: row.completed_count
+        for row in db.session.query(
+            ExerciseExecution.patient_exercise_id,
+            func.count(ExerciseExecution.id).label('completed_count')
+        ).filter(
+            ExerciseExecution.completed_at.isnot(None)
+        ).group_by(ExerciseExecution.patient_exercise_id)
+    }
+
+    # Compara com os contadores armazenados
+    exercise_fixes = []
+    for row in db.session.query(
+        Exercise.id, Exercise.execution_count, Exercise.rating_sum, Exercise.rating_count
+    ):
+        expected = actual_exercises.get(row.id, (0, 0, 0))
+        if (row.execution_count, row.rating_sum, row.rating_count) != expected:
+            exercise_fixes.append({
+                'id': row.id,
+                'execution_count': expected[0],
+                'rating_sum': expected[1],
+                'rating_count': expected[2]
+            })
+
+    prescription_fixes = []
+    for row in db.session.query(PatientExercise.id, PatientExercise.completed_count, PatientExercise.updated_at):
+        expected = actual_completed.get(row.id, 0)
+        if row.completed_count != expected:
+            prescription_fixes.append({'id': row.id, 'completed_count': expected, 'updated_at': row.updated_at})
+
+    if not dry_run:
+        if exercise_fixes:
+            db.session.execute(update(Exercise), exercise_fixes)
+        if prescription_fixes:
+            db.session.execute(update(PatientExercise), prescription_fixes)
+        db.session.commit()
+
+    return {
+        'exercises_fixed': len(exercise_fixes),
+        'prescriptions_fixed': len(prescription_fixes)
+    }
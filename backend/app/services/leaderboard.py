@@ -0,0 +1,228 @@
+"""
+Leaderboards de gamificação com semântica de sorted set
+
+Com REDIS_URL configurado usa ZINCRBY/ZREVRANK/ZREVRANGE (O(log N));
+sem Redis (ou se ele estiver fora) cai para um índice em memória do
+processo, rematerializado periodicamente a partir de patient_points.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'fisioflow:leaderboard'
+GLOBAL_SCOPE = 'global'
+DEFAULT_REFRESH_SECONDS = 300
+
+
+def therapist_scope(therapist_id: str) -> str:
+    """Escopo do leaderboard de um fisioterapeuta (pacientes que ele prescreve)"""
+    return f'therapist:{therapist_id}'
+
+
+class InMemoryLeaderboard:
+    """
+    Sorted set em memória
+
+    Mantém por escopo um dict membro -> score e uma lista ordenada de
+    (-score, membro): rank e score saem em O(log N) via bisect; a
+    atualização custa O(N) pelo deslocamento da lista, aceitável para o
+    fallback de um único processo.
+    """
+
+    def __init__(self):
+        self._scores: Dict[str, Dict[str, float]] = {}
+        self._ordered: Dict[str, List[Tuple[float, str]]] = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, scope: str, member: str) -> None:
+        old = self._scores[scope].get(member)
+        if old is not None:
+            ordered = self._ordered[scope]
+            del ordered[bisect.bisect_left(ordered, (-old, member))]
+
+    def increment(self, scope: str, member: str, amount: float) -> float:
+        with self._lock:
+            scores = self._scores.setdefault(scope, {})
+            self._ordered.setdefault(scope, [])
+            self._remove(scope, member)
+            score = scores.get(member, 0) + amount
+            scores[member] = score
+            bisect.insort(self._ordered[scope], (-score, member))
+            return score
+
+    def increment_many(self, updates: Iterable[Tuple[str, str, float]]) -> None:
+        for scope, member, amount in updates:
+            self.increment(scope, member, amount)
+
+    def replace(self, scope: str, scores: Dict[str, float]) -> None:
+        with self._lock:
+            self._scores[scope] = dict(scores)
+            self._ordered[scope] = sorted((-score, member) for member, score in scores.items())
+
+    def score(self, scope: str, member: str) -> Optional[float]:
+        return self._scores.get(scope, {}).get(member)
+
+    def rank(self, scope: str, member: str) -> Optional[int]:
+        score = self.score(scope, member)
+        if score is None:
+            return None
+        return bisect.bisect_left(self._ordered[scope], (-score, member))
+
+    def top(self, scope: str, limit: int) -> List[Tuple[str, float]]:
+        return [(member, -score) for score, member in self._ordered.get(scope, [])[:limit]]
+
+    def exists(self, scope: str) -> bool:
+        return scope in self._scores
+
+
+class RedisLeaderboard:
+    """Sorted sets do Redis (um por escopo)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _key(scope: str) -> str:
+        return f'{KEY_PREFIX}:{scope}'
+
+    def increment(self, scope: str, member: str, amount: float) -> float:
+        return self.client.zincrby(self._key(scope), amount, member)
+
+    def increment_many(self, updates: Iterable[Tuple[str, str, float]]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for scope, member, amount in updates:
+            pipe.zincrby(self._key(scope), amount, member)
+        pipe.execute()
+
+    def replace(self, scope: str, scores: Dict[str, float]) -> None:
+        # Monta em chave temporária e troca atomicamente com RENAME
+        key = self._key(scope)
+        tmp_key = f'{key}:rebuild'
+        pipe = self.client.pipeline()
+        pipe.delete(tmp_key)
+        if scores:
+            pipe.zadd(tmp_key, scores)
+            pipe.rename(tmp_key, key)
+        else:
+            pipe.delete(key)
+        pipe.execute()
+
+    def score(self, scope: str, member: str) -> Optional[float]:
+        return self.client.zscore(self._key(scope), member)
+
+    def rank(self, scope: str, member: str) -> Optional[int]:
+        return self.client.zrevrank(self._key(scope), member)
+
+    def top(self, scope: str, limit: int) -> List[Tuple[str, float]]:
+        return [
+            (member.decode() if isinstance(member, bytes) else member, score)
+            for member, score in self.client.zrevrange(self._key(scope), 0, limit - 1, withscores=True)
+        ]
+
+    def exists(self, scope: str) -> bool:
+        return bool(self.client.exists(self._key(scope)))
+
+
+class Leaderboard:
+    """
+    Fachada usada pela API e pelo ledger de pontos
+
+    ``loader(scope)`` devolve os scores materializados do banco para um
+    escopo; é chamado quando o escopo ainda não existe no backend e, no
+    fallback em memória, a cada LEADERBOARD_REFRESH_SECONDS.
+    """
+
+    def __init__(self, backend, loader: Callable[[str], Dict[str, float]], refresh_seconds: Optional[int] = None):
+        self.backend = backend
+        self.loader = loader
+        self.refresh_seconds = refresh_seconds
+        self._loaded_at: Dict[str, float] = {}
+
+    @property
+    def backend_name(self) -> str:
+        return 'redis' if isinstance(self.backend, RedisLeaderboard) else 'memory'
+
+    def _ensure(self, scope: str) -> None:
+        loaded_at = self._loaded_at.get(scope)
+        stale = (
+            self.refresh_seconds is not None and loaded_at is not None
+            and time.monotonic() - loaded_at > self.refresh_seconds
+        )
+        if stale or not self.backend.exists(scope):
+            self.materialize(scope)
+
+    def materialize(self, scope: str) -> int:
+        """Reconstrói o escopo a partir do banco"""
+        scores = self.loader(scope)
+        self.backend.replace(scope, scores)
+        self._loaded_at[scope] = time.monotonic()
+        return len(scores)
+
+    def add_points(self, deltas: Iterable[Tuple[str, str, int]]) -> None:
+        """Aplica incrementos (escopo, paciente, pontos) já confirmados no banco"""
+        deltas = [(scope, member, amount) for scope, member, amount in deltas if amount]
+        if not deltas:
+            return
+        try:
+            # Escopos ainda não materializados serão carregados completos
+            # do banco na primeira leitura; incrementá-los criaria um
+            # sorted set parcial.
+            live = {scope for scope in {d[0] for d in deltas} if self.backend.exists(scope)}
+            self.backend.increment_many([d for d in deltas if d[0] in live])
+        except Exception as e:
+            # O banco já tem o valor correto; o próximo rebuild corrige o índice
+            logger.warning(f'Falha ao atualizar leaderboard: {e}')
+
+    def rank(self, scope: str, member: str) -> Optional[int]:
+        """Posição (1 = primeiro) ou None se o paciente não pontuou"""
+        self._ensure(scope)
+        rank = self.backend.rank(scope, member)
+        return rank + 1 if rank is not None else None
+
+    def score(self, scope: str, member: str) -> Optional[float]:
+        self._ensure(scope)
+        return self.backend.score(scope, member)
+
+    def top(self, scope: str, limit: int = 10) -> List[Dict[str, object]]:
+        self._ensure(scope)
+        return [
+            {'rank': position, 'patient_id': member, 'points': int(score)}
+            for position, (member, score) in enumerate(self.backend.top(scope, limit), start=1)
+        ]
+
+
+def _create_backend(app):
+    url = app.config.get('LEADERBOARD_REDIS_URL') or app.config.get('REDIS_URL')
+    if url:
+        try:
+            import redis
+
+            client = redis.Redis.from_url(url, socket_timeout=1)
+            client.ping()
+            return RedisLeaderboard(client)
+        except Exception as e:
+            logger.warning(f'Redis indisponível para leaderboard, usando memória: {e}')
+    return InMemoryLeaderboard()
+
+
+def get_leaderboard() -> Leaderboard:
+    """Leaderboard da aplicação (criado na primeira chamada)"""
+    app = current_app._get_current_object()
+    leaderboard = app.extensions.get('leaderboard')
+    if leaderboard is None:
+        from .points_ledger import load_scope_scores
+
+        backend = _create_backend(app)
+        refresh = None
+        if isinstance(backend, InMemoryLeaderboard):
+            refresh = app.config.get('LEADERBOARD_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS)
+        leaderboard = Leaderboard(backend, load_scope_scores, refresh_seconds=refresh)
+        app.extensions['leaderboard'] = leaderboard
+    return leaderboard
@@ -0,0 +1,371 @@
+"""
+Tendências de dor e desfechos clínicos, vetorizadas com NumPy
+
+As medidas de dor (0-10) de toda a carteira ativa são lidas em lote,
+uma consulta por fonte:
+
+- evolution: ``Evolution.escala_dor`` (atendimento na clínica)
+- exercise: ``ExerciseExecution.pain_level`` (execuções em casa)
+- protocol: avaliações de ``ProtocolApplication.progress_assessments``
+  que tragam uma das chaves de PAIN_KEYS
+
+Cada série (paciente, fonte) vira um trecho contíguo de arrays
+ordenados; contagens, somas, inclinação por mínimos quadrados, médias
+do início e do fim e os alertas de diferença mínima clinicamente
+importante (MCID) saem de operações agrupadas (bincount) sobre a
+carteira inteira, sem laço por paciente.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import Date, literal, select
+
+from ..models.clinical_protocols import ProtocolApplication
+from ..models.exercise import ExerciseExecution
+from ..models.patient import Evolution, MedicalRecord, Patient
+from ..models.types import days_between
+from .. import db
+
+SOURCES = ('evolution', 'exercise', 'protocol')
+
+# Chaves aceitas como escala de dor nas avaliações dos protocolos
+PAIN_KEYS = ('escala_dor', 'pain_level', 'eva', 'dor')
+
+DEFAULT_LOOKBACK_DAYS = 90
+# Diferença mínima clinicamente importante usual para escalas numéricas de dor 0-10
+DEFAULT_MCID = 2.0
+# Medidas no início/fim de cada série usadas na linha de base e no valor atual
+SMOOTHING_POINTS = 3
+# Séries mais curtas (em medidas ou em dias) ficam como dados insuficientes
+MIN_POINTS = 3
+MIN_SPAN_DAYS = 14
+
+IMPROVING, NOT_IMPROVING, WORSENING, INSUFFICIENT = 0, 1, 2, 3
+STATUS_LABELS = ('melhora', 'sem_melhora', 'piora', 'dados_insuficientes')
+
+
+@dataclass
+class PainObservations:
+    """Medidas em colunas (uma posição por medida)"""
+    patients: np.ndarray       # ids distintos (object)
+    patient_index: np.ndarray  # posição em ``patients``
+    sources: np.ndarray        # índice em SOURCES
+    days: np.ndarray           # date.toordinal()
+    values: np.ndarray         # float64
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def patient_ids(self) -> np.ndarray:
+        return self.patients[self.patient_index]
+
+    @classmethod
+    def from_rows(cls, patient_ids: List[str], sources: List[int], days: List[int], values: List[float],
+                  day_origin: int = 0):
+        # Códigos inteiros já na leitura: agrupar por int é bem mais rápido que por string
+        codes: Dict[str, int] = {}
+        patient_index = [codes.setdefault(patient_id, len(codes)) for patient_id in patient_ids]
+        patients = np.empty(len(codes), dtype=object)
+        patients[:] = list(codes)
+        return cls(
+            patients,
+            np.array(patient_index, dtype=np.int64),
+            np.array(sources, dtype=np.int64),
+            np.array(days, dtype=np.int64) + day_origin,
+            np.array(values, dtype=np.float64)
+        )
+
+
+@dataclass
+class TrendTable:
+    """Uma posição por série (paciente, fonte)"""
+    patients: np.ndarray
+    patient_index: np.ndarray
+    sources: np.ndarray
+    points: np.ndarray
+    first_days: np.ndarray
+    last_days: np.ndarray
+    baseline: np.ndarray
+    current: np.ndarray
+    change: np.ndarray
+    slope_per_week: np.ndarray
+    latest: np.ndarray
+    status: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    @property
+    def patient_ids(self) -> np.ndarray:
+        return self.patients[self.patient_index]
+
+    def row(self, index: int) -> Dict[str, Any]:
+        return {
+            'patient_id': self.patients[self.patient_index[index]],
+            'source': SOURCES[self.sources[index]],
+            'status': STATUS_LABELS[self.status[index]],
+            'points': int(self.points[index]),
+            'first_date': date.fromordinal(int(self.first_days[index])).isoformat(),
+            'last_date': date.fromordinal(int(self.last_days[index])).isoformat(),
+            'baseline': round(float(self.baseline[index]), 2),
+            'current': round(float(self.current[index]), 2),
+            'change': round(float(self.change[index]), 2),
+            'slope_per_week': round(float(self.slope_per_week[index]), 3),
+            'latest': float(self.latest[index])
+        }
+
+
+# =============================================================================
+# LEITURA EM LOTE
+# =============================================================================
+
+def _pain_from_assessment(assessment) -> Optional[float]:
+    if not isinstance(assessment, dict):
+        return None
+    for key in PAIN_KEYS:
+        value = assessment.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+    return None
+
+
+def load_pain_observations(since: date, patient_ids: Optional[Sequence[str]] = None) -> PainObservations:
+    """
+    Medidas de dor dos pacientes ativos desde ``since`` (três consultas)
+
+    Os dias vêm do banco como inteiros (dias desde ``since``), sem
+    converter uma data por linha no Python.
+    """
+
+    origin = literal(since, Date)
+    ids: List[str] = []
+    sources: List[int] = []
+    days: List[int] = []
+    values: List[float] = []
+
+    def collect(source, rows):
+        if not rows:
+            return
+        row_ids, row_days, row_values = zip(*rows)
+        ids.extend(row_ids)
+        sources.extend([source] * len(rows))
+        days.extend(row_days)
+        values.extend(row_values)
+
+    def restrict(statement, patient_column):
+        statement = statement.join(Patient, Patient.id == patient_column).where(Patient.is_active == True)  # noqa: E712
+        if patient_ids is not None:
+            statement = statement.where(patient_column.in_(list(patient_ids)))
+        return statement
+
+    evolutions = restrict(
+        select(MedicalRecord.patient_id, days_between(origin, Evolution.data_atendimento), Evolution.escala_dor)
+        .select_from(Evolution)
+        .join(MedicalRecord, MedicalRecord.id == Evolution.medical_record_id)
+        .where(Evolution.escala_dor.isnot(None), Evolution.data_atendimento >= since),
+        MedicalRecord.patient_id
+    )
+    collect(0, db.session.execute(evolutions).all())
+
+    executions = restrict(
+        select(ExerciseExecution.patient_id, days_between(origin, ExerciseExecution.started_at),
+               ExerciseExecution.pain_level)
+        .where(ExerciseExecution.pain_level.isnot(None),
+               ExerciseExecution.started_at >= datetime.combine(since, datetime.min.time())),
+        ExerciseExecution.patient_id
+    )
+    collect(1, db.session.execute(executions).all())
+
+    # Avaliações ficam num JSON por aplicação: chaves 'AAAA-MM-DD'
+    applications = restrict(
+        select(ProtocolApplication.patient_id, ProtocolApplication.progress_assessments)
+        .where(ProtocolApplication.is_active == True),  # noqa: E712
+        ProtocolApplication.patient_id
+    )
+    since_key = since.isoformat()
+    for patient_id, assessments in db.session.execute(applications):
+        for day_key, assessment in (assessments or {}).items():
+            pain = _pain_from_assessment(assessment)
+            if pain is None or day_key[:10] < since_key:
+                continue
+            try:
+                day = date.fromisoformat(day_key[:10])
+            except ValueError:
+                continue
+            ids.append(patient_id)
+            sources.append(2)
+            days.append(day.toordinal() - since.toordinal())
+            values.append(pain)
+
+    return PainObservations.from_rows(ids, sources, days, values, day_origin=since.toordinal())
+
+
+# =============================================================================
+# CÁLCULO VETORIZADO
+# =============================================================================
+
+def _group(observations: PainObservations):
+    """Ordena por (paciente, fonte, dia) e devolve os limites de cada série"""
+    group = observations.patient_index * len(SOURCES) + observations.sources
+    order = np.lexsort((observations.days, group))
+    group = group[order]
+    starts = np.flatnonzero(np.concatenate(([True], group[1:] != group[:-1])))
+    counts = np.diff(np.append(starts, len(group)))
+    members = np.repeat(np.arange(len(starts)), counts)
+    position = np.arange(len(group)) - starts[members]
+    return order, starts, counts, members, position, group
+
+
+def smooth_values(observations: PainObservations, window: int = SMOOTHING_POINTS):
+    """
+    Média móvel de ``window`` medidas dentro de cada série
+
+    Devolve (ordem, suavizado): ``suavizado[i]`` corresponde à medida
+    ``ordem[i]`` das observações (ordenadas por paciente, fonte e dia).
+    """
+    if not len(observations):
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+    order, _, _, _, position, _ = _group(observations)
+    prefix = np.concatenate(([0.0], np.cumsum(observations.values[order])))
+    size = np.minimum(position + 1, window)
+    index = np.arange(1, len(prefix))
+    return order, (prefix[index] - prefix[index - size]) / size
+
+
+def compute_trends(observations: PainObservations, mcid: float = DEFAULT_MCID,
+                   smoothing: int = SMOOTHING_POINTS, min_points: int = MIN_POINTS,
+                   min_span_days: int = MIN_SPAN_DAYS) -> TrendTable:
+    """
+    Tendência de cada série (paciente, fonte)
+
+    Linha de base e valor atual são as médias das primeiras/últimas
+    ``smoothing`` medidas (no máximo metade da série); ``change`` é a
+    diferença entre elas e decide o status pelo MCID (dor menor é
+    melhora). A inclinação é a da reta de mínimos quadrados, em pontos
+    por semana.
+    """
+
+    if not len(observations):
+        integers, floats = np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+        return TrendTable(observations.patients, integers, integers, integers, integers, integers,
+                          floats, floats, floats, floats, floats, integers)
+
+    order, starts, counts, members, position, group = _group(observations)
+    days = observations.days[order]
+    values = observations.values[order]
+    ends = starts + counts - 1
+    groups = len(starts)
+
+    # Mínimos quadrados por série, com x em dias desde a primeira medida
+    x = (days - days[starts][members]).astype(np.float64)
+    n = counts.astype(np.float64)
+    sum_x = np.bincount(members, x, groups)
+    sum_y = np.bincount(members, values, groups)
+    sum_xx = np.bincount(members, x * x, groups)
+    sum_xy = np.bincount(members, x * values, groups)
+    denominator = n * sum_xx - sum_x ** 2
+    slope = np.divide(n * sum_xy - sum_x * sum_y, denominator,
+                      out=np.zeros(groups), where=denominator > 0)
+
+    # Início e fim suavizados (sem sobreposição nas séries curtas)
+    window = np.maximum(1, np.minimum(smoothing, counts // 2))[members]
+    head = (position < window).astype(np.float64)
+    tail = ((counts[members] - 1 - position) < window).astype(np.float64)
+    baseline = np.bincount(members, values * head, groups) / np.bincount(members, head, groups)
+    current = np.bincount(members, values * tail, groups) / np.bincount(members, tail, groups)
+    change = current - baseline
+
+    span = days[ends] - days[starts]
+    status = np.where(change <= -mcid, IMPROVING, np.where(change >= mcid, WORSENING, NOT_IMPROVING))
+    status = np.where((counts >= min_points) & (span >= min_span_days), status, INSUFFICIENT)
+
+    series_group = group[starts]
+    return TrendTable(
+        patients=observations.patients,
+        patient_index=series_group // len(SOURCES),
+        sources=series_group % len(SOURCES),
+        points=counts,
+        first_days=days[starts],
+        last_days=days[ends],
+        baseline=baseline,
+        current=current,
+        change=change,
+        slope_per_week=slope * 7,
+        latest=values[ends],
+        status=status
+    )
+
+
+# =============================================================================
+# CONSULTAS
+# =============================================================================
+
+def _since(lookback_days: int) -> date:
+    return date.today() - timedelta(days=lookback_days)
+
+
+def not_improving_worklist(lookback_days: int = DEFAULT_LOOKBACK_DAYS, mcid: float = DEFAULT_MCID,
+                           sources: Iterable[str] = SOURCES, limit: int = 50) -> Dict[str, Any]:
+    """
+    Pacientes ativos sem melhora clinicamente importante (ou piorando)
+
+    Cada paciente aparece uma vez, pela pior série entre as fontes
+    escolhidas; a lista vem da maior para a menor variação de dor.
+    """
+
+    trends = compute_trends(load_pain_observations(_since(lookback_days)), mcid=mcid)
+    source_codes = [SOURCES.index(source) for source in sources]
+    flagged = np.flatnonzero(
+        np.isin(trends.status, (NOT_IMPROVING, WORSENING)) & np.isin(trends.sources, source_codes)
+    )
+
+    # Pior série por paciente: maior variação, depois maior inclinação
+    flagged = flagged[np.lexsort((-trends.slope_per_week[flagged], -trends.change[flagged]))]
+    _, first = np.unique(trends.patient_index[flagged], return_index=True)
+    worst = flagged[np.sort(first)]
+
+    items = [trends.row(index) for index in worst[:limit]]
+    names = dict(db.session.execute(
+        select(Patient.id, Patient.nome_completo).where(Patient.id.in_([item['patient_id'] for item in items]))
+    ).all()) if items else {}
+    for item in items:
+        item['patient_name'] = names.get(item['patient_id'])
+
+    status_counts = np.bincount(trends.status, minlength=len(STATUS_LABELS))
+    return {
+        'items': items,
+        'total': int(len(worst)),
+        'caseload': int(len(np.unique(trends.patient_index))),
+        'series_by_status': {label: int(count) for label, count in zip(STATUS_LABELS, status_counts)},
+        'mcid': mcid,
+        'since': _since(lookback_days).isoformat()
+    }
+
+
+def patient_outcome_trends(patient_id: str, lookback_days: int = DEFAULT_LOOKBACK_DAYS,
+                           mcid: float = DEFAULT_MCID) -> Dict[str, Any]:
+    """Tendência e série suavizada de cada fonte do paciente"""
+
+    observations = load_pain_observations(_since(lookback_days), patient_ids=[patient_id])
+    trends = compute_trends(observations, mcid=mcid)
+    order, smoothed = smooth_values(observations)
+
+    series: Dict[str, List[Dict[str, Any]]] = {}
+    for index, value in zip(order, smoothed):
+        series.setdefault(SOURCES[observations.sources[index]], []).append({
+            'date': date.fromordinal(int(observations.days[index])).isoformat(),
+            'pain_level': float(observations.values[index]),
+            'smoothed': round(float(value), 2)
+        })
+
+    return {
+        'patient_id': patient_id,
+        'mcid': mcid,
+        'since': _since(lookback_days).isoformat(),
+        'trends': {SOURCES[trends.sources[index]]: trends.row(index) for index in range(len(trends))},
+        'series': series
+    }
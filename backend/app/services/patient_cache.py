@@ -0,0 +1,182 @@
+"""
+Caches por paciente invalidados após o commit
+
+Usado pelo contexto dos prompts de IA (services.ai_context) e pelo
+resumo clínico (services.clinical_summary). Cada cache é registrado com
+um nome; um único conjunto de listeners da sessão anota, no flush, os
+pacientes cujos prontuários ou evoluções foram gravados e descarta as
+entradas deles só após o commit (rollback não invalida nada).
+
+Com Redis o cache (e a invalidação) vale para todos os processos.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from ..models.patient import MedicalRecord
+from .ai_cache import MemoryCacheBackend, RedisCacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class PatientCache:
+    """Valores por paciente, com contadores de acerto"""
+
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def get(self, patient_id: str, loader: Callable[[str], Any]) -> Any:
+        """Valor do cache ou do ``loader`` (None não é guardado)"""
+        cached = self.backend.get(str(patient_id))
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            return cached['value']
+
+        with self._lock:
+            self.misses += 1
+        value = loader(patient_id)
+        if value is not None:
+            self.backend.set(str(patient_id), {'value': value}, self.ttl)
+        return value
+
+    def invalidate(self, patient_id: str) -> None:
+        self.backend.delete(str(patient_id))
+        with self._lock:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def create_patient_cache(config: Dict[str, Any], key_prefix: str, ttl: int, max_entries: int,
+                         use_redis: bool = True) -> PatientCache:
+    """Redis quando ``use_redis`` e REDIS_URL estão definidos; senão memória do processo"""
+
+    backend = None
+    if use_redis and config.get('REDIS_URL'):
+        try:
+            import redis
+
+            client = redis.Redis.from_url(config['REDIS_URL'], socket_timeout=1)
+            client.ping()
+            backend = RedisCacheBackend(client, prefix=key_prefix)
+        except Exception as e:
+            logger.warning(f'Redis indisponível para {key_prefix}, usando memória: {e}')
+
+    if backend is None:
+        backend = MemoryCacheBackend(max_entries)
+
+    return PatientCache(backend, ttl=ttl)
+
+
+def get_app_patient_cache(name: str, factory: Callable[[Dict[str, Any]], PatientCache]) -> PatientCache:
+    """Cache ``name`` da aplicação (criado na primeira chamada)"""
+    app = current_app._get_current_object()
+    cache = app.extensions.get(name)
+    if cache is None:
+        cache = factory(app.config)
+        app.extensions[name] = cache
+    return cache
+
+
+# =============================================================================
+# INVALIDAÇÃO
+# =============================================================================
+
+_PENDING_KEY = 'patient_cache_changes'
+
+# nome -> (função que devolve o cache da aplicação, invalida também em gravações de patients)
+_registry: Dict[str, tuple] = {}
+
+
+def register_patient_cache(name: str, get_cache: Callable[[], PatientCache],
+                           include_patients: bool = False) -> None:
+    """Invalida o cache ``name`` quando prontuários ou evoluções do paciente são gravados"""
+    _registry[name] = (get_cache, include_patients)
+
+
+def changed_patient_ids(session, objects: Iterable[Any]) -> Dict[str, Set[str]]:
+    """
+    Pacientes afetados pelos objetos gravados no flush
+
+    Retorna ``{'records': ..., 'patients': ...}``: alterados via
+    prontuário/evolução e via a própria linha de patients.
+    """
+    record_patients = set()
+    patients = set()
+    record_ids = set()
+    for obj in objects:
+        table = getattr(obj, '__tablename__', None)
+        if table == 'patients':
+            patients.add(obj.id)
+        elif table == 'medical_records':
+            record_patients.add(obj.patient_id)
+        elif table == 'evolutions':
+            # Evoluções criadas só com medical_record_id não têm o relacionamento carregado
+            record_ids.add(obj.medical_record_id)
+
+    record_ids.discard(None)
+    if record_ids:
+        record_patients.update(session.connection().execute(
+            select(MedicalRecord.patient_id).where(MedicalRecord.id.in_(record_ids))
+        ).scalars())
+
+    return {
+        'records': {str(patient_id) for patient_id in record_patients if patient_id is not None},
+        'patients': {str(patient_id) for patient_id in patients if patient_id is not None},
+    }
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_patient_changes(session, flush_context):
+    """Anota, por cache, os pacientes alterados nesta transação"""
+    if not _registry:
+        return
+    changed = changed_patient_ids(session, list(session.new) + list(session.dirty) + list(session.deleted))
+    if not changed['records'] and not changed['patients']:
+        return
+
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for name, (_, include_patients) in _registry.items():
+        patient_ids = changed['records'] | changed['patients'] if include_patients else changed['records']
+        if patient_ids:
+            pending.setdefault(name, set()).update(patient_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_patient_caches(session):
+    """Descarta dos caches as entradas alteradas, só após o commit"""
+    pending: Optional[Dict[str, Set[str]]] = session.info.pop(_PENDING_KEY, None)
+    if not pending or not has_app_context():
+        return
+    for name, patient_ids in pending.items():
+        cache = _registry[name][0]()
+        for patient_id in patient_ids:
+            cache.invalidate(patient_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_patient_changes(session):
+    session.info.pop(_PENDING_KEY, None)
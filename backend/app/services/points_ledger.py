@@ -0,0 +1,301 @@
+"""
+Ledger de pontos da gamificação
+
+apply_points() atualiza patient_points na transação que grava as
+execuções (total via UPDATE ... SET total = total + n, ou INSERT ...
+ON CONFLICT para pacientes sem linha ainda, streak calculado a partir
+do último dia de atividade). Depois do commit, publish_points()
+repassa os incrementos ao leaderboard. backfill_points() recalcula tudo
+a partir de exercise_executions.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import case, func, insert, or_, update
+
+from ..models.exercise import PatientExercise, ExerciseExecution
+from ..models.gamification import PatientPoints
+from .leaderboard import GLOBAL_SCOPE, get_leaderboard, therapist_scope
+from .. import db
+
+# (escopo, paciente, pontos) a publicar no leaderboard após o commit
+LeaderboardDelta = Tuple[str, str, int]
+
+
+def _activity_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.today()
+
+
+def advance_streak(current: int, last: date, activity_days: Iterable[date]) -> Tuple[int, date]:
+    """
+    Avança a sequência com novos dias de atividade
+
+    Dias anteriores ao último já contabilizado (envio offline atrasado)
+    não alteram a sequência; o backfill os considera.
+    """
+    for day in sorted(set(activity_days)):
+        if last is None or day > last + timedelta(days=1):
+            current = 1
+        elif day == last + timedelta(days=1):
+            current += 1
+        else:
+            continue
+        last = day
+    return current, last
+
+
+def _upsert_points_statement(increment: bool):
+    """
+    INSERT em patient_points que não falha se a linha já existir
+
+    Com ``increment``, total e contagem da linha existente recebem os
+    valores inseridos como incremento (primeira execução concorrente do
+    mesmo paciente) e o streak fica com a atividade mais recente; sem
+    ele, a linha existente é substituída (backfill).
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(PatientPoints)
+
+    statement = dialect_insert(PatientPoints)
+    excluded = statement.excluded
+    if not increment:
+        return statement.on_conflict_do_update(
+            index_elements=['patient_id'],
+            set_={column: excluded[column] for column in (
+                'total_points', 'execution_count', 'current_streak', 'longest_streak',
+                'last_activity_date', 'updated_at'
+            )}
+        )
+
+    newer = or_(
+        PatientPoints.last_activity_date.is_(None),
+        excluded.last_activity_date > PatientPoints.last_activity_date
+    )
+    return statement.on_conflict_do_update(
+        index_elements=['patient_id'],
+        set_={
+            'total_points': PatientPoints.total_points + excluded.total_points,
+            'execution_count': PatientPoints.execution_count + excluded.execution_count,
+            'current_streak': case((newer, excluded.current_streak), else_=PatientPoints.current_streak),
+            'last_activity_date': case((newer, excluded.last_activity_date), else_=PatientPoints.last_activity_date),
+            'longest_streak': case(
+                (PatientPoints.longest_streak > excluded.longest_streak, PatientPoints.longest_streak),
+                else_=excluded.longest_streak
+            ),
+            'updated_at': excluded.updated_at
+        }
+    )
+
+
+def apply_points(entries: List[Dict[str, Any]]) -> List[LeaderboardDelta]:
+    """
+    Aplica pontos de execuções recém-gravadas ao ledger
+
+    Args:
+        entries: dicts com patient_id, therapist_id, points e activity_at
+
+    Returns:
+        list: incrementos para publish_points() após o commit
+
+    Não faz commit: deve rodar na transação que insere as execuções.
+    """
+    points: Dict[str, int] = defaultdict(int)
+    executions: Dict[str, int] = defaultdict(int)
+    days: Dict[str, set] = defaultdict(set)
+    therapist_points: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    for entry in entries:
+        patient_id = entry['patient_id']
+        points[patient_id] += entry['points']
+        executions[patient_id] += 1
+        days[patient_id].add(_activity_date(entry.get('activity_at')))
+        if entry.get('therapist_id'):
+            therapist_points[(entry['therapist_id'], patient_id)] += entry['points']
+
+    if not points:
+        return []
+
+    current = {
+        row.patient_id: row
+        for row in db.session.query(
+            PatientPoints.patient_id, PatientPoints.current_streak,
+            PatientPoints.longest_streak, PatientPoints.last_activity_date
+        ).filter(PatientPoints.patient_id.in_(points.keys()))
+    }
+
+    now = datetime.utcnow()
+    new_rows = []
+    for patient_id, delta in points.items():
+        row = current.get(patient_id)
+        streak, last = advance_streak(
+            row.current_streak if row else 0,
+            row.last_activity_date if row else None,
+            days[patient_id]
+        )
+        longest = max(streak, row.longest_streak if row else 0)
+
+        if row is None:
+            new_rows.append({
+                'patient_id': patient_id,
+                'total_points': delta,
+                'execution_count': executions[patient_id],
+                'current_streak': streak,
+                'longest_streak': longest,
+                'last_activity_date': last,
+                'updated_at': now
+            })
+            continue
+
+        db.session.execute(
+            update(PatientPoints)
+            .where(PatientPoints.patient_id == patient_id)
+            .values(
+                total_points=PatientPoints.total_points + delta,
+                execution_count=PatientPoints.execution_count + executions[patient_id],
+                current_streak=streak,
+                longest_streak=longest,
+                last_activity_date=last,
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    if new_rows:
+        # Outra transação pode criar a linha do paciente entre a leitura e o INSERT
+        db.session.execute(_upsert_points_statement(increment=True), new_rows)
+
+    deltas = [(GLOBAL_SCOPE, patient_id, delta) for patient_id, delta in points.items()]
+    deltas.extend(
+        (therapist_scope(therapist_id), patient_id, delta)
+        for (therapist_id, patient_id), delta in therapist_points.items()
+    )
+    return deltas
+
+
+def publish_points(deltas: List[LeaderboardDelta]) -> None:
+    """Repassa ao leaderboard incrementos já confirmados no banco"""
+    if deltas:
+        get_leaderboard().add_points(deltas)
+
+
+def load_scope_scores(scope: str) -> Dict[str, float]:
+    """Scores de um escopo materializados do banco (usado no rebuild)"""
+
+    if scope == GLOBAL_SCOPE:
+        rows = db.session.query(PatientPoints.patient_id, PatientPoints.total_points).filter(
+            PatientPoints.total_points > 0
+        )
+        return {patient_id: total for patient_id, total in rows}
+
+    therapist_id = scope.split(':', 1)[1]
+    total = func.sum(ExerciseExecution.points_earned + ExerciseExecution.bonus_points)
+    rows = db.session.query(
+        ExerciseExecution.patient_id, total
+    ).join(
+        PatientExercise, PatientExercise.id == ExerciseExecution.patient_exercise_id
+    ).filter(
+        PatientExercise.prescribed_by == therapist_id
+    ).group_by(ExerciseExecution.patient_id)
+    return {patient_id: int(points or 0) for patient_id, points in rows if points}
+
+
+def _streaks_from_days(days: List[date]) -> Tuple[int, int]:
+    """(streak vigente no último dia, maior streak) de dias ordenados"""
+    current = longest = 0
+    previous = None
+    for day in days:
+        current = current + 1 if previous and day == previous + timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+
+def backfill_points(dry_run: bool = False) -> Dict[str, int]:
+    """
+    Recalcula patient_points a partir de todas as execuções
+
+    Totais e contagens saem de um GROUP BY; os streaks, dos dias
+    distintos de atividade de cada paciente.
+
+    Returns:
+        dict: pacientes processados e linhas corrigidas
+    """
+    totals = {
+        row.patient_id: (int(row.total_points or 0), row.execution_count)
+        for row in db.session.query(
+            ExerciseExecution.patient_id,
+            func.sum(ExerciseExecution.points_earned + ExerciseExecution.bonus_points).label('total_points'),
+            func.count(ExerciseExecution.id).label('execution_count')
+        ).group_by(ExerciseExecution.patient_id)
+    }
+
+    activity_day = func.date(ExerciseExecution.started_at)
+    days: Dict[str, List[date]] = defaultdict(list)
+    for patient_id, day in db.session.query(
+        ExerciseExecution.patient_id, activity_day
+    ).distinct().order_by(ExerciseExecution.patient_id, activity_day):
+        days[patient_id].append(day if isinstance(day, date) else date.fromisoformat(day))
+
+    stored = {row.patient_id: row for row in PatientPoints.query}
+
+    now = datetime.utcnow()
+    inserts, updates = [], []
+    for patient_id, (total_points, execution_count) in totals.items():
+        patient_days = days.get(patient_id, [])
+        current, longest = _streaks_from_days(patient_days)
+        values = {
+            'patient_id': patient_id,
+            'total_points': total_points,
+            'execution_count': execution_count,
+            'current_streak': current,
+            'longest_streak': longest,
+            'last_activity_date': patient_days[-1] if patient_days else None,
+        }
+
+        row = stored.get(patient_id)
+        if row is None:
+            inserts.append({**values, 'updated_at': now})
+        elif any(getattr(row, key) != value for key, value in values.items()):
+            updates.append({**values, 'updated_at': now})
+
+    # Pacientes sem execuções restantes voltam a zero
+    for patient_id, row in stored.items():
+        if patient_id not in totals and (row.total_points or row.execution_count):
+            updates.append({
+                'patient_id': patient_id, 'total_points': 0, 'execution_count': 0,
+                'current_streak': 0, 'last_activity_date': None, 'updated_at': now
+            })
+
+    if not dry_run:
+        if inserts:
+            db.session.execute(_upsert_points_statement(increment=False), inserts)
+        if updates:
+            db.session.execute(update(PatientPoints), updates)
+        db.session.commit()
+
+    return {
+        'patients': len(totals),
+        'inserted': len(inserts),
+        'updated': len(updates)
+    }
+
+
+def rebuild_leaderboards(therapist_ids: Iterable[str] = ()) -> Dict[str, int]:
+    """Rematerializa o leaderboard global e os de fisioterapeutas indicados"""
+    leaderboard = get_leaderboard()
+    result = {GLOBAL_SCOPE: leaderboard.materialize(GLOBAL_SCOPE)}
+    for therapist_id in therapist_ids:
+        scope = therapist_scope(therapist_id)
+        result[scope] = leaderboard.materialize(scope)
+    return result
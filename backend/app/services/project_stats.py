@@ -0,0 +1,88 @@
+"""
+Progresso e estatísticas de projetos calculados no banco
+
+O progresso de uma página de projetos vem na mesma consulta da página
+(subconsultas agregadas por projeto, via with_expression), e as
+estatísticas de um projeto saem de uma única consulta agrupada por
+status/tipo/prioridade, sem carregar as tarefas.
+"""
+
+from datetime import date
+from typing import Any, Dict
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import with_expression
+
+from ..models.project_management import Project, Task, TaskPriority, TaskStatus, TaskType
+from .. import db
+
+
+def _active_tasks(*columns):
+    return select(*columns).where(
+        Task.project_id == Project.id,
+        Task.is_archived == False  # noqa: E712
+    ).correlate(Project).scalar_subquery()
+
+
+def with_task_counts(query):
+    """Carrega Project.task_total/task_completed junto com os projetos da consulta"""
+    total = _active_tasks(func.count(Task.id))
+    completed = _active_tasks(func.coalesce(func.sum(case((Task.status == TaskStatus.DONE, 1), else_=0)), 0))
+    return query.options(
+        with_expression(Project.task_total, total),
+        with_expression(Project.task_completed, completed)
+    )
+
+
+def project_task_stats(project_id: str) -> Dict[str, Any]:
+    """
+    Estatísticas de tarefas, tempo e velocidade do projeto
+
+    Uma consulta agrupada por (status, tipo, prioridade); as somas por
+    dimensão saem das no máximo 144 linhas do resultado.
+    """
+
+    rows = db.session.query(
+        Task.status, Task.task_type, Task.priority,
+        func.count(Task.id).label('total'),
+        func.sum(case((Task.due_date < date.today(), 1), else_=0)).label('overdue'),
+        func.coalesce(func.sum(Task.estimated_hours), 0).label('estimated_hours'),
+        func.coalesce(func.sum(Task.actual_hours), 0).label('actual_hours'),
+        func.coalesce(func.sum(Task.story_points), 0).label('story_points')
+    ).filter(
+        Task.project_id == project_id,
+        Task.is_archived == False  # noqa: E712
+    ).group_by(Task.status, Task.task_type, Task.priority).all()
+
+    task_stats = {
+        'total': 0,
+        'by_status': {status.value: 0 for status in TaskStatus},
+        'by_type': {task_type.value: 0 for task_type in TaskType},
+        'by_priority': {priority.value: 0 for priority in TaskPriority},
+        'overdue': 0,
+        'completed': 0
+    }
+    total_estimated = total_actual = 0.0
+    completed_story_points = 0
+
+    for row in rows:
+        task_stats['total'] += row.total
+        task_stats['by_status'][row.status.value] += row.total
+        task_stats['by_type'][row.task_type.value] += row.total
+        task_stats['by_priority'][row.priority.value] += row.total
+        total_estimated += row.estimated_hours
+        total_actual += row.actual_hours
+        if row.status == TaskStatus.DONE:
+            task_stats['completed'] += row.total
+            completed_story_points += row.story_points
+        else:
+            task_stats['overdue'] += row.overdue or 0
+
+    time_stats = {
+        'estimated_hours': total_estimated,
+        'actual_hours': total_actual,
+        'variance': total_actual - total_estimated if total_estimated > 0 else 0,
+        'efficiency': (total_estimated / total_actual * 100) if total_actual > 0 else 0
+    }
+
+    return {'task_stats': task_stats, 'time_stats': time_stats, 'velocity': completed_story_points}
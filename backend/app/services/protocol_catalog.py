@@ -0,0 +1,381 @@
+"""
+Catálogo de protocolos clínicos em memória
+
+Protocolos e templates de intervenção mudam pouco e são lidos o tempo
+todo. O catálogo carrega tudo de uma vez, monta índices por CID-10,
+região corporal, especialização, nível de evidência e status, e guarda
+o JSON de cada item já serializado: listagens e detalhes só concatenam
+bytes, sem consultar o banco nem converter as colunas JSON grandes
+(fases, referências, instrumentos de avaliação) a cada requisição.
+
+A versão do catálogo é um carimbo (quantidade de linhas e maior
+``updated_at`` das duas tabelas), verificado no máximo a cada
+``PROTOCOL_CATALOG_CHECK_SECONDS``. Gravações feitas neste processo
+invalidam o catálogo logo após o commit. O contador de uso não entra
+no carimbo: ``usage_count`` (e a ordenação por uso) é o da última carga.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, joinedload
+
+from .. import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECK_SECONDS = 30
+CATALOG_TABLES = ('clinical_protocols', 'intervention_templates')
+
+# Ordem dos níveis de evidência (1a é o mais forte)
+EVIDENCE_ORDER = ['1a', '1b', '2a', '2b', '3a', '3b', '4', '5']
+
+
+def normalize_icd10(code: str) -> str:
+    """'m54.5 ' -> 'M545' (sem ponto, maiúsculo)"""
+    return ''.join(ch for ch in str(code).upper() if ch.isalnum())
+
+
+def icd10_category(code: str) -> str:
+    """Categoria de três caracteres do código (M545 -> M54)"""
+    return normalize_icd10(code)[:3]
+
+
+def _page_bounds(total: int, page: int, per_page: int) -> Dict[str, Any]:
+    pages = (total + per_page - 1) // per_page if total else 0
+    return {
+        'page': page,
+        'pages': pages,
+        'per_page': per_page,
+        'total': total,
+        'has_prev': page > 1,
+        'has_next': page < pages
+    }
+
+
+# =============================================================================
+# CATÁLOGO (SNAPSHOT IMUTÁVEL)
+# =============================================================================
+
+@dataclass
+class CatalogEntry:
+    """Item do catálogo com campos de filtro e JSON pré-serializado"""
+    id: str
+    summary_json: bytes
+    detail_json: bytes
+    filters: Dict[str, Any]
+    search_text: str
+
+
+@dataclass
+class ProtocolCatalog:
+    """Snapshot de protocolos e intervenções com índices"""
+    version: str
+    dumps: Callable[[Any], str]
+    protocols: Dict[str, CatalogEntry] = field(default_factory=dict)
+    interventions: Dict[str, CatalogEntry] = field(default_factory=dict)
+    protocol_orders: Dict[str, List[str]] = field(default_factory=dict)
+    intervention_order: List[str] = field(default_factory=list)
+    indexes: Dict[str, Dict[str, set]] = field(default_factory=dict)
+    icd10_responses: Dict[str, bytes] = field(default_factory=dict)
+    icd10_category_matches: Dict[str, List[str]] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.time)
+
+    def _encode(self, data: Any) -> bytes:
+        return self.dumps(data).encode('utf-8')
+
+    def _index(self, name: str, key: Any) -> set:
+        return self.indexes.get(name, {}).get(key, set())
+
+    def protocol_json(self, protocol_id: str) -> Optional[bytes]:
+        entry = self.protocols.get(protocol_id)
+        return b''.join([b'{"protocol":', entry.detail_json, b'}']) if entry else None
+
+    def list_protocols(self, *, status: Optional[str] = 'ativo', body_region: Optional[str] = None,
+                       specialization: Optional[str] = None, evidence_level: Optional[str] = None,
+                       pathology: Optional[str] = None, search: Optional[str] = None,
+                       sort_by: str = 'updated_at', include_details: bool = False,
+                       page: int = 1, per_page: int = 20) -> bytes:
+        """Página de protocolos como JSON (mesmos filtros da consulta SQL)"""
+        candidates = None
+        for name, value in (('status', status), ('body_region', body_region),
+                            ('specialization', specialization), ('evidence_level', evidence_level)):
+            if value:
+                ids = self._index(name, value)
+                candidates = ids if candidates is None else candidates & ids
+
+        pathology = pathology.lower() if pathology else None
+        search = search.lower() if search else None
+        order = self.protocol_orders.get(sort_by) or self.protocol_orders['updated_at']
+        matched = [
+            protocol_id for protocol_id in order
+            if (candidates is None or protocol_id in candidates)
+            and (pathology is None or pathology in self.protocols[protocol_id].filters['pathology'])
+            and (search is None or search in self.protocols[protocol_id].search_text)
+        ]
+        return self._page('protocols', self.protocols, matched, include_details, page, per_page)
+
+    def list_interventions(self, *, intervention_type: Optional[str] = None, category: Optional[str] = None,
+                           evidence_level: Optional[str] = None, search: Optional[str] = None,
+                           include_details: bool = False, page: int = 1, per_page: int = 20) -> bytes:
+        """Página de templates de intervenção ativos como JSON"""
+        category = category.lower() if category else None
+        search = search.lower() if search else None
+        matched = []
+        for intervention_id in self.intervention_order:
+            filters = self.interventions[intervention_id].filters
+            if intervention_type and filters['intervention_type'] != intervention_type:
+                continue
+            if evidence_level and filters['evidence_level'] != evidence_level:
+                continue
+            if category and category not in filters['category']:
+                continue
+            if search and search not in self.interventions[intervention_id].search_text:
+                continue
+            matched.append(intervention_id)
+        return self._page('interventions', self.interventions, matched, include_details, page, per_page)
+
+    def _page(self, key: str, entries: Dict[str, CatalogEntry], ids: List[str],
+              include_details: bool, page: int, per_page: int) -> bytes:
+        page = max(page, 1)
+        start = (page - 1) * per_page
+        items = [
+            entries[item_id].detail_json if include_details else entries[item_id].summary_json
+            for item_id in ids[start:start + per_page]
+        ]
+        tail = {'pagination': _page_bounds(len(ids), page, per_page), 'catalog_version': self.version}
+        return b''.join([b'{"', key.encode(), b'":[', b','.join(items), b'],', self._encode(tail)[1:]])
+
+    def icd10_lookup(self, code: str) -> bytes:
+        """Protocolos ativos para o código CID-10 (exato, senão a categoria)"""
+        normalized = normalize_icd10(code)
+        cached = self.icd10_responses.get(normalized)
+        if cached is not None:
+            return cached
+        # Subcódigo sem protocolo próprio: protocolos da categoria
+        matched = self.icd10_category_matches.get(normalized[:3], [])
+        return self._icd10_response(normalized, 'category' if matched else 'none', matched)
+
+    def _icd10_response(self, code: str, match: str, protocol_ids: Iterable[str]) -> bytes:
+        head = self._encode({'code': code, 'match': match, 'catalog_version': self.version})
+        items = [self.protocols[protocol_id].summary_json for protocol_id in protocol_ids]
+        return b''.join([head[:-1], b',"protocols":[', b','.join(items), b']}'])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'protocols': len(self.protocols),
+            'interventions': len(self.interventions),
+            'icd10_codes': len(self.indexes.get('icd10', {})),
+            'age_seconds': round(time.time() - self.loaded_at, 1)
+        }
+
+
+def build_catalog(protocols: Iterable, interventions: Iterable, version: str,
+                  dumps: Callable[[Any], str]) -> ProtocolCatalog:
+    """Monta o snapshot a partir das linhas já carregadas"""
+    catalog = ProtocolCatalog(version=version, dumps=dumps)
+    indexes: Dict[str, Dict[Any, set]] = {
+        name: {} for name in ('status', 'body_region', 'specialization', 'evidence_level', 'icd10', 'icd10_category')
+    }
+
+    def add(name, key, item_id):
+        indexes[name].setdefault(key, set()).add(item_id)
+
+    sort_keys: Dict[str, Tuple] = {}
+    for protocol in protocols:
+        summary = protocol.to_dict()
+        filters = {
+            'status': summary['status'],
+            'body_region': summary['body_region'],
+            'specialization': summary['specialization_area'],
+            'evidence_level': summary['evidence_level'],
+            'pathology': (protocol.pathology or '').lower()
+        }
+        catalog.protocols[protocol.id] = CatalogEntry(
+            id=protocol.id,
+            summary_json=catalog._encode(summary),
+            detail_json=catalog._encode(protocol.to_dict(include_details=True)),
+            filters=filters,
+            search_text=f'{protocol.title}\n{protocol.description}'.lower()
+        )
+        for name in ('status', 'body_region', 'specialization', 'evidence_level'):
+            add(name, filters[name], protocol.id)
+        for code in protocol.icd10_codes or []:
+            add('icd10', normalize_icd10(code), protocol.id)
+            add('icd10_category', icd10_category(code), protocol.id)
+        sort_keys[protocol.id] = (protocol.updated_at, protocol.usage_count or 0, filters['evidence_level'])
+
+    ids = list(catalog.protocols)
+    catalog.protocol_orders = {
+        'updated_at': sorted(ids, key=lambda item_id: sort_keys[item_id][0], reverse=True),
+        'usage': sorted(ids, key=lambda item_id: sort_keys[item_id][1], reverse=True),
+        'evidence': sorted(ids, key=lambda item_id: EVIDENCE_ORDER.index(sort_keys[item_id][2])
+                           if sort_keys[item_id][2] in EVIDENCE_ORDER else len(EVIDENCE_ORDER))
+    }
+
+    names = {}
+    for intervention in interventions:
+        summary = intervention.to_dict()
+        catalog.interventions[intervention.id] = CatalogEntry(
+            id=intervention.id,
+            summary_json=catalog._encode(summary),
+            detail_json=catalog._encode(intervention.to_dict(include_details=True)),
+            filters={
+                'intervention_type': summary['intervention_type'],
+                'evidence_level': summary['evidence_level'],
+                'category': (intervention.category or '').lower()
+            },
+            search_text=f'{intervention.name}\n{intervention.description}'.lower()
+        )
+        names[intervention.id] = intervention.name
+    catalog.intervention_order = sorted(names, key=lambda item_id: names[item_id])
+    catalog.indexes = indexes
+
+    # Respostas do CID-10 montadas na carga: a consulta é só um acesso ao dicionário
+    active = indexes['status'].get('ativo', set())
+    by_updated = catalog.protocol_orders['updated_at']
+    for name, match in (('icd10_category', 'category'), ('icd10', 'exact')):
+        for code, protocol_ids in indexes[name].items():
+            matched = [protocol_id for protocol_id in by_updated if protocol_id in protocol_ids and protocol_id in active]
+            if not matched:
+                continue
+            catalog.icd10_responses[code] = catalog._icd10_response(code, match, matched)
+            if match == 'category':
+                catalog.icd10_category_matches[code] = matched
+    return catalog
+
+
+# =============================================================================
+# CARGA E VERSÃO
+# =============================================================================
+
+def catalog_version() -> str:
+    """Carimbo de versão: quantidade e última alteração das duas tabelas"""
+    from ..models.clinical_protocols import ClinicalProtocol, InterventionTemplate
+
+    parts = []
+    for model in (ClinicalProtocol, InterventionTemplate):
+        count, last_update = db.session.query(func.count(model.id), func.max(model.updated_at)).one()
+        parts.append(f"{count}@{last_update.isoformat() if last_update else '-'}")
+    return '|'.join(parts)
+
+
+def load_catalog(version: Optional[str] = None) -> ProtocolCatalog:
+    """Lê protocolos (todos os status) e intervenções ativas em duas consultas"""
+    from ..models.clinical_protocols import ClinicalProtocol, InterventionTemplate
+
+    version = version or catalog_version()
+    protocols = ClinicalProtocol.query.options(joinedload(ClinicalProtocol.creator)).all()
+    interventions = InterventionTemplate.query.options(
+        joinedload(InterventionTemplate.creator)
+    ).filter(InterventionTemplate.is_active == True).all()
+    return build_catalog(protocols, interventions, version, current_app.json.dumps)
+
+
+class CatalogStore:
+    """Guarda o snapshot atual e recarrega quando o carimbo muda"""
+
+    def __init__(self, loader: Callable[[Optional[str]], ProtocolCatalog],
+                 version_fn: Callable[[], str], check_seconds: float = DEFAULT_CHECK_SECONDS):
+        self.loader = loader
+        self.version_fn = version_fn
+        self.check_seconds = check_seconds
+        self.catalog: Optional[ProtocolCatalog] = None
+        self.loads = 0
+        self.checks = 0
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def get(self) -> ProtocolCatalog:
+        """Snapshot atual; no máximo uma consulta de versão por intervalo"""
+        catalog = self.catalog
+        if catalog is not None and time.monotonic() - self._checked_at < self.check_seconds:
+            return catalog
+
+        with self._lock:
+            if self.catalog is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return self.catalog
+            version = self.version_fn()
+            self.checks += 1
+            if self.catalog is None or self.catalog.version != version:
+                self.catalog = self.loader(version)
+                self.loads += 1
+            self._checked_at = time.monotonic()
+            return self.catalog
+
+    def invalidate(self) -> None:
+        """Força a verificação da versão no próximo acesso"""
+        self._checked_at = float('-inf')
+
+    def stats(self) -> Dict[str, Any]:
+        data = {'loads': self.loads, 'version_checks': self.checks, 'check_seconds': self.check_seconds}
+        if self.catalog is not None:
+            data.update(self.catalog.stats())
+        return data
+
+
+def get_protocol_catalog() -> CatalogStore:
+    """Catálogo da aplicação (criado na primeira chamada)"""
+    app = current_app._get_current_object()
+    store = app.extensions.get('protocol_catalog')
+    if store is None:
+        store = CatalogStore(
+            load_catalog, catalog_version,
+            check_seconds=app.config.get('PROTOCOL_CATALOG_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)
+        )
+        app.extensions['protocol_catalog'] = store
+    return store
+
+
+def preload_protocol_catalog(app) -> None:
+    """Carrega o catálogo em segundo plano ao registrar o blueprint"""
+    if not app.config.get('PROTOCOL_CATALOG_ENABLED', True) or not app.config.get('PROTOCOL_CATALOG_PRELOAD', True):
+        return
+
+    def run():
+        with app.app_context():
+            try:
+                get_protocol_catalog().get()
+            except Exception as e:
+                logger.warning(f'Catálogo de protocolos não pré-carregado: {e}')
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run, name='protocol-catalog-preload', daemon=True).start()
+
+
+# =============================================================================
+# INVALIDAÇÃO
+# =============================================================================
+
+_PENDING_KEY = 'protocol_catalog_changed'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_catalog_changes(session, flush_context):
+    """Anota se a transação gravou protocolos ou intervenções"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if getattr(obj, '__tablename__', None) in CATALOG_TABLES:
+            session.info[_PENDING_KEY] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_catalog(session):
+    """Verifica a versão no próximo acesso, só após o commit"""
+    if not session.info.pop(_PENDING_KEY, False) or not has_app_context():
+        return
+    store = current_app.extensions.get('protocol_catalog')
+    if store is not None:
+        store.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,349 @@
+"""
+Carga em lote de protocolos clínicos e templates de intervenção
+
+Cada registro tem uma chave estável (``seed_key``: a chave da origem ou
+o título/nome normalizado) e um hash do conteúdo. A carga lê chaves e
+hashes existentes numa única consulta, compara em memória e grava só o
+que mudou: inserções em lote com ``ON CONFLICT DO NOTHING`` (PostgreSQL
+e SQLite) e atualizações em lote pela chave primária, tudo numa única
+transação. Rodar de novo com os mesmos dados não grava nada.
+
+Linhas antigas sem ``seed_key`` (da carga anterior, por título/nome)
+são adotadas em vez de duplicadas.
+"""
+
+import csv
+import hashlib
+import json
+import re
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from flask import current_app, has_app_context
+from sqlalchemy import insert, update
+
+from ..models.clinical_protocols import (
+    ClinicalProtocol, InterventionTemplate, EvidenceLevel, InterventionType, ProtocolStatus
+)
+from .. import db
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class SeedError(ValueError):
+    """Arquivo ou registro inválido para a carga"""
+
+
+@dataclass(frozen=True)
+class SeedSpec:
+    """Descrição de um tipo de registro carregável"""
+    kind: str
+    model: Any
+    label_field: str
+    fields: Tuple[str, ...]
+    required: Tuple[str, ...]
+    enums: Dict[str, Any]
+    list_fields: Tuple[str, ...]
+    dict_fields: Tuple[str, ...]
+    defaults: Dict[str, Any]
+
+
+PROTOCOL_SPEC = SeedSpec(
+    kind='protocols',
+    model=ClinicalProtocol,
+    label_field='title',
+    fields=(
+        'title', 'description', 'pathology', 'icd10_codes', 'body_region', 'specialization_area',
+        'evidence_level', 'grade_recommendation', 'references', 'indications', 'contraindications',
+        'precautions', 'phases', 'assessment_tools', 'outcome_measures', 'frequency_recommendations',
+        'inclusion_criteria', 'exclusion_criteria', 'population_modifications'
+    ),
+    required=(
+        'title', 'description', 'pathology', 'icd10_codes', 'body_region', 'specialization_area',
+        'evidence_level', 'grade_recommendation', 'references', 'indications', 'phases',
+        'assessment_tools', 'outcome_measures', 'frequency_recommendations', 'inclusion_criteria'
+    ),
+    enums={'evidence_level': EvidenceLevel},
+    list_fields=(
+        'icd10_codes', 'references', 'indications', 'contraindications', 'precautions', 'phases',
+        'assessment_tools', 'outcome_measures', 'inclusion_criteria', 'exclusion_criteria'
+    ),
+    dict_fields=('frequency_recommendations', 'population_modifications'),
+    defaults={'status': ProtocolStatus.ACTIVE, 'version': '1.0', 'usage_count': 0}
+)
+
+INTERVENTION_SPEC = SeedSpec(
+    kind='interventions',
+    model=InterventionTemplate,
+    label_field='name',
+    fields=(
+        'name', 'intervention_type', 'category', 'description', 'detailed_instructions',
+        'equipment_needed', 'default_dosage', 'progression_criteria', 'progression_modifications',
+        'contraindications', 'precautions', 'red_flags', 'evidence_references', 'evidence_level',
+        'images', 'videos'
+    ),
+    required=(
+        'name', 'intervention_type', 'category', 'description', 'detailed_instructions',
+        'default_dosage', 'evidence_level'
+    ),
+    enums={'intervention_type': InterventionType, 'evidence_level': EvidenceLevel},
+    list_fields=(
+        'equipment_needed', 'progression_criteria', 'progression_modifications', 'contraindications',
+        'precautions', 'red_flags', 'evidence_references', 'images', 'videos'
+    ),
+    dict_fields=('default_dosage',),
+    defaults={'is_active': True}
+)
+
+SPECS = {spec.kind: spec for spec in (PROTOCOL_SPEC, INTERVENTION_SPEC)}
+
+
+# =============================================================================
+# NORMALIZAÇÃO
+# =============================================================================
+
+def slugify(text: str) -> str:
+    """'Lombalgia Crônica' -> 'lombalgia-cronica'"""
+    ascii_text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', ascii_text.lower()).strip('-')[:120]
+
+
+def _enum_value(enum_cls, value):
+    if isinstance(value, enum_cls):
+        return value
+    text = str(value).strip()
+    for member in enum_cls:
+        if text in (member.value, member.name):
+            return member
+    raise SeedError(f'valor inválido para {enum_cls.__name__}: {text!r}')
+
+
+def _structured_value(field: str, value, is_list: bool):
+    """Células de CSV: JSON, ou lista separada por ';'"""
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    if text[:1] in '[{':
+        try:
+            return json.loads(text)
+        except ValueError:
+            raise SeedError(f'JSON inválido em {field}')
+    if is_list:
+        return [item.strip() for item in text.split(';') if item.strip()]
+    raise SeedError(f'{field} deve ser um objeto JSON')
+
+
+def content_hash(values: Dict[str, Any]) -> str:
+    """sha256 do conteúdo em JSON canônico (enums pelo valor)"""
+    canonical = json.dumps(
+        {key: value.value if isinstance(value, Enum) else value for key, value in values.items()},
+        sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def normalize_record(spec: SeedSpec, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Registro da origem -> colunas de conteúdo + seed_key + content_hash"""
+    missing = [field for field in spec.required if data.get(field) in (None, '')]
+    if missing:
+        raise SeedError(f'campos obrigatórios ausentes: {", ".join(missing)}')
+
+    values = {}
+    for field in spec.fields:
+        value = data.get(field)
+        if value in (None, ''):
+            value = [] if field in spec.list_fields else {} if field in spec.dict_fields else None
+        elif field in spec.enums:
+            value = _enum_value(spec.enums[field], value)
+        elif field in spec.list_fields or field in spec.dict_fields:
+            value = _structured_value(field, value, field in spec.list_fields)
+            expected = list if field in spec.list_fields else dict
+            if not isinstance(value, expected):
+                raise SeedError(f'{field} deve ser {"uma lista" if expected is list else "um objeto"}')
+        values[field] = value
+
+    seed_key = str(data.get('seed_key') or data.get('key') or slugify(values[spec.label_field]))
+    if not seed_key:
+        raise SeedError('não foi possível gerar a chave do registro')
+    values['seed_key'] = seed_key[:120]
+    values['content_hash'] = content_hash({field: values[field] for field in spec.fields})
+    return values
+
+
+def prepare_records(spec: SeedSpec, records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Normaliza todos os registros; devolve (válidos, erros por posição)"""
+    rows, errors, positions = [], [], {}
+    for index, data in enumerate(records, start=1):
+        try:
+            row = normalize_record(spec, data)
+        except SeedError as e:
+            errors.append(f'registro {index}: {e}')
+            continue
+        if row['seed_key'] in positions:
+            errors.append(f'registro {index}: chave duplicada {row["seed_key"]!r} (registro {positions[row["seed_key"]]})')
+            continue
+        positions[row['seed_key']] = index
+        rows.append(row)
+    return rows, errors
+
+
+# =============================================================================
+# ARQUIVOS
+# =============================================================================
+
+def read_seed_file(path, kind: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Lê registros de JSON ou CSV
+
+    JSON: lista de registros (do tipo ``kind``) ou objeto com as chaves
+    ``protocols`` e/ou ``interventions``. CSV: um registro por linha,
+    listas como JSON ou separadas por ';' e objetos como JSON.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == '.json':
+        with path.open(encoding='utf-8') as handle:
+            data = json.load(handle)
+        if isinstance(data, dict):
+            unknown = set(data) - set(SPECS)
+            if unknown:
+                raise SeedError(f'chaves desconhecidas no arquivo: {", ".join(sorted(unknown))}')
+            return {key: data[key] for key in SPECS if key in data}
+        if isinstance(data, list):
+            return {kind or PROTOCOL_SPEC.kind: data}
+        raise SeedError('o JSON deve ser uma lista ou um objeto')
+    if suffix == '.csv':
+        with path.open(encoding='utf-8-sig', newline='') as handle:
+            rows = [{key: value for key, value in row.items() if value not in (None, '')}
+                    for row in csv.DictReader(handle)]
+        return {kind or PROTOCOL_SPEC.kind: rows}
+    raise SeedError(f'formato não suportado: {suffix or path.name} (use .json ou .csv)')
+
+
+# =============================================================================
+# CARGA
+# =============================================================================
+
+def _insert_statement(model):
+    """INSERT que ignora chaves já gravadas por outra carga concorrente"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(model)
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=['seed_key'])
+
+
+def _chunks(rows: List[Dict[str, Any]], size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _write_rows(model, inserts: List[Dict[str, Any]], updates: List[Dict[str, Any]], batch_size: int,
+                progress: Optional[Callable[[int], None]]) -> None:
+    statement = _insert_statement(model)
+    for chunk in _chunks(inserts, batch_size):
+        db.session.execute(statement, chunk)
+        if progress:
+            progress(len(chunk))
+    for chunk in _chunks(updates, batch_size):
+        db.session.execute(update(model), chunk)
+        if progress:
+            progress(len(chunk))
+
+
+def seed_records(spec: SeedSpec, rows: List[Dict[str, Any]], created_by: str, *,
+                 batch_size: int = DEFAULT_BATCH_SIZE, dry_run: bool = False, commit: bool = True,
+                 progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+    """
+    Insere ou atualiza registros normalizados numa única transação
+
+    Args:
+        rows: saída de ``prepare_records``
+        created_by: autor das linhas novas
+        commit: com False grava na transação do chamador, que faz o
+            commit (ou rollback) e depois chama invalidate_protocol_catalog
+        progress: chamado com a quantidade de registros de cada lote
+
+    Returns:
+        dict: inseridos, atualizados, sem alteração e adotados
+    """
+    model = spec.model
+    label_column = getattr(model, spec.label_field)
+
+    existing = {
+        seed_key: (row_id, stored_hash)
+        for row_id, seed_key, stored_hash in db.session.query(
+            model.id, model.seed_key, model.content_hash
+        ).filter(model.seed_key.isnot(None))
+    }
+    legacy = {
+        label: row_id
+        for row_id, label in db.session.query(model.id, label_column).filter(model.seed_key.is_(None))
+    }
+
+    now = datetime.utcnow()
+    inserts, updates = [], []
+    unchanged = adopted = 0
+    for row in rows:
+        stored = existing.get(row['seed_key'])
+        if stored is None and row[spec.label_field] in legacy:
+            stored = (legacy.pop(row[spec.label_field]), None)
+            adopted += 1
+        if stored is None:
+            inserts.append({**spec.defaults, **row, 'id': str(uuid4()), 'created_by': created_by,
+                            'created_at': now, 'updated_at': now})
+        elif stored[1] != row['content_hash']:
+            updates.append({**row, 'id': stored[0], 'updated_at': now})
+        else:
+            unchanged += 1
+
+    if progress and unchanged:
+        progress(unchanged)
+    if dry_run:
+        if progress:
+            progress(len(inserts) + len(updates))
+    elif not commit:
+        _write_rows(model, inserts, updates, batch_size, progress)
+    else:
+        try:
+            _write_rows(model, inserts, updates, batch_size, progress)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if inserts or updates:
+            invalidate_protocol_catalog()
+
+    return {
+        'total': len(rows),
+        'inserted': len(inserts),
+        'updated': len(updates),
+        'unchanged': unchanged,
+        'adopted': adopted
+    }
+
+
+def seed(kind: str, records: List[Dict[str, Any]], created_by: str, **kwargs) -> Dict[str, int]:
+    """Normaliza e carrega; qualquer registro inválido aborta a carga"""
+    spec = SPECS[kind]
+    rows, errors = prepare_records(spec, records)
+    if errors:
+        raise SeedError('; '.join(errors))
+    return seed_records(spec, rows, created_by, **kwargs)
+
+
+def invalidate_protocol_catalog():
+    """Inserções em lote não passam pela sessão ORM: avisa o catálogo"""
+    if not has_app_context():
+        return
+    store = current_app.extensions.get('protocol_catalog')
+    if store is not None:
+        store.invalidate()
@@ -0,0 +1,407 @@
+"""
+Exportação colunar de dados clínicos para pesquisa e BI
+
+Cada tabela é lida por cursor do servidor (``yield_per``) em blocos de
+``chunk_size`` linhas, só com colunas estruturadas (sem texto livre,
+sem ``to_dict()`` e sem descriptografar nada), e gravada bloco a bloco
+em Parquet (um row group por bloco, quando o pyarrow está instalado)
+ou em CSV com gzip. A memória fica limitada a um bloco por vez.
+
+Pseudonimização: ids de pacientes, profissionais, prontuários,
+evoluções, consultas, execuções e prescrições viram HMAC-SHA256 com
+RESEARCH_EXPORT_PSEUDONYM_KEY (estável entre exportações, então as
+tabelas continuam ligadas entre si); CPF, RG, telefone, nome, e-mail e
+endereço nunca são selecionados. Por padrão só entram pacientes com
+consentimento_dados.
+
+Exportações incrementais usam uma marca d'água por tabela (maior
+``updated_at``/``created_at`` exportado), guardada em watermarks.json no
+diretório de saída e avançada só quando o arquivo termina de ser gravado.
+"""
+
+import csv
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import current_app
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, extract, func, select
+
+from ..models.appointment import Appointment
+from ..models.exercise import ExerciseExecution
+from ..models.patient import Evolution, MedicalRecord, Patient
+from .. import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10_000
+WATERMARKS_FILE = 'watermarks.json'
+FORMATS = ('auto', 'parquet', 'csv')
+
+
+class ResearchExportError(Exception):
+    """Configuração ou formato de exportação inválido"""
+
+
+@dataclass(frozen=True)
+class ExportTable:
+    """Colunas exportadas de uma tabela"""
+    name: str
+    columns: Callable[[], List[Any]]   # expressões rotuladas
+    pseudonymized: Tuple[str, ...]     # rótulos trocados por HMAC
+    watermark: Callable[[], Any]
+    source: Callable[[Any], Any]       # FROM/JOINs até Patient, recebe o select
+
+    def statement(self):
+        return self.source(select(*self.columns(), self.watermark().label('_watermark')))
+
+
+def _patient_columns():
+    return [
+        Patient.id.label('patient_id'),
+        extract('year', Patient.data_nascimento).label('birth_year'),
+        Patient.genero.label('gender'),
+        Patient.escolaridade.label('education_level'),
+        Patient.is_active,
+        Patient.created_at,
+        Patient.updated_at
+    ]
+
+
+def _medical_record_columns():
+    return [
+        MedicalRecord.id,
+        MedicalRecord.patient_id,
+        MedicalRecord.created_by,
+        MedicalRecord.data_avaliacao,
+        MedicalRecord.cid10,
+        MedicalRecord.created_at,
+        MedicalRecord.updated_at
+    ]
+
+
+def _evolution_columns():
+    return [
+        Evolution.id,
+        Evolution.medical_record_id,
+        MedicalRecord.patient_id,
+        Evolution.created_by,
+        Evolution.data_atendimento,
+        Evolution.duracao_minutos,
+        Evolution.escala_dor,
+        Evolution.created_at,
+        Evolution.updated_at
+    ]
+
+
+def _appointment_columns():
+    return [
+        Appointment.id,
+        Appointment.patient_id,
+        Appointment.therapist_id,
+        Appointment.appointment_date,
+        Appointment.start_time,
+        Appointment.duration_minutes,
+        Appointment.appointment_type,
+        Appointment.status,
+        Appointment.is_recurring,
+        Appointment.created_at,
+        Appointment.updated_at,
+        Appointment.cancelled_at
+    ]
+
+
+def _execution_columns():
+    return [
+        ExerciseExecution.id,
+        ExerciseExecution.patient_id,
+        ExerciseExecution.exercise_id,
+        ExerciseExecution.patient_exercise_id,
+        ExerciseExecution.started_at,
+        ExerciseExecution.completed_at,
+        ExerciseExecution.duration_seconds,
+        ExerciseExecution.repetitions_completed,
+        ExerciseExecution.sets_completed,
+        ExerciseExecution.patient_rating,
+        ExerciseExecution.difficulty_felt,
+        ExerciseExecution.pain_level,
+        ExerciseExecution.effort_level,
+        ExerciseExecution.location
+    ]
+
+
+def _joined_to_patient(model, patient_column):
+    return lambda statement: statement.select_from(model).join(Patient, Patient.id == patient_column)
+
+
+EXPORT_TABLES: Dict[str, ExportTable] = {
+    'patients': ExportTable(
+        'patients', _patient_columns, ('patient_id',),
+        lambda: func.coalesce(Patient.updated_at, Patient.created_at),
+        lambda statement: statement.select_from(Patient)
+    ),
+    'medical_records': ExportTable(
+        'medical_records', _medical_record_columns, ('id', 'patient_id', 'created_by'),
+        lambda: func.coalesce(MedicalRecord.updated_at, MedicalRecord.created_at),
+        _joined_to_patient(MedicalRecord, MedicalRecord.patient_id)
+    ),
+    'evolutions': ExportTable(
+        'evolutions', _evolution_columns, ('id', 'medical_record_id', 'patient_id', 'created_by'),
+        lambda: func.coalesce(Evolution.updated_at, Evolution.created_at),
+        lambda statement: statement.select_from(Evolution)
+        .join(MedicalRecord, MedicalRecord.id == Evolution.medical_record_id)
+        .join(Patient, Patient.id == MedicalRecord.patient_id)
+    ),
+    'appointments': ExportTable(
+        'appointments', _appointment_columns, ('id', 'patient_id', 'therapist_id'),
+        lambda: func.coalesce(Appointment.updated_at, Appointment.created_at),
+        _joined_to_patient(Appointment, Appointment.patient_id)
+    ),
+    # Execuções não têm updated_at: a conclusão é a última mudança
+    'exercise_executions': ExportTable(
+        'exercise_executions', _execution_columns, ('id', 'patient_id', 'patient_exercise_id'),
+        lambda: func.coalesce(ExerciseExecution.completed_at, ExerciseExecution.started_at),
+        _joined_to_patient(ExerciseExecution, ExerciseExecution.patient_id)
+    ),
+}
+
+
+# =============================================================================
+# PSEUDONIMIZAÇÃO
+# =============================================================================
+
+class Pseudonymizer:
+    """HMAC-SHA256 truncado dos ids (mesmo id, mesmo pseudônimo)"""
+
+    def __init__(self, key: str, max_cached: int = 100_000):
+        if not key:
+            raise ResearchExportError('RESEARCH_EXPORT_PSEUDONYM_KEY não configurada')
+        self._key = key.encode('utf-8')
+        self._cache: Dict[str, str] = {}
+        self._max_cached = max_cached
+
+    def __call__(self, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        pseudonym = self._cache.get(value)
+        if pseudonym is None:
+            pseudonym = hmac.new(self._key, str(value).encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+            if len(self._cache) >= self._max_cached:
+                self._cache.clear()
+            self._cache[value] = pseudonym
+        return pseudonym
+
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+# =============================================================================
+# ESCRITORES
+# =============================================================================
+
+def _arrow_type(pa, sql_type):
+    if isinstance(sql_type, Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(sql_type, Date):
+        return pa.date32()
+    if isinstance(sql_type, Integer):
+        return pa.int64()
+    if isinstance(sql_type, Float):
+        return pa.float64()
+    return pa.string()
+
+
+class ParquetChunkWriter:
+    """Um row group por bloco, com esquema fixo (blocos só com nulos não mudam o tipo)"""
+    extension = '.parquet'
+
+    def __init__(self, path: str, columns: Sequence[Tuple[str, Any]]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.schema = pa.schema([(name, _arrow_type(pa, sql_type)) for name, sql_type in columns])
+        self._writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, rows: List[Tuple]) -> None:
+        arrays = [
+            self._pa.array(list(values), type=field.type)
+            for values, field in zip(zip(*rows), self.schema)
+        ]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class CsvGzipChunkWriter:
+    """CSV com gzip, escrito bloco a bloco"""
+    extension = '.csv.gz'
+
+    def __init__(self, path: str, columns: Sequence[Tuple[str, Any]]):
+        self._file = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in columns])
+
+    def write(self, rows: List[Tuple]) -> None:
+        self._writer.writerows(
+            [[value.isoformat() if isinstance(value, (date, datetime)) else value for value in row] for row in rows]
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def writer_class(fmt: str):
+    """Formato pedido -> escritor ('auto' usa Parquet se o pyarrow estiver instalado)"""
+    if fmt not in FORMATS:
+        raise ResearchExportError(f'Formato inválido: {fmt} (use {", ".join(FORMATS)})')
+    if fmt == 'parquet' and not parquet_available():
+        raise ResearchExportError('Parquet requer o pacote pyarrow')
+    if fmt == 'parquet' or (fmt == 'auto' and parquet_available()):
+        return ParquetChunkWriter
+    return CsvGzipChunkWriter
+
+
+# =============================================================================
+# EXPORTAÇÃO
+# =============================================================================
+
+def export_table(table: ExportTable, output_dir: str, writer=CsvGzipChunkWriter,
+                 since: Optional[datetime] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 pseudonymize: Optional[Pseudonymizer] = None, consented_only: bool = True) -> Dict[str, Any]:
+    """
+    Exporta as linhas com marca d'água posterior a ``since``
+
+    O arquivo é gravado com sufixo .tmp e renomeado no fim; sem linhas
+    novas nenhum arquivo é criado.
+    """
+
+    statement = table.statement()
+    watermark = statement.selected_columns._watermark
+    if consented_only:
+        statement = statement.where(Patient.consentimento_dados == True)  # noqa: E712
+    if since is not None:
+        statement = statement.where(watermark > since)
+    statement = statement.order_by(watermark, statement.selected_columns[0])
+
+    columns = [(column.name, column.type) for column in statement.selected_columns if column.name != '_watermark']
+    pseudonymized = [index for index, (name, _) in enumerate(columns) if name in table.pseudonymized]
+
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    path = os.path.join(output_dir, f'{table.name}_{stamp}{writer.extension}')
+    temporary = f'{path}.tmp'
+    output = None
+    rows_written = chunks = 0
+    last_watermark = None
+
+    result = db.session.execute(statement.execution_options(yield_per=chunk_size))
+    try:
+        for partition in result.partitions():
+            rows = []
+            for row in partition:
+                values = [_plain(value) for value in row[:-1]]
+                for index in pseudonymized:
+                    values[index] = pseudonymize(values[index])
+                rows.append(tuple(values))
+                last_watermark = row[-1]
+            if output is None:
+                output = writer(temporary, columns)
+            output.write(rows)
+            rows_written += len(rows)
+            chunks += 1
+        if output is not None:
+            output.close()
+            os.replace(temporary, path)
+    except Exception:
+        if output is not None:
+            output.close()
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    finally:
+        result.close()
+
+    return {
+        'table': table.name,
+        'rows': rows_written,
+        'chunks': chunks,
+        'file': path if rows_written else None,
+        'watermark': last_watermark.isoformat() if isinstance(last_watermark, datetime) else last_watermark
+    }
+
+
+def load_watermarks(output_dir: str) -> Dict[str, str]:
+    path = os.path.join(output_dir, WATERMARKS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def save_watermarks(output_dir: str, watermarks: Dict[str, str]) -> None:
+    path = os.path.join(output_dir, WATERMARKS_FILE)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as handle:
+        json.dump(watermarks, handle, indent=2, sort_keys=True)
+    os.replace(f'{path}.tmp', path)
+
+
+def run_research_export(output_dir: Optional[str] = None, tables: Optional[Iterable[str]] = None,
+                        fmt: Optional[str] = None, full: bool = False, chunk_size: Optional[int] = None,
+                        consented_only: bool = True) -> List[Dict[str, Any]]:
+    """
+    Exporta as tabelas pedidas (todas por padrão) de forma incremental
+
+    ``full`` ignora as marcas d'água (exporta tudo e as regrava).
+    """
+
+    config = current_app.config
+    output_dir = output_dir or config.get('RESEARCH_EXPORT_DIR', 'instance/research_exports')
+    names = list(tables or EXPORT_TABLES)
+    unknown = [name for name in names if name not in EXPORT_TABLES]
+    if unknown:
+        raise ResearchExportError(f'Tabelas desconhecidas: {", ".join(unknown)}')
+
+    writer = writer_class(fmt or config.get('RESEARCH_EXPORT_FORMAT', 'auto'))
+    key = config.get('RESEARCH_EXPORT_PSEUDONYM_KEY')
+    if not key:
+        logger.warning('RESEARCH_EXPORT_PSEUDONYM_KEY ausente: usando SECRET_KEY (trocar a chave muda os pseudônimos)')
+        key = config.get('SECRET_KEY')
+    pseudonymize = Pseudonymizer(key)
+
+    os.makedirs(output_dir, exist_ok=True)
+    watermarks = {} if full else load_watermarks(output_dir)
+    results = []
+    for name in names:
+        since = watermarks.get(name)
+        result = export_table(
+            EXPORT_TABLES[name], output_dir, writer=writer,
+            since=datetime.fromisoformat(since) if since else None,
+            chunk_size=chunk_size or config.get('RESEARCH_EXPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE),
+            pseudonymize=pseudonymize, consented_only=consented_only
+        )
+        if result['watermark']:
+            watermarks[name] = result['watermark']
+            save_watermarks(output_dir, watermarks)
+        results.append(result)
+    return results
@@ -0,0 +1,268 @@
+"""
+Burndown diário dos sprints mantido incrementalmente
+
+sprint_burndown_snapshots guarda uma linha por sprint e dia com os totais
+do fim do dia. Cada flush que muda status, pontos, sprint ou arquivamento
+de tarefas (ou registra horas em TimeLog) soma a diferença na linha de
+hoje, na mesma transação; a primeira mudança do dia copia a linha do
+último dia com movimento. Assim o gráfico lê só as linhas do sprint, sem
+varrer o histórico das tarefas.
+
+As gravações em lote (task_bulk) não passam pelo unit of work e chamam
+apply_burndown_deltas diretamente.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, fields
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from ..models.project_management import Sprint, SprintBurndown, Task, TaskStatus, TimeLog
+from .. import db
+
+
+@dataclass
+class BurndownDelta:
+    """Variação dos totais de um sprint"""
+    total_tasks: int = 0
+    completed_tasks: int = 0
+    total_points: int = 0
+    completed_points: int = 0
+    hours_logged: float = 0.0
+
+    def add(self, other: 'BurndownDelta', sign: int = 1) -> None:
+        for field in fields(self):
+            setattr(self, field.name, getattr(self, field.name) + sign * getattr(other, field.name))
+
+    def is_zero(self) -> bool:
+        return not any(getattr(self, field.name) for field in fields(self))
+
+
+def task_contribution(status, story_points, is_archived=False) -> BurndownDelta:
+    """Quanto uma tarefa soma aos totais do sprint"""
+    if is_archived:
+        return BurndownDelta()
+    done = status == TaskStatus.DONE
+    points = story_points or 0
+    return BurndownDelta(
+        total_tasks=1,
+        completed_tasks=1 if done else 0,
+        total_points=points,
+        completed_points=points if done else 0
+    )
+
+
+class BurndownChanges:
+    """Acumula as variações por sprint antes de gravar"""
+
+    def __init__(self):
+        self.deltas: Dict[str, BurndownDelta] = defaultdict(BurndownDelta)
+
+    def move(self, old_sprint_id: Optional[str], old: BurndownDelta,
+             new_sprint_id: Optional[str], new: BurndownDelta) -> None:
+        """Tarefa saiu de (old_sprint_id, old) e entrou em (new_sprint_id, new)"""
+        if old_sprint_id:
+            self.deltas[old_sprint_id].add(old, -1)
+        if new_sprint_id:
+            self.deltas[new_sprint_id].add(new)
+
+    def log_hours(self, sprint_id: Optional[str], hours: float) -> None:
+        if sprint_id and hours:
+            self.deltas[sprint_id].hours_logged += hours
+
+    def pending(self) -> Dict[str, BurndownDelta]:
+        return {sprint_id: delta for sprint_id, delta in self.deltas.items() if not delta.is_zero()}
+
+
+# =============================================================================
+# GRAVAÇÃO
+# =============================================================================
+
+_COUNTERS = tuple(field.name for field in fields(BurndownDelta))
+
+
+def current_totals(connection, sprint_id: str) -> Dict[str, Any]:
+    """Totais atuais do sprint (só na primeira linha do sprint)"""
+
+    done = Task.status == TaskStatus.DONE
+    row = connection.execute(select(
+        func.count(Task.id),
+        func.coalesce(func.sum(case((done, 1), else_=0)), 0),
+        func.coalesce(func.sum(Task.story_points), 0),
+        func.coalesce(func.sum(case((done, Task.story_points), else_=0)), 0)
+    ).where(Task.sprint_id == sprint_id, Task.is_archived == False)).one()  # noqa: E712
+    hours = connection.execute(
+        select(func.coalesce(func.sum(TimeLog.hours), 0.0))
+        .join(Task, Task.id == TimeLog.task_id)
+        .where(Task.sprint_id == sprint_id)
+    ).scalar()
+    return dict(zip(_COUNTERS, (row[0], row[1], row[2], row[3], float(hours))))
+
+
+def _insert_snapshot_statement():
+    """INSERT que ignora a linha criada por uma transação concorrente"""
+    table = SprintBurndown.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(table)
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=['sprint_id', 'day'])
+
+
+def apply_burndown_deltas(deltas: Dict[str, BurndownDelta], connection=None, day: Optional[date] = None) -> None:
+    """
+    Soma as variações na linha do dia de cada sprint
+
+    Deve rodar depois que as mudanças foram enviadas ao banco (flush), na
+    mesma transação. Não faz commit.
+    """
+
+    if not deltas:
+        return
+    connection = connection if connection is not None else db.session.connection()
+    day = day or datetime.utcnow().date()
+    table = SprintBurndown.__table__
+    now = datetime.utcnow()
+
+    for sprint_id, delta in deltas.items():
+        increment = (
+            update(table)
+            .where(table.c.sprint_id == sprint_id, table.c.day == day)
+            .values(updated_at=now, **{name: table.c[name] + getattr(delta, name) for name in _COUNTERS})
+        )
+        if connection.execute(increment).rowcount:
+            continue
+
+        # Primeira mudança do dia: parte do último dia com movimento
+        previous = connection.execute(
+            select(table).where(table.c.sprint_id == sprint_id, table.c.day < day)
+            .order_by(table.c.day.desc()).limit(1)
+        ).mappings().first()
+        if previous is not None:
+            values = {name: previous[name] + getattr(delta, name) for name in _COUNTERS}
+        else:
+            # Primeira linha do sprint: o banco já inclui esta mudança
+            values = current_totals(connection, sprint_id)
+
+        inserted = connection.execute(
+            _insert_snapshot_statement(), [{'sprint_id': sprint_id, 'day': day, 'updated_at': now, **values}]
+        )
+        if not inserted.rowcount:
+            connection.execute(increment)
+
+
+def _old_value(state, name):
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, name)
+
+
+def collect_session_changes(session) -> BurndownChanges:
+    """Variações do flush atual (tarefas e registros de horas)"""
+
+    changes = BurndownChanges()
+    hours_by_task: Dict[str, float] = defaultdict(float)
+
+    for obj in session.new:
+        if isinstance(obj, Task):
+            changes.move(None, BurndownDelta(), obj.sprint_id,
+                         task_contribution(obj.status or TaskStatus.BACKLOG, obj.story_points, obj.is_archived))
+        elif isinstance(obj, TimeLog):
+            hours_by_task[obj.task_id] += obj.hours or 0
+
+    for obj in session.dirty:
+        if isinstance(obj, Task):
+            state = inspect(obj)
+            tracked = ('status', 'story_points', 'sprint_id', 'is_archived')
+            if not any(state.attrs[name].history.has_changes() for name in tracked):
+                continue
+            changes.move(
+                _old_value(state, 'sprint_id'),
+                task_contribution(_old_value(state, 'status'), _old_value(state, 'story_points'),
+                                  _old_value(state, 'is_archived')),
+                obj.sprint_id,
+                task_contribution(obj.status, obj.story_points, obj.is_archived)
+            )
+        elif isinstance(obj, TimeLog):
+            state = inspect(obj)
+            if state.attrs.hours.history.has_changes():
+                hours_by_task[obj.task_id] += (obj.hours or 0) - (_old_value(state, 'hours') or 0)
+
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            changes.move(obj.sprint_id, task_contribution(obj.status, obj.story_points, obj.is_archived),
+                         None, BurndownDelta())
+        elif isinstance(obj, TimeLog):
+            hours_by_task[obj.task_id] -= obj.hours or 0
+
+    hours_by_task = {task_id: hours for task_id, hours in hours_by_task.items() if hours}
+    if hours_by_task:
+        sprints = dict(session.connection().execute(
+            select(Task.id, Task.sprint_id).where(Task.id.in_(list(hours_by_task)))
+        ).all())
+        for task_id, hours in hours_by_task.items():
+            changes.log_hours(sprints.get(task_id), hours)
+
+    return changes
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_burndown_changes(session, flush_context):
+    """Atualiza as linhas do dia na transação do flush"""
+    if not any(isinstance(obj, (Task, TimeLog)) for obj in
+               list(session.new) + list(session.dirty) + list(session.deleted)):
+        return
+    apply_burndown_deltas(collect_session_changes(session).pending(), connection=session.connection())
+
+
+# =============================================================================
+# LEITURA
+# =============================================================================
+
+def sprint_burndown(sprint: Sprint, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Série diária do sprint (do primeiro dia com dados até hoje/fim do sprint)
+
+    Dias sem movimento repetem o último valor. A linha ideal vai dos pontos
+    do início do sprint a zero no último dia.
+    """
+
+    today = today or datetime.utcnow().date()
+    snapshots = SprintBurndown.query.filter(
+        SprintBurndown.sprint_id == sprint.id,
+        SprintBurndown.day <= sprint.end_date
+    ).order_by(SprintBurndown.day).all()
+
+    if not snapshots:
+        # Sprint sem movimento desde a criação da tabela: só a situação atual
+        totals = current_totals(db.session.connection(), sprint.id)
+        snapshots = [SprintBurndown(sprint_id=sprint.id, day=min(today, sprint.end_date), **totals)]
+
+    # Mudanças do planejamento (antes do início) entram no primeiro dia
+    day = max(sprint.start_date, snapshots[0].day)
+    last_day = min(today, sprint.end_date)
+    current = [snapshot for snapshot in snapshots if snapshot.day <= day][-1]
+    by_day = {snapshot.day: snapshot for snapshot in snapshots}
+
+    days = []
+    while day <= last_day:
+        current = by_day.get(day, current)
+        days.append(dict(current.to_dict(), day=day.isoformat()))
+        day += timedelta(days=1)
+
+    start_points = days[0]['total_points'] if days else 0
+    duration = max((sprint.end_date - sprint.start_date).days, 1)
+    ideal = [
+        {'day': (sprint.start_date + timedelta(days=offset)).isoformat(),
+         'remaining_points': round(start_points * (1 - offset / duration), 2)}
+        for offset in range(duration + 1)
+    ]
+
+    return {'sprint': sprint.to_dict(), 'days': days, 'ideal': ideal}
@@ -0,0 +1,261 @@
+"""
+Protocolo de sincronização offline-first do app mobile
+
+Pull: o cliente envia o token (último ``seq`` do changelog visto) e
+recebe apenas as linhas alteradas depois dele, já deduplicadas, mais
+tombstones das excluídas. Sem token, recebe um snapshot completo.
+
+Push: execuções registradas offline chegam em lote com ``client_id``
+(chave de idempotência); reenvios do mesmo item não duplicam nada.
+Notas do paciente nas prescrições usam controle otimista por
+``base_updated_at`` e o servidor vence em caso de conflito.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, insert
+from sqlalchemy.orm import joinedload
+
+from ..models.exercise import PatientExercise, ExerciseExecution
+from ..models.sync import SyncChange, SyncOperation
+from .. import db
+
+DEFAULT_PULL_LIMIT = 500
+MAX_PULL_LIMIT = 2000
+DEFAULT_HISTORY_DAYS = 90
+
+# Alterações mais novas que a janela não são entregues ainda: no
+# PostgreSQL um seq menor pode ser confirmado depois de um maior, e o
+# cliente avançaria o token por cima dele.
+DEFAULT_SAFETY_WINDOW_SECONDS = 2
+
+
+class InvalidSyncToken(ValueError):
+    """Token de sincronização inválido"""
+
+
+def parse_token(token: Optional[str]) -> Optional[int]:
+    """Converte o token opaco em seq (None = snapshot completo)"""
+    if token in (None, '', '0'):
+        return None
+    try:
+        seq = int(token)
+    except (TypeError, ValueError):
+        raise InvalidSyncToken(f'Token inválido: {token}')
+    if seq < 0:
+        raise InvalidSyncToken(f'Token inválido: {token}')
+    return seq
+
+
+def parse_client_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Data ISO 8601 enviada pelo app (com ou sem fuso) como UTC ingênuo"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    # Armazenamos UTC ingênuo, como o restante do sistema
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+
+def record_sync_changes(entity_type: str, entities: Iterable[Tuple[str, str]],
+                        operation: str = SyncOperation.UPSERT) -> None:
+    """
+    Registra alterações feitas fora do flush do ORM (bulk insert/update)
+
+    Args:
+        entity_type: nome da tabela sincronizável
+        entities: pares (entity_id, patient_id)
+        operation: SyncOperation.UPSERT ou SyncOperation.DELETE
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'patient_id': patient_id,
+            'operation': operation,
+            'changed_at': now
+        }
+        for entity_id, patient_id in entities
+    ]
+    if rows:
+        db.session.execute(insert(SyncChange), rows)
+
+
+def _safety_cutoff() -> datetime:
+    window = current_app.config.get('SYNC_SAFETY_WINDOW_SECONDS', DEFAULT_SAFETY_WINDOW_SECONDS)
+    return datetime.utcnow() - timedelta(seconds=window)
+
+
+def _serialize_prescriptions(ids: List[str]) -> List[Dict[str, Any]]:
+    if not ids:
+        return []
+    prescriptions = PatientExercise.query.options(
+        joinedload(PatientExercise.exercise)
+    ).filter(PatientExercise.id.in_(ids)).all()
+    return [pe.to_dict(include_exercise=True) for pe in prescriptions]
+
+
+def _serialize_executions(ids: List[str]) -> List[Dict[str, Any]]:
+    if not ids:
+        return []
+    executions = ExerciseExecution.query.options(
+        joinedload(ExerciseExecution.patient_exercise).joinedload(PatientExercise.exercise)
+    ).filter(ExerciseExecution.id.in_(ids)).all()
+    return [execution.to_dict() for execution in executions]
+
+
+SERIALIZERS = {
+    'patient_exercises': _serialize_prescriptions,
+    'exercise_executions': _serialize_executions,
+}
+
+
+def _empty_changes() -> Dict[str, Dict[str, list]]:
+    return {entity: {'upserted': [], 'deleted': []} for entity in SERIALIZERS}
+
+
+def snapshot(patient_id: str, history_days: int = DEFAULT_HISTORY_DAYS) -> Dict[str, Any]:
+    """Estado completo do paciente para a primeira sincronização"""
+
+    cutoff = _safety_cutoff()
+
+    # Token capturado antes da leitura: o que mudar durante o snapshot
+    # será reenviado no próximo pull (upserts são idempotentes).
+    token = db.session.query(func.max(SyncChange.seq)).filter(
+        SyncChange.changed_at <= cutoff
+    ).scalar() or 0
+
+    changes = _empty_changes()
+
+    prescription_ids = [
+        row.id for row in db.session.query(PatientExercise.id).filter(
+            PatientExercise.patient_id == patient_id,
+            PatientExercise.is_active == True
+        )
+    ]
+    changes['patient_exercises']['upserted'] = _serialize_prescriptions(prescription_ids)
+
+    since = datetime.utcnow() - timedelta(days=history_days)
+    execution_ids = [
+        row.id for row in db.session.query(ExerciseExecution.id).filter(
+            ExerciseExecution.patient_id == patient_id,
+            ExerciseExecution.started_at >= since
+        )
+    ]
+    changes['exercise_executions']['upserted'] = _serialize_executions(execution_ids)
+
+    return {
+        'token': str(token),
+        'has_more': False,
+        'snapshot': True,
+        'changes': changes
+    }
+
+
+def pull_changes(patient_id: str, since: Optional[int], limit: int = DEFAULT_PULL_LIMIT,
+                 history_days: int = DEFAULT_HISTORY_DAYS) -> Dict[str, Any]:
+    """Retorna as alterações do paciente desde o token ``since``"""
+
+    if since is None:
+        return snapshot(patient_id, history_days=history_days)
+
+    limit = max(1, min(limit, MAX_PULL_LIMIT))
+
+    rows = SyncChange.query.filter(
+        SyncChange.patient_id == patient_id,
+        SyncChange.seq > since,
+        SyncChange.changed_at <= _safety_cutoff()
+    ).order_by(SyncChange.seq).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Deduplica: vale a última operação de cada entidade
+    latest: Dict[Tuple[str, str], str] = {}
+    for change in rows:
+        latest[(change.entity_type, change.entity_id)] = change.operation
+
+    changes = _empty_changes()
+    upserts: Dict[str, List[str]] = {entity: [] for entity in SERIALIZERS}
+    for (entity_type, entity_id), operation in latest.items():
+        if entity_type not in SERIALIZERS:
+            continue
+        if operation == SyncOperation.DELETE:
+            changes[entity_type]['deleted'].append(entity_id)
+        else:
+            upserts[entity_type].append(entity_id)
+
+    for entity_type, ids in upserts.items():
+        changes[entity_type]['upserted'] = SERIALIZERS[entity_type](ids)
+
+    return {
+        'token': str(rows[-1].seq if rows else since),
+        'has_more': has_more,
+        'snapshot': False,
+        'changes': changes
+    }
+
+
+def push_prescription_notes(user, updates: List[Dict[str, Any]]) -> Dict[str, list]:
+    """
+    Aplica notas do paciente editadas offline
+
+    Cada item traz ``id``, ``patient_notes`` e ``base_updated_at`` (o
+    ``updated_at`` que o cliente tinha ao editar). Se a prescrição mudou
+    no servidor depois disso, o item vira conflito e o servidor vence.
+    """
+    result = {'applied': [], 'conflicts': [], 'errors': []}
+    if not updates:
+        return result
+
+    ids = [item.get('id') for item in updates if isinstance(item, dict)]
+    prescriptions = {
+        pe.id: pe for pe in PatientExercise.query.filter(PatientExercise.id.in_(ids))
+    }
+
+    for index, item in enumerate(updates):
+        if not isinstance(item, dict) or 'patient_notes' not in item:
+            result['errors'].append({'index': index, 'error': 'Item inválido'})
+            continue
+
+        prescription = prescriptions.get(item.get('id'))
+        if not prescription:
+            result['errors'].append({'index': index, 'error': 'Prescrição não encontrada'})
+            continue
+
+        if (user.role == 'PACIENTE' and prescription.patient_id != user.id) or \
+                (user.role == 'FISIOTERAPEUTA' and prescription.prescribed_by != user.id):
+            result['errors'].append({'index': index, 'error': 'Acesso não autorizado'})
+            continue
+
+        try:
+            base_updated_at = parse_client_datetime(item['base_updated_at'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            base_updated_at = None
+        if base_updated_at is None:
+            result['errors'].append({'index': index, 'error': 'base_updated_at inválido'})
+            continue
+
+        if prescription.updated_at and prescription.updated_at > base_updated_at:
+            result['conflicts'].append({
+                'index': index,
+                'id': prescription.id,
+                'resolution': 'server_wins',
+                'server': prescription.to_dict(include_exercise=False)
+            })
+            continue
+
+        prescription.patient_notes = item['patient_notes']
+        prescription.updated_at = datetime.utcnow()
+        result['applied'].append({
+            'index': index,
+            'id': prescription.id,
+            'updated_at': prescription.updated_at.isoformat()
+        })
+
+    db.session.commit()
+    return result
@@ -0,0 +1,397 @@
+"""
+Importação, exportação e atualização em lote de tarefas
+
+Importar N tarefas custa um punhado de comandos, não N requisições: os
+usuários e sprints referenciados são lidos numa consulta cada, as chaves
+vêm de uma única reserva no contador do projeto (task_keys), as posições
+de uma leitura do fim de cada coluna, e as linhas entram num INSERT em
+lote, tudo numa transação. A atualização em lote segue o mesmo modelo
+(UPDATE em lote pela chave primária). A exportação lê as tarefas em
+blocos (cursor do servidor no PostgreSQL) e gera o CSV aos poucos.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import func, insert, or_, select, update
+
+from ..models.project_management import Project, Sprint, Task, TaskPriority, TaskStatus, TaskType
+from ..models.user import User
+from .board_ordering import COLUMN_STATUSES, POSITION_GAP, STATUS_COLUMNS, append_position, lock_board
+from .sprint_burndown import BurndownChanges, BurndownDelta, apply_burndown_deltas, task_contribution
+from .task_keys import format_task_key, allocate_task_numbers
+from .. import db
+
+MAX_IMPORT_TASKS = 5000
+MAX_BATCH_UPDATE = 1000
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FIELDS = (
+    'key', 'title', 'description', 'task_type', 'status', 'priority', 'column_id', 'assignee_email',
+    'story_points', 'estimated_hours', 'actual_hours', 'due_date', 'sprint_id', 'labels',
+    'created_at', 'updated_at', 'completed_date'
+)
+
+
+class TaskBulkError(ValueError):
+    """Arquivo, registro ou lote inválido (``errors`` detalha cada item)"""
+
+    def __init__(self, message: str, errors: Optional[List[str]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+# =============================================================================
+# LEITURA E VALIDAÇÃO
+# =============================================================================
+
+def read_task_records(content: str, fmt: str) -> List[Dict[str, Any]]:
+    """
+    Lê tarefas de JSON (lista ou ``{"tasks": [...]}``) ou CSV
+
+    No CSV, labels e critérios de aceitação são separados por ';'.
+    """
+    if fmt == 'json':
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            raise TaskBulkError(f'JSON inválido: {e}')
+        if isinstance(data, dict):
+            data = data.get('tasks')
+        if not isinstance(data, list):
+            raise TaskBulkError('o JSON deve ser uma lista de tarefas ou um objeto com "tasks"')
+        return data
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(content.lstrip('\ufeff'), newline=''))
+        return [{key: value for key, value in row.items() if key and value not in (None, '')} for row in reader]
+    raise TaskBulkError(f'formato não suportado: {fmt} (use json ou csv)')
+
+
+def _enum(enum_class, value, field: str) -> Enum:
+    """Aceita o valor ('funcionalidade') ou o nome ('FEATURE'), sem diferenciar maiúsculas"""
+    if isinstance(value, enum_class):
+        return value
+    text = str(value).strip()
+    for member in enum_class:
+        if text.lower() == member.value or text.upper() == member.name:
+            return member
+    raise TaskBulkError(f'{field} inválido: {value!r}')
+
+
+def _list(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return [item.strip() for item in str(value).split(';') if item.strip()]
+
+
+def _number(value, cast, field: str):
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise TaskBulkError(f'{field} inválido: {value!r}')
+
+
+def _date(value, field: str) -> Optional[date]:
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        raise TaskBulkError(f'{field} inválido: {value!r} (use AAAA-MM-DD)')
+
+
+def _user_ids(ids: Iterable[str], emails: Iterable[str]) -> Tuple[set, Dict[str, str]]:
+    """IDs existentes e mapa email -> id, numa consulta só"""
+    ids, emails = set(ids), {email.strip().lower() for email in emails}
+    if not ids and not emails:
+        return set(), {}
+    rows = db.session.query(User.id, User.email).filter(
+        or_(User.id.in_(ids), func.lower(User.email).in_(emails))
+    ).all()
+    return {row.id for row in rows}, {row.email.lower(): row.id for row in rows if row.email}
+
+
+def _sprint_ids(project_id: str, ids: Iterable[str]) -> set:
+    ids = set(ids)
+    if not ids:
+        return set()
+    return {row.id for row in db.session.query(Sprint.id).filter(Sprint.project_id == project_id, Sprint.id.in_(ids))}
+
+
+def prepare_task_rows(project: Project, records: List[Dict[str, Any]],
+                      reporter_id: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Valida e normaliza os registros; devolve (linhas sem chave/posição, erros por posição)"""
+
+    if len(records) > MAX_IMPORT_TASKS:
+        raise TaskBulkError(f'máximo de {MAX_IMPORT_TASKS} tarefas por importação')
+
+    # Referências lidas de uma vez para todo o lote
+    user_ids, users_by_email = _user_ids(
+        (r['assignee_id'] for r in records if isinstance(r, dict) and r.get('assignee_id')),
+        (r['assignee_email'] for r in records if isinstance(r, dict) and r.get('assignee_email'))
+    )
+    sprint_ids = _sprint_ids(project.id, (r['sprint_id'] for r in records if isinstance(r, dict) and r.get('sprint_id')))
+
+    now = datetime.utcnow()
+    rows, errors = [], []
+    for index, record in enumerate(records, start=1):
+        try:
+            if not isinstance(record, dict):
+                raise TaskBulkError('registro deve ser um objeto')
+            title = str(record.get('title') or '').strip()
+            if not title:
+                raise TaskBulkError('title é obrigatório')
+            if len(title) > 300:
+                raise TaskBulkError('title com mais de 300 caracteres')
+            if not record.get('task_type'):
+                raise TaskBulkError('task_type é obrigatório')
+
+            status = _enum(TaskStatus, record.get('status') or TaskStatus.BACKLOG, 'status')
+            column_id = record.get('column_id') or STATUS_COLUMNS[status]
+            if record.get('column_id') and record.get('status') is None:
+                status = COLUMN_STATUSES.get(column_id, TaskStatus.TODO)
+
+            assignee_id = record.get('assignee_id')
+            if assignee_id and assignee_id not in user_ids:
+                raise TaskBulkError(f'assignee_id não encontrado: {assignee_id}')
+            if not assignee_id and record.get('assignee_email'):
+                assignee_id = users_by_email.get(record['assignee_email'].strip().lower())
+                if not assignee_id:
+                    raise TaskBulkError(f'assignee_email não encontrado: {record["assignee_email"]}')
+
+            sprint_id = record.get('sprint_id')
+            if sprint_id and sprint_id not in sprint_ids:
+                raise TaskBulkError(f'sprint_id não pertence ao projeto: {sprint_id}')
+
+            rows.append({
+                'id': str(uuid4()),
+                'project_id': project.id,
+                'title': title,
+                'description': record.get('description'),
+                'task_type': _enum(TaskType, record['task_type'], 'task_type'),
+                'status': status,
+                'priority': _enum(TaskPriority, record.get('priority') or TaskPriority.MEDIUM, 'priority'),
+                'column_id': column_id,
+                'assignee_id': assignee_id,
+                'reporter_id': reporter_id,
+                'story_points': _number(record.get('story_points'), int, 'story_points'),
+                'estimated_hours': _number(record.get('estimated_hours'), float, 'estimated_hours'),
+                'actual_hours': 0.0,
+                'due_date': _date(record.get('due_date'), 'due_date'),
+                'completed_date': now if status == TaskStatus.DONE else None,
+                'sprint_id': sprint_id,
+                'depends_on': [],
+                'labels': _list(record.get('labels')),
+                'components': [],
+                'attachments': [],
+                'external_links': [],
+                'acceptance_criteria': _list(record.get('acceptance_criteria')),
+                'is_archived': False,
+                'created_at': now,
+                'updated_at': now,
+            })
+        except TaskBulkError as e:
+            errors.append(f'registro {index}: {e}')
+    return rows, errors
+
+
+# =============================================================================
+# IMPORTAÇÃO E ATUALIZAÇÃO EM LOTE
+# =============================================================================
+
+def import_tasks(project: Project, records: List[Dict[str, Any]], reporter_id: str,
+                 dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Cria as tarefas numa única transação (tudo ou nada)
+
+    Raises:
+        TaskBulkError: se algum registro for inválido (nada é gravado)
+    """
+
+    rows, errors = prepare_task_rows(project, records, reporter_id)
+    if errors:
+        raise TaskBulkError(f'{len(errors)} registros inválidos', errors)
+    if dry_run or not rows:
+        return {'imported': 0 if dry_run else len(rows), 'valid': len(rows), 'keys': []}
+
+    try:
+        lock_board(project.id)
+
+        # Uma reserva de chaves para o lote inteiro
+        numbers = allocate_task_numbers(project.id, len(rows))
+        for row, number in zip(rows, numbers):
+            row['key'] = format_task_key(project.key, number)
+
+        # Fim de cada coluna lido uma vez; as novas entram em sequência
+        next_positions = {}
+        for row in rows:
+            column_id = row['column_id']
+            if column_id not in next_positions:
+                next_positions[column_id] = append_position(project.id, column_id)
+            row['board_position'] = next_positions[column_id]
+            next_positions[column_id] += POSITION_GAP
+
+        db.session.execute(insert(Task), rows)
+
+        # INSERT em lote não passa pelo flush: burndown dos sprints aqui
+        burndown = BurndownChanges()
+        for row in rows:
+            burndown.move(None, BurndownDelta(), row['sprint_id'],
+                          task_contribution(row['status'], row['story_points']))
+        apply_burndown_deltas(burndown.pending())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {'imported': len(rows), 'valid': len(rows), 'keys': [row['key'] for row in rows]}
+
+
+def batch_update_tasks(project: Project, task_ids: List[str], changes: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Aplica status/responsável/sprint a várias tarefas numa transação
+
+    ``changes`` aceita ``status``, ``assignee_id`` e ``sprint_id`` (None
+    remove o responsável/sprint). Mudar o status leva as tarefas para o
+    fim da coluna correspondente, como no movimento individual.
+    """
+
+    unknown = set(changes) - {'status', 'assignee_id', 'sprint_id'}
+    if unknown:
+        raise TaskBulkError(f'campos não suportados: {", ".join(sorted(unknown))}')
+    if not changes:
+        raise TaskBulkError('nenhuma alteração informada')
+
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        raise TaskBulkError('nenhuma tarefa informada')
+    if len(task_ids) > MAX_BATCH_UPDATE:
+        raise TaskBulkError(f'máximo de {MAX_BATCH_UPDATE} tarefas por lote')
+
+    tasks = db.session.query(
+        Task.id, Task.key, Task.status, Task.column_id, Task.start_date, Task.completed_date, Task.depends_on,
+        Task.sprint_id, Task.story_points, Task.is_archived
+    ).filter(Task.project_id == project.id, Task.id.in_(task_ids)).all()
+    if len(tasks) != len(task_ids):
+        missing = set(task_ids) - {task.id for task in tasks}
+        raise TaskBulkError(f'{len(missing)} tarefas não encontradas no projeto', sorted(missing))
+
+    values: Dict[str, Any] = {}
+    if 'assignee_id' in changes:
+        if changes['assignee_id'] and not _user_ids([changes['assignee_id']], [])[0]:
+            raise TaskBulkError(f'assignee_id não encontrado: {changes["assignee_id"]}')
+        values['assignee_id'] = changes['assignee_id'] or None
+    if 'sprint_id' in changes:
+        if changes['sprint_id'] and not _sprint_ids(project.id, [changes['sprint_id']]):
+            raise TaskBulkError(f'sprint_id não pertence ao projeto: {changes["sprint_id"]}')
+        values['sprint_id'] = changes['sprint_id'] or None
+
+    status = _enum(TaskStatus, changes['status'], 'status') if changes.get('status') else None
+    moving = [task for task in tasks if status is not None and task.status != status]
+
+    if status == TaskStatus.IN_PROGRESS and moving:
+        # Dependências de todas as tarefas numa consulta (como can_move_to_status)
+        dependency_ids = {dep_id for task in moving for dep_id in (task.depends_on or [])}
+        pending = {
+            row.id for row in db.session.query(Task.id).filter(
+                Task.id.in_(dependency_ids), Task.status != TaskStatus.DONE
+            )
+        } if dependency_ids else set()
+        blocked = [task.key for task in moving if pending & set(task.depends_on or [])]
+        if blocked:
+            raise TaskBulkError(f'{len(blocked)} tarefas com dependências não concluídas', blocked)
+
+    now = datetime.utcnow()
+    rows = {task.id: {'id': task.id, 'updated_at': now, **values} for task in tasks}
+
+    try:
+        if moving:
+            lock_board(project.id)
+            column_id = STATUS_COLUMNS[status]
+            position = append_position(project.id, column_id)
+            for task in moving:
+                row = rows[task.id]
+                row.update(status=status, column_id=column_id, board_position=position)
+                position += POSITION_GAP
+                if status == TaskStatus.IN_PROGRESS and not task.start_date:
+                    row['start_date'] = now
+                if status == TaskStatus.DONE:
+                    row['completed_date'] = now
+
+        db.session.execute(update(Task), list(rows.values()))
+
+        burndown = BurndownChanges()
+        for task in tasks:
+            row = rows[task.id]
+            burndown.move(
+                task.sprint_id, task_contribution(task.status, task.story_points, task.is_archived),
+                row.get('sprint_id', task.sprint_id),
+                task_contribution(row.get('status', task.status), task.story_points, task.is_archived)
+            )
+        apply_burndown_deltas(burndown.pending())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {'updated': len(rows), 'moved': len(moving)}
+
+
+# =============================================================================
+# EXPORTAÇÃO
+# =============================================================================
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ';'.join(str(item) for item in value)
+    return value
+
+
+def iter_tasks_csv(project_id: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """
+    Gera o CSV das tarefas do projeto em blocos de ``batch_size`` linhas
+
+    Na ordem do board (coluna e posição, pelo índice ix_tasks_board_order).
+    Só as colunas exportadas são lidas (sem carregar objetos ORM), e a
+    memória fica limitada a um bloco, qualquer que seja o tamanho do projeto.
+    """
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    writer.writerow(EXPORT_FIELDS)
+    yield flush()
+
+    statement = select(
+        Task.key, Task.title, Task.description, Task.task_type, Task.status, Task.priority, Task.column_id,
+        User.email, Task.story_points, Task.estimated_hours, Task.actual_hours, Task.due_date, Task.sprint_id,
+        Task.labels, Task.created_at, Task.updated_at, Task.completed_date
+    ).outerjoin(User, User.id == Task.assignee_id).where(
+        Task.project_id == project_id,
+        Task.is_archived == False  # noqa: E712
+    ).order_by(Task.column_id, Task.board_position, Task.created_at, Task.id).execution_options(yield_per=batch_size)
+
+    for partition in db.session.execute(statement).partitions():
+        writer.writerows([_csv_value(value) for value in row] for row in partition)
+        yield flush()
@@ -0,0 +1,88 @@
+"""
+Numeração atômica das chaves de tarefa por projeto
+
+project_task_counters guarda o último número emitido por projeto.
+Reservar números é um único UPDATE ... SET last_number = last_number + n
+RETURNING last_number: a linha fica travada até o commit, então criações
+concorrentes no mesmo projeto nunca recebem o mesmo número, e uma
+importação de 1.000 tarefas reserva a faixa inteira em um comando.
+
+O contador é criado na primeira reserva a partir das chaves existentes.
+"""
+
+from typing import List, Optional
+
+from sqlalchemy import insert, update
+
+from ..models.project_management import Project, ProjectTaskCounter, Task
+from .. import db
+
+
+def format_task_key(project_key: str, number: int) -> str:
+    return f'{project_key}-{number}'
+
+
+def parse_task_number(key: Optional[str]) -> Optional[int]:
+    """Número de uma chave 'FISIO-12' (None se não seguir o formato)"""
+    if not key or '-' not in key:
+        return None
+    suffix = key.rsplit('-', 1)[1]
+    return int(suffix) if suffix.isdigit() else None
+
+
+def _existing_last_number(project_id: str) -> int:
+    """Maior número já usado nas chaves do projeto (só na criação do contador)"""
+    numbers = (parse_task_number(key) for (key,) in db.session.query(Task.key).filter(Task.project_id == project_id))
+    return max((number for number in numbers if number is not None), default=0)
+
+
+def _insert_counter_statement():
+    """INSERT que ignora o contador criado por uma requisição concorrente"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(ProjectTaskCounter)
+    return dialect_insert(ProjectTaskCounter).on_conflict_do_nothing(index_elements=['project_id'])
+
+
+def allocate_task_numbers(project_id: str, count: int = 1) -> range:
+    """
+    Reserva ``count`` números consecutivos para o projeto.
+
+    Não faz commit: a reserva vale na transação que insere as tarefas
+    (um rollback devolve os números).
+    """
+
+    if count < 1:
+        raise ValueError('count deve ser positivo')
+
+    statement = (
+        update(ProjectTaskCounter)
+        .where(ProjectTaskCounter.project_id == project_id)
+        .values(last_number=ProjectTaskCounter.last_number + count)
+        .returning(ProjectTaskCounter.last_number)
+        .execution_options(synchronize_session=False)
+    )
+
+    last_number = db.session.execute(statement).scalar()
+    if last_number is None:
+        db.session.execute(_insert_counter_statement(), [{
+            'project_id': project_id,
+            'last_number': _existing_last_number(project_id)
+        }])
+        last_number = db.session.execute(statement).scalar()
+
+    return range(last_number - count + 1, last_number + 1)
+
+
+def allocate_task_keys(project: Project, count: int = 1) -> List[str]:
+    """Chaves para ``count`` tarefas novas do projeto, em ordem"""
+    return [format_task_key(project.key, number) for number in allocate_task_numbers(project.id, count)]
+
+
+def next_task_key(project: Project) -> str:
+    """Chave da próxima tarefa do projeto"""
+    return allocate_task_keys(project, 1)[0]
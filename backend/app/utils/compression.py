@@ -0,0 +1,246 @@
+"""
+Compressão das respostas e GET condicional (ETag/304)
+
+Respostas JSON/texto acima de COMPRESSION_MIN_SIZE saem com gzip (ou
+brotli, se o pacote estiver instalado e o cliente aceitar). Toda
+resposta GET 200 ganha um ETag forte: o hash do corpo ou, nas rotas
+marcadas com ``@conditional``, um carimbo de versão barato (ex.: versão
+do catálogo de protocolos), que permite responder 304 antes de rodar a
+view e serializar o corpo. A variante comprimida usa o ETag com sufixo
+da codificação (``"abc-gzip"``), e o resultado da compressão fica num
+LRU por ETag, então um corpo que não mudou é comprimido uma vez só.
+
+Respostas em streaming (SSE, CSV) e arquivos passam direto.
+"""
+
+import gzip
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app, make_response, request
+from werkzeug.http import remove_entity_headers
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+DEFAULT_CACHE_ENTRIES = 128
+
+# Corpos maiores que isto não entram no LRU de compressões
+MAX_CACHED_BODY = 4 * 1024 * 1024
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml', 'text/'
+)
+
+
+def body_etag(body: bytes) -> str:
+    """ETag forte a partir do corpo"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _is_compressible(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMetrics:
+    """Bytes economizados por compressão e por respostas 304"""
+
+    def __init__(self):
+        self.by_encoding: Dict[str, Dict[str, int]] = {}
+        self.not_modified = 0
+        self.not_modified_bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.Lock()
+
+    def compressed(self, encoding: str, original: int, sent: int, cached: bool) -> None:
+        with self._lock:
+            totals = self.by_encoding.setdefault(encoding, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0})
+            totals['responses'] += 1
+            totals['bytes_in'] += original
+            totals['bytes_out'] += sent
+            if cached:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def skipped_body(self, size: int) -> None:
+        with self._lock:
+            self.not_modified += 1
+            self.not_modified_bytes += size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            bytes_in = sum(totals['bytes_in'] for totals in self.by_encoding.values())
+            bytes_out = sum(totals['bytes_out'] for totals in self.by_encoding.values())
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                'compressed_responses': sum(totals['responses'] for totals in self.by_encoding.values()),
+                'bytes_before_compression': bytes_in,
+                'bytes_after_compression': bytes_out,
+                'compression_bytes_saved': bytes_in - bytes_out,
+                'compression_ratio': round(bytes_out / bytes_in, 4) if bytes_in else None,
+                'by_encoding': {encoding: dict(totals) for encoding, totals in self.by_encoding.items()},
+                'not_modified_responses': self.not_modified,
+                'not_modified_bytes_saved': self.not_modified_bytes,
+                'bytes_saved': bytes_in - bytes_out + self.not_modified_bytes,
+                'cache_hit_rate': round(self.cache_hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class ResponseCompressor:
+    """after_request que aplica ETag, 304 e compressão"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.enabled = config.get('COMPRESSION_ENABLED', True)
+        self.etag_enabled = config.get('HTTP_ETAG_ENABLED', True)
+        self.min_size = config.get('COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+        self.gzip_level = config.get('COMPRESSION_GZIP_LEVEL', DEFAULT_GZIP_LEVEL)
+        self.brotli_quality = config.get('COMPRESSION_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY)
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+        self.metrics = CompressionMetrics()
+        self._cache: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._cache_entries = config.get('COMPRESSION_CACHE_ENTRIES', DEFAULT_CACHE_ENTRIES)
+        self._lock = threading.Lock()
+
+    def _negotiate(self) -> Optional[str]:
+        """Codificação preferida entre as aceitas pelo cliente"""
+        accepted = request.accept_encodings
+        best, best_quality = None, 0
+        for encoding in self.encodings:
+            quality = accepted[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def _compressed(self, body: bytes, encoding: str, etag: Optional[str]):
+        """Corpo comprimido (do LRU quando o ETag já foi visto) e se veio do LRU"""
+        key = f'{etag}-{encoding}' if etag else None
+        if key is not None:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    return cached, True
+
+        compressed = self._compress(body, encoding)
+        if key is not None and self._cache_entries and len(body) <= MAX_CACHED_BODY:
+            with self._lock:
+                self._cache[key] = compressed
+                while len(self._cache) > self._cache_entries:
+                    self._cache.popitem(last=False)
+        return compressed, False
+
+    def __call__(self, response):
+        if (request.method not in ('GET', 'HEAD') or response.status_code != 200
+                or response.is_streamed or response.direct_passthrough
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        body = response.get_data()
+        etag = response.get_etag()[0]
+        if etag is None and self.etag_enabled and not response.cache_control.no_store:
+            etag = body_etag(body)
+
+        encoding = None
+        if self.enabled and len(body) >= self.min_size and _is_compressible(response.mimetype):
+            response.vary.add('Accept-Encoding')
+            encoding = self._negotiate()
+
+        if etag is not None and (request.if_none_match.contains(etag) or (
+                encoding is not None and request.if_none_match.contains(f'{etag}-{encoding}'))):
+            # Cliente já tem o corpo: nada de comprimir
+            return self._not_modified(response, f'{etag}-{encoding}' if encoding else etag, len(body))
+
+        if encoding is not None:
+            compressed, cached = self._compressed(body, encoding, etag)
+            if len(compressed) < len(body):
+                self.metrics.compressed(encoding, len(body), len(compressed), cached)
+                response.set_data(compressed)
+                response.headers['Content-Encoding'] = encoding
+            else:
+                encoding = None
+
+        if etag is not None:
+            response.set_etag(f'{etag}-{encoding}' if encoding else etag)
+        return response
+
+    def _not_modified(self, response, etag: str, size: int):
+        self.metrics.skipped_body(size)
+        response.set_data(b'')
+        response.status_code = 304
+        remove_entity_headers(response.headers)
+        response.set_etag(etag)
+        return response
+
+
+def conditional(version_fn: Callable[[], Optional[str]]):
+    """
+    ETag a partir de um carimbo de versão, checado antes da view
+
+    ``version_fn`` deve mudar sempre que o corpo mudar (e o corpo não pode
+    depender do usuário). Com If-None-Match igual, responde 304 sem rodar
+    a view; retornar None desliga o atalho nesta requisição.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = version_fn()
+            if version is None:
+                return view(*args, **kwargs)
+
+            etag = body_etag(f'{version}|{request.full_path}'.encode('utf-8'))
+            compressor = current_app.extensions.get('compression')
+            if compressor is not None and request.method in ('GET', 'HEAD'):
+                candidates = (etag, *(f'{etag}-{encoding}' for encoding in compressor.encodings))
+                matched = next((tag for tag in candidates if request.if_none_match.contains(tag)), None)
+                if matched is not None:
+                    # Nem a view nem a serialização rodam; o tamanho do corpo não é conhecido
+                    compressor.metrics.skipped_body(0)
+                    response = current_app.response_class(status=304)
+                    remove_entity_headers(response.headers)
+                    response.set_etag(matched)
+                    response.vary.add('Accept-Encoding')
+                    return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
+
+
+def init_compression(app) -> ResponseCompressor:
+    """Registra o after_request (depois do CORS, para rodar antes dele)"""
+    compressor = ResponseCompressor(app.config)
+    app.extensions['compression'] = compressor
+    app.after_request(compressor)
+    if brotli is None:
+        logger.info('Pacote brotli não instalado: respostas comprimidas só com gzip')
+    return compressor
+
+
+def get_compression_metrics() -> Dict[str, Any]:
+    """Métricas da aplicação (vazio se a compressão não foi registrada)"""
+    compressor = current_app.extensions.get('compression')
+    if compressor is None:
+        return {}
+    return {'encodings': list(compressor.encodings), **compressor.metrics.stats()}
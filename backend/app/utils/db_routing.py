@@ -0,0 +1,215 @@
+"""
+Roteamento de leituras para a réplica do banco
+
+Com DATABASE_REPLICA_URL configurada, a sessão ganha um engine para a
+réplica (fora dos binds do Flask-SQLAlchemy, para create_all e as
+migrações continuarem só no primário). Rotas marcadas com
+``@read_only`` (e blocos ``with replica_reads():``, usados por comandos
+de exportação) mandam as consultas para a réplica, desde que ela esteja
+acessível e com atraso de replicação abaixo de
+DATABASE_REPLICA_MAX_LAG_SECONDS; caso contrário tudo vai para o
+primário.
+
+Escritas nunca vão para a réplica: flush do ORM e insert()/update()/
+delete() usam o primário, e depois da primeira escrita (ou com objetos
+novos/alterados pendentes) a sessão inteira fica no primário, para ler
+o que acabou de gravar. SQL textual de escrita não é detectado; rotas
+read-only não devem usá-lo.
+
+O estado da réplica é verificado no máximo a cada
+DATABASE_REPLICA_CHECK_SECONDS, e uma queda de conexão detectada numa
+consulta já tira a réplica de uso até a próxima verificação.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_LAG_SECONDS = 30.0
+DEFAULT_CHECK_SECONDS = 10.0
+
+_POSTGRES_LAG = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def replica_lag_seconds(connection) -> float:
+    """Atraso da réplica em segundos (0 fora do PostgreSQL, onde só testa a conexão)"""
+    if connection.dialect.name == 'postgresql':
+        return float(connection.execute(_POSTGRES_LAG).scalar() or 0)
+    connection.execute(text('SELECT 1'))
+    return 0.0
+
+
+class ReplicaMonitor:
+    """Saúde e atraso da réplica, com verificação espaçada"""
+
+    def __init__(self, engine, max_lag_seconds: float = DEFAULT_MAX_LAG_SECONDS,
+                 check_seconds: float = DEFAULT_CHECK_SECONDS,
+                 lag_probe: Callable[[Any], float] = replica_lag_seconds):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.lag_probe = lag_probe
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.checked_at = 0.0
+        self.checks = 0
+        self.replica_statements = 0
+        self.primary_fallbacks = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'handle_error', self._on_error)
+
+    def check(self) -> bool:
+        """Consulta o atraso agora"""
+        try:
+            with self.engine.connect() as connection:
+                lag = self.lag_probe(connection)
+            healthy, error = lag <= self.max_lag_seconds, None
+            if not healthy:
+                error = f'atraso de {lag:.1f}s acima de {self.max_lag_seconds:.0f}s'
+        except Exception as e:
+            lag, healthy, error = None, False, str(e)
+
+        with self._lock:
+            if healthy != self.healthy or error != self.last_error:
+                if healthy:
+                    logger.info('Réplica disponível para leituras')
+                else:
+                    logger.warning(f'Réplica fora de uso, leituras no primário: {error}')
+            self.healthy, self.lag_seconds, self.last_error = healthy, lag, error
+            self.checked_at = time.monotonic()
+            self.checks += 1
+        return healthy
+
+    def available(self) -> bool:
+        if time.monotonic() - self.checked_at >= self.check_seconds:
+            return self.check()
+        return self.healthy
+
+    def mark_unavailable(self, reason: str) -> None:
+        with self._lock:
+            self.healthy = False
+            self.last_error = reason
+            self.checked_at = time.monotonic()
+        logger.warning(f'Réplica fora de uso, leituras no primário: {reason}')
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect:
+            self.mark_unavailable(str(context.original_exception))
+
+    def routed(self, to_replica: bool) -> None:
+        with self._lock:
+            if to_replica:
+                self.replica_statements += 1
+            else:
+                self.primary_fallbacks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'healthy': self.healthy,
+            'lag_seconds': self.lag_seconds,
+            'max_lag_seconds': self.max_lag_seconds,
+            'last_error': self.last_error,
+            'checks': self.checks,
+            'replica_statements': self.replica_statements,
+            'primary_fallbacks': self.primary_fallbacks
+        }
+
+
+def create_replica_monitor(app) -> ReplicaMonitor:
+    url = make_url(app.config['DATABASE_REPLICA_URL'])
+    # Mesmas opções de pool do primário (o SQLite não aceita todas)
+    options = {} if url.get_backend_name() == 'sqlite' else dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    return ReplicaMonitor(
+        create_engine(url, **options),
+        max_lag_seconds=app.config.get('DATABASE_REPLICA_MAX_LAG_SECONDS', DEFAULT_MAX_LAG_SECONDS),
+        check_seconds=app.config.get('DATABASE_REPLICA_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)
+    )
+
+
+def get_replica_monitor() -> Optional[ReplicaMonitor]:
+    """Monitor (e engine) da réplica da aplicação; None sem DATABASE_REPLICA_URL"""
+    app = current_app._get_current_object()
+    if not app.config.get('DATABASE_REPLICA_URL'):
+        return None
+    monitor = app.extensions.get('db_replica')
+    if monitor is None:
+        monitor = create_replica_monitor(app)
+        app.extensions['db_replica'] = monitor
+    return monitor
+
+
+def replica_reads_enabled() -> bool:
+    return has_app_context() and g.get('db_replica_reads', False)
+
+
+@contextmanager
+def replica_reads():
+    """Consultas do bloco vão para a réplica (quando disponível)"""
+    previous = g.get('db_replica_reads', False)
+    g.db_replica_reads = True
+    try:
+        yield
+    finally:
+        g.db_replica_reads = previous
+
+
+def read_only(view):
+    """Marca a rota como somente leitura: consultas pesadas vão para a réplica"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Sessão que escolhe a réplica para leituras em blocos read-only"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        # Só o bind padrão tem réplica (binds explícitos e bind= ficam como estão)
+        if bind is not None or not replica_reads_enabled() or engine is not self._db.engines.get(None):
+            return engine
+        if not self._is_read(clause):
+            return engine
+
+        monitor = get_replica_monitor()
+        if monitor is None:
+            return engine
+        to_replica = monitor.available()
+        monitor.routed(to_replica)
+        return monitor.engine if to_replica else engine
+
+    def _is_read(self, clause) -> bool:
+        if self.info.get(_WROTE_KEY) or self._flushing or self.new or self.dirty or self.deleted:
+            return False
+        if getattr(clause, 'is_dml', False):
+            self.info[_WROTE_KEY] = True
+            return False
+        return True
+
+
+# Depois de uma escrita a sessão fica no primário (a réplica pode não ter recebido ainda)
+_WROTE_KEY = 'db_routing_wrote'
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _stick_to_primary(session, flush_context):
+    session.info[_WROTE_KEY] = True
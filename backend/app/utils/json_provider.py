@@ -0,0 +1,107 @@
+"""
+Provedor JSON da aplicação (orjson, com fallback para a biblioteca padrão)
+
+Os serializadores dos modelos podem devolver date/datetime/time, Enum,
+Decimal e UUID sem converter campo a campo: o orjson trata esses tipos
+nativamente (em C) e o fallback converte para as mesmas strings ISO
+8601 que os ``.isoformat()`` produziam. Datas saem como ISO 8601 também
+no fallback (o padrão do Flask seria o formato HTTP).
+"""
+
+import dataclasses
+import decimal
+import enum
+import json
+import logging
+import uuid
+from datetime import date, time
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Tipos que não são JSON nativo (usado pelos dois caminhos)"""
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f'Objeto do tipo {type(value).__name__} não é serializável em JSON')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSONProvider do Flask com orjson
+
+    Sem o orjson instalado (ou com JSON_PROVIDER=stdlib) usa json da
+    biblioteca padrão com o mesmo ``default``. Inteiros fora de 64 bits,
+    que o orjson recusa, também caem no fallback.
+    """
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+
+    def __init__(self, app, use_orjson: bool = True):
+        super().__init__(app)
+        self.use_orjson = use_orjson and orjson is not None
+        if use_orjson and orjson is None:
+            logger.warning('orjson não instalado, usando json da biblioteca padrão')
+
+    def _orjson_options(self, indent: bool = False) -> int:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        """JSON em UTF-8 (sem passar por str no caminho do orjson)"""
+        if self.use_orjson:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+            except orjson.JSONEncodeError:
+                pass
+        return self.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if self.use_orjson and not kwargs:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode('utf-8')
+            except orjson.JSONEncodeError:
+                pass
+        if not kwargs.get('indent'):
+            kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype)
+
+
+def init_json_provider(app) -> None:
+    """Instala o provedor conforme JSON_PROVIDER ('orjson' ou 'stdlib')"""
+    app.json = FastJSONProvider(app, use_orjson=app.config.get('JSON_PROVIDER', 'orjson') != 'stdlib')
@@ -0,0 +1,74 @@
+"""
+Codificação compacta de séries temporais de sensores
+
+As amostras são armazenadas como float32 little-endian empacotados
+(``array('f')``) e comprimidos com zlib, em vez de listas JSON.
+Uma série de 3.000 amostras ocupa ~12KB crus contra ~60KB em JSON.
+"""
+
+import math
+import sys
+import zlib
+from array import array
+from typing import List, Sequence
+
+ENCODING = 'f32le+zlib'
+
+# Limites padrão de ingestão
+MAX_SAMPLES_PER_CHANNEL = 20000
+TARGET_SAMPLE_RATE_HZ = 25.0
+
+
+def pack_samples(values: Sequence[float]) -> bytes:
+    """Empacota amostras como float32 little-endian comprimido"""
+
+    packed = array('f', values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return zlib.compress(packed.tobytes(), 6)
+
+
+def unpack_samples(data: bytes) -> List[float]:
+    """Desempacota amostras gravadas por ``pack_samples``"""
+
+    packed = array('f')
+    packed.frombytes(zlib.decompress(data))
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tolist()
+
+
+def downsample(values: Sequence[float], factor: int) -> List[float]:
+    """
+    Reduz a série pela média de janelas de ``factor`` amostras
+
+    Args:
+        values: amostras originais
+        factor: tamanho da janela (1 = sem redução)
+
+    Returns:
+        list: série reduzida (a última janela pode ser parcial)
+    """
+    if factor <= 1:
+        return list(values)
+
+    result = []
+    for start in range(0, len(values), factor):
+        window = values[start:start + factor]
+        result.append(sum(window) / len(window))
+    return result
+
+
+def downsample_factor(sample_rate_hz: float, sample_count: int,
+                      target_rate_hz: float = TARGET_SAMPLE_RATE_HZ,
+                      max_samples: int = MAX_SAMPLES_PER_CHANNEL) -> int:
+    """Calcula o fator de redução para respeitar taxa alvo e limite de amostras"""
+
+    factor = 1
+    if sample_rate_hz and sample_rate_hz > target_rate_hz:
+        factor = int(sample_rate_hz // target_rate_hz)
+
+    if sample_count > max_samples:
+        factor = max(factor, math.ceil(sample_count / max_samples))
+
+    return max(factor, 1)
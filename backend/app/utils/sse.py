@@ -0,0 +1,51 @@
+"""
+Utilitários para respostas Server-Sent Events (SSE)
+"""
+
+import json
+from typing import Any, AsyncIterator
+
+from flask import Response, request, stream_with_context
+
+from ..services.ai_executor import get_ai_executor
+
+# Comentário inicial: envia os cabeçalhos antes do primeiro token
+KEEPALIVE = ': keepalive\n\n'
+
+
+def wants_stream() -> bool:
+    """Indica se o cliente pediu streaming (?stream=1 ou Accept: text/event-stream)"""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Formata um evento SSE com payload JSON"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def sse_response(events: AsyncIterator[Any]) -> Response:
+    """
+    Resposta text/event-stream a partir de um gerador de ``AIStreamEvent``
+
+    O gerador roda no loop de IA; quando o servidor fecha a resposta
+    (cliente desconectado) o stream do provedor também é fechado.
+    """
+
+    executor = get_ai_executor()
+
+    def generate():
+        yield KEEPALIVE
+        for item in executor.iterate(events):
+            yield format_sse(item.event, item.data)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # nginx/railway não devem bufferizar
+        }
+    )
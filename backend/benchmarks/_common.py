@@ -0,0 +1,115 @@
+"""
+Utilitários compartilhados pelos benchmarks do backend
+
+Os benchmarks são scripts independentes (não rodam no pytest):
+
+    python -m benchmarks.bench_exercise_filters
+
+Por padrão usam SQLite em memória; defina BENCH_DATABASE_URL para
+rodar contra um PostgreSQL descartável.
+"""
+
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+
+@contextmanager
+def bench_app():
+    """Cria app Flask com banco limpo para benchmark"""
+
+    os.environ['DATABASE_URL'] = os.environ.get('BENCH_DATABASE_URL', 'sqlite:///:memory:')
+    os.environ.setdefault('FLASK_ENV', 'development')
+
+    from app import create_app, db
+    import app.models  # noqa: F401 - registra todos os modelos no metadata
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        try:
+            yield app, db
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+def measure(label, fn, repeat=20):
+    """Executa ``fn`` ``repeat`` vezes e imprime p50/p95 em milissegundos"""
+
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p50 = statistics.median(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f'{label:<55} p50={p50:8.2f}ms  p95={p95:8.2f}ms')
+    return result
+
+
+def throughput(label, count, elapsed):
+    """Imprime vazão em itens/segundo"""
+
+    rate = count / elapsed if elapsed > 0 else float('inf')
+    print(f'{label:<55} {count} itens em {elapsed:.2f}s ({rate:,.0f}/s)')
+    return rate
+
+
+def seed_users(db, count, role='FISIOTERAPEUTA'):
+    """Insere usuários mínimos (sem hash bcrypt, para ser rápido)"""
+
+    from sqlalchemy import insert
+    from app.models.user import User, UserRole
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'id': str(uuid4()),
+            'email': f'bench-{role.lower()}-{i}-{uuid4().hex[:6]}@fisioflow.test',
+            'password_hash': 'x',
+            'role': UserRole(role),
+            'is_active': True,
+            'is_verified': True,
+            'created_at': now,
+        }
+        for i in range(count)
+    ]
+    db.session.execute(insert(User), rows)
+    db.session.commit()
+    return [row['id'] for row in rows]
+
+
+def seed_patients(db, count):
+    """Insere pacientes mínimos"""
+
+    from sqlalchemy import insert
+    from app.models.patient import Patient
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'id': str(uuid4()),
+            'nome_completo': f'Paciente {i}',
+            'is_active': True,
+            'consentimento_dados': True,
+            'consentimento_imagem': False,
+            'created_at': now,
+        }
+        for i in range(count)
+    ]
+    for start in range(0, len(rows), 5_000):
+        db.session.execute(insert(Patient), rows[start:start + 5_000])
+    db.session.commit()
+    return [row['id'] for row in rows]
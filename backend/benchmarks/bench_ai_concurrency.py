@@ -0,0 +1,112 @@
+"""
+Benchmark: chamadas de IA simultâneas em um único worker
+
+Sobe o LLM falso (benchmarks.fake_llm_server) e aponta o cliente
+AsyncAnthropic para ele via ANTHROPIC_BASE_URL. Compara:
+
+- worker sync: uma chamada por vez, com event loop por requisição
+  (o modelo das rotas ``async def`` em worker sync);
+- loop por requisição com várias threads: cada chamada cria loop e
+  cliente (e conexão) novos;
+- AIExecutor: as threads de requisição só aguardam o loop de IA
+  compartilhado, que multiplexa as chamadas num pool de conexões.
+
+Requer os SDKs de IA instalados (requirements.txt):
+
+    python -m benchmarks.bench_ai_concurrency
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks._common import throughput
+from benchmarks.fake_llm_server import FakeLLMServer
+
+LATENCY_SECONDS = 0.5
+REQUEST_THREADS = 64
+CALLS = 256
+
+
+def make_request():
+    from app.services.ai_orchestrator import AIProvider, AIRequest, AITaskType
+
+    return AIRequest(
+        task_type=AITaskType.SOAP_COMPLETION,
+        prompt='Completar evolução',
+        context={'subjective': 'Dor lombar há 3 semanas'},
+        user_id='bench',
+        preferred_provider=AIProvider.CLAUDE,
+        use_cache=False
+    )
+
+
+def run_threads(app, count, threads, call):
+    """Distribui ``count`` chamadas entre ``threads`` threads de requisição"""
+
+    def request():
+        with app.app_context():
+            return call()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(request) for _ in range(count)]
+        # .result() propaga exceções das threads em vez de engoli-las
+        responses = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    failures = [response.error for response in responses if not response.success]
+    if failures:
+        raise RuntimeError(f'{len(failures)} de {count} chamadas falharam: {failures[:3]}')
+    return elapsed
+
+
+def report(label, server, count, elapsed):
+    throughput(label, count, elapsed)
+    print(f'{"":<55} pico simultâneo={server.peak_in_flight}  conexões={server.connections}')
+    server.reset_counters()
+
+
+def main():
+    server = FakeLLMServer(latency=LATENCY_SECONDS).start()
+    os.environ['ANTHROPIC_API_KEY'] = 'bench'
+    os.environ['ANTHROPIC_BASE_URL'] = server.base_url
+    for key in ('OPENAI_API_KEY', 'GOOGLE_API_KEY'):
+        os.environ.pop(key, None)
+
+    from flask import Flask
+    from app.services.ai_executor import AIExecutor, ConcurrencyLimiter
+    from app.services.ai_orchestrator import AIOrchestrator
+
+    app = Flask(__name__)
+    app.config.update(AI_CACHE_ENABLED=False)
+
+    print(f'LLM falso em {server.base_url}, latência {LATENCY_SECONDS}s\n')
+
+    def per_request_loop():
+        # Loop e cliente novos a cada chamada, como asyncio.run numa rota async
+        return asyncio.run(AIOrchestrator().process_request(make_request()))
+
+    sequential = CALLS // 16
+    elapsed = run_threads(app, sequential, 1, per_request_loop)
+    report('Worker sync (1 chamada por vez)', server, sequential, elapsed)
+
+    elapsed = run_threads(app, CALLS, REQUEST_THREADS, per_request_loop)
+    report(f'Loop por requisição ({REQUEST_THREADS} threads)', server, CALLS, elapsed)
+
+    executor = AIExecutor()
+    orchestrator = AIOrchestrator(limiter=ConcurrencyLimiter(max_concurrency=REQUEST_THREADS))
+    elapsed = run_threads(
+        app, CALLS, REQUEST_THREADS,
+        lambda: executor.run(orchestrator.process_request(make_request()))
+    )
+    report(f'AIExecutor ({REQUEST_THREADS} threads, loop único)', server, CALLS, elapsed)
+    print(f'{"":<55} pico no executor={executor.stats()["peak_in_flight"]}')
+
+    executor.shutdown()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: movimentos no Kanban em um board de 5k tarefas
+
+Compara o movimento antigo (desloca todas as tarefas abaixo da posição,
+uma linha por tarefa) com as posições esparsas de board_ordering (uma
+linha por movimento, renumeração ocasional).
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from benchmarks._common import bench_app, seed_users, throughput
+
+TOTAL_TASKS = 5_000
+MOVES = 500
+LEGACY_MOVES = 50  # O movimento antigo é lento demais para 500
+COLUMNS = ['backlog', 'todo', 'in_progress', 'review', 'done']
+
+
+def seed_board(db, Project, Task, TaskType, owner_id, gap):
+    """Projeto com TOTAL_TASKS tarefas, a maioria no backlog"""
+
+    project_id = str(uuid4())
+    db.session.execute(insert(Project), [{
+        'id': project_id, 'name': 'Board', 'key': f'B{uuid4().hex[:6]}', 'category': 'clinico',
+        'owner_id': owner_id, 'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow()
+    }])
+
+    now = datetime.utcnow()
+    per_column = {column: 0 for column in COLUMNS}
+    rows = []
+    for index in range(TOTAL_TASKS):
+        column = 'backlog' if index < TOTAL_TASKS * 0.8 else COLUMNS[index % len(COLUMNS)]
+        per_column[column] += 1
+        rows.append({
+            'id': str(uuid4()), 'project_id': project_id, 'key': f'T{uuid4().hex[:10]}',
+            'title': f'Tarefa {index}', 'task_type': TaskType.FEATURE, 'reporter_id': owner_id,
+            'column_id': column, 'board_position': per_column[column] * gap,
+            'depends_on': [], 'labels': [], 'is_archived': False,
+            'created_at': now + timedelta(microseconds=index), 'updated_at': now,
+        })
+    db.session.execute(insert(Task), rows)
+    db.session.commit()
+    return project_id, [row['id'] for row in rows]
+
+
+def legacy_move(db, Task, task, column_id, position):
+    """Movimento anterior: incrementa a posição de todas as tarefas abaixo"""
+
+    tasks_to_update = Task.query.filter(
+        Task.project_id == task.project_id,
+        Task.column_id == column_id,
+        Task.id != task.id,
+        Task.board_position >= position
+    ).all()
+    for other in tasks_to_update:
+        other.board_position += 1
+    task.column_id = column_id
+    task.board_position = position
+
+
+def run_moves(label, db, Task, task_ids, move, count=MOVES):
+    rng = random.Random(7)
+    moves = [(rng.choice(task_ids), rng.choice(COLUMNS[:2]), rng.randint(0, 200)) for _ in range(count)]
+
+    start = time.perf_counter()
+    for task_id, column_id, position in moves:
+        move(db.session.get(Task, task_id), column_id, position)
+        db.session.commit()
+    return throughput(label, count, time.perf_counter() - start)
+
+
+def main():
+    with bench_app() as (app, db):
+        from app.models.project_management import Project, Task, TaskType
+        from app.services.board_ordering import POSITION_GAP, place_task, rebalance_boards
+
+        owner_id = seed_users(db, 1)[0]
+        print(f'{TOTAL_TASKS} tarefas por board ({db.engine.dialect.name})\n')
+
+        _, legacy_ids = seed_board(db, Project, Task, TaskType, owner_id, gap=1)
+        legacy = run_moves('Movimento antigo (desloca a coluna)', db, Task, legacy_ids,
+                           lambda task, column, position: legacy_move(db, Task, task, column, position),
+                           count=LEGACY_MOVES)
+
+        rebalances = []
+        _, sparse_ids = seed_board(db, Project, Task, TaskType, owner_id, gap=POSITION_GAP)
+        sparse = run_moves('Posições esparsas (uma linha)', db, Task, sparse_ids,
+                           lambda task, column, position: rebalances.append(place_task(task, column, position)))
+
+        print(f'\nRenumerações durante os movimentos: {sum(rebalances)}')
+        print(f'Ganho: {sparse / legacy:.1f}x')
+
+        start = time.perf_counter()
+        result = rebalance_boards(min_gap=POSITION_GAP)
+        print(f"\n{'Job de renumeração (todas as colunas)':<55} {(time.perf_counter() - start) * 1000:8.2f}ms  "
+              f"({result['columns_rebalanced']} colunas, {result['tasks_moved']} tarefas)")
+
+
+if __name__ == '__main__':
+    main()
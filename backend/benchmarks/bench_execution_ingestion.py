@@ -0,0 +1,155 @@
+"""
+Benchmark: ingestão de execuções de exercícios
+
+Compara o fluxo de create_execution (1 execução, 3 lookups e 1 commit
+por chamada) com ingest_executions em lotes de 200, incluindo séries
+de sensores de 100 Hz com 3 canais por execução.
+"""
+
+import random
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from benchmarks._common import bench_app, seed_patients, seed_users, throughput
+
+TOTAL_EXECUTIONS = 4_000
+BATCH_SIZE = 200
+PRESCRIPTIONS = 200
+SENSOR_SECONDS = 30
+SENSOR_RATE_HZ = 100
+
+
+def seed_prescriptions(db, therapist_id):
+    from app.models.exercise import Exercise, PatientExercise, ExerciseCategory, ExerciseDifficulty
+
+    now = datetime.utcnow()
+    exercise_id = str(uuid4())
+    db.session.execute(insert(Exercise), [{
+        'id': exercise_id,
+        'title': 'Agachamento',
+        'description': 'Benchmark',
+        'instructions': 'Benchmark',
+        'category': ExerciseCategory.FORTALECIMENTO,
+        'difficulty': ExerciseDifficulty.INICIANTE,
+        'body_regions': ['joelho'],
+        'default_repetitions': 10,
+        'default_sets': 3,
+        'points_value': 10,
+        'is_active': True,
+        'is_approved': True,
+        'created_at': now,
+        'updated_at': now,
+    }])
+
+    patient_ids = seed_patients(db, PRESCRIPTIONS)
+    rows = [
+        {
+            'id': str(uuid4()),
+            'patient_id': patient_id,
+            'exercise_id': exercise_id,
+            'prescribed_by': therapist_id,
+            'start_date': date.today() - timedelta(days=30),
+            'frequency_per_week': 3,
+            'is_active': True,
+            'is_completed': False,
+            'prescribed_at': now,
+            'updated_at': now,
+        }
+        for patient_id in patient_ids
+    ]
+    db.session.execute(insert(PatientExercise), rows)
+    db.session.commit()
+    return [row['id'] for row in rows]
+
+
+def make_item(rng, prescription_ids, with_sensors):
+    item = {
+        'patient_exercise_id': rng.choice(prescription_ids),
+        'started_at': (datetime.utcnow() - timedelta(minutes=10)).isoformat(),
+        'completed_at': datetime.utcnow().isoformat(),
+        'repetitions_completed': rng.randint(5, 12),
+        'sets_completed': rng.randint(1, 3),
+        'patient_rating': rng.randint(1, 5),
+        'pain_level': rng.randint(0, 10),
+    }
+    if with_sensors:
+        samples = SENSOR_SECONDS * SENSOR_RATE_HZ
+        item['sensor_data'] = {
+            'sample_rate_hz': SENSOR_RATE_HZ,
+            'channels': {
+                axis: [rng.gauss(0, 1) for _ in range(samples)]
+                for axis in ('accel_x', 'accel_y', 'accel_z')
+            }
+        }
+    return item
+
+
+def single_execution_flow(db, user, item):
+    """Reproduz o caminho de create_execution para um item"""
+
+    from app.models.exercise import PatientExercise, ExerciseExecution
+    from app.models.user import User
+    from app.services.execution_ingestion import calculate_execution_points, check_execution_permission
+    from app.services.exercise_stats import apply_execution_counters
+
+    User.query.get(user.id)
+    patient_exercise = PatientExercise.query.get(item['patient_exercise_id'])
+    check_execution_permission(user, patient_exercise)
+    points, bonus = calculate_execution_points(patient_exercise, item)
+
+    execution = ExerciseExecution(
+        patient_exercise_id=patient_exercise.id,
+        exercise_id=patient_exercise.exercise_id,
+        patient_id=patient_exercise.patient_id,
+        repetitions_completed=item['repetitions_completed'],
+        sets_completed=item['sets_completed'],
+        patient_rating=item['patient_rating'],
+        pain_level=item['pain_level'],
+        execution_data=item.get('sensor_data'),
+        points_earned=points,
+        bonus_points=bonus,
+        completed_at=datetime.utcnow()
+    )
+    db.session.add(execution)
+    db.session.flush()
+    apply_execution_counters([execution])
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def main():
+    with bench_app() as (app, db):
+        from app.services.execution_ingestion import ingest_executions
+
+        therapist_id = seed_users(db, 1, role='ADMIN')[0]
+        user = SimpleNamespace(id=therapist_id, role='ADMIN')
+        prescription_ids = seed_prescriptions(db, therapist_id)
+        rng = random.Random(7)
+
+        print(f'Banco: {db.engine.dialect.name}\n')
+
+        for with_sensors in (False, True):
+            label = 'com sensores' if with_sensors else 'sem sensores'
+            total = TOTAL_EXECUTIONS if not with_sensors else TOTAL_EXECUTIONS // 10
+            items = [make_item(rng, prescription_ids, with_sensors) for _ in range(total)]
+
+            start = time.perf_counter()
+            for item in items:
+                single_execution_flow(db, user, item)
+            throughput(f'1 execução por requisição ({label})', total, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for offset in range(0, total, BATCH_SIZE):
+                result = ingest_executions(user, items[offset:offset + BATCH_SIZE])
+                assert not result.errors, result.errors[:3]
+                db.session.expunge_all()
+            throughput(f'Lotes de {BATCH_SIZE} ({label})', total, time.perf_counter() - start)
+            print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: filtro da biblioteca de exercícios por região corporal e categoria
+
+Popula 50k exercícios e compara o filtro executado no banco
+(``Exercise.body_region_filter``, GIN/JSONB no PostgreSQL) com a
+filtragem em Python sobre a lista completa.
+"""
+
+import random
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from benchmarks._common import bench_app, measure
+
+TOTAL_EXERCISES = 50_000
+PAGE_SIZE = 20
+
+
+def seed_exercises(db, Exercise, ExerciseCategory, ExerciseDifficulty, BodyRegion):
+    """Insere a biblioteca sintética em lotes"""
+
+    rng = random.Random(42)
+    categories = list(ExerciseCategory)
+    difficulties = list(ExerciseDifficulty)
+    regions = [r.value for r in BodyRegion]
+    now = datetime.utcnow()
+
+    rows = []
+    for i in range(TOTAL_EXERCISES):
+        rows.append({
+            'id': str(uuid4()),
+            'title': f'Exercício {i}',
+            'description': 'Descrição sintética',
+            'instructions': 'Instruções sintéticas',
+            'category': rng.choice(categories),
+            'difficulty': rng.choice(difficulties),
+            'body_regions': rng.sample(regions, rng.randint(1, 3)),
+            'points_value': 10,
+            'is_active': True,
+            'is_approved': True,
+            'created_at': now,
+            'updated_at': now,
+        })
+        if len(rows) == 5_000:
+            db.session.execute(insert(Exercise), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Exercise), rows)
+    db.session.commit()
+
+
+def main():
+    with bench_app() as (app, db):
+        from app.models.exercise import Exercise, ExerciseCategory, ExerciseDifficulty, BodyRegion
+
+        seed_exercises(db, Exercise, ExerciseCategory, ExerciseDifficulty, BodyRegion)
+        print(f'{TOTAL_EXERCISES} exercícios ({db.engine.dialect.name})\n')
+
+        region = BodyRegion.JOELHO.value
+        category = ExerciseCategory.FORTALECIMENTO
+
+        def sql_count():
+            return Exercise.query.filter(
+                Exercise.is_active == True,
+                Exercise.category == category,
+                Exercise.body_region_filter(region)
+            ).count()
+
+        def sql_page():
+            return Exercise.query.filter(
+                Exercise.is_active == True,
+                Exercise.category == category,
+                Exercise.body_region_filter(region)
+            ).order_by(Exercise.created_at.desc()).limit(PAGE_SIZE).all()
+
+        def python_filter():
+            rows = db.session.query(Exercise.id, Exercise.category, Exercise.body_regions).filter(
+                Exercise.is_active == True
+            ).all()
+            return [r.id for r in rows if r.category == category and region in r.body_regions]
+
+        expected = measure('SQL: count região+categoria', sql_count)
+        measure('SQL: primeira página região+categoria', sql_page)
+        matched = measure('Python: carregar tudo e filtrar', python_filter, repeat=5)
+
+        assert expected == len(matched), 'filtro SQL divergente do filtro em Python'
+        print(f'\n{expected} exercícios de {category.value} para {region}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: serialização JSON dos maiores payloads da API
+
+Compara o caminho antigo (to_dict com .isoformat()/.value por campo +
+encoder da biblioteca padrão) com o provedor da aplicação: dicionários
+com date/datetime/Enum nativos serializados pela biblioteca padrão
+(fallback) e pelo orjson.
+
+Payloads: listagem de agendamentos (list_appointments), calendário do
+mês agrupado por dia e séries temporais diárias de um ano (analytics).
+"""
+
+import enum
+import random
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import benchmarks._common  # noqa: F401 - coloca o backend no sys.path
+from benchmarks._common import measure
+from app.utils.json_provider import FastJSONProvider, orjson
+
+APPOINTMENTS = 5_000
+SERIES_DAYS = 365
+
+
+class Status(enum.Enum):
+    """Como AppointmentStatus (sem importar os modelos)"""
+    SCHEDULED = 'agendado'
+    CONFIRMED = 'confirmado'
+    COMPLETED = 'concluido'
+    CANCELLED = 'cancelado'
+
+
+def appointment(rng, index):
+    """Mesmos campos de Appointment.to_dict(), com valores nativos"""
+    day = date(2024, 1, 1) + timedelta(days=index % 90)
+    created = datetime(2023, 12, 1, 8, 0) + timedelta(minutes=index)
+    return {
+        'id': str(uuid4()), 'patient_id': str(uuid4()), 'therapist_id': str(uuid4()),
+        'appointment_date': day, 'start_time': f'{8 + index % 10:02d}:00', 'end_time': f'{8 + index % 10:02d}:50',
+        'duration_minutes': 50, 'appointment_type': 'tratamento',
+        'status': rng.choice(list(Status)), 'title': f'Sessão {index}', 'description': None,
+        'location': 'Clínica', 'room': f'Sala {index % 5}', 'is_recurring': index % 3 == 0,
+        'recurrence_pattern': None, 'confirmation_required': True,
+        'confirmed_at': created + timedelta(days=1) if index % 2 else None, 'reminder_sent': bool(index % 2),
+        'notes': None, 'cancellation_reason': None, 'is_past': False, 'is_today': False, 'is_confirmed': True,
+        'can_be_cancelled': True, 'can_be_rescheduled': True, 'created_at': created, 'updated_at': created,
+        'patient_name': f'Paciente {index}', 'therapist_name': f'Fisioterapeuta {index % 20}'
+    }
+
+
+def stringified(value):
+    """Como os serializadores faziam antes (conversão campo a campo)"""
+    if isinstance(value, dict):
+        return {key: stringified(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [stringified(item) for item in value]
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, 'value'):
+        return value.value
+    return value
+
+
+def payloads():
+    rng = random.Random(7)
+    appointments = [appointment(rng, index) for index in range(APPOINTMENTS)]
+    calendar = {}
+    for item in appointments[:1_500]:
+        calendar.setdefault(item['appointment_date'].isoformat(), []).append(item)
+    start = date(2024, 1, 1)
+    series = [
+        {'date': start + timedelta(days=offset), 'appointments': rng.randint(0, 80),
+         'completed': rng.randint(0, 60), 'completion_rate': rng.random() * 100}
+        for offset in range(SERIES_DAYS)
+    ]
+    return {
+        f'list_appointments ({APPOINTMENTS})': {'appointments': appointments},
+        'calendário do mês (1500)': {'calendar': calendar},
+        f'séries temporais ({SERIES_DAYS} dias)': {'time_series': series, 'monthly_trends': series[::30]},
+    }
+
+
+def main():
+    app = Flask(__name__)
+    legacy = DefaultJSONProvider(app)
+    fallback = FastJSONProvider(app, use_orjson=False)
+    fast = FastJSONProvider(app)
+
+    with app.app_context():
+        for label, payload in payloads().items():
+            print(f'\n{label}')
+            legacy_payload = stringified(payload)
+            size = len(fast.dumps_bytes(payload))
+            measure('  antes: to_dict com isoformat + json padrão',
+                    lambda: legacy.dumps(stringified(payload)).encode('utf-8'))
+            measure('  só encoder padrão (dict já convertido)', lambda: legacy.dumps(legacy_payload).encode('utf-8'))
+            measure('  provedor, fallback da biblioteca padrão', lambda: fallback.dumps_bytes(payload))
+            if orjson is not None:
+                measure('  provedor, orjson', lambda: fast.dumps_bytes(payload))
+                assert orjson.loads(fast.dumps_bytes(payload)) == fallback.loads(fallback.dumps_bytes(payload))
+            print(f'  {size / 1024:,.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
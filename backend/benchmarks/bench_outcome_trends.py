@@ -0,0 +1,98 @@
+"""
+Benchmark: lista "pacientes sem melhora" para 10k pacientes ativos
+
+Mede a leitura em lote + cálculo vetorizado de outcome_trends contra o
+caminho por paciente (consulta das evoluções e contas em Python para
+cada um). O alvo da lista de trabalho é ficar abaixo de 1s.
+"""
+
+import random
+import time
+from datetime import date, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from benchmarks._common import bench_app, measure, seed_patients, seed_users
+
+PATIENTS = 10_000
+EVOLUTIONS_PER_PATIENT = 12
+LOOP_PATIENTS = 1_000  # O caminho por paciente é medido numa amostra
+BUDGET_MS = 1_000
+
+
+def seed_evolutions(db, MedicalRecord, Evolution, patient_ids, user_id):
+    """Um prontuário e EVOLUTIONS_PER_PATIENT evoluções com dor por paciente"""
+
+    rng = random.Random(7)
+    today = date.today()
+    records, evolutions = [], []
+    for patient_id in patient_ids:
+        record_id = str(uuid4())
+        records.append({'id': record_id, 'patient_id': patient_id, 'created_by': user_id,
+                        'data_avaliacao': today - timedelta(days=80)})
+        pain = rng.randint(4, 10)
+        drift = rng.choice([-0.5, -0.2, 0, 0.1, 0.3])
+        for index in range(EVOLUTIONS_PER_PATIENT):
+            evolutions.append({
+                'id': str(uuid4()), 'medical_record_id': record_id, 'created_by': user_id,
+                'data_atendimento': today - timedelta(days=(EVOLUTIONS_PER_PATIENT - index) * 6),
+                'escala_dor': max(0, min(10, round(pain + drift * index + rng.uniform(-1, 1)))),
+            })
+    for start in range(0, len(records), 5_000):
+        db.session.execute(insert(MedicalRecord), records[start:start + 5_000])
+    for start in range(0, len(evolutions), 5_000):
+        db.session.execute(insert(Evolution), evolutions[start:start + 5_000])
+    db.session.commit()
+
+
+def per_patient_loop(Evolution, MedicalRecord, patient_ids, mcid):
+    """Caminho anterior: uma consulta e contas em Python por paciente"""
+
+    flagged = []
+    for patient_id in patient_ids:
+        evolutions = Evolution.query.join(MedicalRecord).filter(
+            MedicalRecord.patient_id == patient_id, Evolution.escala_dor.isnot(None)
+        ).all()
+        pains = [e.escala_dor for e in sorted(evolutions, key=lambda e: e.data_atendimento)]
+        if len(pains) >= 3 and pains[-1] - pains[0] > -mcid:
+            flagged.append(patient_id)
+    return flagged
+
+
+def main():
+    with bench_app() as (app, db):
+        from app.models.patient import Evolution, MedicalRecord
+        from app.services.outcome_trends import (
+            DEFAULT_MCID, compute_trends, load_pain_observations, not_improving_worklist
+        )
+
+        user_id = seed_users(db, 1)[0]
+        patient_ids = seed_patients(db, PATIENTS)
+        seed_evolutions(db, MedicalRecord, Evolution, patient_ids, user_id)
+        print(f'{PATIENTS} pacientes, {PATIENTS * EVOLUTIONS_PER_PATIENT} evoluções ({db.engine.dialect.name})\n')
+
+        since = date.today() - timedelta(days=90)
+        observations = load_pain_observations(since)
+        measure('Leitura em lote (3 consultas)', lambda: load_pain_observations(since), repeat=5)
+        measure('Cálculo vetorizado (compute_trends)', lambda: compute_trends(observations), repeat=20)
+        result = measure('Lista de trabalho completa', lambda: not_improving_worklist(lookback_days=90), repeat=5)
+
+        start = time.perf_counter()
+        per_patient_loop(Evolution, MedicalRecord, patient_ids[:LOOP_PATIENTS], DEFAULT_MCID)
+        loop_ms = (time.perf_counter() - start) * 1000 * PATIENTS / LOOP_PATIENTS
+        print(f"{'Laço por paciente (estimado para a carteira)':<55} {loop_ms:8.0f}ms")
+
+        print(f"\nSem melhora: {result['total']} de {result['caseload']} pacientes")
+
+        start = time.perf_counter()
+        not_improving_worklist(lookback_days=90)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms > BUDGET_MS:
+            print(f'\nFALHA: lista de trabalho em {elapsed_ms:.0f}ms (orçamento {BUDGET_MS}ms)')
+            return 1
+        return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,110 @@
+"""
+Benchmark: listagem de protocolos e consulta por CID-10
+
+Popula 2k protocolos e compara a consulta SQL com ILIKE e ``to_dict``
+a cada requisição com o catálogo em memória (JSON pré-serializado).
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from benchmarks._common import bench_app, measure, seed_users
+
+TOTAL_PROTOCOLS = 2_000
+PAGE_SIZE = 20
+LOOKUPS = 100_000
+
+ICD10_CODES = ['M54.5', 'M54.4', 'M54.2', 'M75.1', 'M76.5', 'M17.1', 'S83.5', 'M79.7', 'G56.0', 'M65.4']
+BODY_REGIONS = ['coluna_lombar', 'coluna_cervical', 'ombro', 'joelho', 'punho']
+
+
+def seed_protocols(db, ClinicalProtocol, EvidenceLevel, ProtocolStatus, creator_id):
+    """Insere protocolos com colunas JSON de tamanho realista"""
+
+    rng = random.Random(42)
+    levels = list(EvidenceLevel)
+    now = datetime.utcnow()
+    phases = [
+        {'name': f'Fase {n}', 'duration': '2 semanas', 'objectives': ['Reduzir dor'] * 5,
+         'interventions': [{'name': f'Exercício {i}', 'dosage': '3x10'} for i in range(10)]}
+        for n in range(4)
+    ]
+    references = [{'title': f'Estudo {i}', 'year': 2015 + i % 8, 'doi': f'10.1000/{i}'} for i in range(15)]
+
+    rows = []
+    for i in range(TOTAL_PROTOCOLS):
+        rows.append({
+            'id': str(uuid4()),
+            'title': f'Protocolo {i}',
+            'description': 'Protocolo sintético de reabilitação',
+            'pathology': rng.choice(['Lombalgia', 'Cervicalgia', 'Tendinopatia', 'Entorse']),
+            'icd10_codes': rng.sample(ICD10_CODES, 2),
+            'body_region': rng.choice(BODY_REGIONS),
+            'specialization_area': 'ortopedia',
+            'evidence_level': rng.choice(levels),
+            'grade_recommendation': 'A',
+            'references': references,
+            'indications': ['dor'], 'contraindications': [], 'precautions': [],
+            'phases': phases,
+            'assessment_tools': [{'name': 'EVA'}, {'name': 'Oswestry'}],
+            'outcome_measures': [{'measure': 'dor', 'target': '> 50%'}],
+            'frequency_recommendations': {'sessions_per_week': '2-3'},
+            'inclusion_criteria': ['adulto'], 'exclusion_criteria': [],
+            'population_modifications': {},
+            'status': ProtocolStatus.ACTIVE,
+            'version': '1.0',
+            'usage_count': rng.randint(0, 500),
+            'created_by': creator_id,
+            'created_at': now,
+            'updated_at': now - timedelta(minutes=i),
+        })
+    db.session.execute(insert(ClinicalProtocol), rows)
+    db.session.commit()
+
+
+def main():
+    with bench_app() as (app, db):
+        from app.models.clinical_protocols import ClinicalProtocol, EvidenceLevel, ProtocolStatus
+        from app.services.protocol_catalog import load_catalog, normalize_icd10
+
+        creator_id = seed_users(db, 1)[0]
+        seed_protocols(db, ClinicalProtocol, EvidenceLevel, ProtocolStatus, creator_id)
+        print(f'{TOTAL_PROTOCOLS} protocolos ({db.engine.dialect.name})\n')
+
+        def sql_page():
+            protocols = ClinicalProtocol.query.filter(
+                ClinicalProtocol.status == ProtocolStatus.ACTIVE,
+                ClinicalProtocol.pathology.ilike('%lomb%'),
+                ClinicalProtocol.body_region == 'coluna_lombar'
+            ).order_by(ClinicalProtocol.updated_at.desc()).limit(PAGE_SIZE).all()
+            return app.json.dumps([p.to_dict(include_details=True) for p in protocols])
+
+        def sql_icd10():
+            # Sem índice para a coluna JSON: filtra em Python depois de ler tudo
+            rows = db.session.query(ClinicalProtocol.id, ClinicalProtocol.icd10_codes).filter(
+                ClinicalProtocol.status == ProtocolStatus.ACTIVE
+            ).all()
+            return [row.id for row in rows if any(normalize_icd10(c) == 'M545' for c in row.icd10_codes)]
+
+        catalog = measure('Carga do catálogo', load_catalog, repeat=3)
+
+        def catalog_page():
+            return catalog.list_protocols(pathology='lomb', body_region='coluna_lombar', include_details=True)
+
+        measure('SQL: página com detalhes (ILIKE + to_dict)', sql_page)
+        measure('Catálogo: página com detalhes', catalog_page)
+        measure('SQL: protocolos do CID-10 M54.5', sql_icd10, repeat=5)
+
+        start = time.perf_counter()
+        for index in range(LOOKUPS):
+            catalog.icd10_lookup(ICD10_CODES[index % len(ICD10_CODES)])
+        elapsed = time.perf_counter() - start
+        print(f"{'Catálogo: consulta CID-10':<55} {elapsed / LOOKUPS * 1e6:8.2f}µs por consulta")
+
+
+if __name__ == '__main__':
+    main()
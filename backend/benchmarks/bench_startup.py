@@ -0,0 +1,75 @@
+"""
+Benchmark: tempo de inicialização do worker (create_app em processo novo)
+
+Mede create_app() em interpretadores novos, lista os pacotes mais caros
+e falha (código 1) se o p50 passar do orçamento ou se algum SDK de IA for
+importado na inicialização. Serve como teste de regressão no CI:
+
+    python -m benchmarks.bench_startup --budget-ms 1500
+"""
+
+import argparse
+import os
+import resource
+import statistics
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BACKEND_DIR))
+
+from app.commands.startup_profile import group_by_package, profile_startup, total_import_us  # noqa: E402
+
+RUNS = 5
+
+# Pacotes que só devem ser importados na primeira chamada de IA
+LAZY_PACKAGES = ('openai', 'anthropic', 'google.generativeai', 'httpx')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=RUNS)
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('STARTUP_BUDGET_MS') or 0),
+                        help='Falha se o p50 passar deste valor (0 = sem orçamento)')
+    parser.add_argument('--blueprints', default=None, help='ENABLED_BLUEPRINTS do processo medido')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+    env.setdefault('FLASK_ENV', 'development')
+    if args.blueprints is not None:
+        env['ENABLED_BLUEPRINTS'] = args.blueprints
+
+    timings = []
+    costs = []
+    for _ in range(args.runs):
+        elapsed_ms, costs = profile_startup(cwd=str(BACKEND_DIR), env=env)
+        timings.append(elapsed_ms)
+
+    # ru_maxrss dos filhos: KB no Linux, bytes no macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+    p50 = statistics.median(timings)
+    print(f"{'create_app() em processo novo':<55} p50={p50:8.2f}ms  max={max(timings):8.2f}ms")
+    print(f"{'Imports na inicialização':<55} {total_import_us(costs) / 1000:8.2f}ms  ({len(costs)} módulos)")
+    print(f"{'Pico de RSS':<55} {peak_rss_mb:8.1f}MB\n")
+
+    for package, self_us in list(group_by_package(costs).items())[:10]:
+        print(f'  {self_us / 1000:8.2f}ms  {package}')
+
+    failures = []
+    imported = {cost.module for cost in costs}
+    eager = [package for package in LAZY_PACKAGES if package in imported]
+    if eager:
+        failures.append(f"importados na inicialização: {', '.join(eager)}")
+    if args.budget_ms and p50 > args.budget_ms:
+        failures.append(f'p50 {p50:.0f}ms acima do orçamento de {args.budget_ms:.0f}ms')
+
+    for failure in failures:
+        print(f'\nFALHA: {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
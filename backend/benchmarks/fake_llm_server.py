@@ -0,0 +1,125 @@
+"""
+Servidor HTTP local que imita a Messages API da Anthropic
+
+Responde POST /v1/messages após ``latency`` segundos com uma mensagem
+fixa, com keep-alive, e conta requisições simultâneas e conexões
+abertas. Serve de alvo para o benchmark de concorrência sem rede nem
+chave de API:
+
+    python -m benchmarks.fake_llm_server --port 8089 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+from typing import Optional
+
+
+class FakeLLMServer:
+    """Servidor asyncio em thread própria"""
+
+    def __init__(self, latency: float = 0.5, host: str = '127.0.0.1', port: int = 0):
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._ready = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def reset_counters(self) -> None:
+        self.requests = self.connections = self.peak_in_flight = 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                self.requests += 1
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                try:
+                    await asyncio.sleep(self.latency)
+                finally:
+                    self.in_flight -= 1
+
+                payload = json.loads(body or b'{}')
+                response = json.dumps({
+                    'id': f'msg_fake_{self.requests}',
+                    'type': 'message',
+                    'role': 'assistant',
+                    'model': payload.get('model', 'fake'),
+                    'content': [{'type': 'text', 'text': 'Sugestão simulada para a evolução.'}],
+                    'stop_reason': 'end_turn',
+                    'stop_sequence': None,
+                    'usage': {'input_tokens': 200, 'output_tokens': 50}
+                }).encode()
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\n'
+                    b'Content-Type: application/json\r\n'
+                    + f'Content-Length: {len(response)}\r\n'.encode()
+                    + b'Connection: keep-alive\r\n\r\n'
+                    + response
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self) -> 'FakeLLMServer':
+        threading.Thread(target=self._run, name='fake-llm-server', daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LLM falso para testes de carga')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(latency=args.latency, port=args.port).start()
+    print(f'LLM falso em {server.base_url} (latência {args.latency}s) - Ctrl+C para sair')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Provedor de IA falso para testes do orquestrador
+
+Responde localmente, conta chamadas e permite injetar latência e
+falhas, sem chaves de API nem rede.
+"""
+
+import asyncio
+import random
+from types import SimpleNamespace
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from app.services.ai_orchestrator import AIOrchestrator, AIProvider, AIResponse
+
+
+class FakeRateLimitError(Exception):
+    """Imita o RateLimitError dos SDKs (HTTP 429 com Retry-After)"""
+    
+    status_code = 429
+    
+    def __init__(self, retry_after: float):
+        super().__init__('429 Too Many Requests')
+        self.retry_after = retry_after
+
+
+class FakeProvider:
+    """Provedor simulado"""
+
+    def __init__(self, provider: AIProvider, latency: float = 0.0, failure_rate: float = 0.0,
+                 tokens: int = 120, seed: int = 0, chunks: int = 5, chunk_delay: float = 0.0,
+                 fail_after: Optional[int] = None, fail_first: int = 0,
+                 fail_when: Optional[Callable[[str], bool]] = None,
+                 rate_limit_first: int = 0, retry_after: float = 0.05):
+        self.provider = provider
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.tokens = tokens
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.fail_after = fail_after
+        self.fail_first = fail_first
+        self.fail_when = fail_when
+        self.rate_limit_first = rate_limit_first
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.streams_closed = 0
+        self.chunks_sent = 0
+        self.prompts: List[str] = []
+        self._rng = random.Random(seed)
+
+    async def complete(self, request, system_prompt: str, user_prompt: str) -> AIResponse:
+        self.calls += 1
+        self.prompts.append(user_prompt)
+        if self.calls <= self.rate_limit_first:
+            raise FakeRateLimitError(self.retry_after)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if self.calls <= self.rate_limit_first + self.fail_first:
+            raise RuntimeError(f'{self.provider.value}: falha simulada')
+        if self.fail_when and self.fail_when(user_prompt):
+            raise RuntimeError(f'{self.provider.value}: entrada rejeitada')
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise RuntimeError(f'{self.provider.value}: falha simulada')
+        return AIResponse(
+            provider=self.provider,
+            content=f'[{self.provider.value}] resposta #{self.calls}',
+            confidence=0.9,
+            tokens_used=self.tokens,
+            processing_time=0,
+            metadata={'model': f'fake-{self.provider.value}'},
+            success=True
+        )
+
+    async def stream(self, request, system_prompt: str, user_prompt: str,
+                     usage: Dict) -> AsyncIterator[str]:
+        """Emite ``chunks`` trechos; ``fail_after`` trechos antes de falhar"""
+        self.calls += 1
+        self.prompts.append(user_prompt)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.failure_rate and self._rng.random() < self.failure_rate:
+                raise RuntimeError(f'{self.provider.value}: falha simulada')
+            for index in range(self.chunks):
+                if self.fail_after is not None and index >= self.fail_after:
+                    raise RuntimeError(f'{self.provider.value}: stream interrompido')
+                if self.chunk_delay and index:
+                    await asyncio.sleep(self.chunk_delay)
+                self.chunks_sent += 1
+                yield f'{self.provider.value}-{index} '
+            usage['total_tokens'] = self.tokens
+        finally:
+            self.streams_closed += 1
+
+
+class FakeAnthropicClient:
+    """Cliente com a forma do AsyncAnthropic (``messages.create``)"""
+
+    def __init__(self, text: str = 'resposta do claude', input_tokens: int = 80, output_tokens: int = 40,
+                 error: Optional[Exception] = None):
+        self.calls: List[Dict] = []
+
+        async def create(**kwargs):
+            self.calls.append(kwargs)
+            if error is not None:
+                raise error
+            return SimpleNamespace(
+                content=[SimpleNamespace(text=text)],
+                usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens)
+            )
+
+        self.messages = SimpleNamespace(create=create)
+
+
+class FakeOpenAIClient:
+    """Cliente com a forma do AsyncOpenAI (``chat.completions.create``)"""
+
+    def __init__(self, text: str = 'resposta do gpt-4', prompt_tokens: int = 70, completion_tokens: int = 30):
+        self.calls: List[Dict] = []
+
+        async def create(**kwargs):
+            self.calls.append(kwargs)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+                usage=SimpleNamespace(
+                    total_tokens=prompt_tokens + completion_tokens,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens
+                )
+            )
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+class FakeOrchestrator(AIOrchestrator):
+    """Orquestrador que usa apenas provedores falsos"""
+
+    def __init__(self, fakes: Optional[Dict[AIProvider, FakeProvider]] = None, **kwargs):
+        self.fakes = fakes or {AIProvider.CLAUDE: FakeProvider(AIProvider.CLAUDE)}
+        super().__init__(**kwargs)
+
+    def _initialize_providers(self):
+        self.providers = dict(self.fakes)
+
+    async def _call_provider(self, provider, request, system_prompt, user_prompt):
+        return await self.fakes[provider].complete(request, system_prompt, user_prompt)
+
+    def _stream_provider(self, provider, request, system_prompt, user_prompt, usage):
+        return self.fakes[provider].stream(request, system_prompt, user_prompt, usage)
+
+    def _get_patient_context(self, patient_id: str) -> str:
+        return f'Paciente {patient_id}'
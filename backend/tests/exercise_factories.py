@@ -0,0 +1,79 @@
+"""
+App de testes e dados compartilhados (usuários, exercícios, prescrições e execuções)
+
+Os testes usam SQLite em memória sem chaves estrangeiras, então
+pacientes e usuários são referenciados só pelo id.
+"""
+
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pytest
+from flask import Flask
+
+from app import db
+from app.models.exercise import (
+    Exercise, ExerciseCategory, ExerciseDifficulty, ExerciseExecution, PatientExercise
+)
+from app.models.user import User
+
+
+@contextmanager
+def database_app(**config):
+    """Contexto de um app com SQLite em memória, com as tabelas criadas e removidas ao sair"""
+    flask_app = Flask(__name__)
+    flask_app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', **config)
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        import app.models  # noqa: F401  (registra as tabelas)
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def app_context():
+    """App com SQLite em memória"""
+    with database_app() as flask_app:
+        yield flask_app
+
+
+def make_user(user_id='user-1', email=None, password='senha123', **fields) -> User:
+    fields.setdefault('is_active', True)
+    user = User(id=user_id, email=email or f'{user_id}@fisioflow.com', password=password, **fields)
+    db.session.add(user)
+    return user
+
+
+def make_exercise(exercise_id='exercise-1', points_value=10, **fields) -> Exercise:
+    exercise = Exercise(
+        id=exercise_id, title=f'Exercício {exercise_id}', description='Descrição',
+        instructions='Instruções', category=ExerciseCategory.FORTALECIMENTO,
+        difficulty=ExerciseDifficulty.INICIANTE, body_regions=['joelho'],
+        points_value=points_value, **fields
+    )
+    db.session.add(exercise)
+    return exercise
+
+
+def make_prescription(prescription_id='prescription-1', exercise_id='exercise-1',
+                      patient_id='patient-1', prescribed_by='therapist-1', **fields) -> PatientExercise:
+    fields.setdefault('start_date', date(2024, 1, 1))
+    prescription = PatientExercise(
+        id=prescription_id, exercise_id=exercise_id, patient_id=patient_id,
+        prescribed_by=prescribed_by, **fields
+    )
+    db.session.add(prescription)
+    return prescription
+
+
+def make_execution(prescription: PatientExercise, **fields) -> ExerciseExecution:
+    fields.setdefault('started_at', datetime(2024, 1, 2, 10, 0))
+    fields.setdefault('completed_at', fields['started_at'])
+    execution = ExerciseExecution(
+        patient_exercise_id=prescription.id, exercise_id=prescription.exercise_id,
+        patient_id=prescription.patient_id, **fields
+    )
+    db.session.add(execution)
+    return execution
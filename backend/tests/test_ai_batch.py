@@ -0,0 +1,214 @@
+"""
+Testes para jobs de IA em lote com provedores simulados
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app import db
+from app.models.ai_batch import AIBatchJob
+from app.services import ai_batch
+from app.services.ai_batch import (
+    BatchValidationError, create_batch_job, run_batch_job, cancel_batch_job, retry_failed_items,
+    claim_job, claim_pending_jobs
+)
+from app.services.ai_orchestrator import AIProvider
+from tests.ai_fakes import FakeOrchestrator, FakeProvider
+from tests.exercise_factories import database_app
+
+
+@pytest.fixture
+def app_context(monkeypatch):
+    """App com SQLite em memória e jobs sem despacho automático"""
+    monkeypatch.setattr(ai_batch, 'RETRY_BASE_SECONDS', 0.0)
+    with database_app(AI_CACHE_ENABLED=False, AI_BATCH_INLINE=False, AI_USAGE_LEDGER_ENABLED=False) as flask_app:
+        yield flask_app
+
+
+USER = SimpleNamespace(id='user-1')
+
+
+def documents(count, prefix='Relatório de exame'):
+    return [{'content': f'{prefix} número {index}', 'document_type': 'exame'} for index in range(count)]
+
+
+def run(job, fakes=None, **kwargs):
+    orchestrator = FakeOrchestrator(fakes, **kwargs)
+    job = asyncio.run(run_batch_job(job.id, orchestrator=orchestrator))
+    return job, orchestrator
+
+
+class TestCreateBatchJob:
+    """Validação e gravação do job"""
+
+    def test_items_are_persisted_as_pending(self, app_context):
+        """Todos os itens gravados na criação, com opções normalizadas"""
+        job = create_batch_job(USER, 'document_analysis', documents(3), {'concurrency': 500})
+
+        assert job.status == 'pending'
+        assert job.total_items == 3
+        assert job.options['concurrency'] == ai_batch.MAX_JOB_CONCURRENCY
+        assert [item.position for item in job.items] == [0, 1, 2]
+        assert {item.status for item in job.items} == {'pending'}
+
+    @pytest.mark.parametrize('job_type,items', [
+        ('unknown', [{'content': 'Relatório de exame'}]),
+        ('document_analysis', []),
+        ('document_analysis', [{'content': 'curto'}]),
+        ('soap_completion', [{'subjective': 'Dor lombar'}]),
+    ])
+    def test_invalid_jobs_are_rejected(self, app_context, job_type, items):
+        """Tipo, lista vazia e itens incompletos geram BatchValidationError"""
+        with pytest.raises(BatchValidationError):
+            create_batch_job(USER, job_type, items)
+
+
+class TestRunBatchJob:
+    """Processamento dos itens"""
+
+    def test_all_items_succeed(self, app_context):
+        """Job concluído com contadores e tokens acumulados"""
+        job = create_batch_job(USER, 'document_analysis', documents(4))
+        fake = FakeProvider(AIProvider.CLAUDE, tokens=50)
+
+        job, _ = run(job, {AIProvider.CLAUDE: fake})
+
+        assert job.status == 'completed'
+        assert (job.succeeded_items, job.failed_items, job.tokens_used) == (4, 0, 200)
+        assert job.progress == 1.0
+        assert all(item.output and item.provider == 'claude' for item in job.items)
+
+    def test_failed_attempt_is_retried(self, app_context):
+        """Falha transitória é repetida dentro de max_attempts"""
+        job = create_batch_job(USER, 'document_analysis', documents(1), {'max_attempts': 3})
+        fake = FakeProvider(AIProvider.CLAUDE, fail_first=2)
+
+        job, _ = run(job, {AIProvider.CLAUDE: fake})
+
+        item = job.items.first()
+        assert job.status == 'completed'
+        assert item.attempts == 3
+        assert item.error is None
+
+    def test_partial_results_are_kept(self, app_context):
+        """Itens falhos não descartam os concluídos"""
+        items = documents(3) + documents(2, prefix='Documento corrompido')
+        job = create_batch_job(USER, 'document_analysis', items, {'max_attempts': 2})
+        fake = FakeProvider(AIProvider.CLAUDE, fail_when=lambda prompt: 'corrompido' in prompt)
+
+        job, _ = run(job, {AIProvider.CLAUDE: fake})
+
+        assert job.status == 'partial'
+        assert (job.succeeded_items, job.failed_items) == (3, 2)
+        failed = job.items.filter_by(status='failed').all()
+        assert all(item.attempts == 2 and item.error for item in failed)
+
+    def test_job_concurrency_is_bounded(self, app_context):
+        """No máximo ``concurrency`` chamadas simultâneas por job"""
+        job = create_batch_job(USER, 'document_analysis', documents(12), {'concurrency': 3})
+        fake = FakeProvider(AIProvider.CLAUDE, latency=0.01)
+
+        job, _ = run(job, {AIProvider.CLAUDE: fake})
+
+        assert job.status == 'completed'
+        assert fake.peak_in_flight == 3
+
+    def test_rate_limit_waits_on_same_provider(self, app_context):
+        """429 bloqueia o provedor e o lote espera em vez de trocar de provedor"""
+        job = create_batch_job(USER, 'document_analysis', documents(1))
+        claude = FakeProvider(AIProvider.CLAUDE, rate_limit_first=1, retry_after=0.01)
+        gpt4 = FakeProvider(AIProvider.GPT4)
+
+        job, orchestrator = run(job, {AIProvider.CLAUDE: claude, AIProvider.GPT4: gpt4})
+
+        item = job.items.first()
+        assert job.status == 'completed'
+        assert item.provider == 'claude'
+        assert item.attempts == 1
+        assert (claude.calls, gpt4.calls) == (2, 0)
+        assert orchestrator._get_limiter().rate_limited == 1
+
+    def test_interrupted_job_is_resumed(self, app_context):
+        """Itens deixados em running por um worker interrompido são refeitos"""
+        job = create_batch_job(USER, 'document_analysis', documents(3))
+        first = job.items.first()
+        first.status = 'succeeded'
+        first.output = 'pronto'
+        job.succeeded_items = 1
+        job.items.filter_by(position=1).one().status = 'running'
+        job.status = 'running'
+        db.session.commit()
+        fake = FakeProvider(AIProvider.CLAUDE)
+
+        job, _ = run(job, {AIProvider.CLAUDE: fake})
+
+        assert job.status == 'completed'
+        assert job.succeeded_items == 3
+        assert fake.calls == 2
+
+    def test_cancelled_job_is_not_processed(self, app_context):
+        """Job cancelado antes da execução não chama o provedor"""
+        job = create_batch_job(USER, 'document_analysis', documents(2))
+        cancel_batch_job(job)
+        fake = FakeProvider(AIProvider.CLAUDE)
+
+        job, _ = run(job, {AIProvider.CLAUDE: fake})
+
+        assert job.status == 'cancelled'
+        assert fake.calls == 0
+
+    def test_failed_items_can_be_retried(self, app_context):
+        """retry_failed_items reabre o job apenas para os itens falhos"""
+        items = documents(2) + documents(1, prefix='Documento corrompido')
+        job = create_batch_job(USER, 'document_analysis', items, {'max_attempts': 1})
+        job, _ = run(job, {AIProvider.CLAUDE: FakeProvider(
+            AIProvider.CLAUDE, fail_when=lambda prompt: 'corrompido' in prompt
+        )})
+        assert job.status == 'partial'
+
+        assert retry_failed_items(job) == 1
+        assert job.status == 'pending'
+        fake = FakeProvider(AIProvider.CLAUDE)
+        job, _ = run(job, {AIProvider.CLAUDE: fake})
+
+        assert job.status == 'completed'
+        assert (job.succeeded_items, job.failed_items) == (3, 0)
+        assert fake.calls == 1
+
+
+class TestClaimPendingJobs:
+    """Reivindicação de jobs pelo worker"""
+
+    def test_job_is_claimed_once(self, app_context):
+        job = create_batch_job(USER, 'document_analysis', documents(1))
+
+        first = claim_pending_jobs()
+        second = claim_pending_jobs()
+
+        assert [claimed.id for claimed in first] == [job.id]
+        assert first[0].status == 'running'
+        assert second == []
+
+    def test_only_one_concurrent_claim_wins(self, app_context):
+        """Dois workers que leram o mesmo job pendente: só um UPDATE o altera"""
+        job = create_batch_job(USER, 'document_analysis', documents(1))
+        stale_before = datetime.utcnow() - timedelta(minutes=ai_batch.STALE_JOB_MINUTES)
+
+        assert claim_job(job.id, stale_before) is True
+        assert claim_job(job.id, stale_before) is False
+
+    def test_stale_running_job_is_reclaimed(self, app_context):
+        stale = create_batch_job(USER, 'document_analysis', documents(1))
+        active = create_batch_job(USER, 'document_analysis', documents(1))
+        for job in (stale, active):
+            job.status = 'running'
+        db.session.commit()
+        db.session.query(AIBatchJob).filter_by(id=stale.id).update(
+            {'updated_at': datetime.utcnow() - timedelta(minutes=ai_batch.STALE_JOB_MINUTES + 1)}
+        )
+        db.session.commit()
+
+        assert [job.id for job in claim_pending_jobs()] == [stale.id]
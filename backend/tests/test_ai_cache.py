@@ -0,0 +1,177 @@
+"""
+Testes para o cache de respostas do orquestrador de IA
+"""
+
+import asyncio
+import time
+
+import pytest
+from flask import Flask
+
+from app.services.ai_cache import (
+    AIResponseCache, MemoryCacheBackend, DiskCacheBackend, SemanticIndex, HashingEmbedder,
+    cache_key
+)
+from app.services.ai_orchestrator import AIRequest, AITaskType, AIProvider
+from tests.ai_fakes import FakeOrchestrator, FakeProvider
+
+
+@pytest.fixture
+def app_context():
+    """Contexto Flask mínimo (o orquestrador usa current_app.logger)"""
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+def make_request(prompt='Lombalgia crônica', temperature=0.3, **kwargs):
+    return AIRequest(
+        task_type=AITaskType.EXERCISE_SUGGESTION,
+        prompt=prompt,
+        context={},
+        user_id='user-1',
+        temperature=temperature,
+        **kwargs
+    )
+
+
+class TestCacheKey:
+    """Testes para a chave do cache"""
+    
+    def test_whitespace_is_normalized(self):
+        """Espaços e quebras de linha extras não mudam a chave"""
+        a = cache_key('t', 'sistema', 'Dor   no\n joelho ', 0.3, 'claude', 1000)
+        b = cache_key('t', 'sistema', 'Dor no joelho', 0.3, 'claude', 1000)
+        assert a == b
+    
+    def test_parameters_change_key(self):
+        """Provedor, temperatura e tarefa fazem parte da chave"""
+        base = cache_key('t', 's', 'u', 0.3, 'claude', 1000)
+        assert base != cache_key('t', 's', 'u', 0.3, 'gpt4', 1000)
+        assert base != cache_key('t', 's', 'u', 0.5, 'claude', 1000)
+        assert base != cache_key('x', 's', 'u', 0.3, 'claude', 1000)
+
+
+class TestBackends:
+    """Testes para os backends de armazenamento"""
+    
+    def test_memory_lru_eviction(self):
+        """Entrada menos usada é removida ao exceder o limite"""
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set('a', {'v': 1}, ttl=60)
+        backend.set('b', {'v': 2}, ttl=60)
+        backend.get('a')
+        backend.set('c', {'v': 3}, ttl=60)
+        
+        assert backend.get('a') == {'v': 1}
+        assert backend.get('b') is None
+        assert backend.get('c') == {'v': 3}
+    
+    def test_memory_ttl(self):
+        """Entradas expiradas não são retornadas"""
+        backend = MemoryCacheBackend()
+        backend.set('a', {'v': 1}, ttl=-1)
+        assert backend.get('a') is None
+    
+    def test_disk_roundtrip_and_eviction(self, tmp_path):
+        """Backend em disco persiste e respeita o limite de entradas"""
+        backend = DiskCacheBackend(str(tmp_path), max_entries=2)
+        backend.set('a', {'v': 1}, ttl=60)
+        time.sleep(0.01)
+        backend.set('b', {'v': 2}, ttl=60)
+        time.sleep(0.01)
+        backend.set('c', {'v': 3}, ttl=60)
+        
+        assert backend.get('a') is None
+        assert DiskCacheBackend(str(tmp_path)).get('c') == {'v': 3}
+
+
+class TestOrchestratorCache:
+    """Testes do cache integrado ao AIOrchestrator com provedor falso"""
+    
+    def test_identical_requests_hit_cache(self, app_context):
+        """Segunda requisição idêntica não chama o provedor"""
+        fake = FakeProvider(AIProvider.CLAUDE, tokens=150)
+        cache = AIResponseCache(MemoryCacheBackend())
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake}, cache=cache)
+        
+        first = asyncio.run(orchestrator.process_request(make_request()))
+        second = asyncio.run(orchestrator.process_request(make_request()))
+        
+        assert fake.calls == 1
+        assert second.success
+        assert second.content == first.content
+        assert second.tokens_used == 0
+        assert second.metadata['cache'] == 'exact'
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 1
+        assert cache.stats.tokens_saved == 150
+        assert cache.stats.hit_rate == 0.5
+    
+    def test_high_temperature_bypasses_cache(self, app_context):
+        """Chat com temperatura alta sempre chama o provedor"""
+        fake = FakeProvider(AIProvider.CLAUDE)
+        cache = AIResponseCache(MemoryCacheBackend(), max_temperature=0.75)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake}, cache=cache)
+        
+        for _ in range(2):
+            asyncio.run(orchestrator.process_request(make_request(temperature=0.8)))
+        
+        assert fake.calls == 2
+        assert cache.stats.bypassed == 2
+        assert cache.stats.hits == 0
+    
+    def test_use_cache_false_bypasses(self, app_context):
+        """Requisição pode desligar o cache explicitamente"""
+        fake = FakeProvider(AIProvider.CLAUDE)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake}, cache=AIResponseCache(MemoryCacheBackend()))
+        
+        for _ in range(2):
+            asyncio.run(orchestrator.process_request(make_request(use_cache=False)))
+        
+        assert fake.calls == 2
+    
+    def test_failures_are_not_cached(self, app_context):
+        """Erros do provedor não entram no cache"""
+        fake = FakeProvider(AIProvider.CLAUDE, failure_rate=1.0)
+        cache = AIResponseCache(MemoryCacheBackend())
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake}, cache=cache)
+        
+        response = asyncio.run(orchestrator.process_request(make_request()))
+        
+        assert not response.success
+        assert cache.stats.stores == 0
+    
+    def test_semantic_tier_matches_near_duplicates(self, app_context):
+        """Prompt quase idêntico reaproveita resposta pela camada semântica"""
+        fake = FakeProvider(AIProvider.CLAUDE)
+        cache = AIResponseCache(
+            MemoryCacheBackend(),
+            semantic=SemanticIndex(HashingEmbedder(), threshold=0.9)
+        )
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake}, cache=cache)
+        
+        asyncio.run(orchestrator.process_request(
+            make_request('Condição: tendinopatia patelar. Objetivos: reduzir dor, ganhar força')
+        ))
+        response = asyncio.run(orchestrator.process_request(
+            make_request('Condição: tendinopatia patelar. Objetivos: reduzir dor e ganhar força.')
+        ))
+        
+        assert fake.calls == 1
+        assert response.metadata['cache'] == 'semantic'
+        assert cache.stats.semantic_hits == 1
+    
+    def test_semantic_tier_is_scoped_by_patient(self, app_context):
+        """Resposta de um paciente nunca é reutilizada para outro"""
+        fake = FakeProvider(AIProvider.CLAUDE)
+        cache = AIResponseCache(
+            MemoryCacheBackend(),
+            semantic=SemanticIndex(HashingEmbedder(), threshold=0.5)
+        )
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake}, cache=cache)
+        
+        asyncio.run(orchestrator.process_request(make_request(patient_id='p1')))
+        asyncio.run(orchestrator.process_request(make_request(patient_id='p2')))
+        
+        assert fake.calls == 2
@@ -0,0 +1,203 @@
+"""
+Testes para a montagem do contexto dos prompts de IA
+"""
+
+import asyncio
+from datetime import date
+
+import pytest
+from flask import Flask
+
+from app import db
+from app.models.patient import Evolution, MedicalRecord, Patient
+from app.services.ai_context import (
+    TRUNCATION_MARKER, build_user_prompt, deduplicate_context, estimate_tokens,
+    get_patient_context_cache, legacy_prompt, split_document, truncate_to_tokens
+)
+from app.services.ai_orchestrator import AIService, AIProvider
+from tests.ai_fakes import FakeOrchestrator, FakeProvider
+from tests.exercise_factories import database_app
+
+
+@pytest.fixture
+def app_context():
+    """Contexto Flask mínimo, sem cache de respostas"""
+    app = Flask(__name__)
+    app.config.update(AI_CACHE_ENABLED=False)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def database():
+    """SQLite em memória com um paciente e um prontuário"""
+    with database_app(AI_CACHE_ENABLED=False):
+        db.session.add_all([
+            Patient(id='patient-1', nome_completo='Maria Souza'),
+            Patient(id='patient-2', nome_completo='João Lima'),
+        ])
+        record = MedicalRecord(patient_id='patient-1', created_by='user-1', data_avaliacao=date(2025, 1, 6))
+        db.session.add(record)
+        db.session.commit()
+        yield record
+
+
+class TestTokenBudget:
+    """Estimativa, corte e divisão de textos"""
+
+    def test_truncate_respects_budget(self):
+        """O texto cortado cabe no orçamento e termina com o marcador"""
+        text = '\n'.join(f'Linha {index} da evolução clínica do paciente' for index in range(200))
+
+        trimmed = truncate_to_tokens(text, 100)
+
+        assert estimate_tokens(trimmed) <= 100
+        assert trimmed.endswith(TRUNCATION_MARKER)
+        assert truncate_to_tokens('curto', 100) == 'curto'
+
+    def test_split_document_keeps_paragraphs(self):
+        """Partes dentro do limite, sem perder parágrafos"""
+        paragraphs = [f'Parágrafo {index}: ' + 'achado clínico relevante. ' * 20 for index in range(30)]
+        document = '\n\n'.join(paragraphs)
+
+        chunks = split_document(document, 500)
+
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= 500 for chunk in chunks)
+        assert '\n\n'.join(chunks) == document
+
+    def test_split_document_breaks_long_lines(self):
+        """Parágrafo único maior que o limite também é dividido"""
+        chunks = split_document('x' * 10000, 500)
+
+        assert len(chunks) > 1
+        assert ''.join(chunks) == 'x' * 10000
+
+
+class TestBuildUserPrompt:
+    """Deduplicação e orçamento do prompt do usuário"""
+
+    def test_chat_context_is_not_repeated(self, app_context):
+        """Histórico e mensagem já presentes na solicitação não são repetidos"""
+        history = [{'role': 'user', 'content': 'Tenho dor no ombro ao elevar o braço'}]
+        request = AIService().build_chat_request('Posso fazer musculação?', history, 'user-1')
+
+        assert deduplicate_context(request.context, request.prompt) == {}
+        user_prompt, stats = build_user_prompt('chat_response', request.prompt, request.context)
+
+        assert user_prompt.count('Tenho dor no ombro') == 1
+        assert user_prompt.count('Posso fazer musculação?') == 1
+        assert stats.tokens_saved > 0
+
+    def test_context_not_in_prompt_is_kept(self, app_context):
+        """Valores que a solicitação não traz continuam no contexto adicional"""
+        user_prompt, _ = build_user_prompt('diagnosis_support', 'Avaliar dor lombar', {
+            'examination_findings': {'lasegue': 'positivo à direita', 'lado': 'D'},
+            'content_length': 1200
+        })
+
+        assert 'Contexto Adicional' in user_prompt
+        assert 'positivo à direita' in user_prompt
+        assert '"lado":"D"' in user_prompt
+        assert 'content_length: 1200' in user_prompt
+
+    def test_patient_context_is_trimmed_to_budget(self, app_context):
+        """Contexto do paciente é cortado; a solicitação fica inteira"""
+        app_context.config['AI_PROMPT_TOKEN_BUDGETS'] = {'soap_completion': 300}
+        patient_context = '\n'.join(f'Evolução {index}: melhora parcial da dor' for index in range(200))
+
+        user_prompt, stats = build_user_prompt('soap_completion', 'Completar evolução', {}, patient_context)
+
+        assert stats.truncated
+        assert stats.budget == 300
+        assert stats.prompt_tokens <= 300
+        assert user_prompt.endswith('Solicitação:\nCompletar evolução')
+        assert stats.tokens_saved == estimate_tokens(
+            legacy_prompt('Completar evolução', {}, patient_context)
+        ) - stats.prompt_tokens
+
+
+class TestPatientContextCache:
+    """Cache do resumo por paciente e invalidação após commit"""
+
+    def test_record_write_invalidates_after_commit(self, database):
+        """Gravação de prontuário descarta o resumo do paciente no commit"""
+        cache = get_patient_context_cache()
+        cache.get('patient-1', lambda patient_id: 'Resumo antigo')
+        cache.get('patient-2', lambda patient_id: 'Outro paciente')
+
+        db.session.add(MedicalRecord(patient_id='patient-1', created_by='user-1', data_avaliacao=date(2025, 2, 3)))
+        db.session.flush()
+        assert cache.get('patient-1', lambda patient_id: 'Resumo novo') == 'Resumo antigo'
+        db.session.commit()
+
+        assert cache.get('patient-1', lambda patient_id: 'Resumo novo') == 'Resumo novo'
+        assert cache.get('patient-2', lambda patient_id: 'Resumo novo') == 'Outro paciente'
+
+    def test_new_evolution_invalidates_its_patient(self, database):
+        """Evolução criada só com medical_record_id chega ao paciente pelo prontuário"""
+        cache = get_patient_context_cache()
+        cache.get('patient-1', lambda patient_id: 'Resumo antigo')
+
+        db.session.add(Evolution(medical_record_id=database.id, created_by='user-1',
+                                 data_atendimento=date(2025, 1, 7)))
+        db.session.commit()
+
+        assert cache.get('patient-1', lambda patient_id: 'Resumo novo') == 'Resumo novo'
+
+    def test_rollback_keeps_the_cached_context(self, database):
+        cache = get_patient_context_cache()
+        cache.get('patient-1', lambda patient_id: 'Resumo antigo')
+
+        db.session.add(Evolution(medical_record_id=database.id, created_by='user-1',
+                                 data_atendimento=date(2025, 1, 7)))
+        db.session.flush()
+        db.session.rollback()
+
+        assert cache.get('patient-1', lambda patient_id: 'Resumo novo') == 'Resumo antigo'
+
+
+class TestOrchestratorPrompt:
+    """Métricas de prompt e análise de documentos longos"""
+
+    def test_prompt_stats_are_reported(self, app_context):
+        """Cada resposta traz tokens estimados e economizados"""
+        orchestrator = FakeOrchestrator()
+        request = AIService().build_soap_request('p1', {'subjective': 'Dor lombar há 3 semanas'}, 'user-1')
+
+        response = asyncio.run(orchestrator.process_request(request))
+
+        assert response.success
+        assert response.metadata['prompt']['tokens_saved'] > 0
+        assert orchestrator.prompt_stats_snapshot()['calls'] == 1
+        assert orchestrator.prompt_stats_snapshot()['tokens_saved'] == response.metadata['prompt']['tokens_saved']
+
+    def test_long_document_is_map_reduced(self, app_context):
+        """Uma chamada por parte e uma final com os resumos"""
+        app_context.config['AI_PROMPT_TOKEN_BUDGETS'] = {'document_analysis': 1000}
+        fake = FakeProvider(AIProvider.CLAUDE, tokens=10)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake})
+        document = '\n\n'.join(f'Exame {index}: ' + 'resultado dentro da normalidade. ' * 30 for index in range(20))
+
+        response = asyncio.run(AIService().analyze_document(document, 'laudo', 'user-1', orchestrator=orchestrator))
+
+        chunks = response.metadata['chunks']
+        assert response.success
+        assert chunks > 1
+        assert fake.calls == chunks + 1
+        assert response.tokens_used == 10 * (chunks + 1)
+        assert 'resumos de suas partes' in fake.prompts[-1]
+        assert all(estimate_tokens(prompt) <= 1000 for prompt in fake.prompts)
+
+    def test_failed_part_fails_the_analysis(self, app_context):
+        """Falha em uma parte interrompe antes da etapa final"""
+        app_context.config['AI_PROMPT_TOKEN_BUDGETS'] = {'document_analysis': 1000}
+        fake = FakeProvider(AIProvider.CLAUDE, fail_when=lambda prompt: 'Exame 7:' in prompt)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake})
+        document = '\n\n'.join(f'Exame {index}: ' + 'resultado dentro da normalidade. ' * 30 for index in range(20))
+
+        response = asyncio.run(AIService().analyze_document(document, 'laudo', 'user-1', orchestrator=orchestrator))
+
+        assert not response.success
+        assert 'Falha ao resumir a parte' in response.error
+        assert not any('resumos de suas partes' in prompt for prompt in fake.prompts)
@@ -0,0 +1,130 @@
+"""
+Testes para a camada de execução de IA (loop dedicado e limites de
+concorrência) com provedores simulados
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from flask import Flask, current_app
+
+from app.services.ai_executor import AIExecutor, ConcurrencyLimiter
+from app.services.ai_orchestrator import AIRequest, AITaskType, AIProvider
+from tests.ai_fakes import FakeOrchestrator, FakeProvider
+
+
+@pytest.fixture
+def app_context():
+    """Contexto Flask mínimo (o orquestrador usa current_app.logger)"""
+    app = Flask(__name__)
+    app.config['AI_CACHE_ENABLED'] = False
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def executor():
+    executor = AIExecutor(default_timeout=5)
+    yield executor
+    executor.shutdown()
+
+
+def make_request():
+    return AIRequest(
+        task_type=AITaskType.SOAP_COMPLETION,
+        prompt='Completar evolução',
+        context={},
+        user_id='user-1',
+        use_cache=False
+    )
+
+
+def call_from_threads(app, executor, orchestrator, count):
+    """Simula ``count`` threads de requisição (gthread) chamando a IA"""
+    results = []
+
+    def worker():
+        with app.app_context():
+            results.append(executor.run(orchestrator.process_request(make_request())))
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.monotonic() - started
+
+
+class TestAIExecutor:
+    """Loop de longa duração compartilhado pelas threads de requisição"""
+    
+    def test_runs_on_dedicated_loop_with_app_context(self, app_context, executor):
+        """Corrotina roda na thread do loop e enxerga o app de quem submeteu"""
+        async def probe():
+            return threading.current_thread().name, current_app.name
+        
+        thread_name, app_name = executor.run(probe())
+        
+        assert thread_name == 'ai-event-loop'
+        assert app_name == app_context.name
+    
+    def test_loop_is_reused_between_calls(self, executor):
+        """O mesmo loop atende todas as chamadas do processo"""
+        async def current_loop():
+            return asyncio.get_running_loop()
+        
+        assert executor.run(current_loop()) is executor.run(current_loop())
+    
+    def test_multiplexes_concurrent_calls(self, app_context, executor):
+        """40 chamadas de 0,2s simultâneas terminam em bem menos que 40 x 0,2s"""
+        fake = FakeProvider(AIProvider.CLAUDE, latency=0.2)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake}, limiter=ConcurrencyLimiter(64))
+        
+        results, elapsed = call_from_threads(app_context, executor, orchestrator, 40)
+        
+        assert len(results) == 40 and all(r.success for r in results)
+        assert elapsed < 2.0
+        assert executor.stats()['peak_in_flight'] >= 20
+        assert executor.stats()['in_flight'] == 0
+    
+    def test_timeout(self, executor):
+        """Chamada acima do tempo limite levanta TimeoutError"""
+        with pytest.raises(TimeoutError):
+            executor.run(asyncio.sleep(1), timeout=0.05)
+        assert executor.stats()['timeouts'] == 1
+    
+    def test_loop_recreated_after_fork(self, executor):
+        """PID diferente (fork do gunicorn --preload) cria um novo loop"""
+        first = executor.loop
+        executor._pid = -1
+        
+        assert executor.loop is not first
+        assert executor.stats()['running']
+
+
+class TestConcurrencyLimiter:
+    """Limites de chamadas simultâneas por provedor"""
+    
+    def test_provider_limit_is_respected(self, app_context, executor):
+        """Nunca mais que o limite do provedor em andamento"""
+        fake = FakeProvider(AIProvider.CLAUDE, latency=0.05)
+        limiter = ConcurrencyLimiter(max_concurrency=64, provider_limits={'claude': 5})
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake}, limiter=limiter)
+        
+        results, _ = call_from_threads(app_context, executor, orchestrator, 20)
+        
+        assert len(results) == 20
+        assert limiter.peak_in_flight == 5
+        assert limiter.waited > 0
+        assert limiter.in_flight['claude'] == 0
+    
+    def test_limiter_works_across_event_loops(self, app_context):
+        """Semáforos por loop: asyncio.run repetido não quebra o limiter"""
+        fake = FakeProvider(AIProvider.CLAUDE)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake}, limiter=ConcurrencyLimiter(2))
+        
+        for _ in range(3):
+            assert asyncio.run(orchestrator.process_request(make_request())).success
@@ -0,0 +1,236 @@
+"""
+Testes para roteamento de provedores de IA (circuit breaker, hedge e
+latência observada) com provedores simulados
+"""
+
+import asyncio
+import time
+
+import pytest
+from flask import Flask
+
+from app.services.ai_orchestrator import AIOrchestrator, AIRequest, AITaskType, AIProvider
+from app.services.ai_routing import ProviderRouter, RoutingSettings, CircuitBreaker
+from tests.ai_fakes import FakeAnthropicClient, FakeOpenAIClient, FakeOrchestrator, FakeProvider
+
+
+@pytest.fixture
+def app_context():
+    """Contexto Flask mínimo (o orquestrador usa current_app.logger)"""
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+def make_request(**kwargs):
+    # SOAP_COMPLETION prefere Claude no mapeamento estático
+    return AIRequest(
+        task_type=AITaskType.SOAP_COMPLETION,
+        prompt='Completar evolução',
+        context={},
+        user_id='user-1',
+        use_cache=False,
+        **kwargs
+    )
+
+
+def make_orchestrator(fakes, **settings):
+    router = ProviderRouter(RoutingSettings(**settings))
+    return FakeOrchestrator(fakes, router=router), router
+
+
+def run(orchestrator, count=1):
+    async def go():
+        return [await orchestrator.process_request(make_request()) for _ in range(count)]
+    return asyncio.run(go())
+
+
+class TestFallbackAndCircuitBreaker:
+    """Fallback entre provedores e abertura do circuito"""
+    
+    def test_failed_primary_falls_back(self, app_context):
+        """Falha do preferido é atendida pelo próximo provedor"""
+        claude = FakeProvider(AIProvider.CLAUDE, failure_rate=1.0)
+        gpt4 = FakeProvider(AIProvider.GPT4)
+        orchestrator, _ = make_orchestrator({AIProvider.CLAUDE: claude, AIProvider.GPT4: gpt4})
+        
+        response, = run(orchestrator)
+        
+        assert response.success
+        assert response.provider == AIProvider.GPT4
+        assert response.metadata['routing']['fallback'] is True
+        assert claude.calls == 1
+    
+    def test_circuit_opens_after_consecutive_failures(self, app_context):
+        """Após o limite de falhas o provedor deixa de ser chamado"""
+        claude = FakeProvider(AIProvider.CLAUDE, failure_rate=1.0)
+        gpt4 = FakeProvider(AIProvider.GPT4)
+        orchestrator, router = make_orchestrator(
+            {AIProvider.CLAUDE: claude, AIProvider.GPT4: gpt4},
+            failure_threshold=3, cooldown_seconds=60
+        )
+        
+        responses = run(orchestrator, count=10)
+        
+        assert all(r.success for r in responses)
+        assert claude.calls == 3
+        assert router.snapshot()['claude']['circuit'] == CircuitBreaker.OPEN
+    
+    def test_half_open_recovers(self, app_context):
+        """Depois do cooldown uma chamada de teste fecha o circuito"""
+        claude = FakeProvider(AIProvider.CLAUDE, failure_rate=1.0)
+        gpt4 = FakeProvider(AIProvider.GPT4)
+        orchestrator, router = make_orchestrator(
+            {AIProvider.CLAUDE: claude, AIProvider.GPT4: gpt4},
+            failure_threshold=2, cooldown_seconds=0.05
+        )
+        run(orchestrator, count=3)
+        
+        claude.failure_rate = 0.0
+        time.sleep(0.06)
+        response, = run(orchestrator)
+        
+        assert response.provider == AIProvider.CLAUDE
+        assert router.snapshot()['claude']['circuit'] == CircuitBreaker.CLOSED
+    
+    def test_all_providers_down_returns_error(self, app_context):
+        """Sem provedor saudável a resposta é de erro, sem exceção"""
+        orchestrator, _ = make_orchestrator({
+            AIProvider.CLAUDE: FakeProvider(AIProvider.CLAUDE, failure_rate=1.0),
+            AIProvider.GPT4: FakeProvider(AIProvider.GPT4, failure_rate=1.0),
+        })
+        
+        response, = run(orchestrator)
+        
+        assert not response.success
+        assert 'Nenhum provedor disponível' in response.error
+
+
+class TestSDKClients:
+    """_dispatch chamando os métodos reais de cada provedor com clientes de SDK falsos"""
+    
+    def make_sdk_orchestrator(self, monkeypatch, clients):
+        for key in ('ANTHROPIC_API_KEY', 'OPENAI_API_KEY', 'GOOGLE_API_KEY'):
+            monkeypatch.delenv(key, raising=False)
+        orchestrator = AIOrchestrator(router=ProviderRouter(RoutingSettings()))
+        orchestrator.providers = clients
+        return orchestrator
+    
+    def dispatch(self, orchestrator):
+        return asyncio.run(orchestrator._dispatch(AIProvider.CLAUDE, make_request(), 'sistema', 'usuário'))
+    
+    def test_claude_response(self, app_context, monkeypatch):
+        client = FakeAnthropicClient()
+        orchestrator = self.make_sdk_orchestrator(monkeypatch, {AIProvider.CLAUDE: client})
+        
+        response = self.dispatch(orchestrator)
+        
+        assert response.success
+        assert (response.provider, response.content, response.tokens_used) == \
+            (AIProvider.CLAUDE, 'resposta do claude', 120)
+        assert client.calls[0]['system'] == 'sistema'
+    
+    def test_sdk_error_falls_back_to_gpt4(self, app_context, monkeypatch):
+        orchestrator = self.make_sdk_orchestrator(monkeypatch, {
+            AIProvider.CLAUDE: FakeAnthropicClient(error=RuntimeError('overloaded')),
+            AIProvider.GPT4: FakeOpenAIClient(),
+        })
+        
+        response = self.dispatch(orchestrator)
+        
+        assert response.success
+        assert (response.provider, response.content, response.tokens_used) == \
+            (AIProvider.GPT4, 'resposta do gpt-4', 100)
+        assert response.metadata['routing']['errors'] == ['overloaded']
+
+
+class TestHedging:
+    """Requisições com hedge"""
+    
+    def test_slow_primary_is_hedged(self, app_context):
+        """Primário lento: o segundo provedor responde primeiro"""
+        claude = FakeProvider(AIProvider.CLAUDE, latency=0.5)
+        gpt4 = FakeProvider(AIProvider.GPT4, latency=0.01)
+        orchestrator, _ = make_orchestrator(
+            {AIProvider.CLAUDE: claude, AIProvider.GPT4: gpt4},
+            hedge_enabled=True, hedge_delay_seconds=0.05
+        )
+        
+        started = time.monotonic()
+        response, = run(orchestrator)
+        elapsed = time.monotonic() - started
+        
+        assert response.provider == AIProvider.GPT4
+        assert response.metadata['routing']['hedged'] is True
+        assert elapsed < 0.3
+    
+    def test_fast_primary_is_not_hedged(self, app_context):
+        """Primário dentro do prazo não dispara o segundo provedor"""
+        claude = FakeProvider(AIProvider.CLAUDE, latency=0.01)
+        gpt4 = FakeProvider(AIProvider.GPT4)
+        orchestrator, _ = make_orchestrator(
+            {AIProvider.CLAUDE: claude, AIProvider.GPT4: gpt4},
+            hedge_enabled=True, hedge_delay_seconds=0.2
+        )
+        
+        response, = run(orchestrator)
+        
+        assert response.provider == AIProvider.CLAUDE
+        assert gpt4.calls == 0
+
+
+class TestLatencyAwareRouting:
+    """Ordenação por latência, erro e custo observados"""
+    
+    def test_cold_start_uses_task_preference(self):
+        """Sem amostras vale o mapeamento estático"""
+        router = ProviderRouter(RoutingSettings(min_samples=5))
+        assert router.rank(['gpt4', 'claude'], 'claude')[0] == 'claude'
+    
+    def test_faster_provider_wins(self):
+        """Provedor preferido muito mais lento perde a frente"""
+        router = ProviderRouter(RoutingSettings(min_samples=5, costs={'claude': 0.01, 'gpt4': 0.01}))
+        for _ in range(20):
+            router.record('claude', 3.0, True, tokens=500)
+            router.record('gpt4', 0.5, True, tokens=500)
+        
+        assert router.rank(['claude', 'gpt4'], 'claude') == ['gpt4', 'claude']
+    
+    def test_error_rate_penalizes(self):
+        """Taxa de erro alta empurra o provedor para trás"""
+        router = ProviderRouter(RoutingSettings(min_samples=5, failure_threshold=100,
+                                                costs={'claude': 0.01, 'gpt4': 0.01}))
+        for i in range(20):
+            router.record('claude', 1.0, i % 2 == 0, tokens=500)
+            router.record('gpt4', 1.0, True, tokens=500)
+        
+        assert router.rank(['claude', 'gpt4'], 'claude')[0] == 'gpt4'
+    
+    def test_cheaper_provider_wins_at_equal_latency(self):
+        """Com latência igual, menor custo observado vence"""
+        router = ProviderRouter(RoutingSettings(min_samples=5, costs={'claude': 0.01, 'gemini': 0.001}))
+        for _ in range(20):
+            router.record('claude', 1.0, True, tokens=500)
+            router.record('gemini', 1.0, True, tokens=500)
+        
+        assert router.rank(['claude', 'gemini'], 'claude')[0] == 'gemini'
+
+
+class TestSimulatedHarness:
+    """Carga simulada com latência e falhas injetadas"""
+    
+    def test_flaky_providers_keep_serving(self, app_context):
+        """Com 30% de falha no preferido todas as requisições são atendidas"""
+        fakes = {
+            AIProvider.CLAUDE: FakeProvider(AIProvider.CLAUDE, latency=0.002, failure_rate=0.3, seed=1),
+            AIProvider.GPT4: FakeProvider(AIProvider.GPT4, latency=0.004, failure_rate=0.05, seed=2),
+            AIProvider.GEMINI: FakeProvider(AIProvider.GEMINI, latency=0.001, failure_rate=0.05, seed=3),
+        }
+        orchestrator, router = make_orchestrator(fakes, failure_threshold=3, cooldown_seconds=0.01, min_samples=5)
+        
+        responses = run(orchestrator, count=200)
+        
+        assert all(r.success for r in responses)
+        snapshot = router.snapshot()
+        assert snapshot['claude']['error_rate'] > snapshot['gemini']['error_rate']
+        assert sum(s['total_calls'] for s in snapshot.values()) >= 200
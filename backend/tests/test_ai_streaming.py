@@ -0,0 +1,167 @@
+"""
+Testes para respostas de IA em streaming (SSE) com provedores simulados
+"""
+
+import asyncio
+
+import pytest
+from flask import Flask
+
+from app.services.ai_cache import AIResponseCache, MemoryCacheBackend
+from app.services.ai_executor import AIExecutor
+from app.services.ai_orchestrator import AIRequest, AITaskType, AIProvider
+from app.services.ai_routing import ProviderRouter, RoutingSettings
+from app.utils.sse import format_sse, sse_response
+from tests.ai_fakes import FakeOrchestrator, FakeProvider
+
+
+@pytest.fixture
+def app_context():
+    """Contexto Flask mínimo (o orquestrador usa current_app.logger)"""
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+def make_request(**kwargs):
+    kwargs.setdefault('use_cache', False)
+    return AIRequest(
+        task_type=AITaskType.SOAP_COMPLETION,
+        prompt='Completar evolução',
+        context={},
+        user_id='user-1',
+        temperature=0.3,
+        **kwargs
+    )
+
+
+def collect(orchestrator, request=None):
+    async def go():
+        return [event async for event in orchestrator.stream_request(request or make_request())]
+    return asyncio.run(go())
+
+
+class TestStreamRequest:
+    """Eventos emitidos por AIOrchestrator.stream_request"""
+
+    def test_tokens_arrive_between_start_and_done(self, app_context):
+        """start, um token por trecho e done com o resumo"""
+        fake = FakeProvider(AIProvider.CLAUDE, chunks=3, tokens=42)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake})
+
+        events = collect(orchestrator)
+
+        assert [e.event for e in events] == ['start', 'token', 'token', 'token', 'done']
+        assert ''.join(e.data['text'] for e in events if e.event == 'token') == 'claude-0 claude-1 claude-2 '
+        assert events[-1].data['tokens_used'] == 42
+        assert events[-1].data['provider'] == 'claude'
+        assert fake.streams_closed == 1
+
+    def test_time_to_first_token_is_recorded(self, app_context):
+        """TTFT aparece no evento start e nas métricas por provedor"""
+        fake = FakeProvider(AIProvider.CLAUDE, latency=0.05)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake})
+
+        events = collect(orchestrator)
+
+        assert events[0].data['time_to_first_token'] >= 0.05
+        metrics = orchestrator.stream_metrics_snapshot()['claude']
+        assert metrics['streams'] == 1
+        assert metrics['p50_time_to_first_token'] >= 0.05
+
+    def test_falls_back_before_first_token(self, app_context):
+        """Falha antes do primeiro token passa para o próximo provedor"""
+        claude = FakeProvider(AIProvider.CLAUDE, failure_rate=1.0)
+        gpt4 = FakeProvider(AIProvider.GPT4, chunks=2)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: claude, AIProvider.GPT4: gpt4})
+
+        events = collect(orchestrator)
+
+        assert events[0].data['provider'] == 'gpt4'
+        assert events[0].data['fallback'] is True
+        assert events[-1].event == 'done'
+        assert orchestrator.router.stats['claude'].total_failures == 1
+
+    def test_failure_after_first_token_ends_stream(self, app_context):
+        """Depois do primeiro token não há fallback: o stream termina com error"""
+        claude = FakeProvider(AIProvider.CLAUDE, chunks=5, fail_after=2)
+        gpt4 = FakeProvider(AIProvider.GPT4)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: claude, AIProvider.GPT4: gpt4})
+
+        events = collect(orchestrator)
+
+        assert [e.event for e in events] == ['start', 'token', 'token', 'error']
+        assert events[-1].data['partial'] is True
+        assert gpt4.calls == 0
+
+    def test_no_provider_available(self, app_context):
+        """Todos falhando antes do primeiro token resulta em um único error"""
+        claude = FakeProvider(AIProvider.CLAUDE, failure_rate=1.0)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: claude})
+
+        events = collect(orchestrator)
+
+        assert [e.event for e in events] == ['error']
+        assert 'Nenhum provedor disponível' in events[0].data['error']
+
+    def test_completed_stream_is_cached(self, app_context):
+        """Stream completo vai para o cache e a repetição não chama o provedor"""
+        fake = FakeProvider(AIProvider.CLAUDE, chunks=3)
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake}, cache=AIResponseCache(MemoryCacheBackend()))
+
+        first = collect(orchestrator, make_request(use_cache=True))
+        second = collect(orchestrator, make_request(use_cache=True))
+
+        assert fake.calls == 1
+        assert second[0].data['cache'] == 'exact'
+        assert second[1].data['text'] == ''.join(e.data['text'] for e in first if e.event == 'token')
+
+
+class TestClientDisconnect:
+    """Cliente desconectado fecha o stream do provedor"""
+
+    def test_closing_sync_iterator_closes_provider_stream(self, app_context):
+        """Fechar o iterador síncrono (WSGI) interrompe a geração de tokens"""
+        fake = FakeProvider(AIProvider.CLAUDE, chunks=50, chunk_delay=0.01)
+        router = ProviderRouter(RoutingSettings())
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake}, router=router)
+
+        executor = AIExecutor()
+        iterator = executor.iterate(orchestrator.stream_request(make_request()))
+        assert next(iterator).event == 'start'
+        assert next(iterator).event == 'token'
+        iterator.close()
+        executor.shutdown()
+
+        assert fake.streams_closed == 1
+        assert fake.chunks_sent < 50
+        # Desconexão não conta como falha nem como chamada concluída
+        assert router.stats['claude'].total_calls == 0
+        assert router.breakers['claude'].state == 'closed'
+
+
+class TestSSEResponse:
+    """Formato text/event-stream"""
+
+    def test_format_sse(self):
+        """Evento nomeado com payload JSON e linha em branco ao final"""
+        assert format_sse('token', {'text': 'olá'}) == 'event: token\ndata: {"text": "olá"}\n\n'
+
+    def test_sse_response_streams_events(self):
+        """Resposta com cabeçalhos anti-buffer e todos os eventos"""
+        app = Flask(__name__)
+        fake = FakeProvider(AIProvider.CLAUDE, chunks=2)
+
+        @app.route('/stream')
+        def stream():
+            orchestrator = FakeOrchestrator({AIProvider.CLAUDE: fake})
+            return sse_response(orchestrator.stream_request(make_request()))
+
+        response = app.test_client().get('/stream')
+        body = response.get_data(as_text=True)
+
+        assert response.mimetype == 'text/event-stream'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        assert response.headers['X-Accel-Buffering'] == 'no'
+        assert body.count('event: token') == 2
+        assert body.rstrip().split('\n\n')[-1].startswith('event: done')
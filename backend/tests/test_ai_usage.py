@@ -0,0 +1,213 @@
+"""
+Testes para o ledger de uso de IA (gravação em lote, cotas e relatório)
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.ai_usage import AIUsageRecord, AIUsageHourly
+from app.services.ai_orchestrator import AIProvider, AIRequest, AIResponse, AITaskType
+from app.services.ai_usage import (
+    MemoryQuotaCounters, UsageEvent, UsageLedger, bucket_percentile, estimate_cost,
+    get_usage_ledger, latency_bucket, usage_event, usage_report
+)
+from tests.ai_fakes import FakeOrchestrator, FakeProvider
+from tests.exercise_factories import database_app
+
+
+@pytest.fixture
+def app_context():
+    """App com SQLite em memória e gravação só por flush explícito"""
+    with database_app(AI_CACHE_ENABLED=False, AI_USAGE_FLUSH_SECONDS=0) as flask_app:
+        yield flask_app
+
+
+def make_event(**kwargs):
+    defaults = dict(tenant_id='default', user_id='user-1', provider='claude',
+                    task_type='soap_completion', tokens_used=100, latency_ms=800)
+    defaults.update(kwargs)
+    return UsageEvent(**defaults)
+
+
+def make_ledger(**kwargs):
+    kwargs.setdefault('flush_seconds', None)
+    return UsageLedger(**kwargs)
+
+
+class TestCostAndLatency:
+    """Custo estimado e percentis por faixa"""
+
+    def test_cost_uses_input_and_output_prices(self):
+        """Preço de entrada e saída por milhão de tokens"""
+        assert estimate_cost('claude', 1_000_000, 0) == pytest.approx(3.0)
+        assert estimate_cost('claude', 0, 1_000_000) == pytest.approx(15.0)
+        assert estimate_cost('claude', 0, 0, total_tokens=1_000_000) == pytest.approx(9.0)
+        assert estimate_cost('desconhecido', 1000, 1000) == 0.0
+
+    def test_percentiles_from_bucket_counts(self):
+        """Percentil é o limite da faixa que acumula a fração pedida"""
+        counts = {latency_bucket(ms): 0 for ms in (100, 1000, 8000)}
+        counts[100] += 90
+        counts[1000] += 9
+        counts[8000] += 1
+
+        assert bucket_percentile(counts, 0.5) == 100
+        assert bucket_percentile(counts, 0.95) == 1000
+        assert bucket_percentile(counts, 0.999) == 8000
+        assert bucket_percentile({}, 0.5) is None
+
+
+class TestLedgerFlush:
+    """Buffer gravado em lote com agregados por hora"""
+
+    def test_flush_writes_records_and_rollups(self, app_context):
+        """Eventos da mesma hora e faixa somam numa linha do agregado"""
+        ledger = make_ledger(batch_size=2)
+        for _ in range(3):
+            ledger.record(make_event(cost_usd=0.01))
+        ledger.record(make_event(provider='gpt4', success=False, tokens_used=0))
+
+        assert AIUsageRecord.query.count() == 0
+        assert ledger.flush() == 4
+
+        assert AIUsageRecord.query.count() == 4
+        claude = AIUsageHourly.query.filter_by(provider='claude').one()
+        assert (claude.requests, claude.tokens_used, claude.latency_bucket_ms) == (3, 300, 1000)
+        assert claude.cost_usd == pytest.approx(0.03)
+        assert AIUsageHourly.query.filter_by(provider='gpt4').one().failures == 1
+        assert ledger.stats()['buffered'] == 0
+
+    def test_second_flush_increments_existing_rollup(self, app_context):
+        """Flushes seguidos atualizam a mesma linha em vez de duplicar"""
+        ledger = make_ledger()
+        ledger.record(make_event())
+        ledger.flush()
+        ledger.record(make_event(tokens_used=50))
+        ledger.flush()
+
+        rollup = AIUsageHourly.query.one()
+        assert (rollup.requests, rollup.tokens_used) == (2, 150)
+
+    def test_failed_flush_keeps_events(self, app_context, monkeypatch):
+        """Falha no banco devolve os eventos ao buffer"""
+        ledger = make_ledger()
+        ledger.record(make_event())
+
+        def broken(events):
+            raise RuntimeError('banco indisponível')
+
+        monkeypatch.setattr('app.services.ai_usage.apply_hourly_rollups', broken)
+        assert ledger.flush() == 0
+        assert ledger.stats()['buffered'] == 1
+        assert ledger.stats()['flush_failures'] == 1
+        assert AIUsageRecord.query.count() == 0
+
+        monkeypatch.undo()
+        assert ledger.flush() == 1
+
+    def test_disabled_ledger_records_nothing(self, app_context):
+        """AI_USAGE_LEDGER_ENABLED falso não enfileira eventos"""
+        ledger = make_ledger(enabled=False)
+        ledger.record(make_event())
+
+        assert ledger.stats()['buffered'] == 0
+
+
+class TestQuotas:
+    """Cotas por usuário e por tenant"""
+
+    def test_user_quota_blocks_after_limit(self):
+        """Contador carregado uma vez e incrementado a cada evento"""
+        loads = []
+
+        def loader(key):
+            loads.append(key)
+            return 900
+
+        ledger = make_ledger(counters=MemoryQuotaCounters(), user_daily_quota=1000, loader=loader)
+
+        assert ledger.quota_error('user-1') is None
+        ledger.record(make_event(tokens_used=100))
+
+        assert 'Cota diária' in ledger.quota_error('user-1')
+        assert ledger.quota_error('user-2') is None
+        assert len([key for key in loads if key.startswith('user:user-1')]) == 1
+
+    def test_tenant_quota_is_shared_by_users(self):
+        """Cota mensal do tenant soma todos os usuários"""
+        ledger = make_ledger(tenant_monthly_quota=250, loader=lambda key: 0)
+        ledger.quota_error('user-1')
+
+        ledger.record(make_event(user_id='user-1', tokens_used=150))
+        assert ledger.quota_error('user-2') is None
+        ledger.record(make_event(user_id='user-2', tokens_used=150))
+
+        assert 'Cota mensal' in ledger.quota_error('user-3')
+
+    def test_quota_is_loaded_from_ledger(self, app_context):
+        """Sem contador no processo, a cota parte do que já foi gravado hoje"""
+        app_context.config['AI_USER_DAILY_TOKEN_QUOTA'] = 500
+        ledger = get_usage_ledger()
+        ledger.record(make_event(tokens_used=300))
+        ledger.record(make_event(tokens_used=300, created_at=datetime.utcnow() - timedelta(days=2)))
+        ledger.flush()
+
+        fresh = make_ledger(user_daily_quota=500)
+        assert fresh.quota_error('user-1') is None
+        fresh.record(make_event(tokens_used=200))
+        assert fresh.quota_error('user-1') is not None
+
+
+class TestUsageEvents:
+    """Eventos gerados pelo orquestrador e relatório"""
+
+    def test_orchestrator_records_each_call(self, app_context):
+        """Chamada bem-sucedida entra no buffer com tokens e economia de prompt"""
+        orchestrator = FakeOrchestrator({AIProvider.CLAUDE: FakeProvider(AIProvider.CLAUDE, tokens=80)})
+        request = AIRequest(
+            task_type=AITaskType.SOAP_COMPLETION, prompt='Completar evolução',
+            context={'subjective': 'Dor lombar'}, user_id='user-1', use_cache=False
+        )
+
+        asyncio.run(orchestrator.process_request(request))
+        ledger = get_usage_ledger()
+        ledger.flush()
+
+        record = AIUsageRecord.query.one()
+        assert (record.user_id, record.provider, record.tokens_used, record.success) == ('user-1', 'claude', 80, True)
+        assert record.cost_usd > 0
+
+    def test_cache_hit_counts_savings_not_cost(self):
+        """Acerto de cache não tem custo e registra os tokens evitados"""
+        request = AIRequest(task_type=AITaskType.CHAT_RESPONSE, prompt='Oi', context={}, user_id='user-1')
+        response = AIResponse(
+            provider=AIProvider.CLAUDE, content='Olá', confidence=0.9, tokens_used=0, processing_time=0.01,
+            metadata={'cache': 'exact', 'tokens_saved': 500, 'input_tokens': 400, 'output_tokens': 100},
+            success=True
+        )
+
+        event = usage_event(request, response)
+
+        assert (event.tokens_used, event.cost_usd, event.tokens_saved) == (0, 0.0, 500)
+        assert event.cost_saved_usd == pytest.approx(estimate_cost('claude', 400, 100))
+
+    def test_report_groups_by_provider_and_task(self, app_context):
+        """Totais, percentis e economia por provedor e tarefa"""
+        ledger = make_ledger()
+        for latency in (100, 200, 300, 5000):
+            ledger.record(make_event(latency_ms=latency, cost_usd=0.01))
+        ledger.record(make_event(provider='gpt4', task_type='chat_response', cache='exact',
+                                 tokens_used=0, tokens_saved=400, cost_saved_usd=0.02, latency_ms=5))
+        ledger.flush()
+
+        report = usage_report(datetime.utcnow() - timedelta(hours=1))
+
+        assert report['total']['requests'] == 5
+        assert report['by_provider']['claude']['tokens_used'] == 400
+        assert report['by_provider']['claude']['p50_latency_ms'] == 250
+        assert report['by_provider']['claude']['p99_latency_ms'] == 8000
+        assert report['by_task']['chat_response']['cache_hits'] == 1
+        assert report['by_task']['chat_response']['cost_saved_usd'] == pytest.approx(0.02)
+        assert report['top_users'][0] == {'user_id': 'user-1', 'requests': 5, 'tokens_used': 400, 'cost_usd': 0.04}
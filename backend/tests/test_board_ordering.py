@@ -0,0 +1,137 @@
+"""
+Testes para a ordenação esparsa do Kanban
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.project_management import Project, Task, TaskType
+from app.services.board_ordering import (
+    POSITION_GAP, append_position, column_needs_rebalance, place_task, position_between, rebalance_boards
+)
+from tests.exercise_factories import app_context  # noqa: F401
+
+
+@pytest.fixture
+def project(app_context):
+    project = Project(id='project-1', name='Board', key='FISIO', category='clinico', owner_id='user-1')
+    db.session.add(project)
+    db.session.commit()
+    return project
+
+
+def add_tasks(count, column_id='todo', positions=None):
+    tasks = []
+    for index in range(count):
+        position = positions[index] if positions else append_position('project-1', column_id)
+        task = Task(project_id='project-1', key=f'FISIO-{column_id}-{index}', title=f'Tarefa {index}',
+                    task_type=TaskType.FEATURE, reporter_id='user-1', column_id=column_id,
+                    board_position=position)
+        db.session.add(task)
+        db.session.flush()
+        tasks.append(task)
+    db.session.commit()
+    return tasks
+
+
+def column_keys(column_id='todo'):
+    tasks = Task.query.filter_by(project_id='project-1', column_id=column_id).order_by(
+        Task.board_position, Task.created_at, Task.id
+    )
+    return [task.key for task in tasks]
+
+
+@pytest.fixture
+def task_updates(app_context):
+    """Linhas de tasks atualizadas (por UPDATE emitido) durante o teste"""
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('UPDATE TASKS'):
+            statements.append(len(parameters) if executemany else 1)
+
+    event.listen(db.engine, 'before_cursor_execute', before_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+
+class TestPositions:
+    """Cálculo da posição entre vizinhos"""
+
+    def test_between_and_ends(self):
+        assert position_between(None, None) == POSITION_GAP
+        assert position_between(None, POSITION_GAP) == 0
+        assert position_between(POSITION_GAP, None) == 2 * POSITION_GAP
+        assert position_between(10, 20) == 15
+
+    def test_no_room_between_neighbors(self):
+        assert position_between(10, 11) is None
+        assert position_between(10, 10) is None
+
+    def test_needs_rebalance(self):
+        assert not column_needs_rebalance([POSITION_GAP, 2 * POSITION_GAP], min_gap=1024)
+        assert column_needs_rebalance([POSITION_GAP, POSITION_GAP + 10], min_gap=1024)
+        assert column_needs_rebalance([5, 5], min_gap=1)
+
+
+class TestPlaceTask:
+    """Mover tarefas grava uma linha só"""
+
+    def test_move_updates_only_the_task(self, project, task_updates):
+        add_tasks(50)
+        task = Task.query.filter_by(key='FISIO-todo-40').one()
+        task_updates.clear()
+
+        rebalanced = place_task(task, 'todo', 3)
+        db.session.commit()
+
+        assert rebalanced is False
+        assert sum(task_updates) == 1
+        assert column_keys()[:5] == ['FISIO-todo-0', 'FISIO-todo-1', 'FISIO-todo-2', 'FISIO-todo-40', 'FISIO-todo-3']
+
+    def test_move_to_other_column_top_and_end(self, project):
+        add_tasks(3)
+        add_tasks(2, column_id='done')
+        first, second, third = (Task.query.filter_by(key=f'FISIO-todo-{i}').one() for i in range(3))
+
+        place_task(first, 'done', 0)
+        place_task(second, 'done')
+        place_task(third, 'done', 99)
+        db.session.commit()
+
+        assert column_keys('done') == ['FISIO-todo-0', 'FISIO-done-0', 'FISIO-done-1', 'FISIO-todo-1', 'FISIO-todo-2']
+        assert column_keys('todo') == []
+
+    def test_exhausted_gap_rebalances_column(self, project):
+        """Sem espaço entre os vizinhos, a coluna é renumerada e a ordem mantida"""
+        add_tasks(4, positions=[100, 101, 101, 102])
+        task = Task.query.filter_by(key='FISIO-todo-3').one()
+        updated_at = {t.key: t.updated_at for t in Task.query}
+
+        rebalanced = place_task(task, 'todo', 1)
+        db.session.commit()
+
+        assert rebalanced is True
+        assert column_keys() == ['FISIO-todo-0', 'FISIO-todo-3', 'FISIO-todo-1', 'FISIO-todo-2']
+        positions = [t.board_position for t in Task.query.order_by(Task.board_position)]
+        assert not column_needs_rebalance(positions)
+        assert Task.query.filter_by(key='FISIO-todo-1').one().updated_at == updated_at['FISIO-todo-1']
+
+
+class TestRebalanceJob:
+    """Job preventivo de renumeração"""
+
+    def test_only_tight_columns_are_rebalanced(self, project):
+        add_tasks(3, positions=[1, 1, 2])
+        add_tasks(3, column_id='done')
+
+        dry = rebalance_boards(dry_run=True)
+        result = rebalance_boards()
+
+        assert dry == {'columns_checked': 2, 'columns_rebalanced': 1, 'tasks_moved': 3}
+        assert result == {'columns_checked': 2, 'columns_rebalanced': 1, 'tasks_moved': 3}
+        assert [t.board_position for t in Task.query.filter_by(column_id='todo').order_by(Task.board_position)] == [
+            POSITION_GAP, 2 * POSITION_GAP, 3 * POSITION_GAP
+        ]
+        assert rebalance_boards()['columns_rebalanced'] == 0
@@ -0,0 +1,118 @@
+"""
+Testes para o resumo clínico das estatísticas do prontuário
+"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.patient import Evolution, MedicalRecord, Patient
+from app.services.clinical_summary import compute_clinical_summary, get_clinical_summary, get_clinical_summary_cache, pain_trend
+from tests.exercise_factories import app_context, make_user  # noqa: F401
+
+
+@pytest.fixture
+def statements(app_context):
+    """SQL emitido durante o teste"""
+    executed = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_execute)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+
+def add_evolution(record, day, pain=None, minutes=None):
+    evolution = Evolution(medical_record_id=record.id, created_by='user-1', data_atendimento=day,
+                          escala_dor=pain, duracao_minutos=minutes)
+    db.session.add(evolution)
+    db.session.commit()
+    return evolution
+
+
+@pytest.fixture
+def record(app_context):
+    make_user(email='fisio@fisioflow.com')
+    db.session.add(Patient(id='patient-1', nome_completo='Maria Souza'))
+    db.session.commit()
+    first = MedicalRecord(patient_id='patient-1', created_by='user-1', data_avaliacao=date(2025, 1, 6))
+    second = MedicalRecord(patient_id='patient-1', created_by='user-1', data_avaliacao=date(2025, 2, 3))
+    db.session.add_all([first, second])
+    db.session.commit()
+    add_evolution(first, date(2025, 1, 7), pain=8, minutes=50)
+    add_evolution(first, date(2025, 1, 14), pain=6, minutes=40)
+    add_evolution(second, date(2025, 2, 4), pain=4, minutes=0)
+    add_evolution(second, date(2025, 2, 11), minutes=60)
+    return second
+
+
+class TestSummary:
+    """Agregados e janelas no banco"""
+
+    def test_summary_in_two_queries(self, record, statements):
+        summary = compute_clinical_summary('patient-1')
+
+        assert len(statements) == 2
+        assert (summary['total_records'], summary['total_evolutions']) == (2, 4)
+        assert (summary['latest_evaluation'], summary['first_session'], summary['last_session']) == (
+            '2025-02-03', '2025-01-07', '2025-02-11'
+        )
+        assert summary['treatment_duration_days'] == 35
+        # Sessões com duração 0 ficam fora da média, como antes
+        assert summary['average_session_duration'] == 50
+        assert summary['session_duration'] == {
+            'sessions': 3, 'average_minutes': 50, 'min_minutes': 40, 'max_minutes': 60, 'total_minutes': 150
+        }
+        assert [(p['pain_level'], p['moving_average'], p['change']) for p in summary['pain_evolution']] == [
+            (8, 8, None), (6, 7, -2), (4, 6, -2)
+        ]
+        assert summary['pain_trend']['direction'] == 'melhora'
+
+    def test_patient_without_pain_scale_uses_one_query(self, app_context, statements):
+        summary = compute_clinical_summary('sem-prontuario')
+
+        assert len(statements) == 1
+        assert (summary['total_records'], summary['pain_evolution'], summary['pain_trend']) == (0, [], None)
+
+    def test_pain_trend_slope(self):
+        trend = pain_trend([{'date': '2025-01-01', 'pain_level': 8}, {'date': '2025-01-15', 'pain_level': 4}])
+
+        assert (trend['change'], trend['slope_per_week']) == (-4, -2.0)
+
+
+class TestCache:
+    """Cache por paciente invalidado pelas gravações de evoluções"""
+
+    def test_cached_until_an_evolution_changes(self, record, statements):
+        get_clinical_summary('patient-1')
+        invalidations = get_clinical_summary_cache().stats()['invalidations']
+        statements.clear()
+
+        assert get_clinical_summary('patient-1')['total_evolutions'] == 4
+        assert statements == []
+
+        evolution = add_evolution(record, date(2025, 2, 18), pain=2)
+        assert get_clinical_summary('patient-1')['total_evolutions'] == 5
+
+        evolution.escala_dor = 3
+        db.session.commit()
+        assert get_clinical_summary('patient-1')['pain_trend']['last'] == 3
+
+        db.session.delete(evolution)
+        db.session.commit()
+        assert get_clinical_summary('patient-1')['total_evolutions'] == 4
+        assert get_clinical_summary_cache().stats()['invalidations'] == invalidations + 3
+
+    def test_rollback_keeps_the_cached_summary(self, record):
+        get_clinical_summary('patient-1')
+        invalidations = get_clinical_summary_cache().stats()['invalidations']
+
+        db.session.add(Evolution(medical_record_id=record.id, created_by='user-1', data_atendimento=date(2025, 3, 1)))
+        db.session.flush()
+        db.session.rollback()
+
+        assert get_clinical_summary_cache().stats()['invalidations'] == invalidations
@@ -0,0 +1,130 @@
+"""
+Testes para a compressão das respostas e o GET condicional
+"""
+
+import gzip
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from app.utils.compression import conditional, get_compression_metrics, init_compression
+
+ITEMS = [{'id': index, 'name': f'Exercício de alongamento {index}'} for index in range(200)]
+
+
+@pytest.fixture
+def flask_app():
+    app = Flask(__name__)
+    app.config.update(COMPRESSION_MIN_SIZE=1024)
+    init_compression(app)
+    state = {'version': 'v1', 'calls': 0}
+
+    @app.route('/items', methods=['GET', 'POST'])
+    def items():
+        return jsonify({'items': ITEMS})
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'{index}\n' * 500 for index in range(3)), mimetype='text/csv')
+
+    @app.route('/catalog')
+    @conditional(lambda: state['version'])
+    def catalog():
+        state['calls'] += 1
+        return jsonify({'items': ITEMS, 'version': state['version']})
+
+    app.state = state
+    return app
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
+
+
+class TestCompression:
+    """gzip acima do limite, negociado pelo Accept-Encoding"""
+
+    def test_gzip_large_json(self, client):
+        response = client.get('/items', headers={'Accept-Encoding': 'gzip, deflate'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert response.headers['ETag'].endswith('-gzip"')
+        assert gzip.decompress(response.data).startswith(b'{"items":')
+        assert int(response.headers['Content-Length']) == len(response.data)
+
+    def test_plain_without_accept_encoding(self, client):
+        response = client.get('/items', headers={'Accept-Encoding': 'identity'})
+
+        assert 'Content-Encoding' not in response.headers
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert response.get_json() == {'items': ITEMS}
+
+    def test_small_streamed_and_post_untouched(self, client):
+        headers = {'Accept-Encoding': 'gzip'}
+
+        assert 'Content-Encoding' not in client.get('/small', headers=headers).headers
+        streamed = client.get('/stream', headers=headers)
+        assert 'Content-Encoding' not in streamed.headers and 'ETag' not in streamed.headers
+        posted = client.post('/items', headers=headers)
+        assert 'Content-Encoding' not in posted.headers and 'ETag' not in posted.headers
+
+    def test_compressed_body_reused_for_same_etag(self, flask_app, client):
+        for _ in range(3):
+            client.get('/items', headers={'Accept-Encoding': 'gzip'})
+
+        with flask_app.app_context():
+            metrics = get_compression_metrics()
+        assert metrics['compressed_responses'] == 3
+        assert metrics['cache_hit_rate'] == pytest.approx(2 / 3, abs=1e-4)
+        assert metrics['compression_bytes_saved'] > 0
+
+
+class TestConditionalGet:
+    """ETag forte e 304"""
+
+    def test_not_modified_for_same_body(self, flask_app, client):
+        first = client.get('/items', headers={'Accept-Encoding': 'gzip'})
+
+        second = client.get('/items', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+
+        assert second.status_code == 304
+        assert second.data == b''
+        assert second.headers['ETag'] == first.headers['ETag']
+        assert 'Content-Encoding' not in second.headers
+        with flask_app.app_context():
+            assert get_compression_metrics()['not_modified_bytes_saved'] == len(
+                gzip.decompress(first.data))
+
+    def test_uncompressed_etag_matches_other_encoding(self, client):
+        plain = client.get('/items')
+
+        response = client.get('/items', headers={'Accept-Encoding': 'gzip', 'If-None-Match': plain.headers['ETag']})
+
+        assert response.status_code == 304
+
+    def test_changed_body_is_sent(self, client):
+        response = client.get('/items', headers={'If-None-Match': '"outro"'})
+
+        assert response.status_code == 200
+        assert response.get_json() == {'items': ITEMS}
+
+    def test_version_etag_skips_view(self, flask_app, client):
+        first = client.get('/catalog', headers={'Accept-Encoding': 'gzip'})
+        assert flask_app.state['calls'] == 1
+
+        cached = client.get('/catalog', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+        assert cached.status_code == 304
+        assert cached.headers['ETag'] == first.headers['ETag']
+        assert flask_app.state['calls'] == 1
+
+        flask_app.state['version'] = 'v2'
+        changed = client.get('/catalog', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+        assert changed.status_code == 200
+        assert flask_app.state['calls'] == 2
+        assert changed.headers['ETag'] != first.headers['ETag']
@@ -0,0 +1,131 @@
+"""
+Testes para o roteamento de leituras para a réplica (dois bancos SQLite)
+"""
+
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import Column, MetaData, String, Table, insert, select
+
+from app import db
+from app.utils.db_routing import get_replica_monitor, read_only, replica_reads
+
+metadata = MetaData()
+origin = Table('routing_origin', metadata, Column('name', String(20)))
+
+
+def make_app(tmp_path, replica_url=None, **config):
+    flask_app = Flask(__name__)
+    flask_app.config.update(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "primary.db"}',
+        DATABASE_REPLICA_URL=replica_url or f'sqlite:///{tmp_path / "replica.db"}',
+        DATABASE_REPLICA_CHECK_SECONDS=0,
+        **config
+    )
+    db.init_app(flask_app)
+
+    @flask_app.route('/report')
+    @read_only
+    def report():
+        return jsonify({'origin': db.session.execute(select(origin.c.name)).scalar()})
+
+    @flask_app.route('/bookings')
+    def bookings():
+        return jsonify({'origin': db.session.execute(select(origin.c.name)).scalar()})
+
+    return flask_app
+
+
+@pytest.fixture
+def flask_app(tmp_path):
+    flask_app = make_app(tmp_path)
+    with flask_app.app_context():
+        for engine, name in ((db.engines[None], 'primary'), (get_replica_monitor().engine, 'replica')):
+            metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(insert(origin).values(name=name))
+        yield flask_app
+        db.session.remove()
+        get_replica_monitor().engine.dispose()
+
+
+def read_origin():
+    return db.session.execute(select(origin.c.name)).scalar()
+
+
+class TestRouting:
+    """Leituras read-only na réplica, o resto no primário"""
+
+    def test_read_only_route_uses_replica(self, flask_app):
+        client = flask_app.test_client()
+
+        assert client.get('/report').get_json() == {'origin': 'replica'}
+        assert client.get('/bookings').get_json() == {'origin': 'primary'}
+
+    def test_block_scope(self, flask_app):
+        with replica_reads():
+            assert read_origin() == 'replica'
+        db.session.remove()
+        assert read_origin() == 'primary'
+
+    def test_writes_and_later_reads_stay_on_primary(self, flask_app):
+        with replica_reads():
+            db.session.execute(insert(origin).values(name='nova'))
+            assert read_origin() == 'primary'
+            db.session.commit()
+            assert read_origin() == 'primary'
+
+        with db.engines[None].connect() as connection:
+            assert connection.execute(select(origin.c.name)).scalars().all() == ['primary', 'nova']
+
+    def test_stats(self, flask_app):
+        with replica_reads():
+            read_origin()
+
+        stats = get_replica_monitor().stats()
+        assert stats['healthy'] is True
+        assert stats['replica_statements'] >= 1
+        assert stats['lag_seconds'] == 0.0
+
+
+class TestFallback:
+    """Réplica atrasada ou fora do ar: primário"""
+
+    def test_lagging_replica(self, flask_app):
+        monitor = get_replica_monitor()
+        monitor.max_lag_seconds = 5
+        monitor.lag_probe = lambda connection: 60.0
+
+        with replica_reads():
+            assert read_origin() == 'primary'
+
+        assert monitor.stats()['primary_fallbacks'] >= 1
+        assert 'atraso' in monitor.stats()['last_error']
+
+        monitor.lag_probe = lambda connection: 1.0
+        db.session.remove()
+        with replica_reads():
+            assert read_origin() == 'replica'
+
+    def test_unreachable_replica(self, tmp_path):
+        flask_app = make_app(tmp_path, replica_url=f'sqlite:///{tmp_path / "ausente" / "replica.db"}')
+        with flask_app.app_context():
+            metadata.create_all(db.engines[None])
+            with db.engines[None].begin() as connection:
+                connection.execute(insert(origin).values(name='primary'))
+
+            with replica_reads():
+                assert read_origin() == 'primary'
+            assert get_replica_monitor().stats()['healthy'] is False
+            db.session.remove()
+
+    def test_without_replica_configured(self, tmp_path):
+        flask_app = Flask(__name__)
+        flask_app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "only.db"}'
+        flask_app.config['DATABASE_REPLICA_URL'] = None
+        db.init_app(flask_app)
+        with flask_app.app_context():
+            metadata.create_all(db.engines[None])
+            with replica_reads():
+                assert read_origin() is None
+            assert get_replica_monitor() is None
+            db.session.remove()
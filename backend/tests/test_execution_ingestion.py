@@ -0,0 +1,155 @@
+"""
+Testes para a ingestão em lote de execuções e séries de sensores
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app import db
+from app.models.exercise import Exercise, ExerciseExecution, ExerciseSensorSeries, PatientExercise
+from app.services.execution_ingestion import ingest_executions
+from app.utils.sensor_codec import (
+    MAX_SAMPLES_PER_CHANNEL, downsample, downsample_factor, pack_samples, unpack_samples
+)
+from tests.exercise_factories import app_context, make_exercise, make_prescription  # noqa: F401
+
+PATIENT = SimpleNamespace(id='patient-1', role='PACIENTE')
+THERAPIST = SimpleNamespace(id='therapist-1', role='FISIOTERAPEUTA')
+
+
+@pytest.fixture
+def prescriptions(app_context):
+    make_exercise(points_value=10, default_repetitions=10)
+    make_prescription('prescription-1')
+    make_prescription('prescription-other', patient_id='patient-2', prescribed_by='therapist-2')
+    make_prescription('prescription-inactive', is_active=False)
+    db.session.commit()
+
+
+def execution(prescription_id='prescription-1', **fields):
+    return {'patient_exercise_id': prescription_id, 'started_at': '2024-03-01T10:00:00Z', **fields}
+
+
+class TestSensorCodec:
+    """float32 empacotado e redução por média"""
+
+    def test_round_trip(self):
+        samples = [0.5, -1.25, 3.0, 1024.0]
+
+        assert unpack_samples(pack_samples(samples)) == samples
+
+    def test_smaller_than_json(self):
+        samples = [index * 0.001 for index in range(3000)]
+
+        assert len(pack_samples(samples)) < len(str(samples)) / 2
+
+    def test_downsample(self):
+        assert downsample([1, 3, 5, 7, 9], 2) == [2, 6, 9]
+        assert downsample([1, 2], 1) == [1, 2]
+        assert downsample_factor(100, 1000) == 4
+        assert downsample_factor(10, MAX_SAMPLES_PER_CHANNEL * 3) == 3
+        assert downsample_factor(25, 100) == 1
+
+
+class TestIngestion:
+    """Validação por item, bulk insert e idempotência"""
+
+    def test_creates_executions_with_points_and_counters(self, prescriptions):
+        result = ingest_executions(PATIENT, [
+            execution(repetitions_completed=10, patient_rating=4),
+            execution(repetitions_completed=5),
+        ])
+
+        assert [item['points_earned'] for item in result.created] == [15, 10]
+        assert result.total_points == 25
+        assert result.errors == []
+        assert ExerciseExecution.query.count() == 2
+        db.session.expire_all()
+        assert db.session.get(Exercise, 'exercise-1').execution_count == 2
+        assert db.session.get(PatientExercise, 'prescription-1').completed_count == 2
+
+    def test_invalid_items_do_not_block_the_batch(self, prescriptions):
+        result = ingest_executions(PATIENT, [
+            execution(),
+            'texto',
+            execution(pain_level=11),
+            execution('inexistente'),
+            execution(started_at='ontem'),
+            execution('prescription-inactive'),
+            execution(started_at=1700000000),
+            execution(completed_at=['2024-03-01']),
+        ])
+
+        assert len(result.created) == 1
+        assert sorted((error['index'], error['error']) for error in result.errors) == [
+            (1, 'Item deve ser um objeto'),
+            (2, 'pain_level deve ser <= 10'),
+            (3, 'Prescrição não encontrada'),
+            (4, 'Formato de data inválido'),
+            (5, 'Prescrição não está ativa'),
+            (6, 'started_at deve ser uma data ISO 8601'),
+            (7, 'completed_at deve ser uma data ISO 8601'),
+        ]
+
+    def test_permission_errors(self, prescriptions):
+        patient_result = ingest_executions(PATIENT, [execution('prescription-other')])
+        therapist_result = ingest_executions(THERAPIST, [execution('prescription-other'), execution()])
+
+        assert patient_result.errors == [{'index': 0, 'error': 'Acesso não autorizado'}]
+        assert therapist_result.errors == [{'index': 0, 'error': 'Acesso não autorizado'}]
+        assert len(therapist_result.created) == 1
+
+    def test_client_id_makes_resends_idempotent(self, prescriptions):
+        first = ingest_executions(PATIENT, [execution(client_id='offline-1'), execution(client_id='offline-2')])
+
+        resent = ingest_executions(PATIENT, [
+            execution(client_id='offline-1'),
+            execution(client_id='offline-3'),
+            execution(client_id='offline-3'),
+        ])
+
+        assert resent.duplicates[0] == {'index': 0, 'id': first.created[0]['id'], 'client_id': 'offline-1'}
+        assert [item['index'] for item in resent.created] == [1]
+        assert resent.duplicates[1]['index'] == 2
+        assert ExerciseExecution.query.count() == 3
+        db.session.expire_all()
+        assert db.session.get(Exercise, 'exercise-1').execution_count == 3
+
+    def test_timezone_aware_dates_are_stored_as_naive_utc(self, prescriptions):
+        result = ingest_executions(PATIENT, [execution(started_at='2024-03-01T07:00:00-03:00')])
+
+        stored = db.session.get(ExerciseExecution, result.created[0]['id'])
+        assert stored.started_at.isoformat() == '2024-03-01T10:00:00'
+
+
+class TestSensorSeries:
+    """Séries por canal, reduzidas e empacotadas"""
+
+    def test_series_are_downsampled_and_packed(self, prescriptions):
+        samples = [float(index % 4) for index in range(400)]
+        result = ingest_executions(PATIENT, [execution(sensor_data={
+            'sample_rate_hz': 100,
+            'channels': {'accel_x': samples, 'accel_y': [], 'heart_rate': [70, 72]}
+        })])
+
+        assert result.sensor_series_count == 2
+        series = {row.channel: row for row in ExerciseSensorSeries.query}
+        accel = series['accel_x']
+        assert (accel.downsample_factor, accel.sample_rate_hz) == (4, 25.0)
+        assert (accel.original_sample_count, accel.sample_count) == (400, 100)
+        assert accel.to_dict(include_samples=True)['samples'] == [1.5] * 100
+        assert (accel.min_value, accel.max_value, accel.mean_value) == (1.5, 1.5, 1.5)
+        assert unpack_samples(series['heart_rate'].data) == [71.0]
+
+    def test_invalid_sensor_data(self, prescriptions):
+        result = ingest_executions(PATIENT, [
+            execution(sensor_data={'channels': {'accel_x': [1.0]}}),
+            execution(sensor_data={'sample_rate_hz': 50, 'channels': {'accel_x': ['a']}}),
+        ])
+
+        assert [error['error'] for error in result.errors] == [
+            'sensor_data.sample_rate_hz deve ser positivo',
+            'Canal accel_x deve ser uma lista numérica',
+        ]
+        assert ExerciseSensorSeries.query.count() == 0
@@ -0,0 +1,136 @@
+"""
+Testes para os contadores desnormalizados de execuções
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models.exercise import Exercise, PatientExercise
+from app.models.types import days_between
+from app.services.exercise_stats import apply_execution_counters, reconcile_exercise_counters
+from tests.exercise_factories import app_context, make_execution, make_exercise, make_prescription  # noqa: F401
+
+
+def compile_sql(expression, dialect):
+    return str(select(expression).compile(dialect=dialect))
+
+
+class TestDaysBetween:
+    """Diferença em dias por dialeto"""
+
+    def test_compiles_per_dialect(self):
+        expression = days_between(PatientExercise.start_date, PatientExercise.end_date)
+
+        assert 'julianday(patient_exercises.end_date) - julianday(patient_exercises.start_date)' in \
+            compile_sql(expression, sqlite.dialect())
+        assert 'CAST(patient_exercises.end_date AS DATE) - CAST(patient_exercises.start_date AS DATE)' in \
+            compile_sql(expression, postgresql.dialect())
+
+    def test_completion_rate_matches_in_sql(self, app_context):
+        """O lado SQL do hybrid concorda com o cálculo em Python"""
+        make_exercise()
+        prescription = make_prescription(
+            start_date=date(2024, 1, 1), end_date=date(2024, 1, 14), frequency_per_week=3, completed_count=3
+        )
+        db.session.commit()
+
+        in_sql = db.session.execute(select(PatientExercise.completion_rate)).scalar()
+
+        assert prescription.completion_rate == 50.0
+        assert in_sql == 50.0
+
+
+class TestExecutionCounters:
+    """UPDATE col = col + n por exercício/prescrição"""
+
+    def test_apply_increments_counters(self, app_context):
+        make_exercise('exercise-1')
+        make_exercise('exercise-2')
+        first = make_prescription('prescription-1', exercise_id='exercise-1')
+        second = make_prescription('prescription-2', exercise_id='exercise-2')
+        db.session.commit()
+
+        apply_execution_counters([
+            {'exercise_id': 'exercise-1', 'patient_exercise_id': first.id, 'patient_rating': 5,
+             'completed_at': datetime(2024, 1, 2)},
+            {'exercise_id': 'exercise-1', 'patient_exercise_id': first.id, 'patient_rating': None,
+             'completed_at': None},
+            {'exercise_id': 'exercise-2', 'patient_exercise_id': second.id, 'patient_rating': 2,
+             'completed_at': datetime(2024, 1, 2)},
+        ])
+        db.session.commit()
+        db.session.expire_all()
+
+        exercise = db.session.get(Exercise, 'exercise-1')
+        assert (exercise.execution_count, exercise.rating_sum, exercise.rating_count) == (2, 5, 1)
+        assert exercise.average_rating == 5.0
+        assert db.session.get(Exercise, 'exercise-2').total_executions == 1
+        assert db.session.get(PatientExercise, 'prescription-1').completed_count == 1
+        assert db.session.get(PatientExercise, 'prescription-2').completed_count == 1
+
+    def test_accepts_orm_instances(self, app_context):
+        make_exercise()
+        prescription = make_prescription()
+        executions = [make_execution(prescription, patient_rating=rating) for rating in (3, 4)]
+        db.session.flush()
+
+        apply_execution_counters(executions)
+        db.session.commit()
+        db.session.expire_all()
+
+        exercise = db.session.get(Exercise, 'exercise-1')
+        assert exercise.average_rating == 3.5
+        assert db.session.get(PatientExercise, 'prescription-1').completed_count == 2
+
+    def test_sort_by_rating_in_sql(self, app_context):
+        make_exercise('popular', rating_sum=18, rating_count=4, execution_count=9)
+        make_exercise('new')
+        make_exercise('good', rating_sum=5, rating_count=1, execution_count=1)
+        db.session.commit()
+
+        by_rating = db.session.execute(
+            select(Exercise.id).order_by(Exercise.average_rating.desc())
+        ).scalars().all()
+        by_popularity = db.session.execute(
+            select(Exercise.id).order_by(Exercise.total_executions.desc())
+        ).scalars().all()
+
+        assert by_rating == ['good', 'popular', 'new']
+        assert by_popularity == ['popular', 'good', 'new']
+
+
+class TestReconcile:
+    """Recalcula os contadores a partir das execuções"""
+
+    def seed_drift(self):
+        make_exercise()
+        prescription = make_prescription()
+        make_execution(prescription, patient_rating=4)
+        make_execution(prescription, patient_rating=2)
+        make_execution(prescription, completed_at=None)
+        db.session.commit()
+        db.session.execute(update(Exercise).values(execution_count=10, rating_sum=0, rating_count=0))
+        db.session.commit()
+
+    def test_dry_run_only_reports(self, app_context):
+        self.seed_drift()
+
+        result = reconcile_exercise_counters(dry_run=True)
+
+        assert result == {'exercises_fixed': 1, 'prescriptions_fixed': 1}
+        db.session.expire_all()
+        assert db.session.get(Exercise, 'exercise-1').execution_count == 10
+
+    def test_repairs_drift(self, app_context):
+        self.seed_drift()
+
+        reconcile_exercise_counters()
+        db.session.expire_all()
+
+        exercise = db.session.get(Exercise, 'exercise-1')
+        assert (exercise.execution_count, exercise.rating_sum, exercise.rating_count) == (3, 6, 2)
+        assert db.session.get(PatientExercise, 'prescription-1').completed_count == 2
+        assert reconcile_exercise_counters() == {'exercises_fixed': 0, 'prescriptions_fixed': 0}
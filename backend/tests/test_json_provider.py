@@ -0,0 +1,125 @@
+"""
+Testes para o provedor JSON (orjson com fallback da biblioteca padrão)
+"""
+
+import enum
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+import flask
+import pytest
+from flask import Flask, jsonify
+
+from app.utils.json_provider import FastJSONProvider, init_json_provider, orjson
+
+
+class Status(enum.Enum):
+    CONFIRMED = 'confirmado'
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+PAYLOAD = {
+    'date': date(2024, 5, 10),
+    'datetime': datetime(2024, 5, 10, 12, 30, 15, 250),
+    'time': time(8, 0),
+    'status': Status.CONFIRMED,
+    'price': Decimal('150.50'),
+    'id': UUID('12345678-1234-5678-1234-567812345678'),
+    'point': Point(1, 2),
+    'name': 'Sessão de fisioterapia',
+    'items': [1, 2.5, None, True],
+}
+
+EXPECTED = {
+    'date': '2024-05-10',
+    'datetime': '2024-05-10T12:30:15.000250',
+    'time': '08:00:00',
+    'status': 'confirmado',
+    'price': '150.50',
+    'id': '12345678-1234-5678-1234-567812345678',
+    'point': {'x': 1, 'y': 2},
+    'name': 'Sessão de fisioterapia',
+    'items': [1, 2.5, None, True],
+}
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def flask_app(request):
+    provider = request.param
+    if provider == 'orjson' and orjson is None:
+        pytest.skip('orjson não instalado')
+    app = Flask(__name__)
+    app.config['JSON_PROVIDER'] = provider
+    init_json_provider(app)
+
+    @app.route('/payload')
+    def payload():
+        return jsonify(PAYLOAD)
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        return jsonify(flask.request.get_json())
+
+    return app
+
+
+class TestFastJSONProvider:
+    """Mesma saída nos dois caminhos"""
+
+    def test_native_types_as_iso_and_values(self, flask_app):
+        assert json.loads(flask_app.json.dumps(PAYLOAD)) == EXPECTED
+
+    def test_both_paths_produce_same_json(self, flask_app):
+        fallback = FastJSONProvider(flask_app, use_orjson=False)
+
+        assert flask_app.json.dumps(PAYLOAD) == fallback.dumps(PAYLOAD)
+        assert flask_app.json.dumps_bytes(PAYLOAD) == fallback.dumps_bytes(PAYLOAD)
+
+    def test_non_string_keys_and_sorting(self, flask_app):
+        assert flask_app.json.dumps({'b': 1, 'a': {2: 'x'}}) == '{"a":{"2":"x"},"b":1}'
+
+    def test_big_integers_fall_back(self, flask_app):
+        assert json.loads(flask_app.json.dumps({'value': 2 ** 70})) == {'value': 2 ** 70}
+
+    def test_unsupported_type_raises(self, flask_app):
+        with pytest.raises(TypeError):
+            flask_app.json.dumps({'value': object()})
+
+    def test_uses_orjson_only_when_enabled(self, flask_app):
+        assert flask_app.json.use_orjson == (flask_app.config['JSON_PROVIDER'] == 'orjson')
+
+
+class TestResponses:
+    """jsonify e request.get_json passam pelo provedor"""
+
+    def test_jsonify(self, flask_app):
+        response = flask_app.test_client().get('/payload')
+
+        assert response.mimetype == 'application/json'
+        assert response.get_json() == EXPECTED
+        assert response.data.endswith(b'}\n')
+
+    def test_request_body(self, flask_app):
+        response = flask_app.test_client().post('/echo', json={'nome': 'João', 'dor': 7})
+
+        assert response.get_json() == {'nome': 'João', 'dor': 7}
+
+    def test_invalid_body(self, flask_app):
+        response = flask_app.test_client().post('/echo', data='{inválido', content_type='application/json')
+
+        assert response.status_code == 400
+
+    def test_indented_in_debug(self, flask_app):
+        flask_app.debug = True
+
+        response = flask_app.test_client().get('/payload')
+
+        assert b'\n  "date": "2024-05-10"' in response.data
@@ -0,0 +1,131 @@
+"""
+Testes para as tendências de dor vetorizadas
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import db
+from app.models.clinical_protocols import ProtocolApplication
+from app.models.exercise import ExerciseExecution
+from app.models.patient import Evolution, MedicalRecord, Patient
+from app.services.outcome_trends import (
+    INSUFFICIENT, IMPROVING, NOT_IMPROVING, WORSENING, PainObservations,
+    compute_trends, load_pain_observations, not_improving_worklist, smooth_values
+)
+from tests.exercise_factories import app_context  # noqa: F401
+
+TODAY = date.today()
+
+
+def observations(series):
+    """{(paciente, fonte): [(dias atrás, dor), ...]} -> colunas"""
+    ids, sources, days, values = [], [], [], []
+    for (patient_id, source), points in series.items():
+        for days_ago, pain in points:
+            ids.append(patient_id)
+            sources.append(source)
+            days.append((TODAY - timedelta(days=days_ago)).toordinal())
+            values.append(pain)
+    return PainObservations.from_rows(ids, sources, days, values)
+
+
+class TestComputeTrends:
+    """Cálculo agrupado sobre a carteira"""
+
+    def test_status_by_mcid(self):
+        trends = compute_trends(observations({
+            ('melhora', 0): [(28, 8), (21, 7), (14, 5), (7, 4), (0, 3)],
+            ('estavel', 0): [(28, 6), (14, 6), (0, 5)],
+            ('piora', 1): [(30, 3), (20, 4), (10, 6), (0, 7)],
+            ('curta', 0): [(3, 9), (0, 2)],
+        }))
+
+        status = dict(zip(trends.patient_ids, trends.status))
+        assert status == {'melhora': IMPROVING, 'estavel': NOT_IMPROVING, 'piora': WORSENING, 'curta': INSUFFICIENT}
+
+    def test_matches_per_series_reference(self):
+        """Mesmos resultados que um laço por série (np.polyfit)"""
+        rng = np.random.default_rng(7)
+        series = {
+            (f'p{index}', index % 3): [(int(day), int(pain)) for day, pain in
+                                       zip(rng.choice(60, size=8, replace=False), rng.integers(0, 11, size=8))]
+            for index in range(200)
+        }
+
+        trends = compute_trends(observations(series))
+
+        for index in range(len(trends)):
+            points = sorted(series[(trends.patient_ids[index], trends.sources[index])], key=lambda p: -p[0])
+            x = np.array([-days_ago for days_ago, _ in points], dtype=float)
+            y = np.array([pain for _, pain in points], dtype=float)
+            assert trends.slope_per_week[index] == pytest.approx(np.polyfit(x, y, 1)[0] * 7)
+            assert trends.baseline[index] == pytest.approx(y[:3].mean())
+            assert trends.current[index] == pytest.approx(y[-3:].mean())
+
+    def test_moving_average_restarts_per_series(self):
+        data = observations({('a', 0): [(2, 9), (1, 6), (0, 3)], ('b', 0): [(1, 4), (0, 2)]})
+
+        order, smoothed = smooth_values(data)
+
+        assert list(data.patient_ids[order]) == ['a', 'a', 'a', 'b', 'b']
+        assert list(smoothed) == [9, 7.5, 6, 4, 3]
+
+    def test_empty_caseload(self):
+        assert len(compute_trends(observations({}))) == 0
+
+
+@pytest.fixture
+def caseload(app_context):
+    for patient_id, active in (('ana', True), ('bia', True), ('caio', True), ('inativo', False)):
+        db.session.add(Patient(id=patient_id, nome_completo=patient_id.title(), is_active=active))
+        db.session.add(MedicalRecord(id=f'mr-{patient_id}', patient_id=patient_id, created_by='user-1',
+                                     data_avaliacao=TODAY - timedelta(days=60)))
+
+    def evolutions(patient_id, pains):
+        for days_ago, pain in pains:
+            db.session.add(Evolution(medical_record_id=f'mr-{patient_id}', created_by='user-1',
+                                     data_atendimento=TODAY - timedelta(days=days_ago), escala_dor=pain))
+
+    evolutions('ana', [(30, 8), (15, 5), (0, 3)])      # melhora
+    evolutions('bia', [(30, 5), (15, 5), (0, 6)])      # sem melhora
+    evolutions('inativo', [(30, 2), (15, 6), (0, 9)])  # fora da carteira
+    for days_ago, pain in ((28, 3), (14, 5), (0, 8)):  # piora em casa
+        db.session.add(ExerciseExecution(patient_exercise_id='pe-1', exercise_id='ex-1', patient_id='caio',
+                                         started_at=datetime.combine(TODAY - timedelta(days=days_ago),
+                                                                     datetime.min.time()),
+                                         pain_level=pain))
+    db.session.add(ProtocolApplication(protocol_id='protocol-1', patient_id='ana', therapist_id='user-1',
+                                       start_date=TODAY - timedelta(days=40), is_active=True,
+                                       progress_assessments={
+                                           (TODAY - timedelta(days=20)).isoformat(): {'eva': 7},
+                                           (TODAY - timedelta(days=10)).isoformat(): {'observacao': 'sem escala'},
+                                           (TODAY - timedelta(days=200)).isoformat(): {'eva': 10},
+                                       }))
+    db.session.commit()
+
+
+class TestCaseload:
+    """Leitura em lote e lista de trabalho"""
+
+    def test_loads_active_patients_from_all_sources(self, caseload):
+        data = load_pain_observations(TODAY - timedelta(days=90))
+
+        assert set(data.patient_ids) == {'ana', 'bia', 'caio'}
+        assert np.bincount(data.sources, minlength=3).tolist() == [6, 3, 1]
+
+    def test_worklist_lists_each_patient_once_worst_first(self, caseload):
+        result = not_improving_worklist(lookback_days=90)
+
+        assert [(item['patient_id'], item['source'], item['status']) for item in result['items']] == [
+            ('caio', 'exercise', 'piora'), ('bia', 'evolution', 'sem_melhora')
+        ]
+        assert result['items'][0]['patient_name'] == 'Caio'
+        assert (result['total'], result['caseload']) == (2, 3)
+
+    def test_worklist_filters_sources(self, caseload):
+        result = not_improving_worklist(lookback_days=90, sources=['evolution'])
+
+        assert [item['patient_id'] for item in result['items']] == ['bia']
@@ -0,0 +1,91 @@
+"""
+Testes para o cache por paciente compartilhado e sua invalidação
+"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.patient import Evolution, MedicalRecord, Patient
+from app.services.ai_cache import MemoryCacheBackend
+from app.services.ai_context import get_patient_context_cache
+from app.services.clinical_summary import get_clinical_summary_cache
+from app.services.patient_cache import PatientCache
+from tests.exercise_factories import database_app
+
+
+@pytest.fixture
+def record():
+    """SQLite em memória com um paciente e um prontuário"""
+    with database_app():
+        db.session.add(Patient(id='patient-1', nome_completo='Maria Souza'))
+        record = MedicalRecord(patient_id='patient-1', created_by='user-1', data_avaliacao=date(2025, 1, 6))
+        db.session.add(record)
+        db.session.commit()
+        yield record
+
+
+def warm(*caches):
+    for cache in caches:
+        cache.get('patient-1', lambda patient_id: 'antigo')
+
+
+class TestPatientCache:
+    """Leitura, contadores e invalidação"""
+
+    def test_loader_runs_once_until_invalidated(self):
+        """Acertos não consultam o banco; invalidação força nova leitura"""
+        cache = PatientCache(MemoryCacheBackend(), ttl=60)
+        loads = []
+
+        def loader(patient_id):
+            loads.append(patient_id)
+            return f'Resumo {len(loads)}'
+
+        assert cache.get('p1', loader) == 'Resumo 1'
+        assert cache.get('p1', loader) == 'Resumo 1'
+        cache.invalidate('p1')
+        assert cache.get('p1', loader) == 'Resumo 2'
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 2
+
+    def test_none_is_not_cached(self):
+        cache = PatientCache(MemoryCacheBackend(), ttl=60)
+
+        assert cache.get('p1', lambda patient_id: None) is None
+        assert cache.get('p1', lambda patient_id: {'total': 1}) == {'total': 1}
+
+
+class TestInvalidation:
+    """Listeners compartilhados pelos caches registrados"""
+
+    def test_evolution_invalidates_every_cache_with_one_lookup(self, record):
+        context, summary = get_patient_context_cache(), get_clinical_summary_cache()
+        warm(context, summary)
+        record_id = record.id
+        lookups = []
+
+        def before_execute(conn, cursor, statement, parameters, execution_context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                lookups.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_execute)
+        db.session.add(Evolution(medical_record_id=record_id, created_by='user-1', data_atendimento=date(2025, 1, 7)))
+        db.session.commit()
+        event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+        assert len(lookups) == 1
+        assert context.get('patient-1', lambda patient_id: 'novo') == 'novo'
+        assert summary.get('patient-1', lambda patient_id: 'novo') == 'novo'
+
+    def test_patient_row_only_invalidates_caches_that_include_it(self, record):
+        context, summary = get_patient_context_cache(), get_clinical_summary_cache()
+        warm(context, summary)
+
+        db.session.get(Patient, 'patient-1').nome_completo = 'Maria Souza Lima'
+        db.session.commit()
+
+        assert context.get('patient-1', lambda patient_id: 'novo') == 'novo'
+        assert summary.get('patient-1', lambda patient_id: 'novo') == 'antigo'
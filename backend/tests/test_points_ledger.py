@@ -0,0 +1,194 @@
+"""
+Testes para o ledger de pontos, streaks e leaderboards
+"""
+
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models.gamification import PatientPoints
+from app.services.leaderboard import (
+    GLOBAL_SCOPE, InMemoryLeaderboard, Leaderboard, get_leaderboard, therapist_scope
+)
+from app.services.points_ledger import (
+    advance_streak, apply_points, backfill_points, load_scope_scores, publish_points, rebuild_leaderboards,
+    _upsert_points_statement
+)
+from tests.exercise_factories import app_context, make_execution, make_exercise, make_prescription  # noqa: F401
+
+
+def entry(patient_id='patient-1', points=10, day=date(2024, 3, 1), therapist_id='therapist-1'):
+    return {'patient_id': patient_id, 'therapist_id': therapist_id, 'points': points,
+            'activity_at': datetime.combine(day, datetime.min.time())}
+
+
+def stored(patient_id='patient-1'):
+    db.session.expire_all()
+    return db.session.get(PatientPoints, patient_id)
+
+
+class TestStreak:
+    """Dias consecutivos de atividade"""
+
+    def test_advance_streak(self):
+        monday = date(2024, 3, 4)
+
+        assert advance_streak(0, None, [monday]) == (1, monday)
+        assert advance_streak(3, monday, [monday + timedelta(days=1)]) == (4, monday + timedelta(days=1))
+        assert advance_streak(3, monday, [monday + timedelta(days=3)]) == (1, monday + timedelta(days=3))
+        # Envio offline atrasado não mexe na sequência
+        assert advance_streak(3, monday, [monday - timedelta(days=2), monday]) == (3, monday)
+
+    def test_effective_streak_resets_after_a_missed_day(self):
+        points = PatientPoints(patient_id='patient-1', current_streak=5, last_activity_date=date(2024, 3, 4))
+
+        assert points.effective_streak(today=date(2024, 3, 5)) == 5
+        assert points.effective_streak(today=date(2024, 3, 6)) == 0
+
+
+class TestApplyPoints:
+    """Totais incrementais na transação das execuções"""
+
+    def test_first_and_following_executions(self, app_context):
+        deltas = apply_points([entry(points=10), entry(points=5), entry('patient-2', points=7, therapist_id=None)])
+        db.session.commit()
+
+        assert sorted(deltas) == sorted([
+            (GLOBAL_SCOPE, 'patient-1', 15), (GLOBAL_SCOPE, 'patient-2', 7),
+            (therapist_scope('therapist-1'), 'patient-1', 15)
+        ])
+
+        apply_points([entry(points=20, day=date(2024, 3, 2))])
+        db.session.commit()
+
+        points = stored()
+        assert (points.total_points, points.execution_count) == (35, 3)
+        assert (points.current_streak, points.longest_streak) == (2, 2)
+        assert points.last_activity_date == date(2024, 3, 2)
+
+    def test_row_created_concurrently_is_incremented(self, app_context):
+        """INSERT de um paciente que outra transação acabou de criar soma em vez de falhar"""
+        db.session.add(PatientPoints(
+            patient_id='patient-1', total_points=10, execution_count=1, current_streak=1,
+            longest_streak=1, last_activity_date=date(2024, 3, 1)
+        ))
+        db.session.commit()
+
+        db.session.execute(_upsert_points_statement(increment=True), [{
+            'patient_id': 'patient-1', 'total_points': 5, 'execution_count': 1, 'current_streak': 1,
+            'longest_streak': 1, 'last_activity_date': date(2024, 3, 2), 'updated_at': datetime.utcnow()
+        }])
+        db.session.commit()
+
+        points = stored()
+        assert (points.total_points, points.execution_count) == (15, 2)
+        assert points.last_activity_date == date(2024, 3, 2)
+
+    def test_older_concurrent_activity_keeps_the_newer_streak(self, app_context):
+        db.session.add(PatientPoints(
+            patient_id='patient-1', total_points=10, execution_count=1, current_streak=4,
+            longest_streak=6, last_activity_date=date(2024, 3, 5)
+        ))
+        db.session.commit()
+
+        db.session.execute(_upsert_points_statement(increment=True), [{
+            'patient_id': 'patient-1', 'total_points': 5, 'execution_count': 1, 'current_streak': 1,
+            'longest_streak': 1, 'last_activity_date': date(2024, 3, 1), 'updated_at': datetime.utcnow()
+        }])
+        db.session.commit()
+
+        points = stored()
+        assert (points.current_streak, points.longest_streak) == (4, 6)
+        assert points.last_activity_date == date(2024, 3, 5)
+
+
+class TestBackfill:
+    """Recalcula o ledger a partir das execuções"""
+
+    def seed(self):
+        make_exercise(points_value=10)
+        prescription = make_prescription()
+        for day in (1, 2, 3, 6):
+            make_execution(prescription, started_at=datetime(2024, 3, day, 9, 0), points_earned=10, bonus_points=5)
+        db.session.commit()
+
+    def test_backfill_inserts_and_fixes(self, app_context):
+        self.seed()
+        db.session.add(PatientPoints(patient_id='patient-gone', total_points=50, execution_count=5))
+        db.session.commit()
+
+        result = backfill_points()
+
+        assert result == {'patients': 1, 'inserted': 1, 'updated': 1}
+        points = stored()
+        assert (points.total_points, points.execution_count) == (60, 4)
+        assert (points.current_streak, points.longest_streak) == (1, 3)
+        assert stored('patient-gone').total_points == 0
+        assert backfill_points(dry_run=True) == {'patients': 1, 'inserted': 0, 'updated': 0}
+
+    def test_backfill_replaces_a_row_created_meanwhile(self, app_context):
+        """Linha criada por uma execução concorrente depois da leitura do backfill"""
+        apply_points([entry(points=999)])
+        db.session.commit()
+
+        db.session.execute(_upsert_points_statement(increment=False), [{
+            'patient_id': 'patient-1', 'total_points': 60, 'execution_count': 4, 'current_streak': 1,
+            'longest_streak': 3, 'last_activity_date': date(2024, 3, 6), 'updated_at': datetime.utcnow()
+        }])
+        db.session.commit()
+
+        points = stored()
+        assert (points.total_points, points.execution_count, points.longest_streak) == (60, 4, 3)
+
+
+class TestLeaderboard:
+    """Sorted set em memória e materialização a partir do banco"""
+
+    def test_in_memory_sorted_set(self):
+        board = InMemoryLeaderboard()
+        board.replace('global', {'ana': 30, 'bruno': 10, 'carla': 20})
+
+        board.increment('global', 'bruno', 25)
+
+        assert board.top('global', 2) == [('bruno', 35), ('ana', 30)]
+        assert board.rank('global', 'carla') == 2
+        assert board.rank('global', 'diego') is None
+        assert board.exists('global') and not board.exists('therapist:x')
+
+    def test_scopes_are_materialized_before_increments(self):
+        loads = []
+
+        def loader(scope):
+            loads.append(scope)
+            return {'ana': 30, 'bruno': 10}
+
+        board = Leaderboard(InMemoryLeaderboard(), loader)
+        board.add_points([(GLOBAL_SCOPE, 'bruno', 5)])
+        assert loads == []
+
+        assert board.rank(GLOBAL_SCOPE, 'bruno') == 2
+        board.add_points([(GLOBAL_SCOPE, 'bruno', 50), (GLOBAL_SCOPE, 'ana', 0)])
+        assert board.top(GLOBAL_SCOPE, 1) == [{'rank': 1, 'patient_id': 'bruno', 'points': 60}]
+        assert loads == [GLOBAL_SCOPE]
+
+    def test_published_points_reach_the_leaderboard(self, app_context):
+        make_exercise()
+        first = make_prescription('prescription-1', patient_id='patient-1')
+        second = make_prescription('prescription-2', patient_id='patient-2', prescribed_by='therapist-2')
+        make_execution(first, points_earned=30)
+        make_execution(second, points_earned=40)
+        apply_points([entry('patient-1', points=30), entry('patient-2', points=40, therapist_id='therapist-2')])
+        db.session.commit()
+
+        assert load_scope_scores(GLOBAL_SCOPE) == {'patient-1': 30, 'patient-2': 40}
+        assert load_scope_scores(therapist_scope('therapist-2')) == {'patient-2': 40}
+        assert rebuild_leaderboards(['therapist-2']) == {GLOBAL_SCOPE: 2, therapist_scope('therapist-2'): 1}
+
+        leaderboard = get_leaderboard()
+        assert leaderboard.backend_name == 'memory'
+        assert leaderboard.rank(GLOBAL_SCOPE, 'patient-2') == 1
+
+        deltas = apply_points([entry('patient-1', points=15)])
+        db.session.commit()
+        publish_points(deltas)
+
+        assert leaderboard.top(GLOBAL_SCOPE, 1) == [{'rank': 1, 'patient_id': 'patient-1', 'points': 45}]
@@ -0,0 +1,87 @@
+"""
+Testes para progresso e estatísticas de projetos calculados no banco
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.project_management import Project, Task, TaskPriority, TaskStatus, TaskType
+from app.services.project_stats import project_task_stats, with_task_counts
+from tests.exercise_factories import app_context  # noqa: F401
+
+
+@pytest.fixture
+def statements(app_context):
+    """SQL emitido durante o teste"""
+    executed = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_execute)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+
+def add_tasks(project_id, specs):
+    for index, (status, extra) in enumerate(specs):
+        db.session.add(Task(project_id=project_id, key=f'{project_id}-{index}', title=f'Tarefa {index}',
+                            task_type=extra.pop('task_type', TaskType.FEATURE), reporter_id='user-1',
+                            status=status, **extra))
+    db.session.commit()
+
+
+@pytest.fixture
+def projects(app_context):
+    for index in range(5):
+        db.session.add(Project(id=f'project-{index}', name=f'P{index}', key=f'P{index}',
+                               category='clinico', owner_id='user-1'))
+    db.session.commit()
+    add_tasks('project-0', [
+        (TaskStatus.DONE, {'story_points': 5, 'estimated_hours': 4, 'actual_hours': 5}),
+        (TaskStatus.DONE, {'story_points': 3, 'task_type': TaskType.BUG}),
+        (TaskStatus.TODO, {'story_points': 8, 'due_date': date.today() - timedelta(days=1),
+                           'priority': TaskPriority.HIGH, 'estimated_hours': 6}),
+        (TaskStatus.TODO, {'is_archived': True}),
+    ])
+    add_tasks('project-1', [(TaskStatus.IN_PROGRESS, {})])
+
+
+class TestProgress:
+    """Progresso da página de projetos"""
+
+    def test_page_loads_counts_in_one_query(self, projects, statements):
+        page = with_task_counts(Project.query).order_by(Project.id).all()
+
+        progress = [project.progress_percentage for project in page]
+
+        assert progress == [pytest.approx(200 / 3), 0, 0, 0, 0]
+        assert len(statements) == 1
+
+    def test_progress_without_expression_queries_once(self, projects, statements):
+        project = db.session.get(Project, 'project-0')
+        statements.clear()
+
+        assert project.task_counts() == (3, 2)
+        assert project.progress_percentage == pytest.approx(200 / 3)
+        assert len(statements) == 1
+
+
+class TestStats:
+    """Estatísticas numa consulta agrupada"""
+
+    def test_stats_by_dimension(self, projects, statements):
+        stats = project_task_stats('project-0')
+
+        task_stats = stats['task_stats']
+        assert (task_stats['total'], task_stats['completed'], task_stats['overdue']) == (3, 2, 1)
+        assert task_stats['by_status'][TaskStatus.DONE.value] == 2
+        assert task_stats['by_type'][TaskType.BUG.value] == 1
+        assert task_stats['by_priority'][TaskPriority.HIGH.value] == 1
+        assert stats['time_stats']['estimated_hours'] == 10
+        assert stats['time_stats']['actual_hours'] == 5
+        assert stats['velocity'] == 8
+        assert len(statements) == 1
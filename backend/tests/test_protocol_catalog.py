@@ -0,0 +1,190 @@
+"""
+Testes para o catálogo de protocolos em memória
+"""
+
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app import db
+from app.models.clinical_protocols import (
+    ClinicalProtocol, EvidenceLevel, InterventionTemplate, InterventionType, ProtocolStatus
+)
+from app.services.protocol_catalog import CatalogStore, catalog_version, get_protocol_catalog, load_catalog
+from tests.exercise_factories import database_app
+
+
+@pytest.fixture
+def app_context():
+    """App com SQLite em memória e catálogo sem pré-carga"""
+    with database_app(PROTOCOL_CATALOG_CHECK_SECONDS=3600) as flask_app:
+        yield flask_app
+
+
+def make_protocol(title, icd10_codes, status=ProtocolStatus.ACTIVE, evidence=EvidenceLevel.NIVEL_1A,
+                  body_region='coluna_lombar', updated_days_ago=0, **kwargs):
+    protocol = ClinicalProtocol(
+        title=title, description=kwargs.pop('description', f'Protocolo para {title}'),
+        pathology=kwargs.pop('pathology', title), icd10_codes=icd10_codes, body_region=body_region,
+        specialization_area=kwargs.pop('specialization_area', 'ortopedia'), evidence_level=evidence,
+        grade_recommendation='A', references=[{'title': 'Diretriz'}], indications=['dor'],
+        contraindications=[], precautions=[], phases=[{'name': 'Fase Aguda'}],
+        assessment_tools=[{'name': 'EVA'}], outcome_measures=[{'measure': 'dor'}],
+        frequency_recommendations={'sessions_per_week': '2-3'}, inclusion_criteria=['adulto'],
+        exclusion_criteria=[], status=status, created_by='user-1',
+        updated_at=datetime.utcnow() - timedelta(days=updated_days_ago), **kwargs
+    )
+    db.session.add(protocol)
+    return protocol
+
+
+def make_intervention(name, category='fortalecimento', is_active=True):
+    intervention = InterventionTemplate(
+        name=name, intervention_type=InterventionType.EXERCISE, category=category,
+        description=f'Exercício {name}', detailed_instructions='Executar devagar',
+        default_dosage={'sets': '3'}, progression_criteria=['sem dor'],
+        evidence_level=EvidenceLevel.NIVEL_1B, is_active=is_active, created_by='user-1'
+    )
+    db.session.add(intervention)
+    return intervention
+
+
+@pytest.fixture
+def catalog(app_context):
+    make_protocol('Lombalgia aguda', ['M54.5'], updated_days_ago=1)
+    make_protocol('Ciatalgia', ['M54.3', 'M54.4'], evidence=EvidenceLevel.NIVEL_2A, usage_count=10)
+    make_protocol('Cervicalgia', ['M54.2'], body_region='coluna_cervical', updated_days_ago=2)
+    make_protocol('Lombalgia crônica (rascunho)', ['M54.5'], status=ProtocolStatus.DRAFT)
+    make_intervention('Ponte')
+    make_intervention('Agachamento', category='Fortalecimento de membros')
+    make_intervention('Antigo', is_active=False)
+    db.session.commit()
+    return load_catalog()
+
+
+class TestCatalogQueries:
+    """Listagens e detalhes servidos do snapshot"""
+
+    def test_list_uses_indexes_and_default_status(self, catalog):
+        """Só protocolos ativos por padrão, combinando os índices"""
+        data = json.loads(catalog.list_protocols())
+        assert [p['title'] for p in data['protocols']] == ['Ciatalgia', 'Lombalgia aguda', 'Cervicalgia']
+        assert data['pagination']['total'] == 3
+        assert data['catalog_version'] == catalog.version
+
+        lumbar = json.loads(catalog.list_protocols(body_region='coluna_lombar', evidence_level='1a'))
+        assert [p['title'] for p in lumbar['protocols']] == ['Lombalgia aguda']
+
+        drafts = json.loads(catalog.list_protocols(status='rascunho'))
+        assert [p['title'] for p in drafts['protocols']] == ['Lombalgia crônica (rascunho)']
+
+    def test_text_filters_sort_and_pages(self, catalog):
+        """Busca sem diferenciar maiúsculas, ordenação e paginação"""
+        data = json.loads(catalog.list_protocols(search='LOMBALGIA', sort_by='evidence', per_page=1))
+        assert [p['title'] for p in data['protocols']] == ['Lombalgia aguda']
+        assert data['pagination']['has_next'] is False
+
+        by_usage = json.loads(catalog.list_protocols(sort_by='usage', per_page=2, page=1))
+        assert by_usage['protocols'][0]['title'] == 'Ciatalgia'
+        assert by_usage['pagination'] == {
+            'page': 1, 'pages': 2, 'per_page': 2, 'total': 3, 'has_prev': False, 'has_next': True
+        }
+        assert json.loads(catalog.list_protocols(pathology='cervical'))['protocols'][0]['title'] == 'Cervicalgia'
+
+    def test_serialized_json_matches_model(self, app_context, catalog):
+        """Bytes pré-serializados equivalem ao to_dict do modelo"""
+        protocol = ClinicalProtocol.query.filter_by(title='Ciatalgia').one()
+
+        detail = json.loads(catalog.protocol_json(protocol.id))
+
+        assert detail == {'protocol': json.loads(json.dumps(protocol.to_dict(include_details=True)))}
+        assert detail['protocol']['phases'] == [{'name': 'Fase Aguda'}]
+        assert catalog.protocol_json('inexistente') is None
+
+    def test_interventions_only_active(self, catalog):
+        """Templates inativos ficam fora; categoria por trecho do texto"""
+        data = json.loads(catalog.list_interventions())
+        assert [i['name'] for i in data['interventions']] == ['Agachamento', 'Ponte']
+
+        members = json.loads(catalog.list_interventions(category='membros', include_details=True))
+        assert [i['name'] for i in members['interventions']] == ['Agachamento']
+        assert members['interventions'][0]['default_dosage'] == {'sets': '3'}
+
+
+class TestICD10Lookup:
+    """Consulta por CID-10"""
+
+    def test_exact_code_is_normalized(self, catalog):
+        """Ponto, espaços e caixa não importam; rascunhos ficam fora"""
+        data = json.loads(catalog.icd10_lookup(' m54.5 '))
+
+        assert data['code'] == 'M545'
+        assert data['match'] == 'exact'
+        assert [p['title'] for p in data['protocols']] == ['Lombalgia aguda']
+
+    def test_falls_back_to_category(self, catalog):
+        """Subcódigo sem protocolo e a própria categoria trazem a família M54"""
+        subcode = json.loads(catalog.icd10_lookup('M54.9'))
+        category = json.loads(catalog.icd10_lookup('M54'))
+
+        assert subcode['match'] == category['match'] == 'category'
+        assert len(subcode['protocols']) == len(category['protocols']) == 3
+        assert json.loads(catalog.icd10_lookup('S83.5')) == {
+            'code': 'S835', 'match': 'none', 'catalog_version': catalog.version, 'protocols': []
+        }
+
+
+def recording_loader(loads):
+    def loader(version):
+        loads.append(version)
+        return SimpleNamespace(version=version)
+    return loader
+
+
+class TestCatalogStore:
+    """Versão e recarga"""
+
+    def test_version_is_checked_once_per_interval(self):
+        """Acessos dentro do intervalo não consultam a versão"""
+        versions = ['v1']
+        loads = []
+        store = CatalogStore(recording_loader(loads), lambda: versions[0], check_seconds=3600)
+
+        store.get()
+        store.get()
+        versions[0] = 'v2'
+        assert store.get().version == 'v1'
+
+        store.invalidate()
+        assert store.get().version == 'v2'
+        assert loads == ['v1', 'v2']
+        assert store.checks == 2
+
+    def test_unchanged_version_keeps_snapshot(self):
+        """Carimbo igual não recarrega"""
+        loads = []
+        store = CatalogStore(recording_loader(loads), lambda: 'v1', check_seconds=0)
+
+        store.get()
+        store.get()
+
+        assert loads == ['v1']
+        assert store.checks == 2
+
+    def test_commit_invalidates_catalog(self, app_context):
+        """Gravar um protocolo recarrega o catálogo no próximo acesso"""
+        make_protocol('Lombalgia aguda', ['M54.5'])
+        db.session.commit()
+        store = get_protocol_catalog()
+        before = store.get()
+
+        make_protocol('Tendinopatia patelar', ['M76.5'], body_region='joelho')
+        db.session.commit()
+        after = store.get()
+
+        assert after is not before
+        assert after.version == catalog_version() != before.version
+        assert json.loads(after.icd10_lookup('M76.5'))['match'] == 'exact'
+        assert store.loads == 2
@@ -0,0 +1,205 @@
+"""
+Testes para a carga em lote de protocolos e intervenções
+"""
+
+import copy
+import json
+
+import pytest
+
+from app import db
+from app.data.base_interventions import BASE_INTERVENTIONS
+from app.data.base_protocols import BASE_PROTOCOLS
+from app.models.clinical_protocols import ClinicalProtocol, EvidenceLevel, InterventionTemplate, ProtocolStatus
+from app.commands import init_protocols
+from app.models.user import UserRole
+from app.services.protocol_seeding import (
+    PROTOCOL_SPEC, SPECS, SeedError, prepare_records, read_seed_file, seed, seed_records
+)
+from tests.exercise_factories import app_context, make_user  # noqa: F401
+
+
+def external_protocols(count):
+    """Protocolos de uma fonte externa, com chave própria"""
+    template = BASE_PROTOCOLS[0]
+    records = []
+    for index in range(count):
+        record = copy.deepcopy(template)
+        record.update(key=f'ext-{index}', title=f'Protocolo externo {index}', evidence_level='1b')
+        records.append(record)
+    return records
+
+
+class TestSeed:
+    """Upsert idempotente por seed_key e hash"""
+
+    def test_rerun_writes_nothing(self, app_context):
+        """Segunda carga dos dados base não duplica nem atualiza"""
+        first = seed('protocols', BASE_PROTOCOLS, 'admin-1')
+        seed('interventions', BASE_INTERVENTIONS, 'admin-1')
+        updated_at = {p.id: p.updated_at for p in ClinicalProtocol.query}
+
+        again = seed('protocols', BASE_PROTOCOLS, 'admin-1')
+
+        assert first['inserted'] == len(BASE_PROTOCOLS)
+        assert again == {'total': len(BASE_PROTOCOLS), 'inserted': 0, 'updated': 0,
+                         'unchanged': len(BASE_PROTOCOLS), 'adopted': 0}
+        assert ClinicalProtocol.query.count() == len(BASE_PROTOCOLS)
+        assert {p.id: p.updated_at for p in ClinicalProtocol.query} == updated_at
+        assert InterventionTemplate.query.count() == len(BASE_INTERVENTIONS)
+
+    def test_changed_content_is_updated_in_place(self, app_context):
+        """Só o registro alterado é atualizado; status e uso são preservados"""
+        records = external_protocols(3)
+        seed('protocols', records, 'admin-1')
+        protocol = ClinicalProtocol.query.filter_by(seed_key='ext-1').one()
+        protocol.status = ProtocolStatus.ARCHIVED
+        protocol.usage_count = 7
+        db.session.commit()
+
+        records[1]['indications'] = ['Dor lombar crônica']
+        result = seed('protocols', records, 'admin-2')
+
+        assert (result['inserted'], result['updated'], result['unchanged']) == (0, 1, 2)
+        db.session.expire_all()
+        protocol = ClinicalProtocol.query.filter_by(seed_key='ext-1').one()
+        assert protocol.indications == ['Dor lombar crônica']
+        assert (protocol.status, protocol.usage_count, protocol.created_by) == (ProtocolStatus.ARCHIVED, 7, 'admin-1')
+
+    def test_legacy_rows_are_adopted(self, app_context):
+        """Protocolos da carga antiga (sem seed_key) não são duplicados"""
+        data = {key: value for key, value in BASE_PROTOCOLS[0].items()}
+        db.session.add(ClinicalProtocol(**data, status=ProtocolStatus.ACTIVE, created_by='admin-1'))
+        db.session.commit()
+
+        result = seed('protocols', BASE_PROTOCOLS, 'admin-1')
+
+        assert result['adopted'] == 1
+        assert result['inserted'] == len(BASE_PROTOCOLS) - 1
+        assert ClinicalProtocol.query.count() == len(BASE_PROTOCOLS)
+        assert ClinicalProtocol.query.filter(ClinicalProtocol.seed_key.is_(None)).count() == 0
+
+    def test_batches_and_progress(self, app_context):
+        """Milhares de registros em lotes, com progresso por lote"""
+        rows, errors = prepare_records(PROTOCOL_SPEC, external_protocols(1200))
+        calls = []
+
+        result = seed_records(PROTOCOL_SPEC, rows, 'admin-1', batch_size=500, progress=calls.append)
+
+        assert errors == []
+        assert result['inserted'] == 1200
+        assert calls == [500, 500, 200]
+        assert ClinicalProtocol.query.filter_by(evidence_level=EvidenceLevel.NIVEL_1B).count() == 1200
+
+    def test_dry_run_does_not_write(self, app_context):
+        """Simulação só conta o que seria gravado"""
+        result = seed('protocols', external_protocols(5), 'admin-1', dry_run=True)
+
+        assert result['inserted'] == 5
+        assert ClinicalProtocol.query.count() == 0
+
+
+    def test_without_commit_the_caller_owns_the_transaction(self, app_context):
+        rows, _ = prepare_records(PROTOCOL_SPEC, external_protocols(3))
+
+        result = seed_records(PROTOCOL_SPEC, rows, 'admin-1', commit=False)
+        assert result['inserted'] == 3
+        db.session.rollback()
+
+        assert ClinicalProtocol.query.count() == 0
+
+
+class TestImportCommand:
+    """flask import-protocols grava todos os tipos do arquivo numa transação"""
+
+    def run(self, app_context, tmp_path):
+        make_user('admin-1', email='admin@fisioflow.com', role=UserRole.ADMIN)
+        db.session.commit()
+        path = tmp_path / 'catalogo.json'
+        path.write_text(json.dumps({
+            'protocols': external_protocols(2), 'interventions': BASE_INTERVENTIONS[:1]
+        }, default=lambda value: value.value), encoding='utf-8')
+        return app_context.test_cli_runner().invoke(init_protocols.import_protocols, [str(path)])
+
+    def test_imports_every_kind(self, app_context, tmp_path):
+        result = self.run(app_context, tmp_path)
+
+        assert result.exit_code == 0, result.output
+        assert ClinicalProtocol.query.count() == 2
+        assert InterventionTemplate.query.count() == 1
+
+    def test_failure_in_a_later_kind_rolls_back_the_file(self, app_context, tmp_path, monkeypatch):
+        def failing_seed(spec, *args, **kwargs):
+            if spec is SPECS['interventions']:
+                raise RuntimeError('falha simulada')
+            return seed_records(spec, *args, **kwargs)
+
+        monkeypatch.setattr(init_protocols, 'seed_records', failing_seed)
+
+        result = self.run(app_context, tmp_path)
+
+        assert result.exit_code != 0
+        assert ClinicalProtocol.query.count() == 0
+        assert InterventionTemplate.query.count() == 0
+
+
+class TestSeedFiles:
+    """Leitura e validação de JSON e CSV"""
+
+    def test_invalid_records_are_reported(self, app_context):
+        """Campos ausentes, enums inválidos e chaves repetidas abortam a carga"""
+        records = external_protocols(3)
+        del records[0]['phases']
+        records[1]['evidence_level'] = '9z'
+        records[2]['key'] = 'ext-1'
+        records.append(copy.deepcopy(records[2]))
+
+        rows, errors = prepare_records(PROTOCOL_SPEC, records)
+
+        assert len(rows) == 1
+        assert 'phases' in errors[0]
+        assert 'EvidenceLevel' in errors[1]
+        assert 'chave duplicada' in errors[2]
+        with pytest.raises(SeedError):
+            seed('protocols', records, 'admin-1')
+        assert ClinicalProtocol.query.count() == 0
+
+    def test_json_file_with_both_kinds(self, tmp_path):
+        """Objeto JSON com protocolos e intervenções"""
+        path = tmp_path / 'catalogo.json'
+        path.write_text(json.dumps({'protocols': external_protocols(2), 'interventions': []}), encoding='utf-8')
+
+        sources = read_seed_file(path)
+
+        assert set(sources) == {'protocols', 'interventions'}
+        assert len(sources['protocols']) == 2
+
+    def test_csv_cells_are_parsed(self, app_context, tmp_path):
+        """Listas separadas por ';' e objetos em JSON nas células"""
+        path = tmp_path / 'protocolos.csv'
+        path.write_text(
+            'key,title,description,pathology,icd10_codes,body_region,specialization_area,evidence_level,'
+            'grade_recommendation,references,indications,phases,assessment_tools,outcome_measures,'
+            'frequency_recommendations,inclusion_criteria\n'
+            'csv-1,Entorse de tornozelo,Protocolo,Entorse,S93.4;S93.6,tornozelo,ortopedia,NIVEL_1A,A,'
+            '"[{""title"": ""Diretriz""}]",Dor;Edema,"[{""name"": ""Fase Aguda""}]","[{""name"": ""EVA""}]",'
+            '"[{""measure"": ""dor""}]","{""sessions_per_week"": ""2""}",Adulto\n',
+            encoding='utf-8'
+        )
+
+        records = read_seed_file(path)['protocols']
+        result = seed('protocols', records, 'admin-1')
+
+        protocol = ClinicalProtocol.query.one()
+        assert result['inserted'] == 1
+        assert protocol.seed_key == 'csv-1'
+        assert protocol.icd10_codes == ['S93.4', 'S93.6']
+        assert protocol.frequency_recommendations == {'sessions_per_week': '2'}
+        assert protocol.exclusion_criteria == []
+
+    def test_unsupported_format(self, tmp_path):
+        path = tmp_path / 'protocolos.xlsx'
+        path.write_bytes(b'')
+
+        with pytest.raises(SeedError):
+            read_seed_file(path)
@@ -0,0 +1,163 @@
+"""
+Testes para a exportação de dados clínicos para pesquisa
+"""
+
+import csv
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.exercise import ExerciseExecution
+from app.models.patient import Evolution, MedicalRecord, Patient
+from app.services.research_export import (
+    CsvGzipChunkWriter, EXPORT_TABLES, Pseudonymizer, ResearchExportError, export_table,
+    run_research_export, writer_class
+)
+from tests.exercise_factories import database_app
+
+NOW = datetime(2024, 5, 10, 12, 0)
+
+
+def read_csv(path):
+    with gzip.open(path, 'rt', newline='', encoding='utf-8') as handle:
+        return list(csv.DictReader(handle))
+
+
+@pytest.fixture
+def app_context(tmp_path):
+    """App com SQLite em memória e diretório de exportação temporário"""
+    with database_app(RESEARCH_EXPORT_DIR=str(tmp_path), RESEARCH_EXPORT_FORMAT='csv',
+                      RESEARCH_EXPORT_PSEUDONYM_KEY='chave-de-teste') as flask_app:
+        yield flask_app
+
+
+@pytest.fixture
+def clinic(app_context):
+    for patient_id, consent in (('ana', True), ('bia', True), ('caio', False)):
+        db.session.add(Patient(id=patient_id, nome_completo=patient_id.title(),
+                               cpf_encrypted=f'cpf-cifrado-{patient_id}',
+                               telefone_encrypted=f'telefone-cifrado-{patient_id}',
+                               data_nascimento=date(1980, 3, 1), consentimento_dados=consent, created_at=NOW))
+        db.session.add(MedicalRecord(id=f'mr-{patient_id}', patient_id=patient_id, created_by='fisio-1',
+                                     data_avaliacao=NOW.date(), created_at=NOW))
+        for day in range(5):
+            db.session.add(Evolution(medical_record_id=f'mr-{patient_id}', created_by='fisio-1',
+                                     data_atendimento=NOW.date() + timedelta(days=day), escala_dor=8 - day,
+                                     created_at=NOW + timedelta(days=day)))
+    db.session.add(ExerciseExecution(patient_exercise_id='pe-1', exercise_id='ex-1', patient_id='ana',
+                                     started_at=NOW, completed_at=NOW + timedelta(minutes=20), pain_level=3))
+    db.session.commit()
+
+
+class TestPseudonymizer:
+    """Pseudônimos estáveis e dependentes da chave"""
+
+    def test_deterministic_per_key(self):
+        first, second = Pseudonymizer('a'), Pseudonymizer('b')
+
+        assert first('ana') == Pseudonymizer('a')('ana')
+        assert first('ana') != first('bia')
+        assert first('ana') != second('ana')
+        assert first(None) is None
+
+    def test_requires_key(self):
+        with pytest.raises(ResearchExportError):
+            Pseudonymizer('')
+
+
+class TestExportTable:
+    """Exportação por tabela"""
+
+    def test_exports_only_consented_patients_without_identifiers(self, clinic, tmp_path):
+        pseudonymize = Pseudonymizer('chave')
+
+        result = export_table(EXPORT_TABLES['patients'], str(tmp_path), pseudonymize=pseudonymize)
+
+        rows = read_csv(result['file'])
+        assert sorted(row['patient_id'] for row in rows) == sorted([pseudonymize('ana'), pseudonymize('bia')])
+        assert rows[0]['birth_year'] == '1980'
+        content = gzip.open(result['file'], 'rt').read()
+        for identifier in ('cifrado', 'Ana', 'ana'):
+            assert identifier not in content
+
+    def test_links_tables_through_pseudonyms(self, clinic, tmp_path):
+        pseudonymize = Pseudonymizer('chave')
+
+        result = export_table(EXPORT_TABLES['evolutions'], str(tmp_path), pseudonymize=pseudonymize)
+
+        rows = read_csv(result['file'])
+        assert result['rows'] == 10
+        assert {row['patient_id'] for row in rows} == {pseudonymize('ana'), pseudonymize('bia')}
+        assert {row['created_by'] for row in rows} == {pseudonymize('fisio-1')}
+
+        records = export_table(EXPORT_TABLES['medical_records'], str(tmp_path), pseudonymize=pseudonymize)
+        record_ids = {row['id'] for row in read_csv(records['file'])}
+        assert record_ids == {pseudonymize('mr-ana'), pseudonymize('mr-bia')}
+        assert {row['medical_record_id'] for row in rows} == record_ids
+
+    def test_row_and_foreign_ids_are_pseudonymized(self, clinic, tmp_path):
+        """Ids internos também ligariam a exportação ao banco de produção"""
+        pseudonymize = Pseudonymizer('chave')
+        execution_id = ExerciseExecution.query.one().id
+
+        result = export_table(EXPORT_TABLES['exercise_executions'], str(tmp_path), pseudonymize=pseudonymize)
+
+        row, = read_csv(result['file'])
+        assert (row['id'], row['patient_exercise_id']) == (pseudonymize(execution_id), pseudonymize('pe-1'))
+        assert row['exercise_id'] == 'ex-1'
+        for table in ('medical_records', 'evolutions', 'appointments', 'exercise_executions'):
+            assert 'id' in EXPORT_TABLES[table].pseudonymized
+
+    def test_writes_in_chunks(self, clinic, tmp_path):
+        result = export_table(EXPORT_TABLES['evolutions'], str(tmp_path), chunk_size=3,
+                              pseudonymize=Pseudonymizer('chave'), consented_only=False)
+
+        assert (result['rows'], result['chunks']) == (15, 5)
+        assert len(read_csv(result['file'])) == 15
+        assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+    def test_no_file_without_new_rows(self, clinic, tmp_path):
+        result = export_table(EXPORT_TABLES['evolutions'], str(tmp_path), since=NOW + timedelta(days=30),
+                              pseudonymize=Pseudonymizer('chave'))
+
+        assert (result['rows'], result['file']) == (0, None)
+        assert os.listdir(tmp_path) == []
+
+
+class TestRunResearchExport:
+    """Exportação incremental com marca d'água"""
+
+    def test_incremental_exports_only_changed_rows(self, clinic, tmp_path):
+        first = {result['table']: result for result in run_research_export(tables=['evolutions'])}
+        assert first['evolutions']['rows'] == 10
+        watermarks = json.load(open(tmp_path / 'watermarks.json'))
+        assert watermarks == {'evolutions': (NOW + timedelta(days=4)).isoformat()}
+
+        db.session.add(Evolution(medical_record_id='mr-ana', created_by='fisio-1', data_atendimento=NOW.date(),
+                                 escala_dor=2, created_at=NOW + timedelta(days=6)))
+        db.session.commit()
+
+        second = run_research_export(tables=['evolutions'])
+        assert second[0]['rows'] == 1
+        assert read_csv(second[0]['file'])[0]['escala_dor'] == '2'
+
+        assert run_research_export(tables=['evolutions'], full=True)[0]['rows'] == 11
+
+    def test_exports_every_table(self, clinic):
+        results = {result['table']: result['rows'] for result in run_research_export()}
+
+        assert results == {'patients': 2, 'medical_records': 2, 'evolutions': 10,
+                           'appointments': 0, 'exercise_executions': 1}
+
+    def test_rejects_unknown_table_and_format(self, app_context):
+        with pytest.raises(ResearchExportError):
+            run_research_export(tables=['users'])
+        with pytest.raises(ResearchExportError):
+            writer_class('xlsx')
+
+    def test_csv_format(self):
+        assert writer_class('csv') is CsvGzipChunkWriter
@@ -0,0 +1,135 @@
+"""
+Testes para o burndown diário mantido incrementalmente
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.project_management import Project, Sprint, SprintBurndown, Task, TaskStatus, TaskType, TimeLog
+from app.services.sprint_burndown import BurndownDelta, apply_burndown_deltas, sprint_burndown
+from app.services.task_bulk import batch_update_tasks, import_tasks
+from tests.exercise_factories import app_context, make_user  # noqa: F401
+
+
+TODAY = datetime.utcnow().date()
+
+
+@pytest.fixture
+def sprint(app_context):
+    project = Project(id='project-1', name='Board', key='FISIO', category='clinico', owner_id='user-1')
+    sprint = Sprint(id='sprint-1', project_id='project-1', name='S1',
+                    start_date=TODAY - timedelta(days=3), end_date=TODAY + timedelta(days=10))
+    db.session.add_all([project, sprint])
+    make_user(email='dono@fisioflow.com')
+    db.session.commit()
+    return sprint
+
+
+def add_task(number, points, status=TaskStatus.TODO, sprint_id='sprint-1'):
+    task = Task(project_id='project-1', key=f'FISIO-{number}', title=f'Tarefa {number}', task_type=TaskType.FEATURE,
+                reporter_id='user-1', status=status, story_points=points, sprint_id=sprint_id)
+    db.session.add(task)
+    db.session.commit()
+    return task
+
+
+def snapshot(day=TODAY):
+    return db.session.get(SprintBurndown, ('sprint-1', day))
+
+
+class TestIncrementalSnapshots:
+    """Linha do dia atualizada a cada flush"""
+
+    def test_task_changes_update_today(self, sprint):
+        first = add_task(1, 5)
+        second = add_task(2, 3)
+
+        first.status = TaskStatus.DONE
+        db.session.commit()
+        second.story_points = 8
+        db.session.commit()
+
+        row = snapshot()
+        assert (row.total_tasks, row.completed_tasks, row.total_points, row.completed_points) == (2, 1, 13, 5)
+
+        second.sprint_id = None
+        first.is_archived = True
+        db.session.commit()
+        db.session.refresh(row)
+        assert (row.total_tasks, row.completed_tasks, row.total_points, row.completed_points) == (0, 0, 0, 0)
+
+    def test_time_logs_accumulate_hours(self, sprint):
+        task = add_task(1, 2)
+        log = TimeLog(task_id=task.id, user_id='user-1', hours=1.5, date_worked=TODAY)
+        db.session.add(log)
+        db.session.commit()
+        log.hours = 2.5
+        db.session.add(TimeLog(task_id=task.id, user_id='user-1', hours=1.0, date_worked=TODAY))
+        db.session.commit()
+
+        assert snapshot().hours_logged == pytest.approx(3.5)
+
+        db.session.delete(log)
+        db.session.commit()
+        db.session.refresh(snapshot())
+        assert snapshot().hours_logged == pytest.approx(1.0)
+
+    def test_first_change_of_the_day_copies_the_last_row(self, sprint):
+        db.session.add(SprintBurndown(sprint_id='sprint-1', day=TODAY - timedelta(days=2), total_tasks=4,
+                                      completed_tasks=1, total_points=20, completed_points=5, hours_logged=6.0))
+        db.session.commit()
+
+        apply_burndown_deltas({'sprint-1': BurndownDelta(completed_tasks=1, completed_points=3)})
+        db.session.commit()
+
+        row = snapshot()
+        assert (row.total_tasks, row.completed_tasks, row.total_points, row.completed_points) == (4, 2, 20, 8)
+        assert row.hours_logged == 6.0
+
+    def test_bulk_paths_record_their_changes(self, sprint):
+        keys = import_tasks(sprint.project, [
+            {'title': 'A', 'task_type': 'FEATURE', 'story_points': 3, 'sprint_id': 'sprint-1'},
+            {'title': 'B', 'task_type': 'FEATURE', 'story_points': 5, 'sprint_id': 'sprint-1'},
+            {'title': 'C', 'task_type': 'FEATURE', 'story_points': 8},
+        ], 'user-1')['keys']
+        assert (snapshot().total_tasks, snapshot().total_points) == (2, 8)
+
+        ids = [task.id for task in Task.query.filter(Task.key.in_(keys))]
+        batch_update_tasks(sprint.project, ids, {'status': 'concluido', 'sprint_id': 'sprint-1'})
+
+        db.session.refresh(snapshot())
+        row = snapshot()
+        assert (row.total_tasks, row.completed_tasks, row.total_points, row.completed_points) == (3, 3, 16, 16)
+
+
+class TestBurndownSeries:
+    """Série diária para o gráfico"""
+
+    def test_days_without_changes_repeat_the_last_value(self, sprint):
+        start = sprint.start_date
+        db.session.add_all([
+            SprintBurndown(sprint_id='sprint-1', day=start - timedelta(days=1), total_tasks=3, total_points=13),
+            SprintBurndown(sprint_id='sprint-1', day=start + timedelta(days=2), total_tasks=3, completed_tasks=1,
+                           total_points=13, completed_points=5),
+        ])
+        db.session.commit()
+
+        result = sprint_burndown(sprint)
+
+        assert [day['remaining_points'] for day in result['days']] == [13, 13, 8, 8]
+        assert result['days'][0]['day'] == start.isoformat()
+        assert result['ideal'][0]['remaining_points'] == 13
+        assert result['ideal'][-1] == {'day': sprint.end_date.isoformat(), 'remaining_points': 0}
+
+    def test_sprint_without_rows_uses_current_totals(self, app_context):
+        db.session.add(Project(id='project-1', name='Board', key='FISIO', category='clinico', owner_id='user-1'))
+        sprint = Sprint(id='sprint-2', project_id='project-1', name='S2',
+                        start_date=date(2025, 3, 1), end_date=date(2025, 3, 14))
+        db.session.add(sprint)
+        db.session.commit()
+
+        result = sprint_burndown(sprint, today=date(2025, 3, 20))
+
+        assert result['days'] == [dict(result['days'][0], day='2025-03-14', remaining_points=0)]
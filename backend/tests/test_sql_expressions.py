@@ -0,0 +1,79 @@
+"""
+Testes para as expressões SQL compartilhadas pelos modelos (app.models.types)
+"""
+
+import pytest
+from flask import Flask
+from sqlalchemy import Column, Integer, MetaData, String, Table, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models.types import JSONBList, json_array_contains
+
+metadata = MetaData()
+items = Table(
+    'expression_items', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(20)),
+    Column('regions', JSONBList)
+)
+
+
+def compile_sql(statement, dialect):
+    return str(statement.compile(dialect=dialect))
+
+
+@pytest.fixture
+def app_context():
+    """App com SQLite em memória"""
+    flask_app = Flask(__name__)
+    flask_app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        metadata.create_all(db.engine)
+        db.session.execute(items.insert(), [
+            {'id': 1, 'name': 'ombro', 'regions': ['shoulder', 'neck']},
+            {'id': 2, 'name': 'joelho', 'regions': ['knee']},
+            {'id': 3, 'name': 'vazio', 'regions': []},
+        ])
+        db.session.commit()
+        yield flask_app
+        db.session.remove()
+
+
+def names_with(region):
+    statement = select(items.c.name).where(json_array_contains(items.c.regions, region)).order_by(items.c.id)
+    return db.session.execute(statement).scalars().all()
+
+
+class TestJSONArrayContains:
+    """Filtro "array JSON contém valor" executado no banco"""
+
+    def test_postgresql_uses_containment_operator(self):
+        sql = compile_sql(select(items.c.id).where(json_array_contains(items.c.regions, 'knee')),
+                          postgresql.dialect())
+
+        assert '@> jsonb_build_array(CAST(' in sql
+        assert 'json_each' not in sql
+
+    def test_sqlite_uses_json_each(self):
+        sql = compile_sql(select(items.c.id).where(json_array_contains(items.c.regions, 'knee')),
+                          sqlite.dialect())
+
+        assert 'EXISTS (SELECT 1 FROM json_each(expression_items.regions)' in sql
+
+    def test_filters_in_sql(self, app_context):
+        assert names_with('knee') == ['joelho']
+        assert names_with('neck') == ['ombro']
+        assert names_with('hip') == []
+
+    def test_value_is_a_bound_parameter(self, app_context):
+        """Valores diferentes não reaproveitam o parâmetro do statement em cache"""
+        assert names_with('shoulder') == ['ombro']
+        assert names_with('knee') == ['joelho']
+
+        first = json_array_contains(items.c.regions, 'shoulder')
+        second = json_array_contains(items.c.regions, 'knee')
+        assert first._generate_cache_key().bindparams[0].value == 'shoulder'
+        assert second._generate_cache_key().bindparams[0].value == 'knee'
+        assert "'knee'" not in compile_sql(select(items.c.id).where(second), sqlite.dialect())
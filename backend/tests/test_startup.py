@@ -0,0 +1,102 @@
+"""
+Testes para a inicialização preguiçosa (blueprints e SDKs de IA)
+"""
+
+import sys
+
+import pytest
+from flask import Flask
+
+from app import BLUEPRINTS, enabled_blueprints
+from app.commands.startup_profile import group_by_package, parse_importtime, total_import_us
+from app.services import ai_orchestrator
+from app.services.ai_orchestrator import AIOrchestrator, AIService, get_ai_service
+
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        300 |     openai._types
+import time:      1500 |       1800 |   openai
+import time:       200 |       2120 | app.services.ai_orchestrator
+import time:        80 |         80 | json
+"""
+
+
+class TestImportTime:
+    """Leitura da saída de -X importtime"""
+
+    def test_parse_lines(self):
+        costs = parse_importtime(IMPORTTIME_OUTPUT.splitlines())
+
+        assert [cost.module for cost in costs] == [
+            '_io', 'openai._types', 'openai', 'app.services.ai_orchestrator', 'json'
+        ]
+        assert [cost.depth for cost in costs] == [1, 2, 1, 0, 0]
+        assert (costs[2].self_us, costs[2].cumulative_us) == (1500, 1800)
+
+    def test_totals_and_packages(self):
+        """Total = imports de primeiro nível; pacotes somam o tempo próprio"""
+        costs = parse_importtime(IMPORTTIME_OUTPUT.splitlines())
+
+        assert total_import_us(costs) == 2200
+        assert group_by_package(costs) == {'openai': 1800, 'app': 200, '_io': 120, 'json': 80}
+
+
+class TestEnabledBlueprints:
+    """Seleção dos blueprints por ENABLED_BLUEPRINTS"""
+
+    def test_empty_means_all(self):
+        flask_app = Flask(__name__)
+        flask_app.config['ENABLED_BLUEPRINTS'] = []
+
+        assert enabled_blueprints(flask_app) == list(BLUEPRINTS)
+
+    def test_subset_keeps_registry_order(self):
+        flask_app = Flask(__name__)
+        flask_app.config['ENABLED_BLUEPRINTS'] = ['sync', 'auth']
+
+        assert enabled_blueprints(flask_app) == ['auth', 'sync']
+
+    def test_unknown_name_fails_fast(self):
+        flask_app = Flask(__name__)
+        flask_app.config['ENABLED_BLUEPRINTS'] = ['auth', 'ia']
+
+        with pytest.raises(ValueError, match='ia'):
+            enabled_blueprints(flask_app)
+
+
+class TestLazyAIService:
+    """Orquestrador e SDKs só no primeiro uso"""
+
+    @pytest.fixture
+    def without_sdks(self, monkeypatch):
+        """Qualquer import dos SDKs falha (None em sys.modules)"""
+        for name in ('ANTHROPIC_API_KEY', 'OPENAI_API_KEY', 'GOOGLE_API_KEY'):
+            monkeypatch.delenv(name, raising=False)
+        for module in ('anthropic', 'openai', 'google.generativeai', 'httpx'):
+            monkeypatch.setitem(sys.modules, module, None)
+
+    def test_service_builds_orchestrator_on_first_access(self, monkeypatch):
+        created = []
+        monkeypatch.setattr(ai_orchestrator, 'AIOrchestrator', lambda: created.append(1) or 'orquestrador')
+
+        service = AIService()
+        assert created == []
+
+        assert service.orchestrator == 'orquestrador'
+        assert service.orchestrator == 'orquestrador'
+        assert created == [1]
+
+    def test_orchestrator_without_keys_imports_no_sdk(self, without_sdks):
+        orchestrator = AIOrchestrator()
+
+        assert orchestrator.providers == {}
+
+    def test_get_ai_service_is_a_singleton(self, monkeypatch):
+        monkeypatch.setattr(ai_orchestrator, '_ai_service', None)
+
+        service = get_ai_service()
+
+        assert get_ai_service() is service
+        assert ai_orchestrator.ai_service is service
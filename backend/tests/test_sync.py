@@ -0,0 +1,201 @@
+"""
+Testes para o protocolo de sincronização offline-first (pull/push)
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app import db
+from app.models.exercise import ExerciseExecution, PatientExercise
+from app.models.sync import SyncChange
+from app.services.execution_ingestion import ingest_executions
+from app.services.sync import (
+    InvalidSyncToken, parse_client_datetime, parse_token, pull_changes, push_prescription_notes
+)
+from tests.exercise_factories import database_app, make_execution, make_exercise, make_prescription
+
+PATIENT = SimpleNamespace(id='patient-1', role='PACIENTE')
+THERAPIST = SimpleNamespace(id='therapist-1', role='FISIOTERAPEUTA')
+OTHER_THERAPIST = SimpleNamespace(id='therapist-2', role='FISIOTERAPEUTA')
+
+
+@pytest.fixture
+def app_context():
+    """Sem janela de segurança: alterações recém-gravadas já saem no pull"""
+    with database_app(SYNC_SAFETY_WINDOW_SECONDS=0) as flask_app:
+        yield flask_app
+
+
+@pytest.fixture
+def prescription(app_context):
+    make_exercise()
+    prescription = make_prescription('prescription-1')
+    make_prescription('prescription-other', patient_id='patient-2')
+    db.session.commit()
+    return prescription
+
+
+def upserted_ids(result, entity_type):
+    return sorted(item['id'] for item in result['changes'][entity_type]['upserted'])
+
+
+class TestTokens:
+    """Token opaco e datas enviadas pelo app"""
+
+    def test_parse_token(self):
+        assert parse_token(None) is None
+        assert parse_token('0') is None
+        assert parse_token('42') == 42
+        for invalid in ('abc', '-1'):
+            with pytest.raises(InvalidSyncToken):
+                parse_token(invalid)
+
+    def test_client_datetimes_become_naive_utc(self):
+        expected = datetime(2024, 3, 1, 10, 0)
+
+        assert parse_client_datetime('2024-03-01T10:00:00') == expected
+        assert parse_client_datetime('2024-03-01T10:00:00Z') == expected
+        assert parse_client_datetime('2024-03-01T07:00:00-03:00') == expected
+        assert parse_client_datetime(None) is None
+
+
+class TestPull:
+    """Snapshot, deltas deduplicados, paginação e tombstones"""
+
+    def test_snapshot_without_token(self, prescription):
+        make_execution(prescription, started_at=datetime.utcnow())
+        make_execution(prescription, started_at=datetime.utcnow() - timedelta(days=200))
+        db.session.commit()
+
+        result = pull_changes('patient-1', None)
+
+        assert result['snapshot'] is True
+        assert upserted_ids(result, 'patient_exercises') == ['prescription-1']
+        assert len(result['changes']['exercise_executions']['upserted']) == 1
+        assert result['token'] == str(db.session.query(db.func.max(SyncChange.seq)).scalar())
+
+    def test_deltas_since_token_are_deduplicated(self, prescription):
+        token = int(pull_changes('patient-1', None)['token'])
+
+        prescription.therapist_notes = 'Aumentar carga'
+        db.session.commit()
+        prescription.therapist_notes = 'Aumentar carga na próxima semana'
+        db.session.commit()
+        other = db.session.get(PatientExercise, 'prescription-other')
+        other.therapist_notes = 'Outro paciente'
+        db.session.commit()
+
+        result = pull_changes('patient-1', token)
+
+        assert result['snapshot'] is False
+        assert upserted_ids(result, 'patient_exercises') == ['prescription-1']
+        assert result['changes']['patient_exercises']['upserted'][0]['therapist_notes'] == \
+            'Aumentar carga na próxima semana'
+        assert pull_changes('patient-1', int(result['token']))['changes']['patient_exercises']['upserted'] == []
+
+    def test_paging_with_has_more(self, prescription):
+        token = int(pull_changes('patient-1', None)['token'])
+        executions = [make_execution(prescription) for _ in range(3)]
+        db.session.commit()
+
+        first = pull_changes('patient-1', token, limit=2)
+        second = pull_changes('patient-1', int(first['token']), limit=2)
+
+        assert first['has_more'] is True
+        assert second['has_more'] is False
+        pulled = upserted_ids(first, 'exercise_executions') + upserted_ids(second, 'exercise_executions')
+        assert sorted(pulled) == sorted(execution.id for execution in executions)
+
+    def test_deleted_rows_come_back_as_tombstones(self, prescription):
+        execution = make_execution(prescription)
+        db.session.commit()
+        token = int(pull_changes('patient-1', None)['token'])
+
+        db.session.delete(execution)
+        db.session.commit()
+        result = pull_changes('patient-1', token)
+
+        assert result['changes']['exercise_executions'] == {'upserted': [], 'deleted': [execution.id]}
+
+    def test_safety_window_holds_recent_changes(self, app_context, prescription):
+        token = int(pull_changes('patient-1', None)['token'])
+        make_execution(prescription)
+        db.session.commit()
+
+        app_context.config['SYNC_SAFETY_WINDOW_SECONDS'] = 60
+        held = pull_changes('patient-1', token)
+
+        assert held['token'] == str(token)
+        assert held['changes']['exercise_executions']['upserted'] == []
+
+
+class TestPushNotes:
+    """Notas do paciente com controle otimista por base_updated_at"""
+
+    def note(self, prescription, notes='Senti dor leve', base=None):
+        return {
+            'id': prescription.id,
+            'patient_notes': notes,
+            'base_updated_at': base or prescription.updated_at.isoformat()
+        }
+
+    def test_applied_when_base_is_current(self, prescription):
+        result = push_prescription_notes(PATIENT, [self.note(prescription)])
+
+        assert [item['id'] for item in result['applied']] == ['prescription-1']
+        assert db.session.get(PatientExercise, 'prescription-1').patient_notes == 'Senti dor leve'
+
+    def test_server_wins_on_conflict(self, prescription):
+        base = prescription.updated_at.isoformat()
+        prescription.therapist_notes = 'Editado no servidor'
+        prescription.updated_at = prescription.updated_at + timedelta(minutes=5)
+        db.session.commit()
+
+        result = push_prescription_notes(PATIENT, [self.note(prescription, base=base)])
+
+        assert result['applied'] == []
+        assert result['conflicts'][0]['resolution'] == 'server_wins'
+        assert result['conflicts'][0]['server']['therapist_notes'] == 'Editado no servidor'
+        assert db.session.get(PatientExercise, 'prescription-1').patient_notes is None
+
+    def test_timezone_aware_base(self, prescription):
+        base = prescription.updated_at.isoformat()
+
+        result = push_prescription_notes(PATIENT, [
+            self.note(prescription, base=base + '+00:00'),
+            self.note(prescription, notes='De novo', base=base + 'Z'),
+            self.note(prescription, base='ontem'),
+        ])
+
+        assert [item['index'] for item in result['applied']] == [0]
+        assert [item['index'] for item in result['conflicts']] == [1]
+        assert result['errors'] == [{'index': 2, 'error': 'base_updated_at inválido'}]
+
+    def test_ownership(self, prescription):
+        other = db.session.get(PatientExercise, 'prescription-other')
+
+        patient = push_prescription_notes(PATIENT, [self.note(other)])
+        stranger = push_prescription_notes(OTHER_THERAPIST, [self.note(prescription)])
+        prescriber = push_prescription_notes(THERAPIST, [self.note(prescription)])
+
+        assert patient['errors'] == [{'index': 0, 'error': 'Acesso não autorizado'}]
+        assert stranger['errors'] == [{'index': 0, 'error': 'Acesso não autorizado'}]
+        assert len(prescriber['applied']) == 1
+
+    def test_note_pushed_with_its_executions(self, prescription):
+        """Os contadores das execuções do mesmo push não viram conflito da nota"""
+        note = self.note(prescription)
+
+        ingestion = ingest_executions(PATIENT, [
+            {'patient_exercise_id': prescription.id, 'client_id': 'offline-1'}
+        ])
+        result = push_prescription_notes(PATIENT, [note])
+
+        assert len(ingestion.created) == 1
+        assert [item['id'] for item in result['applied']] == ['prescription-1']
+        db.session.expire_all()
+        stored = db.session.get(PatientExercise, 'prescription-1')
+        assert (stored.completed_count, stored.patient_notes) == (1, 'Senti dor leve')
+        assert ExerciseExecution.query.filter_by(client_id='offline-1').count() == 1
@@ -0,0 +1,157 @@
+"""
+Testes para importação, exportação e atualização em lote de tarefas
+"""
+
+import csv
+import io
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.project_management import Project, ProjectTaskCounter, Sprint, Task, TaskStatus, TaskType
+from app.services.task_bulk import TaskBulkError, batch_update_tasks, import_tasks, iter_tasks_csv, read_task_records
+from tests.exercise_factories import app_context, make_user  # noqa: F401
+
+
+@pytest.fixture
+def project(app_context):
+    project = Project(id='project-1', name='Board', key='FISIO', category='clinico', owner_id='user-1')
+    db.session.add(project)
+    make_user('user-2', email='ana@fisioflow.com')
+    db.session.commit()
+    return project
+
+
+@pytest.fixture
+def statements(app_context):
+    """SQL emitido durante o teste"""
+    executed = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_execute)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', before_execute)
+
+
+def records(count, **extra):
+    return [dict({'title': f'Tarefa {index}', 'task_type': 'FEATURE'}, **extra) for index in range(count)]
+
+
+class TestImport:
+    """Importação em lote numa transação"""
+
+    def test_import_uses_a_fixed_number_of_statements(self, project, statements):
+        """500 tarefas: referências, chaves, posições e INSERT em lote"""
+        result = import_tasks(project, records(500, assignee_email='ANA@fisioflow.com'), 'user-1')
+
+        assert result['imported'] == 500
+        assert result['keys'][0] == 'FISIO-1'
+        assert result['keys'][-1] == 'FISIO-500'
+        assert len(statements) < 15
+        positions = [t.board_position for t in Task.query.order_by(Task.key)]
+        assert len(set(positions)) == 500
+        assert Task.query.filter_by(assignee_id='user-2', column_id='backlog').count() == 500
+
+    def test_csv_records(self, project):
+        content = (
+            '\ufefftitle,task_type,status,priority,labels,due_date,story_points\n'
+            'Revisar prontuário,bug,em_andamento,ALTA,clínico;urgente,2025-03-10,3\n'
+            'Atualizar protocolo,melhoria,,,,,\n'
+        )
+
+        result = import_tasks(project, read_task_records(content, 'csv'), 'user-1')
+
+        first = Task.query.filter_by(key=result['keys'][0]).one()
+        second = Task.query.filter_by(key=result['keys'][1]).one()
+        assert (first.task_type, first.status, first.column_id) == (TaskType.BUG, TaskStatus.IN_PROGRESS, 'in_progress')
+        assert first.labels == ['clínico', 'urgente']
+        assert (first.story_points, first.due_date.isoformat()) == (3, '2025-03-10')
+        assert (second.status, second.column_id) == (TaskStatus.BACKLOG, 'backlog')
+
+    def test_invalid_records_abort_the_import(self, project):
+        """Nada é gravado e o contador de chaves não avança"""
+        bad = records(3)
+        bad[0]['task_type'] = 'epico'
+        bad[1]['assignee_email'] = 'ninguem@fisioflow.com'
+        bad[2]['sprint_id'] = 'sprint-de-outro-projeto'
+
+        with pytest.raises(TaskBulkError) as error:
+            import_tasks(project, bad, 'user-1')
+
+        assert len(error.value.errors) == 3
+        assert 'task_type' in error.value.errors[0]
+        assert Task.query.count() == 0
+        assert db.session.get(ProjectTaskCounter, 'project-1') is None
+
+    def test_dry_run_only_validates(self, project):
+        result = import_tasks(project, records(5), 'user-1', dry_run=True)
+
+        assert (result['imported'], result['valid']) == (0, 5)
+        assert Task.query.count() == 0
+
+    def test_json_payload_shapes(self):
+        assert len(read_task_records('{"tasks": [{"title": "A"}]}', 'json')) == 1
+        with pytest.raises(TaskBulkError):
+            read_task_records('{"tarefas": []}', 'json')
+
+
+class TestBatchUpdate:
+    """Status, responsável e sprint para N tarefas"""
+
+    def test_status_assignee_and_sprint(self, project):
+        db.session.add(Sprint(id='sprint-1', project_id='project-1', name='S1',
+                              start_date=date(2025, 3, 1), end_date=date(2025, 3, 14)))
+        db.session.commit()
+        keys = import_tasks(project, records(4), 'user-1')['keys']
+        ids = [t.id for t in Task.query.filter(Task.key.in_(keys[:3]))]
+
+        result = batch_update_tasks(project, ids, {'status': 'em_andamento', 'assignee_id': 'user-2', 'sprint_id': 'sprint-1'})
+
+        assert result == {'updated': 3, 'moved': 3}
+        moved = Task.query.filter(Task.id.in_(ids)).all()
+        assert {(t.status, t.column_id, t.assignee_id, t.sprint_id) for t in moved} == {
+            (TaskStatus.IN_PROGRESS, 'in_progress', 'user-2', 'sprint-1')
+        }
+        assert all(t.start_date is not None for t in moved)
+        assert len({t.board_position for t in moved}) == 3
+        assert Task.query.filter_by(key=keys[3]).one().status == TaskStatus.BACKLOG
+
+    def test_unknown_tasks_abort_the_batch(self, project):
+        keys = import_tasks(project, records(2), 'user-1')['keys']
+        task = Task.query.filter_by(key=keys[0]).one()
+
+        with pytest.raises(TaskBulkError) as error:
+            batch_update_tasks(project, [task.id, 'nao-existe'], {'assignee_id': 'user-2'})
+
+        assert error.value.errors == ['nao-existe']
+        assert Task.query.filter_by(assignee_id='user-2').count() == 0
+
+    def test_pending_dependencies_block_in_progress(self, project):
+        keys = import_tasks(project, records(2), 'user-1')['keys']
+        first, second = (Task.query.filter_by(key=key).one() for key in keys)
+        second.depends_on = [first.id]
+        db.session.commit()
+
+        with pytest.raises(TaskBulkError) as error:
+            batch_update_tasks(project, [second.id], {'status': 'em_andamento'})
+
+        assert error.value.errors == [second.key]
+
+
+class TestExport:
+    """CSV em blocos"""
+
+    def test_streams_in_batches(self, project):
+        import_tasks(project, records(25, assignee_email='ana@fisioflow.com', labels='a;b'), 'user-1')
+
+        chunks = list(iter_tasks_csv('project-1', batch_size=10))
+        rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+
+        assert len(chunks) == 4  # cabeçalho + 3 blocos
+        assert len(rows) == 25
+        assert rows[0]['key'] == 'FISIO-1'
+        assert (rows[0]['assignee_email'], rows[0]['labels'], rows[0]['status']) == ('ana@fisioflow.com', 'a;b', 'backlog')
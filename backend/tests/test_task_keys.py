@@ -0,0 +1,66 @@
+"""
+Testes para a numeração atômica das chaves de tarefa
+"""
+
+import pytest
+
+from app import db
+from app.models.project_management import Project, ProjectTaskCounter, Task, TaskType
+from app.services.task_keys import allocate_task_keys, allocate_task_numbers, next_task_key, parse_task_number
+from tests.exercise_factories import app_context  # noqa: F401
+
+
+@pytest.fixture
+def project(app_context):
+    project = Project(id='project-1', name='Board', key='FISIO', category='clinico', owner_id='user-1')
+    db.session.add(project)
+    db.session.commit()
+    return project
+
+
+def add_task(key):
+    db.session.add(Task(project_id='project-1', key=key, title=key, task_type=TaskType.FEATURE, reporter_id='user-1'))
+    db.session.commit()
+
+
+class TestTaskKeys:
+    """Contador por projeto com UPDATE ... RETURNING"""
+
+    def test_parse_task_number(self):
+        assert parse_task_number('FISIO-12') == 12
+        assert parse_task_number('FISIO-DEV-3') == 3
+        assert parse_task_number('FISIO') is None
+        assert parse_task_number('FISIO-x') is None
+
+    def test_sequential_keys(self, project):
+        assert [next_task_key(project) for _ in range(3)] == ['FISIO-1', 'FISIO-2', 'FISIO-3']
+        assert db.session.get(ProjectTaskCounter, 'project-1').last_number == 3
+
+    def test_counter_starts_after_existing_keys(self, project):
+        """Projetos antigos continuam a numeração das chaves já usadas"""
+        add_task('FISIO-41')
+        add_task('FISIO-7')
+
+        assert next_task_key(project) == 'FISIO-42'
+
+    def test_bulk_range_in_one_statement(self, project):
+        next_task_key(project)
+
+        keys = allocate_task_keys(project, 1000)
+
+        assert keys[0] == 'FISIO-2'
+        assert keys[-1] == 'FISIO-1001'
+        assert next_task_key(project) == 'FISIO-1002'
+
+    def test_rollback_releases_numbers(self, project):
+        next_task_key(project)
+        db.session.commit()
+
+        allocate_task_numbers('project-1', 10)
+        db.session.rollback()
+
+        assert allocate_task_numbers('project-1', 1) == range(2, 3)
+
+    def test_count_must_be_positive(self, project):
+        with pytest.raises(ValueError):
+            allocate_task_numbers('project-1', 0)
@@ -171,6 +171,79 @@ export const patientService = {
   },
 };
 
+// Offline-first sync (/sync/pull + /sync/push)
+const SYNC_TOKEN_KEY = 'sync_token';
+const PENDING_EXECUTIONS_KEY = 'pending_exercises';
+const SYNC_PUSH_BATCH_SIZE = 200;
+
+const generateClientId = () =>
+  `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+
+type SyncPage = {
+  token: string;
+  has_more: boolean;
+  snapshot: boolean;
+  changes: Record<string, { upserted: any[]; deleted: string[] }>;
+};
+
+const readPendingExecutions = async (): Promise<any[]> => {
+  const pending = await SecureStore.getItemAsync(PENDING_EXECUTIONS_KEY);
+  return pending ? JSON.parse(pending) : [];
+};
+
+const writePendingExecutions = async (exercises: any[]) => {
+  if (exercises.length) {
+    await SecureStore.setItemAsync(PENDING_EXECUTIONS_KEY, JSON.stringify(exercises));
+  } else {
+    await SecureStore.deleteItemAsync(PENDING_EXECUTIONS_KEY);
+  }
+};
+
+export const syncService = {
+  // Pull only what changed since the last token (full snapshot when there is none).
+  // The token of each page is stored only after applyChanges has persisted it,
+  // so an interrupted sync resumes from the last applied page.
+  pull: async (applyChanges: (page: SyncPage) => Promise<void>) => {
+    let token = await SecureStore.getItemAsync(SYNC_TOKEN_KEY);
+    let hasMore = true;
+
+    while (hasMore) {
+      const response = await apiClient.get('/sync/pull', {
+        params: token ? { since: token } : {},
+      });
+      const page: SyncPage = response.data;
+      await applyChanges(page);
+
+      token = page.token;
+      await SecureStore.setItemAsync(SYNC_TOKEN_KEY, token);
+      hasMore = page.has_more;
+    }
+  },
+
+  // Push executions in batches; returns the client_ids the server stored
+  // (created now or already stored by an earlier attempt)
+  push: async (executions: any[]) => {
+    const acknowledged: string[] = [];
+    for (let i = 0; i < executions.length; i += SYNC_PUSH_BATCH_SIZE) {
+      const batch = executions.slice(i, i + SYNC_PUSH_BATCH_SIZE);
+      const response = await apiClient.post('/sync/push', { executions: batch });
+      const { created, duplicates, errors } = response.data.executions;
+
+      for (const item of [...created, ...duplicates]) {
+        acknowledged.push(batch[item.index].client_id);
+      }
+      for (const error of errors) {
+        console.warn('Execution rejected by sync:', batch[error.index].client_id, error.error);
+      }
+    }
+    return acknowledged;
+  },
+
+  resetToken: async () => {
+    await SecureStore.deleteItemAsync(SYNC_TOKEN_KEY);
+  },
+};
+
 export const offlineService = {
   // Store data for offline access
   storeData: async (key: string, data: any) => {
@@ -201,27 +274,53 @@ export const offlineService = {
     }
   },
 
+  // Queue an exercise completion made while offline.
+  // The clientId is generated once here and re-sent on every retry.
+  queueExerciseCompletion: async (exerciseId: string, data: any) => {
+    const exercises = await readPendingExecutions();
+    exercises.push({ exerciseId, data, clientId: generateClientId() });
+    await writePendingExecutions(exercises);
+  },
+
   // Sync offline data when connection is restored
-  syncOfflineData: async () => {
+  syncOfflineData: async (applyChanges: (page: SyncPage) => Promise<void>) => {
     try {
-      // Get pending exercise completions
-      const pendingExercises = await SecureStore.getItemAsync('pending_exercises');
-      if (pendingExercises) {
-        const exercises = JSON.parse(pendingExercises);
-        
-        for (const exercise of exercises) {
-          try {
-            await patientService.completeExercise(exercise.exerciseId, exercise.data);
-          } catch (error) {
-            console.error('Error syncing exercise:', error);
-          }
-        }
-        
-        // Clear pending exercises after sync
-        await SecureStore.deleteItemAsync('pending_exercises');
+      let exercises = await readPendingExecutions();
+
+      // Entries queued by older versions have no clientId: assign and store it
+      // before the first push, so retries keep the same idempotency key
+      if (exercises.some((exercise: any) => !exercise.clientId)) {
+        exercises = exercises.map((exercise: any) => ({
+          ...exercise,
+          clientId: exercise.clientId ?? generateClientId(),
+        }));
+        await writePendingExecutions(exercises);
       }
+
+      // Only entries that know their prescription can be sent
+      const pushable = exercises.filter((exercise: any) => exercise.data?.patient_exercise_id);
+      if (pushable.length) {
+        const acknowledged = new Set(
+          await syncService.push(
+            pushable.map((exercise: any) => ({
+              ...exercise.data,
+              client_id: exercise.clientId,
+            }))
+          )
+        );
+
+        // Re-read the queue: completions may have been queued during the push
+        const remaining = await readPendingExecutions();
+        await writePendingExecutions(
+          remaining.filter((exercise: any) => !acknowledged.has(exercise.clientId))
+        );
+      }
+
+      await syncService.pull(applyChanges);
+      return true;
     } catch (error) {
       console.error('Error syncing offline data:', error);
+      return false;
     }
   },
 };